@@ -0,0 +1,129 @@
+"""
+Benchmark opening chat history as it grows.
+
+Fills a temporary history database in steps up to --sessions sessions and
+--messages messages. At each step it times what the GUI does when a chat is
+opened: the first sidebar page, the newest page of messages, and the next
+older page (fetched when the chat is scrolled to the top). These are compared
+with the unpaginated loads (every session, every message of the chat). One
+"long chat" gets a share of every step's messages so its full load keeps
+growing, while its pages should not.
+
+Usage:
+    python bench_history.py [--sessions 10000] [--messages 1000000] [--steps 4]
+                            [--repeat 20] [--output history_bench.json]
+"""
+
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from config import HISTORY_PAGE_SIZE, HISTORY_SESSION_PAGE_SIZE
+from core.history import ChatHistoryManager
+
+LONG_CHAT_SHARE = 0.01  # Fraction of each step's messages that go to the long chat
+WORDS = "the a timer alarm weather light today tomorrow remind meeting news kitchen please what when how".split()
+
+
+def timed(fn, repeat):
+    """p50 of repeat calls, in ms."""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return round(float(np.percentile(samples, 50)), 3)
+
+
+def fill(history, sessions, messages, start_time, long_chat, rng):
+    """Append sessions and messages with increasing timestamps, in one transaction."""
+    db = history.db
+    first = db.query_one("SELECT COUNT(*) FROM sessions")[0]
+    session_ids = [f"bench-{first + i}" for i in range(sessions)]
+    db.executemany(
+        "INSERT INTO sessions (id, title, created_at, updated_at, pinned) VALUES (?, ?, ?, ?, ?)",
+        [(sid, f"Chat {sid}", start_time.isoformat(), start_time.isoformat(), int(rng.random() < 0.01))
+         for sid in session_ids],
+    )
+    all_ids = [row[0] for row in db.query("SELECT id FROM sessions")]
+    long_messages = int(messages * LONG_CHAT_SHARE)
+    rows = []
+    for i in range(messages):
+        sid = long_chat if i < long_messages else rng.choice(all_ids)
+        stamp = (start_time + timedelta(milliseconds=i)).isoformat()
+        content = " ".join(rng.choices(WORDS, k=16))
+        rows.append((sid, "user" if i % 2 == 0 else "assistant", content, stamp))
+    with db.transaction() as conn:
+        conn.executemany("INSERT INTO messages (session_id, role, content, timestamp) VALUES (?, ?, ?, ?)", rows)
+        conn.execute("UPDATE sessions SET updated_at = ? WHERE id = ?", (rows[-1][3], long_chat))
+
+
+def measure(history, long_chat, repeat):
+    newest = history.get_messages(long_chat, limit=HISTORY_PAGE_SIZE)
+    before_id = newest[0]["id"] if newest else None
+    return {
+        "sidebar_page_ms": timed(lambda: history.get_sessions(limit=HISTORY_SESSION_PAGE_SIZE), repeat),
+        "sidebar_all_ms": timed(history.get_sessions, max(1, repeat // 4)),
+        "chat_newest_page_ms": timed(lambda: history.get_messages(long_chat, limit=HISTORY_PAGE_SIZE), repeat),
+        "chat_older_page_ms": timed(
+            lambda: history.get_messages(long_chat, before_id=before_id, limit=HISTORY_PAGE_SIZE), repeat
+        ),
+        "chat_all_ms": timed(lambda: history.get_messages(long_chat), max(1, repeat // 4)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=10_000)
+    parser.add_argument("--messages", type=int, default=1_000_000)
+    parser.add_argument("--steps", type=int, default=4, help="Growth checkpoints")
+    parser.add_argument("--repeat", type=int, default=20, help="Timed calls per query")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="history_bench.json")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    report = {"created": datetime.now().isoformat(), "page_size": HISTORY_PAGE_SIZE,
+              "session_page_size": HISTORY_SESSION_PAGE_SIZE, "steps": []}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        history = ChatHistoryManager(os.path.join(tmp, "history.db"))
+        long_chat = history.create_session("Long chat")
+        history.flush()
+        start_time = datetime(2025, 1, 1)
+
+        print(f"{'Sessions':>9} {'Messages':>10} {'Long chat':>10} {'Sidebar pg':>11} {'Sidebar all':>12} "
+              f"{'Newest pg':>10} {'Older pg':>9} {'Chat all':>9}")
+        for step in range(1, args.steps + 1):
+            sessions = args.sessions * step // args.steps - args.sessions * (step - 1) // args.steps
+            messages = args.messages * step // args.steps - args.messages * (step - 1) // args.steps
+            fill(history, sessions, messages, start_time, long_chat, rng)
+            start_time += timedelta(days=30)
+
+            counts = {
+                "sessions": history.db.query_one("SELECT COUNT(*) FROM sessions")[0],
+                "messages": history.db.query_one("SELECT COUNT(*) FROM messages")[0],
+                "long_chat_messages": history.db.query_one(
+                    "SELECT COUNT(*) FROM messages WHERE session_id = ?", (long_chat,))[0],
+            }
+            row = {**counts, **measure(history, long_chat, args.repeat)}
+            report["steps"].append(row)
+            print(f"{row['sessions']:>9} {row['messages']:>10} {row['long_chat_messages']:>10} "
+                  f"{row['sidebar_page_ms']:>9.2f}ms {row['sidebar_all_ms']:>10.2f}ms "
+                  f"{row['chat_newest_page_ms']:>8.2f}ms {row['chat_older_page_ms']:>7.2f}ms "
+                  f"{row['chat_all_ms']:>7.2f}ms")
+        history.close()
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nReport written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
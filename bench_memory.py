@@ -0,0 +1,97 @@
+"""
+Benchmark the semantic memory index at growing sizes.
+
+Fills a temporary MemoryIndex through its normal incremental sync, using a
+synthetic message source and random unit vectors in place of the embedding
+model, so only the index itself is measured. At each checkpoint it times
+search_vector() (the float16 matrix product plus top-k, over the
+memory-mapped file) for random queries, and compares it with a brute-force
+float32 matrix held in RAM. Query embedding time depends on the Ollama model
+and is not included.
+
+Usage:
+    python bench_memory.py [--vectors 100000] [--dim 768] [--checkpoints 10000 50000 100000]
+                           [--queries 200] [--k 5] [--output memory_bench.json]
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+
+from config import MEMORY_SYNC_BATCH
+from core.memory_index import MemoryIndex, Source, normalize
+
+
+def latency(fn, queries):
+    samples = []
+    for query in queries:
+        start = time.perf_counter()
+        fn(query)
+        samples.append((time.perf_counter() - start) * 1000)
+    arr = np.array(samples)
+    return {"p50": round(float(np.percentile(arr, 50)), 3), "p95": round(float(np.percentile(arr, 95)), 3)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--vectors", type=int, default=100_000)
+    parser.add_argument("--dim", type=int, default=768, help="Embedding size (nomic-embed-text: 768)")
+    parser.add_argument("--checkpoints", type=int, nargs="+", default=[10_000, 50_000, 100_000])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="memory_bench.json")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    total = {"n": 0}  # Messages the synthetic source has "written" so far
+
+    def messages(after_id):
+        start = (after_id or 0) + 1
+        end = min(total["n"], start + MEMORY_SYNC_BATCH - 1)
+        return [(i, "user message", f"synthetic message number {i}", "") for i in range(start, end + 1)]
+
+    def embed(texts):
+        return rng.standard_normal((len(texts), args.dim), dtype=np.float32)
+
+    queries = normalize(rng.standard_normal((args.queries, args.dim), dtype=np.float32))
+    checkpoints = sorted(n for n in set(args.checkpoints + [args.vectors]) if n <= args.vectors)
+    report = {"created": datetime.now().isoformat(), "dim": args.dim, "k": args.k, "checkpoints": []}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        index = MemoryIndex(tmp, embed=embed, sources=[Source("messages", messages, append_only=True)],
+                            model="synthetic")
+        print(f"{'Vectors':>8} {'Sync/s':>9} {'File MB':>8} {'mmap p50':>9} {'mmap p95':>9} "
+              f"{'f32 RAM p50':>12}")
+        for n in checkpoints:
+            added, total["n"] = n - index.count, n
+            start = time.perf_counter()
+            index.sync()
+            sync_s = time.perf_counter() - start
+
+            matrix = np.array(index._vectors[:index.count], dtype=np.float32)  # In-RAM float32 baseline
+            row = {
+                "vectors": index.count,
+                "sync_rows_per_s": round(added / sync_s) if sync_s else None,
+                "file_mb": round(os.path.getsize(index.vectors_path) / 2**20, 1),
+                "search_ms": latency(lambda q: index.search_vector(q, args.k), queries),
+                "float32_ram_ms": latency(lambda q: np.argpartition(matrix @ q, -args.k)[-args.k:], queries),
+            }
+            report["checkpoints"].append(row)
+            print(f"{row['vectors']:>8} {row['sync_rows_per_s']:>9} {row['file_mb']:>8} "
+                  f"{row['search_ms']['p50']:>7.2f}ms {row['search_ms']['p95']:>7.2f}ms "
+                  f"{row['float32_ram_ms']['p50']:>10.2f}ms")
+        index.close()
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nReport written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
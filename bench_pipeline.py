@@ -0,0 +1,180 @@
+"""
+Benchmark the router-then-responder pipeline against native tool calling.
+
+Runs the same prompts (the held-out split of training_dataset_functions.jsonl by
+default) through both pipelines against a running Ollama and reports tool
+accuracy, routing time, time to first token, total time and prefilled prompt
+tokens. Tools are dry-run by default so no timers, alarms or tasks are created;
+pass --execute to call the real FunctionExecutor.
+
+    router: FunctionGemma routes, tools run, the responder answers with the results
+    native: the responder gets the tool schemas and calls the tools itself
+
+thinking and nonthinking count as the same "answer directly" choice, since the
+native pipeline has no separate passthrough functions. Both pipelines stream
+with think=False.
+
+Usage:
+    python bench_pipeline.py [--pipelines router native] [--split heldout] [--limit 50]
+                             [--model qwen3:1.7b] [--execute] [--output pipeline_bench.json]
+"""
+
+import argparse
+import json
+import time
+from datetime import datetime
+from itertools import islice
+
+import numpy as np
+
+from config import NATIVE_TOOLS_TIER, ROUTER_TRAINING_DATA
+from core.intent_classifier import is_held_out, iter_dataset
+from core.model_tiers import model_for_tier
+from core.native_tools import PASSTHROUGH_FUNCTIONS, run_native
+from core.ollama_client import ollama, ContentChunk, DoneStats, ToolCallChunk
+
+SYSTEM_PROMPT = "You are a helpful assistant. Respond naturally and concisely."
+
+
+def percentiles(values):
+    arr = np.array(values) if values else np.zeros(1)
+    return {
+        "mean": round(float(arr.mean()), 2),
+        "p50": round(float(np.percentile(arr, 50)), 2),
+        "p95": round(float(np.percentile(arr, 95)), 2),
+    }
+
+
+def same_choice(predicted, expected):
+    if expected in PASSTHROUGH_FUNCTIONS:
+        return predicted in PASSTHROUGH_FUNCTIONS
+    return predicted == expected
+
+
+def make_executor(real):
+    """execute(calls) -> one tool result message per call."""
+    if real:
+        from core.function_executor import executor as function_executor
+
+        def execute(calls):
+            results = function_executor.execute_many(calls)
+            return [f"ACTION RESULT: {name} {'succeeded' if r.get('success') else 'failed'}. {r.get('message', '')}"
+                    for (name, _), r in zip(calls, results)]
+    else:
+        def execute(calls):
+            return [f"ACTION RESULT: {name} succeeded. {json.dumps(args)} (dry run)" for name, args in calls]
+    return execute
+
+
+def stream(model, messages, events, start):
+    """Drain events; returns (first_token_ms, prefill_tokens, tool_names)."""
+    first_token = None
+    prefill = 0
+    tools = []
+    for event in events:
+        if isinstance(event, ContentChunk) and first_token is None:
+            first_token = (time.perf_counter() - start) * 1000
+        elif isinstance(event, ToolCallChunk):
+            tools.extend(name for name, _ in event.calls)
+        elif isinstance(event, DoneStats):
+            prefill += event.prompt_eval_count
+    return first_token, prefill, tools
+
+
+def run_router(prompt, model, execute):
+    from core.llm import route_cache, route_query_multi
+
+    route_cache.clear()  # Measure the router, not the cache
+    start = time.perf_counter()
+    calls = route_query_multi(prompt)
+    route_ms = (time.perf_counter() - start) * 1000
+
+    actions = [(name, args) for name, args in calls if name not in PASSTHROUGH_FUNCTIONS]
+    content = prompt
+    if actions:
+        context = "\n".join(execute(actions))
+        content = f"{context}\n\nUser asked: {prompt}\n\nRespond naturally and concisely."
+    messages = [{"role": "system", "content": SYSTEM_PROMPT}, {"role": "user", "content": content}]
+    first_token, prefill, _ = stream(
+        model, messages, ollama.chat_stream(model, messages, think=False, keep_alive="5m"), start
+    )
+    return calls[0][0], route_ms, first_token, prefill, (time.perf_counter() - start) * 1000
+
+
+def run_native_pipeline(prompt, model, execute):
+    start = time.perf_counter()
+    messages = [{"role": "system", "content": SYSTEM_PROMPT}, {"role": "user", "content": prompt}]
+    first_token, prefill, tools = stream(
+        model, messages, run_native(model, messages, execute, keep_alive="5m"), start
+    )
+    return (tools[0] if tools else "nonthinking"), 0.0, first_token, prefill, (time.perf_counter() - start) * 1000
+
+
+PIPELINES = {"router": run_router, "native": run_native_pipeline}
+
+
+def evaluate(name, examples, model, execute):
+    run = PIPELINES[name]
+    run(examples[0][0], model, execute)  # Warm up models and connections
+
+    correct = 0
+    route_ms, first_token_ms, total_ms, prefill = [], [], [], []
+    errors = []
+    for prompt, expected, _ in examples:
+        predicted, route, first_token, tokens, total = run(prompt, model, execute)
+        if same_choice(predicted, expected):
+            correct += 1
+        elif len(errors) < 20:
+            errors.append({"prompt": prompt, "expected": expected, "predicted": predicted})
+        route_ms.append(route)
+        if first_token is not None:
+            first_token_ms.append(first_token)
+        total_ms.append(total)
+        prefill.append(tokens)
+
+    return {
+        "accuracy": round(correct / len(examples), 4),
+        "route_ms": percentiles(route_ms),
+        "first_token_ms": percentiles(first_token_ms),
+        "total_ms": percentiles(total_ms),
+        "prefill_tokens": percentiles(prefill),
+        "errors": errors,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pipelines", nargs="+", default=list(PIPELINES), choices=list(PIPELINES))
+    parser.add_argument("--data", default=ROUTER_TRAINING_DATA)
+    parser.add_argument("--split", choices=["heldout", "all"], default="heldout")
+    parser.add_argument("--limit", type=int, default=50, help="Prompts to run (0 = all)")
+    parser.add_argument("--model", default=None, help="Responder model (default: the native tools tier)")
+    parser.add_argument("--execute", action="store_true", help="Run the real tools instead of a dry run")
+    parser.add_argument("--output", default="pipeline_bench.json")
+    args = parser.parse_args()
+
+    examples = (e for e in iter_dataset(args.data) if args.split == "all" or is_held_out(e[0]))
+    examples = list(islice(examples, args.limit) if args.limit else examples)
+    model = args.model or model_for_tier(NATIVE_TOOLS_TIER)
+    execute = make_executor(args.execute)
+    print(f"{len(examples)} prompts, responder {model}, tools {'executed' if args.execute else 'dry run'}")
+
+    report = {"created": datetime.now().isoformat(), "model": model, "prompts": len(examples), "pipelines": {}}
+    for name in args.pipelines:
+        print(f"\n[{name}]")
+        report["pipelines"][name] = evaluate(name, examples, model, execute)
+
+    print(f"\n{'Pipeline':<8} {'Accuracy':>9} {'Route p50':>10} {'TTFT p50':>9} {'TTFT p95':>9} "
+          f"{'Total p50':>10} {'Prefill':>8}")
+    for name, r in report["pipelines"].items():
+        print(f"{name:<8} {r['accuracy']:>9.1%} {r['route_ms']['p50']:>8.0f}ms "
+              f"{r['first_token_ms']['p50']:>7.0f}ms {r['first_token_ms']['p95']:>7.0f}ms "
+              f"{r['total_ms']['p50']:>8.0f}ms {r['prefill_tokens']['mean']:>8.0f}")
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nReport written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -8,6 +8,39 @@ OLLAMA_URL = "http://localhost:11434/api"
 LOCAL_ROUTER_PATH = "./merged_model"
 HF_ROUTER_REPO = "nlouis/pocket-ai-router"  # Hugging Face repo for auto-download
 MAX_HISTORY = 20
+RESPONSE_CACHE_PATH = "./data/response_cache.db"  # Cached nonthinking answers (opt-in: settings "general.response_cache")
+RESPONSE_CACHE_TTL = 7 * 24 * 3600  # Seconds before a cached answer expires
+RESPONSE_CACHE_MAX_ENTRIES = 500  # Least recently used answers are evicted beyond this
+CONTEXT_MAX_TOKENS = 3000  # Estimated prompt budget for chat/voice history before it is trimmed
+CONTEXT_TRIM_RATIO = 0.5  # Trim down to this fraction of the budget at once, so the prompt prefix stays stable between trims
+CONTEXT_SUMMARY_ENABLED = True  # Replace trimmed turns with a rolling summary message
+CONTEXT_SUMMARY_MAX_TOKENS = 200  # Max length of the rolling summary
+SYSTEM_CONTEXT_MAX_TOKENS = 250  # Estimated budget for get_system_info results in the responder prompt
+OLLAMA_CONNECT_TIMEOUT = 5  # Seconds to connect to Ollama
+OLLAMA_READ_TIMEOUT = 120  # Seconds to wait for a non-streaming response (covers model loading)
+OLLAMA_STREAM_READ_TIMEOUT = 300  # Max seconds between streamed chunks
+OLLAMA_MAX_CONNECTIONS = 10  # Size of the shared connection pool (core/ollama_client.py)
+OLLAMA_KEEPALIVE_EXPIRY = 60  # Seconds an idle pooled connection stays open
+ROUTER_PREFIX_CACHE = True  # Prefill the router's tool-schema prompt once and reuse its KV cache
+ROUTER_MODE = "generate"  # "generate" decodes the full call, "constrained" decodes it under the call grammar, "score" ranks function names in one forward pass
+ROUTER_SCORE_TEMPERATURE = 1.0  # Confidence calibration for "score" mode (see FunctionGemmaRouter.calibrate_temperature)
+ROUTER_BATCH_SIZE = 8  # Max prompts per batched generate() in FunctionGemmaRouter.route_batch
+ROUTER_BACKEND = "torch"  # "torch", "int8" (dynamic quantization) or "onnx" (ONNX Runtime); settings "router.backend" overrides
+ROUTER_BACKEND_CACHE_DIR = "./data/router_backends"  # Cached int8 / ONNX conversions of the router
+ROUTER_OUT_OF_PROCESS = True  # Run the router in a worker process (core/router_server.py) so the GUI never imports torch
+ROUTER_SERVER_TIMEOUT = 30  # Seconds per routing request before the worker is restarted
+ROUTER_SERVER_START_TIMEOUT = 300  # Seconds to wait for the worker to load (first run may download the model)
+ROUTE_CACHE_ENABLED = True  # Reuse router results for repeated prompts
+ROUTE_CACHE_SIZE = 256  # Max cached prompts (LRU)
+ROUTE_CACHE_TTL = 3600  # Seconds before a cached route expires
+INTENT_CLASSIFIER_ENABLED = True  # Route unambiguous queries with the lexical classifier before the router
+INTENT_CLASSIFIER_PATH = "./data/intent_classifier.npz"  # Trained from ROUTER_TRAINING_DATA if missing
+INTENT_CLASSIFIER_THRESHOLD = 0.9  # Below this confidence the router decides
+ROUTER_TRAINING_DATA = "./training_dataset_functions.jsonl"
+SPECULATIVE_ROUTING_ENABLED = True  # Route the chat input box in the background while the user types
+SPECULATIVE_ROUTING_DEBOUNCE_MS = 400  # Typing pause before a draft is routed
+SPECULATIVE_ROUTING_MAX_AGE = 60  # Seconds a speculative route stays usable
+SPECULATIVE_WARM_INTERVAL = 60  # Min seconds between responder warm-ups triggered by typing
 
 # --- TTS Configuration ---
 TTS_VOICE_MODEL = "en_GB-northern_english_male-medium"
@@ -35,6 +68,62 @@ VOICE_ASSISTANT_ENABLED = True
 QWEN_TIMEOUT_SECONDS = 300  # 5 minutes of inactivity before sleep
 QWEN_KEEP_ALIVE = "5m"  # Keep in memory for 5 minutes after last use
 
+# --- Model Residency ---
+MODEL_MEMORY_BUDGET_GB = 0  # Memory for resident Ollama models (settings "models.memory_budget_gb"; 0 = auto)
+MODEL_MEMORY_AUTO_FRACTION = 0.6  # Auto budget: this share of system RAM
+RESIDENCY_TICK_SECONDS = 10  # How often idle models and preload hints are checked
+
+# --- Local Storage (core/storage.py: history, tasks, calendar) ---
+STORAGE_CACHE_SIZE_KB = 8192  # SQLite page cache per connection
+STORAGE_STATEMENT_CACHE = 256  # Prepared statements kept per connection
+STORAGE_BUSY_TIMEOUT = 5  # Seconds to wait for another writer's lock
+STORAGE_GROUP_COMMIT_MS = 30  # Write-behind: how long queued writes wait for others to share a commit
+HISTORY_PAGE_SIZE = 50  # Messages loaded per page when opening a chat (older pages load on scroll)
+HISTORY_SESSION_PAGE_SIZE = 100  # Sessions loaded per page in the chat sidebar
+HISTORY_SEARCH_LIMIT = 30  # Results shown by the sidebar search
+HISTORY_SEARCH_DEBOUNCE_MS = 150  # Typing pause before the sidebar search runs
+HISTORY_FTS_BACKFILL_BATCH = 2000  # Messages indexed per transaction when building the search index for existing history
+HISTORY_SYNCHRONOUS = "NORMAL"  # Chat history durability: "FULL" fsyncs every commit, "NORMAL" only at WAL checkpoints (may lose the last replies on power loss, never corrupts), "OFF" leaves it to the OS
+
+# --- Semantic Memory (core/memory_index.py) ---
+MEMORY_ENABLED = True  # Recall earlier chats, tasks and events into the responder prompt (settings "memory.enabled")
+MEMORY_EMBED_MODEL = "nomic-embed-text"  # Ollama embedding model (settings "memory.embed_model"; changing it rebuilds the index)
+MEMORY_EMBED_KEEP_ALIVE = "10m"  # How long the embedding model stays loaded after use
+MEMORY_INDEX_DIR = "./data/memory_index"  # vectors.f16 (memory-mapped float16 matrix) + index.db (what each row is)
+MEMORY_EMBED_BATCH = 32  # Texts per embedding request
+MEMORY_SYNC_BATCH = 512  # New messages read per step of an incremental sync
+MEMORY_MIN_TEXT_CHARS = 12  # Shorter messages ("ok", "thanks") are not indexed
+MEMORY_MAX_TEXT_CHARS = 1000  # Longer texts are truncated before embedding
+MEMORY_TOP_K = 5  # Matches considered for the responder prompt
+MEMORY_MIN_SCORE = 0.5  # Minimum cosine similarity for a match to be used
+MEMORY_CONTEXT_MAX_TOKENS = 200  # Estimated budget for recalled snippets in the responder prompt
+MEMORY_SNIPPET_CHARS = 240  # Each recalled snippet is cut to this length
+MEMORY_QUERY_TIMEOUT = 2  # Seconds to embed the question before answering without memory
+MEMORY_RETRY_SECONDS = 300  # Wait after the embedding model failed (e.g. not pulled) before trying again
+
+# --- LLM Metrics ---
+METRICS_DB_PATH = "./data/metrics.db"  # Per-reply token counts, timings and TTFT from Ollama
+METRICS_RETENTION_DAYS = 30  # Older rows are dropped at startup (0 = keep forever)
+METRICS_WINDOW_SECONDS = 3600  # Rolling window for the summaries shown in the UI
+
+# --- Ollama Status (/api/ps) ---
+OLLAMA_STATUS_TTL = 1.0  # Seconds a /api/ps result is reused
+OLLAMA_STATUS_ACTIVE_INTERVAL = 1.0  # Poll interval while a generation is running
+OLLAMA_STATUS_IDLE_INTERVAL = 10.0  # Poll interval while idle (paused while the window is hidden)
+
+# --- Response Tiers ---
+# Responder tier per routed function; anything not listed uses the "fast" tier.
+# Tier models are set in settings "models.tiers" (empty = the chat model).
+RESPONSE_TIER_FUNCTIONS = {"thinking": "deep", "get_system_info": "deep", "web_search": "deep"}
+PINNED_KEEP_ALIVE = -1  # A separately configured fast tier never expires
+
+# --- Native Tool Calling ---
+# settings "pipeline.mode": "router" (FunctionGemma, then the responder) or
+# "native" (the responder calls the tools itself via /api/chat tools)
+PIPELINE_MODE = "router"
+NATIVE_TOOLS_TIER = "deep"  # Response tier whose model handles native tool calls
+NATIVE_TOOLS_MAX_ROUNDS = 2  # Tool-call rounds before the model must answer
+
 # --- Router Keywords ---
 # REMOVED: ROUTER_KEYWORDS - All queries now go through Function Gemma router
 # The router handles all routing decisions, so keyword-based bypass is no longer needed
@@ -1,10 +1,26 @@
 # core package
-from core.tts import PiperTTS, SentenceBuffer, tts
-from core.router import FunctionGemmaRouter
-from core.llm import route_query, execute_function, should_bypass_router, preload_models, http_session
-
-__all__ = [
-    "PiperTTS", "SentenceBuffer", "tts",
-    "FunctionGemmaRouter", 
-    "route_query", "execute_function", "should_bypass_router", "preload_models", "http_session"
-]
+#
+# Exports are resolved lazily (PEP 562) so that importing any core submodule
+# doesn't pull in tts (sounddevice) or the router (torch/transformers).
+import importlib
+
+_EXPORTS = {
+    "PiperTTS": "core.tts",
+    "SentenceBuffer": "core.tts",
+    "tts": "core.tts",
+    "FunctionGemmaRouter": "core.router",
+    "route_query": "core.llm",
+    "route_query_multi": "core.llm",
+    "execute_function": "core.llm",
+    "should_bypass_router": "core.llm",
+    "preload_models": "core.llm",
+    "ollama": "core.ollama_client",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    if name in _EXPORTS:
+        return getattr(importlib.import_module(_EXPORTS[name]), name)
+    raise AttributeError(f"module 'core' has no attribute {name!r}")
@@ -7,8 +7,7 @@ import json
 from .browser_controller import BrowserController
 from .vlm_client import VLMClient
 
-from core.model_manager import ensure_exclusive_qwen
-from core.model_persistence import unload_qwen
+from core.model_persistence import residency, PRIORITY_AGENT
 
 class BrowserAgent(QObject):
     """
@@ -36,10 +35,8 @@ class BrowserAgent(QObject):
         self.history = []
 
     def start_task(self, instruction: str):
-        # Unload Qwen model to free VRAM for VLM
-        unload_qwen("browser_agent_using_vlm")
-        # Unload other models to free VRAM
-        ensure_exclusive_qwen(self.client.model_name)
+        # Load the VLM, evicting idle models if it doesn't fit the memory budget
+        residency.ensure_loaded(self.client.model_name, PRIORITY_AGENT)
         
         self.running = True
         self.history = []
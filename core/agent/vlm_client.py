@@ -1,8 +1,9 @@
 import json
 import re
-import requests
 from typing import List, Dict, Any, Generator
 
+from core.model_persistence import residency
+from core.ollama_client import ollama, ThinkingChunk, ContentChunk
 from core.settings_store import settings as app_settings
 
 class VLMClient:
@@ -97,39 +98,21 @@ class VLMClient:
             Dict: {"type": "action", "content": dict} for final parsed action
         """
         try:
-            response = requests.post(
-                f"{self.base_url}/api/chat",
-                json={
-                    "model": self.model_name,
-                    "messages": messages,
-                    "stream": True,
-                    "think": True,
-                    "options": self.model_params
-                },
-                stream=True
-            )
-            
+            residency.touch(self.model_name)
             full_response = ""
             full_thinking = ""
             
-            for line in response.iter_lines():
-                if line:
-                    data = json.loads(line.decode('utf-8'))
-                    msg = data.get("message", {})
-                    
-                    # 1. Handle "thinking" field (Qwen/DeepSeek reasoning models)
-                    if "thinking" in msg and msg["thinking"]:
-                        yield {"type": "thinking", "content": msg["thinking"]}
-                        full_thinking += msg["thinking"]
-                    
-                    # 2. Handle "content" field
-                    chunk = msg.get("content", "")
-                    if chunk:
-                        full_response += chunk
-                        yield {"type": "text", "content": chunk}
-                        
-                    if data.get("done"):
-                        break
+            for event in ollama.chat_stream(self.model_name, messages, think=True,
+                                            options=self.model_params, base_url=self.base_url):
+                # 1. Handle "thinking" field (Qwen/DeepSeek reasoning models)
+                if isinstance(event, ThinkingChunk):
+                    yield {"type": "thinking", "content": event.text}
+                    full_thinking += event.text
+                
+                # 2. Handle "content" field
+                elif isinstance(event, ContentChunk):
+                    full_response += event.text
+                    yield {"type": "text", "content": event.text}
             
             print(f"\n[DEBUG] Full Thinking:\n{full_thinking}\n")
             print(f"[DEBUG] Full Model Response (No Thinking):\n{full_response}\n[DEBUG] End Response\n")
@@ -1,34 +1,36 @@
-import sqlite3
 import uuid
-import os
 from datetime import datetime
 from typing import List, Dict, Optional
 
+from core.storage import Database
+
+# Schema versions (PRAGMA user_version); append new migrations, never edit old ones
+MIGRATIONS = [
+    [
+        """
+        CREATE TABLE IF NOT EXISTS events (
+            id TEXT PRIMARY KEY,
+            title TEXT NOT NULL,
+            start_time TIMESTAMP NOT NULL,
+            end_time TIMESTAMP NOT NULL,
+            category TEXT DEFAULT 'WORK',
+            description TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+    ],
+]
+
 class CalendarManager:
     """Manages calendar events using a local SQLite database."""
     
     def __init__(self, db_path: str = "data/calendar.db"):
         self.db_path = db_path
-        self._init_db()
+        self.db = Database(db_path, MIGRATIONS, name="Calendar")
         
-    def _init_db(self):
-        """Initialize the database and create table if not exists."""
-        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
-        
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS events (
-                    id TEXT PRIMARY KEY,
-                    title TEXT NOT NULL,
-                    start_time TIMESTAMP NOT NULL,
-                    end_time TIMESTAMP NOT NULL,
-                    category TEXT DEFAULT 'WORK',
-                    description TEXT,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            """)
-            conn.commit()
+    def close(self):
+        """Close the database connections."""
+        self.db.close()
             
     def get_events(self, date_str: str) -> List[Dict]:
         """
@@ -39,17 +41,21 @@ class CalendarManager:
             start_of_day = f"{date_str} 00:00:00"
             end_of_day = f"{date_str} 23:59:59"
             
-            with sqlite3.connect(self.db_path) as conn:
-                conn.row_factory = sqlite3.Row
-                cursor = conn.cursor()
-                cursor.execute("""
-                    SELECT * FROM events 
-                    WHERE start_time BETWEEN ? AND ? 
-                    ORDER BY start_time ASC
-                """, (start_of_day, end_of_day))
-                
-                rows = cursor.fetchall()
-                return [dict(row) for row in rows]
+            rows = self.db.query("""
+                SELECT * FROM events 
+                WHERE start_time BETWEEN ? AND ? 
+                ORDER BY start_time ASC
+            """, (start_of_day, end_of_day))
+            return [dict(row) for row in rows]
+        except Exception as e:
+            print(f"Error loading events: {e}")
+            return []
+
+    def get_all_events(self) -> List[Dict]:
+        """Retrieve every event ordered by start time."""
+        try:
+            rows = self.db.query("SELECT * FROM events ORDER BY start_time ASC")
+            return [dict(row) for row in rows]
         except Exception as e:
             print(f"Error loading events: {e}")
             return []
@@ -61,22 +67,19 @@ class CalendarManager:
         """
         event_id = str(uuid.uuid4())
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-                cursor.execute("""
-                    INSERT INTO events (id, title, start_time, end_time, category, description) 
-                    VALUES (?, ?, ?, ?, ?, ?)
-                """, (event_id, title, start_time, end_time, category, description))
-                conn.commit()
-                
-                return {
-                    "id": event_id,
-                    "title": title,
-                    "start_time": start_time,
-                    "end_time": end_time,
-                    "category": category,
-                    "description": description
-                }
+            self.db.execute("""
+                INSERT INTO events (id, title, start_time, end_time, category, description) 
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, (event_id, title, start_time, end_time, category, description))
+            
+            return {
+                "id": event_id,
+                "title": title,
+                "start_time": start_time,
+                "end_time": end_time,
+                "category": category,
+                "description": description
+            }
         except Exception as e:
             print(f"Error adding event: {e}")
             return None
@@ -84,10 +87,7 @@ class CalendarManager:
     def delete_event(self, event_id: str):
         """Delete an event by ID."""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-                cursor.execute("DELETE FROM events WHERE id = ?", (event_id,))
-                conn.commit()
+            self.db.execute("DELETE FROM events WHERE id = ?", (event_id,))
         except Exception as e:
             print(f"Error deleting event: {e}")
 
@@ -0,0 +1,154 @@
+"""
+Context Builder - Compact, token-budgeted tool results for the responder.
+
+Function results are turned into the context message the responder answers
+from. get_system_info returns every timer, alarm, event, task, device and news
+item, which used to be pasted in as Python reprs with no size limit. Here each
+item becomes a short line, items are ranked by how relevant they are to the
+user's question, and the best ones are kept until the token budget is spent.
+Sections that had to drop items say how many were left out. Shared by
+ChatWorker and VoiceAssistant.
+"""
+
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+from config import SYSTEM_CONTEXT_MAX_TOKENS
+
+CHARS_PER_TOKEN = 4  # Same estimate as core/context_window.py
+
+WORD_PATTERN = re.compile(r"[a-z0-9']+")
+
+# Words that mark a question as being about a section
+SECTION_KEYWORDS = {
+    "time": {"time", "date", "day", "today", "now", "clock"},
+    "timers": {"timer", "timers", "countdown", "remaining", "left"},
+    "alarms": {"alarm", "alarms", "wake", "morning"},
+    "calendar": {"calendar", "event", "events", "meeting", "meetings", "schedule", "appointment", "agenda", "today"},
+    "tasks": {"task", "tasks", "todo", "to-do", "list", "pending", "remind", "chores"},
+    "devices": {"light", "lights", "lamp", "device", "devices", "plug", "on", "off", "home"},
+    "weather": {"weather", "temperature", "rain", "sunny", "cold", "hot", "forecast", "outside", "umbrella"},
+    "news": {"news", "headline", "headlines", "happening", "world", "stories"},
+}
+
+# Output order and base priority (how useful a section is for a generic "what's up" question)
+SECTIONS: List[Tuple[str, str, float]] = [
+    ("time", "Now", 3.0),
+    ("timers", "Active timers", 3.0),
+    ("alarms", "Alarms", 2.0),
+    ("calendar", "Today's events", 2.5),
+    ("tasks", "Pending tasks", 2.0),
+    ("devices", "Devices on", 1.0),
+    ("weather", "Weather", 2.0),
+    ("news", "Top news", 1.0),
+]
+
+LABELS = {key: label for key, label, _ in SECTIONS}
+
+SECTION_MATCH_BOOST = 10.0  # The question names the section
+ITEM_MATCH_BOOST = 3.0  # Per question word that appears in the item
+POSITION_DECAY = 0.05  # Earlier items in a section (soonest, newest) rank slightly higher
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def _words(text: str) -> set:
+    return set(WORD_PATTERN.findall(text.lower()))
+
+
+def _section_items(data: Dict[str, Any]) -> Dict[str, List[str]]:
+    """One short line per item, in the order get_system_info returns them."""
+    weather = data.get("weather") or {}
+    weather_line = ""
+    if weather:
+        weather_line = f"{weather.get('temp')}°F, {weather.get('condition')}"
+        if weather.get("high") is not None and weather.get("low") is not None:
+            weather_line += f" (high {weather['high']}, low {weather['low']})"
+    return {
+        "time": [data["current_time"]] if data.get("current_time") else [],
+        "timers": [f"{t.get('label', 'Timer')} ({t.get('remaining', '?')} left)" for t in data.get("timers") or []],
+        "alarms": [f"{a.get('time', '?')} {a.get('label', '')}".strip() for a in data.get("alarms") or []],
+        "calendar": [f"{e.get('time', '')} {e.get('title', '')}".strip() for e in data.get("calendar_today") or []],
+        "tasks": [t.get("text", "") for t in data.get("tasks") or [] if not t.get("completed")],
+        "devices": [d.get("name", "Unknown") for d in data.get("smart_devices") or [] if d.get("is_on")],
+        "weather": [weather_line] if weather_line else [],
+        "news": [item.get("title", "")[:80] for item in data.get("news") or [] if item.get("title")],
+    }
+
+
+def build_system_context(data: Dict[str, Any], query: str = "",
+                         max_tokens: Optional[int] = None) -> str:
+    """
+    Serialize get_system_info data into at most max_tokens (estimated), keeping the
+    items most relevant to query. Returns "" if there is nothing to report.
+    """
+    max_tokens = SYSTEM_CONTEXT_MAX_TOKENS if max_tokens is None else max_tokens
+    query_words = _words(query)
+    items = _section_items(data)
+
+    ranked = []
+    for order, (key, _, priority) in enumerate(SECTIONS):
+        section_score = priority + (SECTION_MATCH_BOOST if query_words & SECTION_KEYWORDS[key] else 0.0)
+        for position, text in enumerate(items[key]):
+            score = section_score + ITEM_MATCH_BOOST * len(query_words & _words(text)) - POSITION_DECAY * position
+            ranked.append((-score, order, position, key, text))
+    ranked.sort()
+
+    header = "SYSTEM CONTEXT:"
+    used = estimate_tokens(header)
+    kept: Dict[str, List[Tuple[int, str]]] = {key: [] for key, _, _ in SECTIONS}
+    for _, _, position, key, text in ranked:
+        # A section's label (and a possible "+N more") is paid for by its first item
+        cost = estimate_tokens(f"; {text}")
+        if not kept[key]:
+            cost += estimate_tokens(LABELS[key]) + 3
+        if used + cost > max_tokens:
+            continue
+        kept[key].append((position, text))
+        used += cost
+
+    lines = []
+    for key, label, _ in SECTIONS:
+        if key == "devices" and not kept[key] and not items[key] and data.get("smart_devices"):
+            lines.append(f"{label}: none")
+            continue
+        if not kept[key]:
+            continue
+        line = f"{label}: " + "; ".join(text for _, text in sorted(kept[key]))
+        omitted = len(items[key]) - len(kept[key])
+        if omitted:
+            line += f" (+{omitted} more)"
+        lines.append(line)
+    return header + "\n" + "\n".join(lines) if lines else ""
+
+
+def build_context_message(func_name: str, result: Dict[str, Any], query: str = "",
+                          max_tokens: Optional[int] = None, spoken: bool = False) -> str:
+    """
+    Describe a function result for the responder. spoken: the reply is read
+    aloud (voice), so search results come without URLs or link formatting.
+    """
+    if func_name == "get_system_info" and result.get("success"):
+        return (build_system_context(result.get("data", {}), query, max_tokens)
+                or "No system information available.")
+
+    status = "succeeded" if result.get("success") else "failed"
+    search = result.get("data") if func_name == "web_search" and result.get("success") else None
+    if search and search.get("results"):
+        # Full search results so the responder can answer and cite them
+        context_msg = f"SEARCH RESULTS for '{search.get('query', '')}':\n\n"
+        for i, r in enumerate(search["results"], 1):
+            context_msg += f"{i}. {r.get('title', '')}\n"
+            context_msg += f"   {r.get('body', '')}\n"
+            if not spoken:
+                context_msg += f"   URL: {r.get('url', '')}\n"
+            context_msg += "\n"
+        context_msg += "Use the above search results to answer the user's question. "
+        if spoken:
+            context_msg += "Your answer will be read aloud, so do not include URLs, links or markdown."
+        else:
+            context_msg += "Include relevant URLs in your response using markdown link format [text](url)."
+        return context_msg
+    return f"ACTION RESULT: {func_name} {status}. {result.get('message', '')}"
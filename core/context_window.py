@@ -0,0 +1,196 @@
+"""
+Context Window - Token-budgeted, prefix-stable trimming of chat history.
+
+Trimming one message per turn shifts the start of the prompt every turn, so
+Ollama can never reuse its KV cache and re-evaluates the whole context. Instead
+the history is trimmed rarely and in large blocks: once it exceeds the budget,
+the oldest turns are cut down to a low-water mark and replaced by a rolling
+summary message. Between trims the prompt only grows at the end, so the prefix
+stays byte-identical and only the new turn has to be prefilled.
+
+A trim never waits for the model: it puts an extractive summary in the prompt
+right away and asks the summarizer for a proper one on a background thread.
+That one replaces the extractive text as the basis of the next trim's summary
+(swapping it in earlier would break the stable prefix).
+"""
+
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from config import (
+    CONTEXT_MAX_TOKENS, CONTEXT_TRIM_RATIO, CONTEXT_SUMMARY_ENABLED, CONTEXT_SUMMARY_MAX_TOKENS,
+    RESPONDER_MODEL, GRAY, RESET
+)
+
+SUMMARY_PREFIX = "Summary of the earlier conversation:\n"
+
+Message = Dict[str, Any]
+
+
+def estimate_tokens(messages: List[Message]) -> int:
+    """Rough token count (~4 characters per token plus per-message overhead)."""
+    return sum(len(m.get("content") or "") // 4 + 4 for m in messages)
+
+
+def is_summary(message: Message) -> bool:
+    return message.get("role") == "system" and (message.get("content") or "").startswith(SUMMARY_PREFIX)
+
+
+def summarize_with_model(previous: str, evicted: List[Message], model: Optional[str] = None) -> str:
+    """
+    Fold evicted turns into the rolling summary using the responder model of
+    this turn (already loaded or loading), so a trim never loads another model.
+    """
+    from core.ollama_client import ollama
+
+    transcript = "\n".join(f"{m['role']}: {m.get('content', '')}" for m in evicted)
+    prompt = (
+        "Update the summary of a conversation between a user and an assistant.\n"
+        f"Current summary:\n{previous or '(none)'}\n\n"
+        f"New messages:\n{transcript}\n\n"
+        "Write the updated summary in a few short sentences. Keep names, facts, preferences "
+        "and open requests. Output only the summary."
+    )
+    response = ollama.chat(
+        model or RESPONDER_MODEL,
+        [{"role": "user", "content": prompt}],
+        think=False,
+        options={"temperature": 0.2, "num_predict": CONTEXT_SUMMARY_MAX_TOKENS},
+        timeout=60,
+    )
+    return response["message"]["content"].strip()
+
+
+def summarize_extractive(previous: str, evicted: List[Message]) -> str:
+    """Fallback summary: the opening of each evicted user turn."""
+    lines = [previous] if previous else []
+    for m in evicted:
+        if m.get("role") == "user":
+            text = " ".join((m.get("content") or "").split())
+            lines.append(f"- User asked: {text[:120]}")
+    # Keep the fallback bounded
+    return "\n".join(lines)[-CONTEXT_SUMMARY_MAX_TOKENS * 4:]
+
+
+class ContextWindow:
+    """
+    Keeps a message list (system prompt first) under a token and message budget.
+    fit() trims in place so callers holding the same list see the result.
+    """
+
+    def __init__(self, max_tokens: int = CONTEXT_MAX_TOKENS, trim_ratio: float = CONTEXT_TRIM_RATIO,
+                 summarizer: Optional[Callable[[str, List[Message], Optional[str]], str]] = None,
+                 name: str = "Context"):
+        self.max_tokens = max_tokens
+        self.trim_ratio = trim_ratio
+        self.summarizer = summarizer
+        self.name = name
+
+        self._lock = threading.Lock()
+        # (summary put in the prompt at the last trim, the summarizer's version of it once ready)
+        self._refresh: Optional[Tuple[str, Optional[str]]] = None
+        self._refresh_thread: Optional[threading.Thread] = None
+        self.trims = 0
+        self.turns = 0
+        self.prompt_tokens = 0  # Estimated tokens sent
+        self.prefill_tokens = 0  # Tokens Ollama actually evaluated (prompt_eval_count)
+
+    def fit(self, messages: List[Message], max_messages: Optional[int] = None,
+            model: Optional[str] = None) -> bool:
+        """
+        Trim messages in place if they exceed the budget. Returns True if trimmed.
+        The last message (the new user turn) is always kept. model is the
+        responder for this turn, passed on to the summarizer.
+        """
+        head = 1  # System prompt
+        if len(messages) > 1 and is_summary(messages[1]):
+            head = 2
+        body = messages[head:]
+
+        over_tokens = estimate_tokens(messages) > self.max_tokens
+        over_count = max_messages is not None and len(body) > max_messages
+        if not (over_tokens or over_count) or len(body) < 2:
+            return False
+
+        # Cut down to the low-water mark in one go, at a user-turn boundary
+        token_target = int(self.max_tokens * self.trim_ratio) - estimate_tokens(messages[:head])
+        count_target = int(max_messages * self.trim_ratio) if max_messages else len(body)
+        keep = len(body) - 1
+        while keep > 0:
+            candidate = body[keep - 1:]
+            if len(candidate) > count_target or estimate_tokens(candidate) > token_target:
+                break
+            keep -= 1
+        while keep < len(body) - 1 and body[keep].get("role") != "user":
+            keep += 1
+
+        evicted, kept = body[:keep], body[keep:]
+        previous = messages[1]["content"][len(SUMMARY_PREFIX):] if head == 2 else ""
+        with self._lock:
+            if self._refresh and self._refresh[0] == previous and self._refresh[1]:
+                previous = self._refresh[1]
+        summary = self._summarize(previous, evicted, model) if CONTEXT_SUMMARY_ENABLED else ""
+
+        new_head = messages[:1]
+        if summary:
+            new_head.append({"role": "system", "content": SUMMARY_PREFIX + summary})
+        messages[:] = new_head + kept
+
+        with self._lock:
+            self.trims += 1
+        print(f"{GRAY}[{self.name}] Trimmed {len(evicted)} messages into the summary "
+              f"({estimate_tokens(messages)} tokens left){RESET}")
+        return True
+
+    def _summarize(self, previous: str, evicted: List[Message], model: Optional[str]) -> str:
+        """The extractive summary now; the summarizer's version is refreshed in the background."""
+        if not evicted:
+            return previous
+        summary = summarize_extractive(previous, evicted)
+        if self.summarizer is not None:
+            with self._lock:
+                self._refresh = (summary, None)
+            self._refresh_thread = threading.Thread(
+                target=self._refresh_summary, args=(summary, previous, evicted, model),
+                name=f"{self.name}Summary", daemon=True
+            )
+            self._refresh_thread.start()
+        return summary
+
+    def _refresh_summary(self, placeholder: str, previous: str, evicted: List[Message], model: Optional[str]):
+        try:
+            summary = self.summarizer(previous, evicted, model)
+        except Exception as e:
+            print(f"{GRAY}[{self.name}] Summary failed ({e}), keeping the extractive one{RESET}")
+            return
+        with self._lock:
+            if self._refresh and self._refresh[0] == placeholder:
+                self._refresh = (placeholder, summary)
+
+    def wait_for_summary(self, timeout: Optional[float] = None):
+        """Wait for the background summary of the last trim (if any)."""
+        if self._refresh_thread is not None:
+            self._refresh_thread.join(timeout)
+
+    def record(self, messages: List[Message], stats) -> None:
+        """Log how much of the prompt Ollama had to prefill (prompt_eval_count from the done chunk)."""
+        if stats is None or stats.cancelled:
+            return
+        estimated = estimate_tokens(messages)
+        with self._lock:
+            self.turns += 1
+            self.prompt_tokens += estimated
+            self.prefill_tokens += stats.prompt_eval_count
+        print(f"{GRAY}[{self.name}] Prefilled {stats.prompt_eval_count} prompt tokens "
+              f"(~{estimated} in context, {stats.prompt_eval_duration / 1e6:.0f}ms){RESET}")
+
+    def stats(self) -> Dict[str, Any]:
+        """Return trim and prefill counters."""
+        with self._lock:
+            return {
+                "turns": self.turns,
+                "trims": self.trims,
+                "prompt_tokens": self.prompt_tokens,
+                "prefill_tokens": self.prefill_tokens,
+                "prefill_ratio": self.prefill_tokens / self.prompt_tokens if self.prompt_tokens else 0.0,
+            }
@@ -4,7 +4,8 @@ Function Executor - Executes Gemma-routed functions with actual backend calls.
 
 import asyncio
 from datetime import datetime, timedelta
-from typing import Dict, Any, Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional, Tuple
 from dataclasses import dataclass, field
 import threading
 import time
@@ -117,6 +118,25 @@ class FunctionExecutor:
         except Exception as e:
             return {"success": False, "message": f"Error: {str(e)}", "data": None}
     
+    def execute_many(self, calls: List[Tuple[str, Dict[str, Any]]]) -> List[Dict[str, Any]]:
+        """
+        Execute several independent calls concurrently.
+        Results are returned in call order. get_system_info runs after the actions so
+        it reports their effects (e.g. a timer that was just set).
+        """
+        results: List[Optional[Dict[str, Any]]] = [None] * len(calls)
+        actions = [i for i, (name, _) in enumerate(calls) if name != "get_system_info"]
+        queries = [i for i, (name, _) in enumerate(calls) if name == "get_system_info"]
+        
+        for group in (actions, queries):
+            if not group:
+                continue
+            with ThreadPoolExecutor(max_workers=len(group)) as pool:
+                futures = {i: pool.submit(self.execute, *calls[i]) for i in group}
+                for i, future in futures.items():
+                    results[i] = future.result()
+        return results
+    
     # === Action Functions ===
     
     def _control_light(self, params: Dict) -> Dict:
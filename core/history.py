@@ -1,167 +1,312 @@
-import sqlite3
 import json
+import re
 import uuid
 import datetime
-from pathlib import Path
+import threading
+
+from config import (
+    HISTORY_SYNCHRONOUS, HISTORY_SEARCH_LIMIT, HISTORY_FTS_BACKFILL_BATCH, GRAY, RESET
+)
+from core.storage import Database, WriteBehind, add_column
 
 DB_PATH = "chat_history.db"
 
+# Schema versions (PRAGMA user_version); append new migrations, never edit old ones
+MIGRATIONS = [
+    [
+        '''
+        CREATE TABLE IF NOT EXISTS sessions (
+            id TEXT PRIMARY KEY,
+            title TEXT,
+            created_at TEXT,
+            updated_at TEXT,
+            pinned INTEGER DEFAULT 0
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS messages (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            session_id TEXT,
+            role TEXT,
+            content TEXT,
+            timestamp TEXT,
+            FOREIGN KEY(session_id) REFERENCES sessions(id)
+        )
+        ''',
+    ],
+    # Databases created before sessions could be pinned
+    add_column("sessions", "pinned", "INTEGER DEFAULT 0"),
+    [
+        # Newest-first pages of one session's messages
+        'CREATE INDEX IF NOT EXISTS idx_messages_session ON messages(session_id, id)',
+        # Covers the sidebar query: sorted, paginated and without touching the table
+        'CREATE INDEX IF NOT EXISTS idx_sessions_sidebar ON sessions(pinned, updated_at, id, title, created_at)',
+    ],
+    [
+        # Full-text index over messages.content (external content: the text itself is not duplicated)
+        '''
+        CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5(
+            content, content='messages', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+        )
+        ''',
+        # Messages that existed before the index, still to be indexed by backfill_search_index()
+        'CREATE TABLE IF NOT EXISTS fts_backfill (last_id INTEGER NOT NULL, end_id INTEGER NOT NULL)',
+        'INSERT INTO fts_backfill SELECT 0, MAX(id) FROM messages HAVING MAX(id) IS NOT NULL',
+        # New messages are indexed as they are written
+        '''
+        CREATE TRIGGER IF NOT EXISTS messages_fts_insert AFTER INSERT ON messages BEGIN
+            INSERT INTO messages_fts(rowid, content) VALUES (new.id, new.content);
+        END
+        ''',
+        # Rows the backfill has not reached yet are not in the index, so there is nothing to remove
+        '''
+        CREATE TRIGGER IF NOT EXISTS messages_fts_delete AFTER DELETE ON messages
+        WHEN NOT EXISTS (SELECT 1 FROM fts_backfill WHERE old.id > last_id AND old.id <= end_id) BEGIN
+            INSERT INTO messages_fts(messages_fts, rowid, content) VALUES ('delete', old.id, old.content);
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS messages_fts_update AFTER UPDATE OF content ON messages
+        WHEN NOT EXISTS (SELECT 1 FROM fts_backfill WHERE old.id > last_id AND old.id <= end_id) BEGIN
+            INSERT INTO messages_fts(messages_fts, rowid, content) VALUES ('delete', old.id, old.content);
+            INSERT INTO messages_fts(rowid, content) VALUES (new.id, new.content);
+        END
+        ''',
+    ],
+]
+
+SEARCH_WORD = re.compile(r"\w+", re.UNICODE)
+
+
+def search_query(text: str) -> str:
+    """
+    FTS5 query for what the user typed: every word must match, the last one as
+    a prefix (so results follow along while typing). Quoting keeps FTS syntax
+    characters in the input from being parsed as operators.
+    """
+    words = SEARCH_WORD.findall(text)
+    if not words:
+        return ""
+    return " ".join([f'"{w}"' for w in words[:-1]] + [f'"{words[-1]}"*'])
+
+
+def backfill_search_index(db: Database, batch: int = HISTORY_FTS_BACKFILL_BATCH) -> bool:
+    """
+    Index the next batch of messages that predate the search index. Progress is
+    committed with each batch, so an interrupted backfill resumes where it
+    stopped. Returns True while there is more to do.
+    """
+    with db.transaction() as conn:
+        row = conn.execute('SELECT last_id, end_id FROM fts_backfill').fetchone()
+        if row is None:
+            return False
+        last_id, end_id = row
+        ids = conn.execute(
+            'SELECT id FROM messages WHERE id > ? AND id <= ? ORDER BY id LIMIT ?', (last_id, end_id, batch)
+        ).fetchall()
+        if not ids:
+            conn.execute('DELETE FROM fts_backfill')
+            return False
+        upto = ids[-1][0]
+        conn.execute(
+            'INSERT INTO messages_fts(rowid, content) SELECT id, content FROM messages WHERE id > ? AND id <= ?',
+            (last_id, upto)
+        )
+        conn.execute('UPDATE fts_backfill SET last_id = ?', (upto,))
+    return True
+
+
 class ChatHistoryManager:
+    """
+    Chat sessions and messages. Writes are queued and committed in batches by a
+    background thread, so saving a message never blocks the GUI on disk I/O;
+    reads flush the queue first so they always see earlier writes, which means
+    they wait for a commit: call them off the GUI thread.
+    """
     def __init__(self, db_path: str = "data/chat_history.db"):
         self.db_path = db_path
-        # Ensure directory exists
-        Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
-        self._init_db()
+        self.db = Database(db_path, MIGRATIONS, name="History", synchronous=HISTORY_SYNCHRONOUS)
+        self.writer = WriteBehind(self.db)
+        self._stop_backfill = threading.Event()
+        self._backfill_thread = None
+        if self.db.query_one('SELECT 1 FROM fts_backfill'):
+            self._backfill_thread = threading.Thread(target=self._backfill, name="HistoryBackfill", daemon=True)
+            self._backfill_thread.start()
 
-    def _init_db(self):
-        """Initialize the database schema."""
-        conn = sqlite3.connect(self.db_path)
+    def _backfill(self):
+        """Index messages from before search existed, a batch at a time."""
+        print(f"{GRAY}[History] Building the search index for existing messages...{RESET}")
         try:
-            cursor = conn.cursor()
-            
-            # Sessions table
-            cursor.execute('''
-            CREATE TABLE IF NOT EXISTS sessions (
-                id TEXT PRIMARY KEY,
-                title TEXT,
-                created_at TEXT,
-                updated_at TEXT,
-                pinned INTEGER DEFAULT 0
-            )
-            ''')
-            
-            # Add pinned column if it doesn't exist (migration for existing DBs)
-            try:
-                cursor.execute('ALTER TABLE sessions ADD COLUMN pinned INTEGER DEFAULT 0')
-            except sqlite3.OperationalError:
-                pass  # Column already exists
-            
-            # Messages table
-            cursor.execute('''
-            CREATE TABLE IF NOT EXISTS messages (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                session_id TEXT,
-                role TEXT,
-                content TEXT,
-                timestamp TEXT,
-                FOREIGN KEY(session_id) REFERENCES sessions(id)
-            )
-            ''')
-            
-            conn.commit()
-        finally:
-            conn.close()
+            while not self._stop_backfill.is_set() and backfill_search_index(self.db):
+                self._stop_backfill.wait(0.01)  # Let queued writes in between batches
+        except Exception as e:
+            print(f"{GRAY}[History] Search index backfill stopped: {e}{RESET}")
+            return
+        if not self._stop_backfill.is_set():
+            print(f"{GRAY}[History] Search index ready.{RESET}")
+
+    def wait_for_index(self, timeout=None):
+        """Wait for the search index backfill (if any) to finish."""
+        if self._backfill_thread:
+            self._backfill_thread.join(timeout)
+
+    def flush(self):
+        """Wait until all queued writes are committed."""
+        self.writer.flush()
+
+    def close(self):
+        """Commit queued writes and close the database connections."""
+        self._stop_backfill.set()
+        self.wait_for_index()
+        self.writer.close()
+        self.db.close()
 
     def create_session(self, title="New Chat"):
         """Create a new chat session."""
         session_id = str(uuid.uuid4())
         now = datetime.datetime.now().isoformat()
-        
-        conn = sqlite3.connect(self.db_path)
-        try:
-            cursor = conn.cursor()
-            cursor.execute(
-                'INSERT INTO sessions (id, title, created_at, updated_at, pinned) VALUES (?, ?, ?, ?, ?)',
-                (session_id, title, now, now, 0)
-            )
-            conn.commit()
-        finally:
-            conn.close()
+
+        self.writer.submit(
+            'INSERT INTO sessions (id, title, created_at, updated_at, pinned) VALUES (?, ?, ?, ?, ?)',
+            (session_id, title, now, now, 0)
+        )
         return session_id
 
     def update_session_title(self, session_id, title):
         """Update the title of a session."""
         now = datetime.datetime.now().isoformat()
-        conn = sqlite3.connect(self.db_path)
-        try:
-            cursor = conn.cursor()
-            cursor.execute(
-                'UPDATE sessions SET title = ?, updated_at = ? WHERE id = ?',
-                (title, now, session_id)
-            )
-            conn.commit()
-        finally:
-            conn.close()
+        self.writer.submit(
+            'UPDATE sessions SET title = ?, updated_at = ? WHERE id = ?',
+            (title, now, session_id)
+        )
 
     def toggle_pin(self, session_id):
         """Toggle the pinned status of a session. Returns the new pinned state."""
-        conn = sqlite3.connect(self.db_path)
-        try:
-            cursor = conn.cursor()
-            
+        self.flush()
+        with self.db.transaction() as conn:
             # Get current pinned state
-            cursor.execute('SELECT pinned FROM sessions WHERE id = ?', (session_id,))
-            row = cursor.fetchone()
+            row = conn.execute('SELECT pinned FROM sessions WHERE id = ?', (session_id,)).fetchone()
             current_pinned = row[0] if row else 0
             new_pinned = 0 if current_pinned else 1
-            
+
             # Update
-            cursor.execute('UPDATE sessions SET pinned = ? WHERE id = ?', (new_pinned, session_id))
-            conn.commit()
-            return bool(new_pinned)
-        finally:
-            conn.close()
+            conn.execute('UPDATE sessions SET pinned = ? WHERE id = ?', (new_pinned, session_id))
+        return bool(new_pinned)
+
+    def set_pinned(self, session_id, pinned):
+        """Pin or unpin a session (queued, like other writes)."""
+        self.writer.submit('UPDATE sessions SET pinned = ? WHERE id = ?', (int(pinned), session_id))
 
     def add_message(self, session_id, role, content):
         """Add a message to a session."""
         now = datetime.datetime.now().isoformat()
-        conn = sqlite3.connect(self.db_path)
-        try:
-            cursor = conn.cursor()
-            cursor.execute(
-                'INSERT INTO messages (session_id, role, content, timestamp) VALUES (?, ?, ?, ?)',
-                (session_id, role, content, now)
-            )
-            # Update session timestamp
-            cursor.execute(
-                'UPDATE sessions SET updated_at = ? WHERE id = ?',
-                (now, session_id)
-            )
-            conn.commit()
-        finally:
-            conn.close()
-
-    def get_sessions(self):
-        """Get all sessions, ordered by pinned first, then most recent update."""
-        conn = sqlite3.connect(self.db_path)
-        try:
-            cursor = conn.cursor()
-            cursor.execute('SELECT id, title, created_at, pinned FROM sessions ORDER BY pinned DESC, updated_at DESC')
-            sessions = [
-                {'id': row[0], 'title': row[1], 'created_at': row[2], 'pinned': bool(row[3])}
-                for row in cursor.fetchall()
-            ]
-            return sessions
-        finally:
-            conn.close()
-
-    def get_messages(self, session_id):
-        """Get all messages for a session."""
-        conn = sqlite3.connect(self.db_path)
-        try:
-            cursor = conn.cursor()
-            cursor.execute(
-                'SELECT role, content FROM messages WHERE session_id = ? ORDER BY id ASC',
-                (session_id,)
-            )
-            messages = [
-                {'role': row[0], 'content': row[1]}
-                for row in cursor.fetchall()
-            ]
-            return messages
-        finally:
-            conn.close()
+        self.writer.submit(
+            'INSERT INTO messages (session_id, role, content, timestamp) VALUES (?, ?, ?, ?)',
+            (session_id, role, content, now)
+        )
+        # Update session timestamp (only the latest one per batch is written)
+        self.writer.submit(
+            'UPDATE sessions SET updated_at = ? WHERE id = ?',
+            (now, session_id),
+            coalesce=("updated_at", session_id)
+        )
+
+    def get_sessions(self, limit=None, cursor=None):
+        """
+        Get sessions, ordered by pinned first, then most recent update.
+        Pages with limit: pass the last session's 'cursor' to get the next page.
+        """
+        self.flush()
+        sql = 'SELECT id, title, created_at, pinned, updated_at FROM sessions'
+        params = []
+        if cursor is not None:
+            sql += ' WHERE (pinned, updated_at, id) < (?, ?, ?)'
+            params.extend(cursor)
+        sql += ' ORDER BY pinned DESC, updated_at DESC, id DESC'
+        if limit is not None:
+            sql += ' LIMIT ?'
+            params.append(limit)
+        return [
+            {'id': row[0], 'title': row[1], 'created_at': row[2], 'pinned': bool(row[3]),
+             'cursor': (row[3], row[4], row[0])}
+            for row in self.db.query(sql, params)
+        ]
+
+    def get_messages(self, session_id, before_id=None, limit=None):
+        """
+        Get messages for a session in chronological order.
+        With limit, only the newest page (older than before_id, if given).
+        """
+        self.flush()
+        sql = 'SELECT id, role, content FROM messages WHERE session_id = ?'
+        params = [session_id]
+        if before_id is not None:
+            sql += ' AND id < ?'
+            params.append(before_id)
+        if limit is None:
+            rows = self.db.query(sql + ' ORDER BY id ASC', params)
+        else:
+            rows = self.db.query(sql + ' ORDER BY id DESC LIMIT ?', params + [limit])[::-1]
+        return [
+            {'id': row[0], 'role': row[1], 'content': row[2]}
+            for row in rows
+        ]
+
+    def get_messages_after(self, after_id, limit):
+        """Messages of every session with id > after_id, oldest first (for incremental indexing)."""
+        self.flush()
+        rows = self.db.query(
+            'SELECT id, session_id, role, content, timestamp FROM messages WHERE id > ? ORDER BY id LIMIT ?',
+            (after_id, limit)
+        )
+        return [
+            {'id': row[0], 'session_id': row[1], 'role': row[2], 'content': row[3], 'timestamp': row[4]}
+            for row in rows
+        ]
+
+    def existing_message_ids(self, ids):
+        """
+        The subset of ids whose messages have not been deleted. Reads committed
+        rows only (no flush), since it runs before every reply; a delete still
+        in the write queue shows up a moment later.
+        """
+        if not ids:
+            return set()
+        marks = ",".join("?" * len(ids))
+        return {row[0] for row in self.db.query(f'SELECT id FROM messages WHERE id IN ({marks})', list(ids))}
+
+    def search(self, text, limit=HISTORY_SEARCH_LIMIT, highlight=("[", "]")):
+        """
+        Search message text, best matches (BM25) first. Each result has the
+        session, the message and a snippet with matches wrapped in highlight.
+        """
+        query = search_query(text)
+        if not query:
+            return []
+        self.flush()
+        rows = self.db.query(
+            '''
+            SELECT m.id, m.session_id, s.title, m.role,
+                   snippet(messages_fts, 0, ?, ?, '…', 12), bm25(messages_fts)
+            FROM messages_fts
+            JOIN messages m ON m.id = messages_fts.rowid
+            JOIN sessions s ON s.id = m.session_id
+            WHERE messages_fts MATCH ?
+            ORDER BY rank
+            LIMIT ?
+            ''',
+            (highlight[0], highlight[1], query, limit)
+        )
+        return [
+            {'message_id': row[0], 'session_id': row[1], 'title': row[2], 'role': row[3],
+             'snippet': row[4], 'score': row[5]}
+            for row in rows
+        ]
 
     def delete_session(self, session_id):
         """Delete a session and all its messages."""
-        conn = sqlite3.connect(self.db_path)
-        try:
-            cursor = conn.cursor()
-            cursor.execute('DELETE FROM messages WHERE session_id = ?', (session_id,))
-            cursor.execute('DELETE FROM sessions WHERE id = ?', (session_id,))
-            conn.commit()
-        finally:
-            conn.close()
+        self.writer.submit('DELETE FROM messages WHERE session_id = ?', (session_id,))
+        self.writer.submit('DELETE FROM sessions WHERE id = ?', (session_id,))
 
 # Global Instance
 history_manager = ChatHistoryManager()
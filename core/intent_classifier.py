@@ -0,0 +1,294 @@
+"""
+Lexical Intent Classifier - Fast path in front of the FunctionGemma router.
+
+Hashed character n-grams + a softmax linear model in pure NumPy, trained from
+training_dataset_functions.jsonl. Unambiguous queries ("set a timer for 10 minutes",
+"hello") are routed in well under a millisecond; anything below the confidence
+threshold, or whose arguments can't be extracted reliably, goes to the neural router.
+"""
+
+import json
+import re
+import zlib
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+N_FEATURES = 2 ** 13
+NGRAM_RANGE = (2, 4)
+
+
+# --- Features ---
+
+def _normalize(text: str) -> str:
+    text = re.sub(r"[^\w\s:']", " ", text.lower())
+    return " ".join(text.split())
+
+
+def featurize(text: str, n_features: int = N_FEATURES, ngram_range: Tuple[int, int] = NGRAM_RANGE) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Hash word unigrams and character n-grams into a sparse vector.
+    Returns (indices, values), L2-normalized.
+    """
+    norm = _normalize(text)
+    grams = ["w:" + w for w in norm.split()]
+    padded = f" {norm} "
+    for n in range(ngram_range[0], ngram_range[1] + 1):
+        grams.extend(padded[i:i + n] for i in range(len(padded) - n + 1))
+
+    if not grams:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+
+    # crc32 is stable across processes, unlike hash()
+    hashed = np.fromiter((zlib.crc32(g.encode("utf-8")) % n_features for g in grams),
+                         dtype=np.int64, count=len(grams))
+    indices, counts = np.unique(hashed, return_counts=True)
+    values = counts.astype(np.float32)
+    values /= np.linalg.norm(values)
+    return indices, values
+
+
+# --- Model ---
+
+class IntentClassifier:
+    """Softmax regression over hashed n-gram features."""
+
+    def __init__(self, labels: List[str], weights: np.ndarray, bias: np.ndarray,
+                 n_features: int = N_FEATURES, ngram_range: Tuple[int, int] = NGRAM_RANGE):
+        self.labels = list(labels)
+        self.weights = weights.astype(np.float32)
+        self.bias = bias.astype(np.float32)
+        self.n_features = n_features
+        self.ngram_range = tuple(ngram_range)
+
+    def predict_proba(self, text: str) -> np.ndarray:
+        """Class probabilities for a prompt."""
+        indices, values = featurize(text, self.n_features, self.ngram_range)
+        logits = values @ self.weights[indices] + self.bias
+        logits -= logits.max()
+        probs = np.exp(logits)
+        return probs / probs.sum()
+
+    def predict(self, text: str) -> Tuple[str, float]:
+        """Return (label, confidence)."""
+        probs = self.predict_proba(text)
+        best = int(np.argmax(probs))
+        return self.labels[best], float(probs[best])
+
+    @classmethod
+    def train(cls, texts: List[str], labels: List[str], epochs: int = 500, lr: float = 8.0,
+              l2: float = 1e-4, n_features: int = N_FEATURES,
+              ngram_range: Tuple[int, int] = NGRAM_RANGE) -> "IntentClassifier":
+        """Fit with full-batch gradient descent on the cross-entropy loss."""
+        classes = sorted(set(labels))
+        class_index = {c: i for i, c in enumerate(classes)}
+        y = np.array([class_index[label] for label in labels])
+
+        X = np.zeros((len(texts), n_features), dtype=np.float32)
+        for row, text in enumerate(texts):
+            indices, values = featurize(text, n_features, ngram_range)
+            X[row, indices] = values
+
+        Y = np.eye(len(classes), dtype=np.float32)[y]
+        W = np.zeros((n_features, len(classes)), dtype=np.float32)
+        b = np.zeros(len(classes), dtype=np.float32)
+
+        for _ in range(epochs):
+            logits = X @ W + b
+            logits -= logits.max(axis=1, keepdims=True)
+            probs = np.exp(logits)
+            probs /= probs.sum(axis=1, keepdims=True)
+            grad = (probs - Y) / len(texts)
+            W -= lr * (X.T @ grad + l2 * W)
+            b -= lr * grad.sum(axis=0)
+
+        return cls(classes, W, b, n_features, ngram_range)
+
+    def save(self, path: str):
+        """Save as a compressed float16 .npz artifact."""
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        np.savez_compressed(
+            path,
+            labels=np.array(self.labels),
+            weights=self.weights.astype(np.float16),
+            bias=self.bias.astype(np.float16),
+            n_features=np.array(self.n_features),
+            ngram_range=np.array(self.ngram_range),
+        )
+
+    @classmethod
+    def load(cls, path: str) -> "IntentClassifier":
+        data = np.load(path)
+        return cls(
+            labels=[str(label) for label in data["labels"]],
+            weights=data["weights"],
+            bias=data["bias"],
+            n_features=int(data["n_features"]),
+            ngram_range=tuple(int(n) for n in data["ngram_range"]),
+        )
+
+
+def iter_dataset(path: str) -> Iterator[Tuple[str, str, Dict[str, Any]]]:
+    """Stream (prompt, func_name, arguments) examples from a FunctionGemma training jsonl."""
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            messages = json.loads(line)["messages"]
+            prompt = next(m["content"] for m in messages if m["role"] == "user")
+            calls = next((m.get("tool_calls") for m in messages if m["role"] == "assistant"), None)
+            if not calls:
+                continue
+            func = calls[0]["function"]
+            yield prompt, func["name"], func.get("arguments", {})
+
+
+def load_dataset(path: str) -> List[Tuple[str, str, Dict[str, Any]]]:
+    """Read all (prompt, func_name, arguments) examples from a training jsonl."""
+    return list(iter_dataset(path))
+
+
+def is_held_out(prompt: str) -> bool:
+    """Deterministic 20% evaluation split, stable across runs and machines."""
+    return zlib.crc32(prompt.encode("utf-8")) % 5 == 0
+
+
+# --- Argument extraction ---
+# Only the common phrasings are handled; returning None sends the query to the router.
+
+_DURATION = r"(?P<duration>\d+(?:\.\d+)?\s*(?:hours?|hrs?|minutes?|mins?|seconds?|secs?)(?:\s*(?:and\s+)?\d+\s*(?:minutes?|mins?|seconds?|secs?))?)"
+_TIME = r"(?P<time>\d{1,2}(?::\d{2})?\s*(?:am|pm))"
+_UNIT_NAMES = {"hr": "hour", "hrs": "hours", "min": "minute", "mins": "minutes", "sec": "second", "secs": "seconds"}
+
+_TIMER_PATTERNS = [
+    re.compile(rf"^(?:(?:set|start|create)\s+)?(?:an?\s+)?(?:timer\s+)?(?:for\s+)?{_DURATION}(?:\s+timer)?(?:\s+for\s+(?:the\s+)?(?P<label>[\w\s]+))?$"),
+]
+_ALARM_PATTERNS = [
+    re.compile(rf"^(?:(?:set|create)\s+)?(?:an?\s+)?(?:(?P<label>\w+)\s+)?alarm\s+(?:for\s+|at\s+)?(?:tomorrow\s+)?{_TIME}$"),
+    re.compile(rf"^wake\s+me(?:\s+up)?\s+(?:at\s+)?(?:tomorrow\s+)?{_TIME}(?:\s+tomorrow)?$"),
+]
+_LIGHT_PATTERNS = [
+    re.compile(r"^(?:turn|switch)\s+(?P<action>on|off)\s+(?:the\s+)?(?P<device>[\w\s]+?)(?:\s+lights?)?$"),
+    re.compile(r"^(?:turn|switch)\s+(?:the\s+)?(?P<device>[\w\s]+?)(?:\s+lights?)?\s+(?P<action>on|off)$"),
+    re.compile(r"^(?:the\s+)?(?P<device>[\w\s]+?)\s+lights?\s+(?P<action>on|off)$"),
+    re.compile(r"^lights?\s+(?P<action>on|off)(?:\s+in\s+(?:the\s+)?(?P<device>[\w\s]+))?$"),
+]
+# The device group is free text: these words mean it ran into a time or a second
+# command ("the kitchen lights in 10 minutes", "... and then ..."), so let the router decide
+_DEVICE_STOP_WORDS = re.compile(r"\b(?:in|at|for|and|then|after|until|when|by|tomorrow|tonight)\b")
+_TASK_PATTERNS = [
+    re.compile(r"^(?:add|create)\s+(?:a\s+)?(?:new\s+)?task\s*:?\s+(?P<text>.+)$"),
+    re.compile(r"^add\s+(?P<text>.+?)\s+to\s+(?:my\s+|the\s+)?(?:task\s+|to\s*do\s+|todo\s+)?list$"),
+    re.compile(r"^put\s+(?P<text>.+?)\s+on\s+(?:my\s+|the\s+)?(?:task\s+|to\s*do\s+|todo\s+)?list$"),
+]
+_SEARCH_PATTERNS = [
+    re.compile(r"^(?:search\s+(?:the\s+web\s+|online\s+)?for|look\s+up|google|find)\s+(?P<query>.+)$"),
+]
+
+
+def _clean(text: str) -> str:
+    return " ".join(text.strip().rstrip(".!?").split())
+
+
+def _normalize_duration(duration: str) -> str:
+    duration = re.sub(r"(\d)([a-z])", r"\1 \2", duration)
+    words = [_UNIT_NAMES.get(w, w) for w in duration.split()]
+    # "30 minute" -> "30 minutes"
+    for i in range(1, len(words)):
+        if words[i - 1].replace(".", "").isdigit() and words[i - 1] != "1" and not words[i].endswith("s"):
+            words[i] += "s"
+    return " ".join(w for w in words if w != "and")
+
+
+def extract_arguments(func_name: str, text: str) -> Optional[Dict[str, Any]]:
+    """Extract arguments for the predicted function, or None if unsure."""
+    raw = _clean(text)
+    lowered = raw.lower()
+
+    if func_name in ("thinking", "nonthinking"):
+        return {"prompt": text}
+
+    if func_name == "get_system_info":
+        return {}
+
+    if func_name == "set_timer":
+        for pattern in _TIMER_PATTERNS:
+            match = pattern.match(lowered)
+            if match:
+                args = {"duration": _normalize_duration(match.group("duration"))}
+                if match.group("label"):
+                    args["label"] = match.group("label").strip()
+                return args
+        return None
+
+    if func_name == "set_alarm":
+        for pattern in _ALARM_PATTERNS:
+            match = pattern.match(lowered)
+            if match:
+                args = {"time": match.group("time").replace(" ", "")}
+                label = match.groupdict().get("label")
+                if label and label not in ("an", "the", "my"):
+                    args["label"] = label
+                return args
+        return None
+
+    if func_name == "control_light":
+        for pattern in _LIGHT_PATTERNS:
+            match = pattern.match(lowered)
+            if match:
+                args = {"action": match.group("action")}
+                device = match.group("device")
+                if device and _DEVICE_STOP_WORDS.search(device):
+                    return None
+                if device and device.strip() not in ("light", "lights", "the lights"):
+                    args["device_name"] = device.strip()
+                return args
+        return None
+
+    if func_name == "add_task":
+        for pattern in _TASK_PATTERNS:
+            match = pattern.match(lowered)
+            if match:
+                start, end = match.span("text")
+                return {"text": raw[start:end]}
+        return None
+
+    if func_name == "web_search":
+        for pattern in _SEARCH_PATTERNS:
+            match = pattern.match(lowered)
+            if match:
+                start, end = match.span("query")
+                return {"query": raw[start:end]}
+        return None
+
+    # create_calendar_event and anything new: leave to the router
+    return None
+
+
+class IntentFastPath:
+    """Classifier + argument extraction; returns None when the router should decide."""
+
+    def __init__(self, classifier: IntentClassifier, threshold: float = 0.9):
+        self.classifier = classifier
+        self.threshold = threshold
+
+    def route(self, user_input: str) -> Optional[Tuple[str, Dict[str, Any]]]:
+        func_name, confidence = self.classifier.predict(user_input)
+        if confidence < self.threshold:
+            return None
+        args = extract_arguments(func_name, user_input)
+        if args is None:
+            return None
+        return func_name, args
+
+
+def load_or_train(model_path: str, dataset_path: str) -> IntentClassifier:
+    """Load the classifier artifact, training and saving it first if it doesn't exist."""
+    if Path(model_path).exists():
+        return IntentClassifier.load(model_path)
+
+    examples = load_dataset(dataset_path)
+    classifier = IntentClassifier.train([e[0] for e in examples], [e[1] for e in examples])
+    classifier.save(model_path)
+    return classifier
@@ -2,26 +2,97 @@
 LLM interaction and function execution.
 """
 
-import requests
+import atexit
 import threading
+from concurrent.futures import Future, ThreadPoolExecutor
 
 from config import (
-    RESPONDER_MODEL, OLLAMA_URL, LOCAL_ROUTER_PATH,
+    LOCAL_ROUTER_PATH,
+    ROUTE_CACHE_ENABLED, ROUTE_CACHE_SIZE, ROUTE_CACHE_TTL, WAKE_WORD,
+    INTENT_CLASSIFIER_ENABLED, INTENT_CLASSIFIER_PATH, INTENT_CLASSIFIER_THRESHOLD,
+    ROUTER_TRAINING_DATA, ROUTER_OUT_OF_PROCESS, ROUTER_SERVER_TIMEOUT, ROUTER_SERVER_START_TIMEOUT,
+    SPECULATIVE_ROUTING_ENABLED, SPECULATIVE_ROUTING_MAX_AGE, SPECULATIVE_WARM_INTERVAL, PIPELINE_MODE,
     GRAY, RESET
 )
+from core.model_persistence import residency
+from core.model_tiers import FAST, DEEP, model_for_tier, warm_model
+from core.multi_intent import drops_clause, merge_calls, split_compound_prompt
+from core.route_cache import RouteCache
+from core.router_server import RouterClient
+from core.speculative_routing import SpeculativeRouter
 
-# Persistent Session for faster HTTP
-http_session = requests.Session()
-
-# Global Router Instance
+# Global Router Instance (in-process mode)
 router = None
 
+# Router worker client (out-of-process mode, keeps torch out of this process)
+router_client = None
+if ROUTER_OUT_OF_PROCESS:
+    router_client = RouterClient(
+        LOCAL_ROUTER_PATH,
+        request_timeout=ROUTER_SERVER_TIMEOUT,
+        start_timeout=ROUTER_SERVER_START_TIMEOUT,
+    )
+    atexit.register(router_client.stop)
+
+# Lexical fast path in front of the router (False once loading has failed)
+intent_fast_path = None
+_intent_lock = threading.Lock()
+
+# Cache of recent routing decisions
+route_cache = RouteCache(
+    max_size=ROUTE_CACHE_SIZE,
+    ttl_seconds=ROUTE_CACHE_TTL,
+    wake_word=WAKE_WORD,
+    enabled=ROUTE_CACHE_ENABLED,
+)
+
 
 def is_router_loaded():
     """Check if the local router model is loaded in memory."""
+    if router_client is not None:
+        return router_client.is_ready()
     return router is not None
 
 
+def _get_router():
+    """Return the out-of-process router client, or the in-process router (lazy loaded)."""
+    global router
+    
+    if router_client is not None:
+        return router_client
+    
+    if not router:
+        from core.router import FunctionGemmaRouter
+        # We load without compilation for faster initialization and stability
+        router = FunctionGemmaRouter(model_path=LOCAL_ROUTER_PATH, compile_model=False)
+    return router
+
+
+def get_route_cache_stats():
+    """Return hit/miss/eviction counters of the route cache."""
+    return route_cache.stats()
+
+
+def get_intent_fast_path():
+    """Lazy load the intent classifier fast path. Returns None if disabled or unavailable."""
+    global intent_fast_path
+    
+    if not INTENT_CLASSIFIER_ENABLED:
+        return None
+    
+    with _intent_lock:
+        if intent_fast_path is None:
+            try:
+                from core.intent_classifier import IntentFastPath, load_or_train
+                classifier = load_or_train(INTENT_CLASSIFIER_PATH, ROUTER_TRAINING_DATA)
+                intent_fast_path = IntentFastPath(classifier, INTENT_CLASSIFIER_THRESHOLD)
+            except Exception as e:
+                print(f"{GRAY}[Intent Classifier Error: {e}]{RESET}")
+                intent_fast_path = False
+    
+    return intent_fast_path or None
+
+
 def should_bypass_router(text):
     """Return True if text definitely doesn't need routing."""
     # All queries now go through Function Gemma router
@@ -29,23 +100,44 @@ def should_bypass_router(text):
     return False
 
 
+def _route_without_router(user_input):
+    """Answer from the route cache or the intent classifier. Returns None if neither can."""
+    cached = route_cache.get(user_input)
+    if cached is not None:
+        return cached
+    
+    fast_path = get_intent_fast_path()
+    if fast_path:
+        result = fast_path.route(user_input)
+        if result is not None:
+            route_cache.put(user_input, *result)
+            return result
+    
+    return None
+
+
 def route_query(user_input):
-    """Route user query using local FunctionGemmaRouter. Lazy loads the router on first use."""
-    global router
+    """
+    Route user query: route cache, then the lexical intent classifier, then the local
+    FunctionGemmaRouter for anything the classifier isn't confident about.
+    Lazy loads the router on first use.
+    """
+    
+    result = _route_without_router(user_input)
+    if result is not None:
+        return result
     
     # Lazy Initialization
-    if not router:
-        try:
-            from core.router import FunctionGemmaRouter
-            # We load without compilation for faster initialization and stability
-            router = FunctionGemmaRouter(model_path=LOCAL_ROUTER_PATH, compile_model=False)
-        except Exception as e:
-            print(f"{GRAY}[Router Init Error: {e}]{RESET}")
-            return "nonthinking", {"prompt": user_input}
+    try:
+        active_router = _get_router()
+    except Exception as e:
+        print(f"{GRAY}[Router Init Error: {e}]{RESET}")
+        return "nonthinking", {"prompt": user_input}
 
     try:
         # Route using the fine-tuned model - returns (func_name, params)
-        (func_name, params), elapsed = router.route_with_timing(user_input)
+        func_name, params = active_router.route(user_input)
+        route_cache.put(user_input, func_name, params)
         return func_name, params
             
     except Exception as e:
@@ -53,6 +145,80 @@ def route_query(user_input):
         return "nonthinking", {"prompt": user_input}
 
 
+def route_query_multi(user_input):
+    """
+    Route a prompt that may contain several commands ("turn off the lights and set a
+    timer for 20 minutes"). Returns a list of (func_name, params).
+    Each clause goes through the cache and intent classifier first; the rest are
+    routed together in one router batch. If a clause isn't a command (it would be
+    dropped), the prompt is routed as a whole instead.
+    """
+    clauses = split_compound_prompt(user_input)
+    results = [_route_without_router(clause) for clause in clauses]
+    pending = [i for i, result in enumerate(results) if result is None]
+    
+    try:
+        if pending and len(clauses) == 1:
+            return _route_whole(user_input)
+        if pending:
+            routed = _get_router().route_batch([clauses[i] for i in pending])
+            for i, (func_name, params) in zip(pending, routed):
+                route_cache.put(clauses[i], func_name, params)
+                results[i] = (func_name, params)
+        if drops_clause(results):
+            return _route_whole(user_input)
+    except Exception as e:
+        print(f"{GRAY}[Router Error: {e}]{RESET}")
+        return [("nonthinking", {"prompt": user_input})]
+    
+    return merge_calls(results, user_input)
+
+
+def _route_whole(user_input):
+    """The router's calls for the unsplit prompt (a single prompt may still decode to several)."""
+    routed = _get_router().route_multi(user_input, split=False)
+    if len(routed) == 1:
+        route_cache.put(user_input, *routed[0])
+    return routed
+
+
+def warm_responder(model=None):
+    """
+    Load a responder model (default: the fast tier) and unload other Qwen models
+    ahead of the first token. Returns False if it could not be loaded.
+    """
+    return warm_model(model or model_for_tier(FAST))
+
+
+# Responder warm-ups run next to routing and tool execution
+_warmup_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="ResponderWarmup")
+
+
+def start_responder_warmup(warm_fn=None) -> Future:
+    """
+    Start readying the responder (warm_responder by default) in the background.
+    Wait on the returned future only when the first token is needed.
+    """
+    return _warmup_pool.submit(warm_fn or warm_responder)
+
+
+def get_speculation_stats():
+    """Return counters of the chat tab's speculative routing (None if disabled)."""
+    return speculative_router.stats() if speculative_router else None
+
+
+# Routes chat drafts while the user is typing (see gui/tabs/chat.py)
+speculative_router = None
+if SPECULATIVE_ROUTING_ENABLED:
+    speculative_router = SpeculativeRouter(
+        route_query_multi,
+        warm_fn=warm_responder,
+        max_age=SPECULATIVE_ROUTING_MAX_AGE,
+        warm_interval=SPECULATIVE_WARM_INTERVAL,
+        wake_word=WAKE_WORD,
+    )
+
+
 def execute_function(name, params):
     """Execute function and return response string."""
     if name == "control_light":
@@ -92,46 +258,43 @@ def execute_function(name, params):
 
 def preload_models():
     """Client-side preload to ensure models are in memory before user interaction. Parallelized."""
-    from core.router import FunctionGemmaRouter
     from core.tts import tts
     
-    global router
-    
     print(f"{GRAY}[System] Preloading models...{RESET}")
     
     threads = []
 
     def load_router():
-        global router
+        from core.settings_store import settings
+        if settings.get("pipeline.mode", PIPELINE_MODE) == "native":
+            print(f"{GRAY}[System] Native tool pipeline: router model not loaded.{RESET}")
+            return
         try:
-            router = FunctionGemmaRouter(model_path=LOCAL_ROUTER_PATH, compile_model=False)
+            if router_client is not None:
+                # Non-blocking: the worker keeps loading while the window is up
+                router_client.start()
+            else:
+                _get_router()
         except Exception as e:
             print(f"{GRAY}[Router] Failed to load local model: {e}{RESET}")
 
     def load_responder():
-        try:
-            # Send a minimal prompt to force the model to fully load into VRAM
-            # The keep_alive ensures it stays loaded for 30 minutes
-            print(f"{GRAY}[System] Loading responder model ({RESPONDER_MODEL})...{RESET}")
-            response = http_session.post(f"{OLLAMA_URL}/generate", json={
-                "model": RESPONDER_MODEL, 
-                "prompt": "hi",
-                "stream": False,
-                "keep_alive": "30m",
-                "options": {"num_predict": 1}  # Generate just 1 token to minimize wait
-            }, timeout=120)  # 2 minute timeout for initial model load
-            if response.status_code == 200:
-                print(f"{GRAY}[System] Responder model loaded successfully.{RESET}")
-            else:
-                print(f"{GRAY}[System] Responder model load returned status {response.status_code}{RESET}")
-        except Exception as e:
-            print(f"{GRAY}[System] Failed to preload responder: {e}{RESET}")
+        # The fast tier answers first (pinned if configured); the deep tier only loads if it fits
+        fast, deep = model_for_tier(FAST), model_for_tier(DEEP)
+        print(f"{GRAY}[System] Loading responder model ({fast})...{RESET}")
+        if warm_responder(fast):
+            print(f"{GRAY}[System] Responder model loaded successfully.{RESET}")
+        else:
+            print(f"{GRAY}[System] Failed to preload responder.{RESET}")
+        if deep != fast:
+            residency.hint(deep)
 
     def load_voice():
         print(f"{GRAY}[System] Loading voice model...{RESET}")
         tts.initialize()
 
     # Create threads
+    threads.append(threading.Thread(target=get_intent_fast_path))
     threads.append(threading.Thread(target=load_router))
     threads.append(threading.Thread(target=load_responder))
     threads.append(threading.Thread(target=load_voice))
@@ -0,0 +1,517 @@
+"""
+Memory Index - Semantic recall over chat history, tasks and calendar events.
+
+The responder only sees the newest MAX_HISTORY messages of the current chat,
+so anything older (or said in another chat, or a task or event it was never
+told about) is lost to it. This index embeds every message, task and event
+title with an Ollama embedding model. The vectors live in a memory-mapped
+float16 matrix (vectors.f16) next to a small SQLite table that says what each
+row is, so the index costs little RAM and survives restarts.
+
+New rows are embedded incrementally on a background thread after each turn:
+messages are read after a stored cursor, tasks and events (small tables) are
+reconciled against what is indexed. A search is one vectorized dot product
+over the matrix plus an argpartition for the top k. context_for() turns the
+best matches into a short "RELEVANT MEMORY" block, within a token budget, for
+the responder prompt.
+"""
+
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+import httpx
+import numpy as np
+
+from config import (
+    MEMORY_ENABLED, MEMORY_EMBED_MODEL, MEMORY_EMBED_KEEP_ALIVE, MEMORY_INDEX_DIR, MEMORY_EMBED_BATCH,
+    MEMORY_SYNC_BATCH, MEMORY_MIN_TEXT_CHARS, MEMORY_MAX_TEXT_CHARS, MEMORY_TOP_K, MEMORY_MIN_SCORE,
+    MEMORY_CONTEXT_MAX_TOKENS, MEMORY_SNIPPET_CHARS, MEMORY_QUERY_TIMEOUT, MEMORY_RETRY_SECONDS, GRAY, RESET
+)
+from core.context_builder import estimate_tokens
+from core.storage import Database
+
+# (source_id, label, text, timestamp)
+Entry = Tuple[Any, str, str, str]
+
+INITIAL_CAPACITY = 1024  # Rows allocated in vectors.f16 at first; doubled when full
+SCORE_BLOCK_ROWS = 4096  # Rows converted to float32 at a time while scoring
+
+# Turn-time lookups, started while the prompt is routed and the responder warms up
+_query_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="MemoryQuery")
+
+MIGRATIONS = [
+    [
+        # row is the vector's row in vectors.f16; source_id keeps the source's own type
+        '''
+        CREATE TABLE IF NOT EXISTS items (
+            row INTEGER PRIMARY KEY,
+            source TEXT NOT NULL,
+            source_id NOT NULL,
+            label TEXT,
+            text TEXT NOT NULL,
+            ts TEXT,
+            live INTEGER NOT NULL DEFAULT 1
+        )
+        ''',
+        'CREATE INDEX IF NOT EXISTS idx_items_source ON items(source, source_id)',
+        # model, dim and one cursor per append-only source
+        'CREATE TABLE IF NOT EXISTS state (key TEXT PRIMARY KEY, value)',
+    ],
+]
+
+MEMORY_HEADER = "RELEVANT MEMORY (from earlier chats, tasks and events):"
+
+
+def _setting(key: str, default: Any) -> Any:
+    try:
+        from core.settings_store import settings
+        return settings.get(key, default)
+    except Exception:
+        return default  # Settings store unavailable (e.g. no Qt in a subprocess)
+
+
+@dataclass
+class Source:
+    """
+    Where indexed rows come from. An append-only source (chat messages) is read
+    incrementally: fetch(cursor) returns the next entries after cursor, whose
+    source_ids are increasing and become the new cursor. Any other source is
+    small enough to re-read: fetch(None) returns all of its rows and the index
+    adds, replaces and drops entries to match.
+    """
+    name: str
+    fetch: Callable[[Any], List[Entry]]
+    append_only: bool = False
+    exists: Optional[Callable[[List[Any]], Set[Any]]] = None  # Append-only: which ids were not deleted since
+
+
+def default_sources() -> List[Source]:
+    """Chat messages, tasks and calendar events."""
+    from core.history import history_manager
+    from core.tasks import task_manager
+    from core.calendar_manager import calendar_manager
+
+    def messages(after_id):
+        return [(m['id'], f"{m['role']} message", m['content'] or "", m['timestamp'] or "")
+                for m in history_manager.get_messages_after(after_id or 0, MEMORY_SYNC_BATCH)]
+
+    def tasks(_):
+        return [(t['id'], "task (done)" if t['completed'] else "task", t['text'], str(t.get('created_at') or ""))
+                for t in task_manager.get_tasks()]
+
+    def events(_):
+        return [(e['id'], "event", e['title'], str(e['start_time'])) for e in calendar_manager.get_all_events()]
+
+    return [
+        Source("messages", messages, append_only=True, exists=history_manager.existing_message_ids),
+        Source("tasks", tasks),
+        Source("events", events),
+    ]
+
+
+def normalize(vectors: Any) -> np.ndarray:
+    """Unit-length float32 rows, so a dot product is the cosine similarity."""
+    arr = np.asarray(vectors, dtype=np.float32)
+    if arr.ndim == 1:
+        arr = arr[None, :]
+    norms = np.linalg.norm(arr, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return arr / norms
+
+
+def cosine_scores(matrix: np.ndarray, query: np.ndarray, block: int = SCORE_BLOCK_ROWS) -> np.ndarray:
+    """matrix @ query for a float16 matrix, upcast a block at a time (NumPy has no fast float16 matmul)."""
+    scores = np.empty(len(matrix), dtype=np.float32)
+    for start in range(0, len(matrix), block):
+        scores[start:start + block] = matrix[start:start + block].astype(np.float32) @ query
+    return scores
+
+
+def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k highest scores, best first."""
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    top = np.argpartition(scores, len(scores) - k)[len(scores) - k:]
+    return top[np.argsort(-scores[top], kind="stable")]
+
+
+def describe(hit: Dict[str, Any]) -> str:
+    """One line for the responder, e.g. "[user message 2026-03-02 18:04] ...". """
+    stamp = (hit.get('ts') or "")[:16].replace("T", " ")
+    text = " ".join(hit['text'].split())
+    if len(text) > MEMORY_SNIPPET_CHARS:
+        text = text[:MEMORY_SNIPPET_CHARS - 3].rstrip() + "..."
+    return f"[{hit['label']} {stamp}] {text}" if stamp else f"[{hit['label']}] {text}"
+
+
+class MemoryIndex:
+    """Embedding index over messages, tasks and events: float16 vectors on disk plus SQLite metadata."""
+
+    def __init__(self, path: str = MEMORY_INDEX_DIR,
+                 embed: Optional[Callable[[List[str]], Any]] = None,
+                 sources: Optional[Sequence[Source]] = None,
+                 model: Optional[str] = None):
+        self.path = Path(path)
+        self.vectors_path = self.path / "vectors.f16"
+        self.model = model  # None: settings "memory.embed_model"
+        self._embed_fn = embed  # texts -> vectors; None: Ollama /api/embed
+        self._sources = list(sources) if sources is not None else None
+        self.db = Database(str(self.path / "index.db"), MIGRATIONS, name="Memory")
+
+        self._lock = threading.Lock()  # Vectors, live mask and count
+        self._readers = 0  # Searches scoring a view of the vectors outside the lock
+        self._no_readers = threading.Condition(self._lock)
+        self._sync_lock = threading.Lock()  # One sync at a time
+        self._vectors: Optional[np.memmap] = None
+        self._live = np.zeros(0, dtype=bool)
+        self.count = 0
+        self.dim = 0
+
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+        self._retry_at = 0.0
+        self._open()
+
+    # --- Storage ---
+
+    def _state(self, key: str, default: Any = None) -> Any:
+        row = self.db.query_one('SELECT value FROM state WHERE key = ?', (key,))
+        return row[0] if row else default
+
+    def _open(self):
+        self.dim = int(self._state("dim", 0))
+        self.count = self.db.query_one('SELECT COALESCE(MAX(row) + 1, 0) FROM items')[0]
+        if not self.dim or not self.vectors_path.exists():
+            if self.count:
+                self._reset(self._state("model"))  # Vectors lost: rebuild
+            return
+        capacity = self.vectors_path.stat().st_size // (2 * self.dim)
+        if capacity < self.count:
+            self._reset(self._state("model"))
+            return
+        self._vectors = np.memmap(self.vectors_path, dtype=np.float16, mode="r+", shape=(capacity, self.dim))
+        self._live = np.zeros(capacity, dtype=bool)
+        live_rows = [row[0] for row in self.db.query('SELECT row FROM items WHERE live = 1')]
+        self._live[live_rows] = True
+
+    def _release_vectors(self):
+        """Unmap the vectors; call with the lock held. Waits for searches still scoring a view."""
+        # Windows can't resize or delete a file while a view of it is mapped
+        self._no_readers.wait_for(lambda: not self._readers)
+        if self._vectors is not None:
+            self._vectors.flush()
+            self._vectors = None
+
+    def _reset(self, model: Optional[str]):
+        """Drop everything (e.g. a different embedding model)."""
+        with self._lock:
+            self._release_vectors()
+            self.vectors_path.unlink(missing_ok=True)
+            with self.db.transaction() as conn:
+                conn.execute('DELETE FROM items')
+                conn.execute('DELETE FROM state')
+                conn.execute('INSERT INTO state VALUES (?, ?)', ("model", model))
+            self._live = np.zeros(0, dtype=bool)
+            self.count = 0
+            self.dim = 0
+
+    def _ensure_capacity(self, rows: int):
+        """Grow vectors.f16 (doubling) to hold rows; call with the lock held."""
+        capacity = 0 if self._vectors is None else self._vectors.shape[0]
+        if rows <= capacity:
+            return
+        new_capacity = max(rows, capacity * 2, INITIAL_CAPACITY)
+        self._release_vectors()
+        self.vectors_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.vectors_path, "ab") as f:
+            f.truncate(new_capacity * self.dim * 2)
+        self._vectors = np.memmap(self.vectors_path, dtype=np.float16, mode="r+", shape=(new_capacity, self.dim))
+        self._live = np.concatenate([self._live, np.zeros(new_capacity - len(self._live), dtype=bool)])
+
+    def _append(self, source: str, entries: List[Entry], vectors: np.ndarray, cursor: Any = None):
+        """Store embedded entries (and the source's new cursor) as new rows."""
+        with self._lock:
+            if entries:
+                if not self.dim:
+                    self.dim = vectors.shape[1]
+                start = self.count
+                self._ensure_capacity(start + len(entries))
+                # Vectors first: rows only count once the metadata below is committed
+                self._vectors[start:start + len(entries)] = vectors.astype(np.float16)
+                self._vectors.flush()
+            with self.db.transaction() as conn:
+                if entries:
+                    conn.execute('INSERT OR REPLACE INTO state VALUES (?, ?)', ("dim", self.dim))
+                    conn.executemany(
+                        'INSERT INTO items (row, source, source_id, label, text, ts) VALUES (?, ?, ?, ?, ?, ?)',
+                        [(start + i, source, sid, label, text, ts) for i, (sid, label, text, ts) in enumerate(entries)]
+                    )
+                if cursor is not None:
+                    conn.execute('INSERT OR REPLACE INTO state VALUES (?, ?)', (f"cursor:{source}", cursor))
+            if entries:
+                self._live[start:start + len(entries)] = True
+                self.count = start + len(entries)
+
+    def _remove(self, rows: Iterable[int]):
+        rows = list(rows)
+        if not rows:
+            return
+        with self._lock:
+            self._live[rows] = False
+            marks = ",".join("?" * len(rows))
+            self.db.execute(f'UPDATE items SET live = 0 WHERE row IN ({marks})', rows)
+
+    # --- Embedding ---
+
+    def embed_model(self) -> str:
+        return self.model or _setting("memory.embed_model", MEMORY_EMBED_MODEL)
+
+    def enabled(self) -> bool:
+        return bool(_setting("memory.enabled", MEMORY_ENABLED))
+
+    def embed(self, texts: List[str], timeout: Optional[float] = None) -> np.ndarray:
+        """
+        Unit-length embeddings of texts (truncated to MEMORY_MAX_TEXT_CHARS).
+        With a timeout (queries), raises TimeoutError instead of waiting for
+        the embedding model to be loaded.
+        """
+        texts = [text[:MEMORY_MAX_TEXT_CHARS] for text in texts]
+        if self._embed_fn is not None:
+            return normalize(self._embed_fn(texts))
+        from core.ollama_client import ollama
+        from core.model_persistence import residency, PRIORITY_EMBED
+        model = self.embed_model()
+        if timeout is None:
+            # Background sync: load it within the model memory budget like any other model
+            residency.ensure_loaded(model, PRIORITY_EMBED, embedding=True)
+        elif not residency.is_loaded(model):
+            # Query path: never wait for a load (or evictions) in front of a reply
+            residency.hint(model, PRIORITY_EMBED, embedding=True)
+            raise TimeoutError(f"{model} is not loaded yet")
+        vectors = ollama.embed(model, texts, keep_alive=MEMORY_EMBED_KEEP_ALIVE, timeout=timeout)
+        residency.touch(model)
+        return normalize(vectors)
+
+    def _add(self, source: str, entries: List[Entry], cursor: Any = None):
+        """
+        Embed entries in batches and store them. With a cursor (append-only
+        sources) each batch also saves how far it got, so a sync that stops
+        part way never indexes a row twice; the last batch saves cursor.
+        """
+        for start in range(0, len(entries), MEMORY_EMBED_BATCH):
+            if self._closed:
+                return
+            batch = entries[start:start + MEMORY_EMBED_BATCH]
+            if cursor is not None and start + MEMORY_EMBED_BATCH < len(entries):
+                batch_cursor = batch[-1][0]
+            else:
+                batch_cursor = cursor
+            self._append(source, batch, self.embed([text for _, _, text, _ in batch]), batch_cursor)
+        if not entries and cursor is not None:
+            self._append(source, [], np.empty((0, self.dim), dtype=np.float32), cursor)
+
+    # --- Sync ---
+
+    def sources(self) -> List[Source]:
+        if self._sources is None:
+            self._sources = default_sources()
+        return self._sources
+
+    def sync(self) -> int:
+        """Embed rows added since the last sync and drop removed ones. Returns how many rows were added."""
+        with self._sync_lock:
+            model = self.embed_model()
+            if self._state("model") != model:
+                if self.count:
+                    print(f"{GRAY}[Memory] Embedding model changed to {model}; rebuilding the index.{RESET}")
+                self._reset(model)
+            before = self.count
+            for source in self.sources():
+                if self._closed:
+                    break
+                if source.append_only:
+                    self._sync_append_only(source)
+                else:
+                    self._sync_table(source)
+            return self.count - before
+
+    def _sync_append_only(self, source: Source):
+        cursor = self._state(f"cursor:{source.name}")
+        while not self._closed:
+            entries = source.fetch(cursor)
+            if not entries:
+                return
+            cursor = entries[-1][0]
+            keep = [e for e in entries if len(e[2].strip()) >= MEMORY_MIN_TEXT_CHARS]
+            self._add(source.name, keep, cursor)
+            self._yield_to_generation()
+
+    def _sync_table(self, source: Source):
+        current = {entry[0]: entry for entry in source.fetch(None) if entry[2].strip()}
+        indexed = {
+            row[1]: (row[0], row[2], row[3])
+            for row in self.db.query('SELECT row, source_id, label, text FROM items WHERE source = ? AND live = 1',
+                                     (source.name,))
+        }
+        changed = {sid for sid, (_, label, text) in indexed.items()
+                   if sid not in current or (current[sid][1], current[sid][2]) != (label, text)}
+        self._remove(indexed[sid][0] for sid in changed)
+        self._add(source.name, [entry for sid, entry in current.items() if sid not in indexed or sid in changed])
+
+    def _yield_to_generation(self):
+        """Let a running chat/voice reply have Ollama to itself between embedding batches."""
+        try:
+            from core.ollama_status import ollama_status
+        except Exception:
+            return
+        while ollama_status.is_active() and not self._closed:
+            time.sleep(0.5)
+
+    # --- Background ---
+
+    def schedule_sync(self):
+        """Index new rows soon, on the background thread."""
+        if self._closed or not self.enabled():
+            return
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="MemoryIndex", daemon=True)
+            self._thread.start()
+        self._wake.set()
+
+    def _run(self):
+        while True:
+            self._wake.wait()
+            self._wake.clear()
+            if self._closed:
+                return
+            if time.monotonic() < self._retry_at:
+                continue
+            try:
+                added = self.sync()
+                if added:
+                    print(f"{GRAY}[Memory] Indexed {added} new items ({self.count} total).{RESET}")
+            except Exception as e:
+                self._unavailable(e)
+
+    def _unavailable(self, error: Exception):
+        self._retry_at = time.monotonic() + MEMORY_RETRY_SECONDS
+        print(f"{GRAY}[Memory] Embedding with {self.embed_model()} failed ({error}); "
+              f"retrying in {MEMORY_RETRY_SECONDS}s.{RESET}")
+
+    def close(self):
+        """Stop the background sync and release the files."""
+        self._closed = True
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        with self._lock:
+            self._release_vectors()
+        self.db.close()
+
+    # --- Search ---
+
+    def search_vector(self, query: np.ndarray, k: int = MEMORY_TOP_K) -> List[Tuple[int, float]]:
+        """(row, cosine similarity) of the k live rows closest to a unit-length query, best first."""
+        query = np.asarray(query, dtype=np.float32).reshape(-1)
+        with self._lock:
+            n = self.count
+            if not n or self._vectors is None or len(query) != self.dim:
+                return []
+            vectors = self._vectors[:n]
+            live = self._live[:n].copy()
+            self._readers += 1
+        # Rows below count are never rewritten, so score without blocking appends
+        try:
+            scores = cosine_scores(vectors, query)
+        finally:
+            del vectors
+            with self._lock:
+                self._readers -= 1
+                self._no_readers.notify_all()
+        scores[~live] = -np.inf
+        return [(int(row), float(scores[row])) for row in top_k(scores, k) if np.isfinite(scores[row])]
+
+    def search(self, query: str, k: int = MEMORY_TOP_K, min_score: float = MEMORY_MIN_SCORE,
+               timeout: Optional[float] = None) -> List[Dict[str, Any]]:
+        """The k indexed items most similar to query (at least min_score), best first."""
+        if not self.count:
+            return []
+        # Fetch extra in case some messages were deleted since they were indexed
+        hits = [(row, score) for row, score in self.search_vector(self.embed([query], timeout)[0], k * 2)
+                if score >= min_score]
+        if not hits:
+            return []
+        marks = ",".join("?" * len(hits))
+        items = {
+            row[0]: {'source': row[1], 'source_id': row[2], 'label': row[3], 'text': row[4], 'ts': row[5]}
+            for row in self.db.query(f'SELECT row, source, source_id, label, text, ts FROM items WHERE row IN ({marks})',
+                                     [row for row, _ in hits])
+        }
+        deleted = set()
+        for source in self.sources():
+            if source.exists is None:
+                continue
+            ids = [item['source_id'] for item in items.values() if item['source'] == source.name]
+            if ids:
+                gone = set(ids) - set(source.exists(ids))
+                deleted.update(row for row, item in items.items()
+                               if item['source'] == source.name and item['source_id'] in gone)
+        self._remove(deleted)
+        return [
+            {**items[row], 'row': row, 'score': score}
+            for row, score in hits if row in items and row not in deleted
+        ][:k]
+
+    def context_for(self, query: str, exclude: Iterable[str] = (),
+                    max_tokens: Optional[int] = None) -> str:
+        """
+        A "RELEVANT MEMORY" block with the best matches for query that are not
+        already part of the conversation (exclude: its message texts), within
+        max_tokens. "" if disabled, empty or the embedding model is unavailable.
+        A slow query only skips memory for this turn; errors back off for
+        MEMORY_RETRY_SECONDS.
+        """
+        max_tokens = MEMORY_CONTEXT_MAX_TOKENS if max_tokens is None else max_tokens
+        if not self.enabled() or not self.count or time.monotonic() < self._retry_at:
+            return ""
+        try:
+            hits = self.search(query, timeout=MEMORY_QUERY_TIMEOUT)
+        except (httpx.TimeoutException, TimeoutError) as e:
+            print(f"{GRAY}[Memory] Skipping memory for this turn: {e or type(e).__name__}{RESET}")
+            return ""
+        except Exception as e:
+            self._unavailable(e)
+            return ""
+
+        exclude = [text for text in exclude if text]
+        used = estimate_tokens(MEMORY_HEADER)
+        lines = []
+        for hit in hits:
+            if any(hit['text'] in text for text in exclude):
+                continue
+            line = f"- {describe(hit)}"
+            cost = estimate_tokens(line)
+            if used + cost > max_tokens:
+                continue
+            lines.append(line)
+            used += cost
+        return MEMORY_HEADER + "\n" + "\n".join(lines) if lines else ""
+
+    def lookup(self, query: str, exclude: Iterable[str] = ()) -> Future:
+        """Start context_for() on a worker thread; the future's result is the block ("" if none)."""
+        return _query_pool.submit(self.context_for, query, list(exclude))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            live = int(self._live[:self.count].sum())
+        return {"rows": self.count, "live": live, "dim": self.dim, "model": self._state("model")}
+
+
+# Global memory index instance
+memory_index = MemoryIndex()
@@ -0,0 +1,218 @@
+"""
+LLM Metrics - Persisted per-request performance telemetry from Ollama streams.
+
+Ollama's final chunk of every /api/chat stream carries token counts and
+timings (DoneStats). A StreamRecorder watches one reply's events, adds the
+wall-clock time to first token, and stores one row per reply in SQLite, tagged
+with the entry point (chat or voice), the model and the routed function.
+summary() and breakdown() give rolling tokens/sec and TTFT percentiles for the UI.
+"""
+
+import math
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from config import METRICS_DB_PATH, METRICS_RETENTION_DAYS, METRICS_WINDOW_SECONDS, GRAY, RESET
+from core.ollama_client import ContentChunk, DoneStats, StreamEvent, ThinkingChunk, ToolCallChunk
+
+NS_PER_MS = 1e6
+
+COLUMNS = ("ts", "entry", "model", "function", "prompt_tokens", "prompt_ms", "eval_tokens", "eval_ms",
+           "load_ms", "total_ms", "ttft_ms", "first_token_ms", "cancelled")
+
+
+def _percentile(values: List[float], q: float) -> Optional[float]:
+    """Nearest-rank percentile (q in 0-100), None for no values."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, math.ceil(q / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+class StreamRecorder:
+    """Accumulates the DoneStats of one reply (several for native tool rounds) and its TTFT."""
+
+    def __init__(self, metrics: "LLMMetrics", entry: str, model: str, function: Optional[str] = None):
+        self.metrics = metrics
+        self.entry = entry
+        self.model = model
+        self.function = function
+        self.start = time.perf_counter()
+        self.ttft_ms: Optional[float] = None
+        self.tools: List[str] = []
+        self.done: List[DoneStats] = []
+
+    def observe(self, event: StreamEvent):
+        if isinstance(event, (ThinkingChunk, ContentChunk)):
+            if self.ttft_ms is None:
+                self.ttft_ms = (time.perf_counter() - self.start) * 1000
+        elif isinstance(event, ToolCallChunk):
+            self.tools.extend(name for name, _ in event.calls)
+        elif isinstance(event, DoneStats):
+            self.done.append(event)
+
+    def finish(self, first_token_ms: Optional[float] = None, cancelled: bool = False):
+        """
+        Store the reply. first_token_ms is the end-to-end time from the user's request
+        (routing and tools included). Replayed (cached) replies have no DoneStats and
+        aren't recorded; a cancelled one that stopped before its DoneStats arrived is
+        recorded as cancelled.
+        """
+        if not self.done and cancelled:
+            self.done.append(DoneStats(model=self.model, cancelled=True))
+        if not self.done:
+            return
+        function = self.function or ",".join(dict.fromkeys(self.tools)) or "nonthinking"
+        self.metrics.record(self.entry, self.model, function, self.done, self.ttft_ms, first_token_ms)
+
+
+class LLMMetrics:
+    """SQLite store of per-reply Ollama timings with rolling summaries."""
+
+    def __init__(self, db_path: str = METRICS_DB_PATH, retention_days: float = METRICS_RETENTION_DAYS):
+        self.db_path = db_path
+        self.retention_days = retention_days
+        self._lock = threading.Lock()
+        Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+        self._init_db()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path)
+        conn.execute('PRAGMA synchronous=NORMAL')
+        return conn
+
+    def _init_db(self):
+        conn = self._connect()
+        try:
+            # WAL: inserts at the end of a reply don't wait for an fsync
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('''
+            CREATE TABLE IF NOT EXISTS requests (
+                id INTEGER PRIMARY KEY,
+                ts REAL,
+                entry TEXT,
+                model TEXT,
+                function TEXT,
+                prompt_tokens INTEGER,
+                prompt_ms REAL,
+                eval_tokens INTEGER,
+                eval_ms REAL,
+                load_ms REAL,
+                total_ms REAL,
+                ttft_ms REAL,
+                first_token_ms REAL,
+                cancelled INTEGER
+            )
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_requests_ts ON requests(ts)')
+            if self.retention_days:
+                conn.execute('DELETE FROM requests WHERE ts < ?', (time.time() - self.retention_days * 86400,))
+            conn.commit()
+        finally:
+            conn.close()
+
+    def stream(self, entry: str, model: str, function: Optional[str] = None) -> StreamRecorder:
+        """Start recording one reply; call observe(event) per event and finish() at the end."""
+        return StreamRecorder(self, entry, model, function)
+
+    def record(self, entry: str, model: str, function: str, done: List[DoneStats],
+               ttft_ms: Optional[float] = None, first_token_ms: Optional[float] = None):
+        """Store one reply; the DoneStats of all its rounds are summed."""
+        row = (
+            time.time(), entry, model or done[-1].model, function,
+            sum(d.prompt_eval_count for d in done),
+            sum(d.prompt_eval_duration for d in done) / NS_PER_MS,
+            sum(d.eval_count for d in done),
+            sum(d.eval_duration for d in done) / NS_PER_MS,
+            sum(d.load_duration for d in done) / NS_PER_MS,
+            sum(d.total_duration for d in done) / NS_PER_MS,
+            ttft_ms, first_token_ms, int(any(d.cancelled for d in done)),
+        )
+        with self._lock:
+            conn = self._connect()
+            try:
+                conn.execute(
+                    f'INSERT INTO requests ({", ".join(COLUMNS)}) VALUES ({", ".join("?" * len(COLUMNS))})', row
+                )
+                conn.commit()
+            except sqlite3.Error as e:
+                print(f"{GRAY}[Metrics] Could not record request: {e}{RESET}")
+            finally:
+                conn.close()
+
+    def _rows(self, window_seconds: Optional[float], **filters) -> List[Dict[str, Any]]:
+        clauses, params = [], []
+        if window_seconds:
+            clauses.append('ts >= ?')
+            params.append(time.time() - window_seconds)
+        for column, value in filters.items():
+            if value is not None:
+                clauses.append(f'{column} = ?')
+                params.append(value)
+        where = f'WHERE {" AND ".join(clauses)}' if clauses else ''
+        with self._lock:
+            conn = self._connect()
+            conn.row_factory = sqlite3.Row
+            try:
+                return [dict(r) for r in conn.execute(f'SELECT * FROM requests {where} ORDER BY ts', params)]
+            finally:
+                conn.close()
+
+    @staticmethod
+    def _summarize(rows: List[Dict[str, Any]]) -> Dict[str, Any]:
+        eval_tokens = sum(r["eval_tokens"] for r in rows)
+        eval_ms = sum(r["eval_ms"] for r in rows)
+        prompt_tokens = sum(r["prompt_tokens"] for r in rows)
+        prompt_ms = sum(r["prompt_ms"] for r in rows)
+        rates = [r["eval_tokens"] / r["eval_ms"] * 1000 for r in rows if r["eval_ms"]]
+        ttft = [r["ttft_ms"] for r in rows if r["ttft_ms"] is not None]
+        first_token = [r["first_token_ms"] for r in rows if r["first_token_ms"] is not None]
+        return {
+            "requests": len(rows),
+            "cancelled": sum(r["cancelled"] for r in rows),
+            "tokens_per_second": eval_tokens / eval_ms * 1000 if eval_ms else 0.0,
+            "tokens_per_second_p50": _percentile(rates, 50),
+            "prefill_tokens_per_second": prompt_tokens / prompt_ms * 1000 if prompt_ms else 0.0,
+            "ttft_ms_p50": _percentile(ttft, 50),
+            "ttft_ms_p95": _percentile(ttft, 95),
+            "first_token_ms_p50": _percentile(first_token, 50),
+            "first_token_ms_p95": _percentile(first_token, 95),
+            "load_ms_mean": sum(r["load_ms"] for r in rows) / len(rows) if rows else 0.0,
+        }
+
+    def summary(self, window_seconds: Optional[float] = METRICS_WINDOW_SECONDS, model: Optional[str] = None,
+                function: Optional[str] = None, entry: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Rolling stats over the last window_seconds (None = all time), optionally for one
+        model, routed function or entry point. ttft_ms is from sending the request to
+        Ollama; first_token_ms is from the user's request.
+        """
+        return self._summarize(self._rows(window_seconds, model=model, function=function, entry=entry))
+
+    def breakdown(self, by: str = "model", window_seconds: Optional[float] = METRICS_WINDOW_SECONDS
+                  ) -> Dict[str, Dict[str, Any]]:
+        """summary() per model, function or entry."""
+        if by not in ("model", "function", "entry"):
+            raise ValueError(f"Unknown breakdown: {by}")
+        groups: Dict[str, List[Dict[str, Any]]] = {}
+        for row in self._rows(window_seconds):
+            groups.setdefault(row[by], []).append(row)
+        return {key: self._summarize(rows) for key, rows in groups.items()}
+
+    def clear(self):
+        """Drop all recorded requests."""
+        with self._lock:
+            conn = self._connect()
+            try:
+                conn.execute('DELETE FROM requests')
+                conn.commit()
+            finally:
+                conn.close()
+
+
+# Global metrics instance
+llm_metrics = LLMMetrics()
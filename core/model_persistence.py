@@ -1,173 +1,302 @@
 """
-Model Persistence Manager - Manages which models stay loaded and which can sleep.
+Model Persistence Manager - Decides which Ollama models stay resident.
+
+Every model the app uses (the response tiers, the web agent's VLM, the memory
+index's embedding model) is loaded through the residency scheduler, which keeps the models reported by /api/ps
+within a memory budget. Before a load, the lowest-priority, least recently used
+models are unloaded until the new one fits. Pinned models are never evicted.
+One timer thread unloads models that have been idle too long and services
+preload hints, which load a model only if it fits without evicting anything.
 """
 
 import threading
 import time
-import requests
-from typing import Optional
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional
+
 from config import (
-    RESPONDER_MODEL, OLLAMA_URL, QWEN_TIMEOUT_SECONDS, 
-    QWEN_KEEP_ALIVE, GRAY, RESET, CYAN
+    QWEN_TIMEOUT_SECONDS, QWEN_KEEP_ALIVE, PINNED_KEEP_ALIVE,
+    MODEL_MEMORY_BUDGET_GB, MODEL_MEMORY_AUTO_FRACTION, RESIDENCY_TICK_SECONDS,
+    GRAY, RESET, CYAN
 )
-from core.model_manager import get_running_models, sync_unload_model
-
-
-class QwenModelManager:
-    """Manages Qwen model lifecycle - load, keep alive, and sleep."""
-    
-    def __init__(self):
-        self.model_name = RESPONDER_MODEL
-        self.last_used_time: Optional[float] = None
-        self.is_loaded = False
-        self.lock = threading.Lock()
-        self.timeout_thread: Optional[threading.Thread] = None
-        self.monitoring = False
-        self.http_session = requests.Session()
-    
-    def ensure_loaded(self) -> bool:
-        """Ensure Qwen model is loaded. Load if not already loaded."""
-        with self.lock:
-            if self.is_loaded:
-                # Update last used time
-                self.last_used_time = time.time()
-                return True
-            
-            # Check if already running in Ollama (persistence restart case)
-            running_models = get_running_models()
-            if self.model_name in running_models or any(self.model_name in m for m in running_models):
-                print(f"{CYAN}[QwenManager] {self.model_name} already running in Ollama.{RESET}")
-                self.is_loaded = True
-                self.last_used_time = time.time()
-                self._start_timeout_monitor()
+from core.ollama_client import ollama
+from core.ollama_status import ollama_status
+
+# Eviction order: lower priority goes first, then least recently used
+PRIORITY_EXTERNAL = -1  # Loaded by something else; never idle-unloaded by us
+PRIORITY_AGENT = 0
+PRIORITY_EMBED = 0  # Memory index embeddings: small, quick to reload
+PRIORITY_RESPONDER = 1
+
+GB = 1024 ** 3
+
+
+def canonical_name(model: str) -> str:
+    """Ollama reports untagged models as "name:latest"."""
+    return model if ":" in model else f"{model}:latest"
+
+
+@dataclass
+class ResidentModel:
+    name: str
+    size: int = 0  # Bytes, from /api/ps (or /api/tags before the first load)
+    priority: int = PRIORITY_EXTERNAL
+    pinned: bool = False
+    loaded: bool = False
+    last_used: float = 0.0
+    embedding: bool = False  # Loaded/unloaded through /api/embed (no /api/generate support)
+
+
+def _configured_budget() -> float:
+    """Budget in bytes: settings "models.memory_budget_gb", or a share of system RAM when 0."""
+    budget_gb = MODEL_MEMORY_BUDGET_GB
+    try:
+        from core.settings_store import settings
+        budget_gb = settings.get("models.memory_budget_gb", budget_gb)
+    except Exception:
+        pass  # Settings store unavailable (e.g. no Qt in a subprocess)
+    if budget_gb:
+        return budget_gb * GB
+    try:
+        import psutil
+        return psutil.virtual_memory().total * MODEL_MEMORY_AUTO_FRACTION
+    except Exception:
+        return float("inf")
+
+
+class ResidencyScheduler:
+    """Tracks resident Ollama models and keeps them within a memory budget."""
+
+    def __init__(self, budget_bytes: Optional[float] = None, idle_timeout: float = QWEN_TIMEOUT_SECONDS,
+                 tick: float = RESIDENCY_TICK_SECONDS, client=None, status=None):
+        self._budget_bytes = budget_bytes
+        self.idle_timeout = idle_timeout
+        self.tick = tick
+        self.client = client or ollama
+        self.ollama_status = status or ollama_status
+
+        self._models: Dict[str, ResidentModel] = {}
+        self._lock = threading.RLock()
+        self._load_lock = threading.Lock()  # One load/eviction decision at a time
+        self._wake = threading.Condition(self._lock)
+        self._hints: List[str] = []
+        self._timer: Optional[threading.Thread] = None
+
+    @property
+    def budget_bytes(self) -> float:
+        return self._budget_bytes if self._budget_bytes is not None else _configured_budget()
+
+    # --- State ---
+
+    def _state(self, model: str) -> ResidentModel:
+        name = canonical_name(model)
+        with self._lock:
+            if name not in self._models:
+                self._models[name] = ResidentModel(name)
+            return self._models[name]
+
+    def _register(self, model: str, priority: int, embedding: bool = False) -> ResidentModel:
+        state = self._state(model)
+        with self._lock:
+            state.priority = max(state.priority, priority)
+            state.embedding = state.embedding or embedding
+        return state
+
+    def refresh(self) -> bool:
+        """Sync loaded flags and sizes with the shared /api/ps view. Returns False if Ollama is unreachable."""
+        models = self.ollama_status.models()
+        if models is None:
+            print(f"{GRAY}[Residency] Could not query loaded models.{RESET}")
+            return False
+        running = {canonical_name(m.get("name", "")): m.get("size", 0) for m in models}
+        with self._lock:
+            for name, size in running.items():
+                state = self._state(name)
+                if not state.loaded and state.priority == PRIORITY_EXTERNAL:
+                    state.last_used = time.time()
+                state.loaded = True
+                state.size = size or state.size
+            for state in self._models.values():
+                if state.name not in running:
+                    state.loaded = False
+        return True
+
+    def used_bytes(self) -> int:
+        with self._lock:
+            return sum(s.size for s in self._models.values() if s.loaded)
+
+    def touch(self, model: str):
+        """Mark a model as just used."""
+        state = self._state(model)
+        with self._lock:
+            state.last_used = time.time()
+
+    def set_pinned(self, models: Iterable[str]):
+        """Pin exactly these models (previously pinned ones become evictable)."""
+        names = {canonical_name(m) for m in models}
+        with self._lock:
+            for name in names:
+                self._state(name)
+            for state in self._models.values():
+                state.pinned = state.name in names
+
+    def is_pinned(self, model: str) -> bool:
+        with self._lock:
+            state = self._models.get(canonical_name(model))
+            return state is not None and state.pinned
+
+    def is_loaded(self, model: str) -> bool:
+        """Whether model was resident at the last refresh (no request to Ollama)."""
+        with self._lock:
+            state = self._models.get(canonical_name(model))
+            return state is not None and state.loaded
+
+    # --- Loading and eviction ---
+
+    def ensure_loaded(self, model: str, priority: int = PRIORITY_RESPONDER, embedding: bool = False) -> bool:
+        """Load model if needed, evicting others to stay within the budget. Returns False on failure."""
+        state = self._register(model, priority, embedding)
+        self._start_timer()
+        with self._load_lock:
+            self.refresh()
+            if state.loaded:
+                self.touch(model)
                 return True
-            
-            # Load the model
+
+            self._make_room(state.size or self._estimate_size(state.name), keep={state.name})
+            keep_alive = PINNED_KEEP_ALIVE if state.pinned else QWEN_KEEP_ALIVE
             try:
-                print(f"{CYAN}[QwenManager] Loading {self.model_name}...{RESET}")
-                response = self.http_session.post(
-                    f"{OLLAMA_URL}/generate",
-                    json={
-                        "model": self.model_name,
-                        "prompt": "hi",
-                        "stream": False,
-                        "keep_alive": QWEN_KEEP_ALIVE,
-                        "options": {"num_predict": 1}
-                    },
-                    timeout=120
-                )
-                
-                if response.status_code == 200:
-                    self.is_loaded = True
-                    self.last_used_time = time.time()
-                    print(f"{CYAN}[QwenManager] {self.model_name} loaded.{RESET}")
-                    
-                    # Start timeout monitoring
-                    self._start_timeout_monitor()
-                    return True
+                print(f"{CYAN}[Residency] Loading {state.name}...{RESET}")
+                if state.embedding:
+                    self.client.embed(state.name, [], keep_alive=keep_alive, timeout=120)
                 else:
-                    print(f"{GRAY}[QwenManager] Failed to load {self.model_name}: {response.status_code}{RESET}")
-                    return False
+                    self.client.load(state.name, keep_alive=keep_alive, timeout=120)
             except Exception as e:
-                print(f"{GRAY}[QwenManager] Error loading {self.model_name}: {e}{RESET}")
+                print(f"{GRAY}[Residency] Error loading {state.name}: {e}{RESET}")
                 return False
-    
-    def mark_used(self):
-        """Mark model as used (update timestamp)."""
-        with self.lock:
-            self.last_used_time = time.time()
-            if not self.is_loaded:
-                self.ensure_loaded()
-            elif self.monitoring:
-                # Restart timeout monitoring
-                self._start_timeout_monitor()
-    
-    def unload(self, reason: str = "manual"):
-        """Unload Qwen model to free VRAM."""
-        with self.lock:
-            if not self.is_loaded:
-                return
-            
-            try:
-                print(f"{GRAY}[QwenManager] Unloading {self.model_name} ({reason})...{RESET}")
-                sync_unload_model(self.model_name)
-                self.is_loaded = False
-                self.last_used_time = None
-                self.monitoring = False
-                print(f"{GRAY}[QwenManager] {self.model_name} unloaded.{RESET}")
-            except Exception as e:
-                print(f"{GRAY}[QwenManager] Error unloading {self.model_name}: {e}{RESET}")
-    
-    def _start_timeout_monitor(self):
-        """Start or restart timeout monitoring thread."""
-        self.monitoring = True
-        
-        # Stop existing thread if any
-        if self.timeout_thread and self.timeout_thread.is_alive():
-            # Thread will check self.monitoring and exit
+            finally:
+                self.ollama_status.invalidate()
+            self.refresh()
+            self.touch(model)
+            with self._lock:
+                state.loaded = True
+            print(f"{CYAN}[Residency] {state.name} loaded "
+                  f"({self.used_bytes() / GB:.1f} / {self.budget_bytes / GB:.1f} GB in use).{RESET}")
+            return True
+
+    def _estimate_size(self, name: str) -> int:
+        """Size of a model that isn't loaded yet, from /api/tags (0 if unknown)."""
+        try:
+            for m in self.client.tags():
+                if canonical_name(m.get("name", "")) == name:
+                    return m.get("size", 0)
+        except Exception:
             pass
-        
-        # Start new monitoring thread
-        self.timeout_thread = threading.Thread(
-            target=self._timeout_monitor_loop,
-            daemon=True
-        )
-        self.timeout_thread.start()
-    
-    def _timeout_monitor_loop(self):
-        """Monitor for timeout and unload model if inactive."""
-        while self.monitoring:
-            time.sleep(10)  # Check every 10 seconds
-            
-            with self.lock:
-                if not self.monitoring or not self.is_loaded:
-                    break
-                
-                if self.last_used_time is None:
-                    continue
-                
-                elapsed = time.time() - self.last_used_time
-                
-                if elapsed >= QWEN_TIMEOUT_SECONDS:
-                    print(f"{GRAY}[QwenManager] Timeout reached ({elapsed:.0f}s), unloading {self.model_name}...{RESET}")
-                    self.unload("timeout")
-                    break
-    
-    def check_status(self) -> dict:
-        """Get current status of Qwen model."""
-        with self.lock:
-            running_models = get_running_models()
-            is_running = self.model_name in running_models or any(
-                self.model_name in m for m in running_models
+        return 0
+
+    def _make_room(self, needed: int, keep: set):
+        """Unload the lowest-priority, least recently used models until needed bytes fit."""
+        budget = self.budget_bytes
+        with self._lock:
+            used = self.used_bytes()
+            candidates = sorted(
+                (s for s in self._models.values() if s.loaded and not s.pinned and s.name not in keep),
+                key=lambda s: (s.priority, s.last_used),
             )
-            
-            return {
-                "is_loaded": self.is_loaded,
-                "is_running": is_running,
-                "last_used": self.last_used_time,
-                "time_since_use": time.time() - self.last_used_time if self.last_used_time else None
-            }
+            victims = []
+            for state in candidates:
+                if used + needed <= budget:
+                    break
+                victims.append(state.name)
+                used -= state.size
+        for name in victims:
+            self.unload(name, "memory budget")
 
+    def unload(self, model: str, reason: str = "manual"):
+        """Unload a model now."""
+        state = self._state(model)
+        try:
+            print(f"{GRAY}[Residency] Unloading {state.name} ({reason})...{RESET}")
+            if state.embedding:
+                self.client.embed(state.name, [], keep_alive=0, timeout=5)
+            else:
+                self.client.unload(state.name)
+        except Exception as e:
+            print(f"{GRAY}[Residency] Error unloading {state.name}: {e}{RESET}")
+            return
+        finally:
+            self.ollama_status.invalidate()
+        with self._lock:
+            state.loaded = False
 
-# Global Qwen model manager instance
-qwen_manager = QwenModelManager()
+    def hint(self, model: str, priority: int = PRIORITY_RESPONDER, embedding: bool = False):
+        """Preload model in the background if it fits without evicting anything."""
+        self._register(model, priority, embedding)
+        self._start_timer()
+        with self._wake:
+            self._hints.append(canonical_name(model))
+            self._wake.notify()
 
+    # --- Timer thread ---
 
-def ensure_qwen_loaded() -> bool:
-    """Ensure Qwen model is loaded. Public interface."""
-    return qwen_manager.ensure_loaded()
+    def _start_timer(self):
+        with self._lock:
+            if self._timer is None or not self._timer.is_alive():
+                self._timer = threading.Thread(target=self._timer_loop, name="ResidencyTimer", daemon=True)
+                self._timer.start()
 
+    def _timer_loop(self):
+        while True:
+            with self._wake:
+                self._wake.wait(self.tick)
+                hints, self._hints = self._hints, []
+            try:
+                self._evict_idle()
+                for name in hints:
+                    self._preload(name)
+            except Exception as e:
+                print(f"{GRAY}[Residency] Timer error: {e}{RESET}")
 
-def mark_qwen_used():
-    """Mark Qwen model as used. Public interface."""
-    qwen_manager.mark_used()
+    def _evict_idle(self):
+        now = time.time()
+        with self._lock:
+            idle = [
+                s.name for s in self._models.values()
+                if s.loaded and not s.pinned and s.priority != PRIORITY_EXTERNAL
+                and now - s.last_used >= self.idle_timeout
+            ]
+        for name in idle:
+            self.unload(name, "idle")
 
+    def _preload(self, name: str):
+        with self._load_lock:
+            self.refresh()
+            state = self._state(name)
+            if state.loaded:
+                return
+            size = state.size or self._estimate_size(name)
+            if self.used_bytes() + size > self.budget_bytes:
+                print(f"{GRAY}[Residency] Skipping preload of {name}: it doesn't fit the budget.{RESET}")
+                return
+        self.ensure_loaded(name, state.priority)
 
-def unload_qwen(reason: str = "manual"):
-    """Unload Qwen model. Public interface."""
-    qwen_manager.unload(reason)
+    def status(self) -> Dict[str, Any]:
+        """Budget, usage and per-model residency."""
+        now = time.time()
+        with self._lock:
+            return {
+                "budget_bytes": self.budget_bytes,
+                "used_bytes": self.used_bytes(),
+                "models": [
+                    {
+                        "name": s.name, "size": s.size, "loaded": s.loaded, "pinned": s.pinned,
+                        "priority": s.priority,
+                        "idle_seconds": now - s.last_used if s.last_used else None,
+                    }
+                    for s in sorted(self._models.values(), key=lambda s: s.name)
+                ],
+            }
 
 
-def get_qwen_status() -> dict:
-    """Get Qwen model status. Public interface."""
-    return qwen_manager.check_status()
+# Global residency scheduler instance
+residency = ResidencyScheduler()
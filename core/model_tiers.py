@@ -0,0 +1,88 @@
+"""
+Model Tiers - Picks the responder model from the router's decision.
+
+Greetings, chit-chat and action confirmations go to a small "fast" model, while
+reasoning, system summaries and search answers go to a larger "deep" model.
+The models are set in settings "models.tiers"; an empty tier uses the chat
+model, so nothing changes until a tier is configured. A separately configured
+fast tier is pinned in memory (keep_alive -1) so confirmations never wait on a
+model load.
+"""
+
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from config import RESPONDER_MODEL, RESPONSE_TIER_FUNCTIONS, PINNED_KEEP_ALIVE, QWEN_KEEP_ALIVE
+
+FAST = "fast"
+DEEP = "deep"
+TIERS = (FAST, DEEP)
+
+Call = Tuple[str, Dict[str, Any]]
+
+
+def _setting(key: str, default: Any) -> Any:
+    try:
+        from core.settings_store import settings
+        return settings.get(key, default)
+    except Exception:
+        return default  # Settings store unavailable (e.g. no Qt in a subprocess)
+
+
+def tier_for(function_names: Iterable[str]) -> str:
+    """The tier for a set of routed functions (deep if any of them needs it)."""
+    tiers = {RESPONSE_TIER_FUNCTIONS.get(name, FAST) for name in function_names}
+    return DEEP if DEEP in tiers else FAST
+
+
+def model_for_tier(tier: str) -> str:
+    """The model configured for a tier, falling back to the chat model."""
+    return _setting(f"models.tiers.{tier}", "") or _setting("models.chat", RESPONDER_MODEL)
+
+
+def select_responder(calls: List[Call]) -> Tuple[str, str]:
+    """(tier, model) for the routed calls."""
+    tier = tier_for(name for name, _ in calls)
+    return tier, model_for_tier(tier)
+
+
+def pinned_model() -> Optional[str]:
+    """The fast tier's model if one is configured; it stays resident."""
+    return _setting(f"models.tiers.{FAST}", "") or None
+
+
+def keep_alive_for(model: str) -> Any:
+    """keep_alive to send with requests to model (so a stream can't shorten the pin)."""
+    return PINNED_KEEP_ALIVE if model == pinned_model() else QWEN_KEEP_ALIVE
+
+
+def pin_fast_tier() -> bool:
+    """Pin the fast tier in the residency scheduler and make sure it is loaded."""
+    from core.model_persistence import residency, PRIORITY_RESPONDER
+
+    model = pinned_model()
+    residency.set_pinned([model] if model else [])
+    if model is None:
+        return False
+    return residency.ensure_loaded(model, PRIORITY_RESPONDER)
+
+
+def warm_model(model: str) -> bool:
+    """
+    Make model ready to answer through the residency scheduler, which evicts
+    other models as needed to stay within the memory budget (never the pinned
+    fast tier). Returns False if the model could not be loaded.
+    """
+    from core.model_persistence import residency, PRIORITY_RESPONDER
+
+    if model == pinned_model():
+        return pin_fast_tier()
+    pinned = pinned_model()
+    residency.set_pinned([pinned] if pinned else [])
+    return residency.ensure_loaded(model, PRIORITY_RESPONDER)
+
+
+def mark_model_used(model: str):
+    """Reset the model's idle time in the residency scheduler."""
+    from core.model_persistence import residency
+
+    residency.touch(model)
@@ -0,0 +1,65 @@
+"""
+Multi-intent helpers - Split compound commands and merge the routed calls.
+
+"Turn off the kitchen lights and set a timer for 20 minutes" is split into one
+clause per command so each can be routed (and executed) independently. This
+module is torch-free so the GUI process can use it alongside the router client.
+"""
+
+import re
+from typing import Any, Dict, List, Tuple
+
+Call = Tuple[str, Dict[str, Any]]
+
+PASSTHROUGH_FUNCTIONS = {"thinking", "nonthinking"}
+
+# A conjunction only splits the prompt when the next clause starts with an action
+# verb that maps to a tool, so "search for salt and pepper shakers" and "add task
+# buy milk and set up the printer" stay one clause. Questions ("and what time do
+# they close") are not commands and never start a clause. Regex fragments.
+COMMAND_STARTERS = (
+    r"turn", r"switch", r"dim", r"brighten", r"set (?:a|an|my|the lights?)", r"create", r"add",
+    r"schedule", r"remind", r"wake", r"search", r"look up", r"google",
+)
+
+_SPLIT_PATTERN = re.compile(
+    r"\s*(?:,\s*(?:and\s+)?(?:then\s+)?|;\s*|\s+and\s+(?:then\s+|also\s+)?|\s+then\s+|\s+also\s+)"
+    r"(?=(?:please\s+)?(?:" + "|".join(COMMAND_STARTERS) + r")\b)",
+    re.IGNORECASE,
+)
+
+
+def split_compound_prompt(text: str) -> List[str]:
+    """Split a compound command into clauses. Returns [text] if it isn't compound."""
+    clauses = [c.strip(" ,.;") for c in _SPLIT_PATTERN.split(text.strip())]
+    clauses = [c for c in clauses if c]
+    return clauses if len(clauses) > 1 else [text]
+
+
+def drops_clause(calls: List[Call]) -> bool:
+    """
+    True if merging per-clause routes would lose part of the request: a clause
+    routed to passthrough next to actions. Route the whole prompt instead.
+    """
+    names = {func_name for func_name, _ in calls}
+    return bool(names & PASSTHROUGH_FUNCTIONS) and bool(names - PASSTHROUGH_FUNCTIONS)
+
+
+def merge_calls(calls: List[Call], user_prompt: str) -> List[Call]:
+    """
+    Combine per-clause routes into the final call list.
+    Duplicates are dropped, and passthrough calls only survive when nothing else was
+    routed (the responder sees the whole prompt anyway). Per-clause routes should be
+    checked with drops_clause() first.
+    """
+    merged: List[Call] = []
+    for func_name, params in calls:
+        if (func_name, params) not in merged:
+            merged.append((func_name, params))
+
+    actions = [call for call in merged if call[0] not in PASSTHROUGH_FUNCTIONS]
+    if actions:
+        return actions
+
+    func_name = "thinking" if any(call[0] == "thinking" for call in merged) else "nonthinking"
+    return [(func_name, {"prompt": user_prompt})]
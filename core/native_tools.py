@@ -0,0 +1,74 @@
+"""
+Native Tools - Single-hop pipeline where the responder calls the tools itself.
+
+Instead of FunctionGemma picking a function and Qwen answering afterwards, the
+responder gets the router's tool schemas on /api/chat, requests tool calls in
+its own stream, and answers from the tool results in the same conversation.
+No router model is involved on this path. Selected with settings "pipeline.mode".
+"""
+
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from config import NATIVE_TOOLS_MAX_ROUNDS
+from core.ollama_client import ollama, ContentChunk, DoneStats, StreamEvent, ToolCallChunk
+from core.router_tools import TOOL_FUNCTIONS, function_schema
+
+Call = Tuple[str, Dict[str, Any]]
+
+# Passthrough "functions" are the responder answering directly, so they aren't tools
+PASSTHROUGH_FUNCTIONS = {"thinking", "nonthinking"}
+
+
+def native_tools() -> List[Dict[str, Any]]:
+    """Ollama tool definitions for the router's functions (without the passthrough ones)."""
+    tools = []
+    for fn in TOOL_FUNCTIONS:
+        if fn.__name__ in PASSTHROUGH_FUNCTIONS:
+            continue
+        schema = function_schema(fn)
+        schema["function"].pop("return", None)
+        tools.append(schema)
+    return tools
+
+
+NATIVE_TOOLS = native_tools()
+
+
+def run_native(model: str, messages: List[Dict[str, Any]], execute: Callable[[List[Call]], List[str]],
+               think: bool = False, keep_alive: Any = None, stop_event=None,
+               tools: Optional[List[Dict[str, Any]]] = None,
+               max_rounds: int = NATIVE_TOOLS_MAX_ROUNDS) -> Iterator[StreamEvent]:
+    """
+    Stream the responder's reply to messages, running the tools it calls in between.
+
+    execute(calls) runs [(name, arguments), ...] and returns one tool message per
+    call. The assistant's tool-call turn and the tool results are appended to
+    messages, so the follow-up round (and later turns) see them. Yields every
+    stream event, including one ToolCallChunk and one DoneStats per round.
+    """
+    tools = NATIVE_TOOLS if tools is None else tools
+    for round_index in range(max_rounds + 1):
+        calls: List[Call] = []
+        content = ""
+        # The last round gets no tools, so the model has to answer
+        round_tools = tools if round_index < max_rounds else None
+        for event in ollama.chat_stream(model, messages, think=think, keep_alive=keep_alive,
+                                        stop_event=stop_event, tools=round_tools):
+            if isinstance(event, ToolCallChunk):
+                calls.extend(event.calls)
+            elif isinstance(event, ContentChunk):
+                content += event.text
+            yield event
+            if isinstance(event, DoneStats) and event.cancelled:
+                return
+
+        if not calls or (stop_event is not None and stop_event.is_set()):
+            return
+
+        messages.append({
+            "role": "assistant",
+            "content": content,
+            "tool_calls": [{"function": {"name": name, "arguments": args}} for name, args in calls],
+        })
+        for (name, _), result in zip(calls, execute(calls)):
+            messages.append({"role": "tool", "content": result, "tool_name": name})
@@ -1,8 +1,8 @@
 import json
-import requests
 import datetime
 from duckduckgo_search import DDGS
-from config import OLLAMA_URL, RESPONDER_MODEL
+from config import RESPONDER_MODEL
+from core.ollama_client import ollama
 
 class NewsManager:
     """Manages fetching and curating news for the Briefing dashboard."""
@@ -122,19 +122,15 @@ Do NOT add any markdown or text. Just the JSON array.
 """
         
         try:
-            response = requests.post(
-                f"{OLLAMA_URL}/chat",
-                json={
-                    "model": RESPONDER_MODEL,
-                    "messages": [{"role": "user", "content": prompt}],
-                    "stream": False,
-                    "options": {"temperature": 0.3}
-                },
+            response = ollama.chat(
+                RESPONDER_MODEL,
+                [{"role": "user", "content": prompt}],
+                options={"temperature": 0.3},
                 timeout=60
             )
             
-            if response.status_code == 200:
-                content = response.json()['message']['content']
+            if response.get('message'):
+                content = response['message']['content']
                 # Try to clean markdown code blocks if present
                 if "```json" in content:
                     content = content.split("```json")[1].split("```")[0].strip()
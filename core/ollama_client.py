@@ -0,0 +1,347 @@
+"""
+Ollama Client - One pooled HTTP client for every Ollama request.
+
+Chat, voice, the web agent, news curation and the model managers all talk to
+Ollama through the `ollama` singleton, so there is a single connection pool and
+one place to tune timeouts and keep-alive. The async methods open a client per
+call instead: an httpx.AsyncClient is bound to the event loop it was first used
+on, and each asyncio.run() brings a new loop.
+
+Streaming /api/chat responses are decoded incrementally from the NDJSON byte
+stream into typed events (ThinkingChunk, ContentChunk, DoneStats). Streams are
+pull-based: nothing more is read from the socket until the consumer asks for
+the next event, so a slow consumer (e.g. TTS) applies backpressure instead of
+buffering. Setting the stop_event closes the response, which also stops
+generation in Ollama.
+"""
+
+import json
+import threading
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+import httpx
+
+from config import (
+    OLLAMA_URL, OLLAMA_CONNECT_TIMEOUT, OLLAMA_READ_TIMEOUT, OLLAMA_STREAM_READ_TIMEOUT,
+    OLLAMA_MAX_CONNECTIONS, OLLAMA_KEEPALIVE_EXPIRY
+)
+
+
+class OllamaError(Exception):
+    """Ollama returned an error status or an error message in the stream."""
+
+
+@dataclass
+class ThinkingChunk:
+    """Part of the model's reasoning (think=True)."""
+    text: str
+
+
+@dataclass
+class ContentChunk:
+    """Part of the model's answer."""
+    text: str
+
+
+@dataclass
+class ToolCallChunk:
+    """Tool calls requested by the model (chat with tools)."""
+    calls: List[Tuple[str, Dict[str, Any]]]
+
+
+@dataclass
+class DoneStats:
+    """Final stream event with Ollama's timing counters (durations in nanoseconds)."""
+    model: str = ""
+    done_reason: str = ""
+    total_duration: int = 0
+    load_duration: int = 0
+    prompt_eval_count: int = 0
+    prompt_eval_duration: int = 0
+    eval_count: int = 0
+    eval_duration: int = 0
+    cancelled: bool = False
+
+    @classmethod
+    def from_chunk(cls, chunk: Dict[str, Any]) -> "DoneStats":
+        return cls(
+            model=chunk.get("model", ""),
+            done_reason=chunk.get("done_reason", ""),
+            total_duration=chunk.get("total_duration", 0),
+            load_duration=chunk.get("load_duration", 0),
+            prompt_eval_count=chunk.get("prompt_eval_count", 0),
+            prompt_eval_duration=chunk.get("prompt_eval_duration", 0),
+            eval_count=chunk.get("eval_count", 0),
+            eval_duration=chunk.get("eval_duration", 0),
+        )
+
+    @property
+    def tokens_per_second(self) -> float:
+        return self.eval_count / (self.eval_duration / 1e9) if self.eval_duration else 0.0
+
+
+StreamEvent = Union[ThinkingChunk, ContentChunk, ToolCallChunk, DoneStats]
+
+
+class NDJSONDecoder:
+    """Incremental newline-delimited JSON decoder. Malformed lines are skipped."""
+
+    def __init__(self):
+        self._buffer = b""
+
+    def feed(self, data: bytes) -> List[Dict[str, Any]]:
+        """Add bytes and return the objects completed by them."""
+        self._buffer += data
+        *lines, self._buffer = self._buffer.split(b"\n")
+        return [obj for obj in map(self._decode, lines) if obj is not None]
+
+    def flush(self) -> List[Dict[str, Any]]:
+        """Decode whatever is left once the stream has ended."""
+        rest, self._buffer = self._buffer, b""
+        obj = self._decode(rest)
+        return [obj] if obj is not None else []
+
+    @staticmethod
+    def _decode(line: bytes) -> Optional[Dict[str, Any]]:
+        line = line.strip()
+        if not line:
+            return None
+        try:
+            return json.loads(line)
+        except ValueError:
+            return None
+
+
+def _events(chunk: Dict[str, Any]) -> Iterator[StreamEvent]:
+    """Typed events for one decoded /api/chat (or /api/generate) chunk."""
+    if chunk.get("error"):
+        raise OllamaError(chunk["error"])
+    msg = chunk.get("message", {})
+    if msg.get("thinking"):
+        yield ThinkingChunk(msg["thinking"])
+    content = msg.get("content") or chunk.get("response")
+    if content:
+        yield ContentChunk(content)
+    if msg.get("tool_calls"):
+        yield ToolCallChunk([
+            (call["function"]["name"], call["function"].get("arguments") or {})
+            for call in msg["tool_calls"]
+        ])
+    if chunk.get("done"):
+        yield DoneStats.from_chunk(chunk)
+
+
+def _base_url() -> str:
+    """Ollama server URL from the settings store ("ollama_url"), falling back to config."""
+    url = OLLAMA_URL
+    try:
+        from core.settings_store import settings
+        url = settings.get("ollama_url", url)
+    except Exception:
+        pass  # Settings store unavailable (e.g. no Qt in a subprocess)
+    url = url.rstrip("/")
+    return url[:-len("/api")] if url.endswith("/api") else url
+
+
+class OllamaClient:
+    """Pooled sync client (and per-call async clients) for the Ollama REST API."""
+
+    def __init__(self, base_url: Optional[str] = None, transport: Optional[httpx.BaseTransport] = None,
+                 async_transport: Optional[httpx.AsyncBaseTransport] = None):
+        self.base_url = base_url
+        self._transport = transport
+        self._async_transport = async_transport
+        self._timeout = httpx.Timeout(OLLAMA_READ_TIMEOUT, connect=OLLAMA_CONNECT_TIMEOUT)
+        self._stream_timeout = httpx.Timeout(OLLAMA_STREAM_READ_TIMEOUT, connect=OLLAMA_CONNECT_TIMEOUT)
+        self._limits = httpx.Limits(
+            max_connections=OLLAMA_MAX_CONNECTIONS,
+            max_keepalive_connections=OLLAMA_MAX_CONNECTIONS,
+            keepalive_expiry=OLLAMA_KEEPALIVE_EXPIRY,
+        )
+        self._client: Optional[httpx.Client] = None
+        self._lock = threading.Lock()
+
+    # --- Plumbing ---
+
+    def _url(self, path: str, base_url: Optional[str] = None) -> str:
+        return f"{(base_url or self.base_url or _base_url()).rstrip('/')}/api/{path}"
+
+    @property
+    def client(self) -> httpx.Client:
+        with self._lock:
+            if self._client is None:
+                self._client = httpx.Client(timeout=self._timeout, limits=self._limits, transport=self._transport)
+            return self._client
+
+    @asynccontextmanager
+    async def _async_client(self) -> AsyncIterator[httpx.AsyncClient]:
+        """An async client for one call, closed on the loop that used it."""
+        async with httpx.AsyncClient(timeout=self._timeout, limits=self._limits,
+                                     transport=self._async_transport) as client:
+            yield client
+
+    @staticmethod
+    def _check(response: httpx.Response):
+        if response.is_error:
+            response.read()
+            raise OllamaError(f"{response.status_code} from {response.url}: {response.text[:200]}")
+
+    @staticmethod
+    def _chat_payload(model: str, messages: List[Dict[str, Any]], stream: bool, think: Optional[bool],
+                      options: Optional[Dict[str, Any]], keep_alive: Any, format: Any,
+                      tools: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
+        payload = {"model": model, "messages": messages, "stream": stream}
+        if tools:
+            payload["tools"] = tools
+        if think is not None:
+            payload["think"] = think
+        if options:
+            payload["options"] = options
+        if keep_alive is not None:
+            payload["keep_alive"] = keep_alive
+        if format is not None:
+            payload["format"] = format
+        return payload
+
+    # --- Sync face ---
+
+    def chat_stream(self, model: str, messages: List[Dict[str, Any]], think: Optional[bool] = None,
+                    options: Optional[Dict[str, Any]] = None, keep_alive: Any = None,
+                    stop_event: Optional[threading.Event] = None,
+                    base_url: Optional[str] = None,
+                    tools: Optional[List[Dict[str, Any]]] = None) -> Iterator[StreamEvent]:
+        """
+        Stream a chat completion as typed events.
+        Ends with DoneStats; if stop_event is set it ends early with DoneStats(cancelled=True).
+        With tools, requested calls arrive as ToolCallChunk events.
+        """
+        payload = self._chat_payload(model, messages, True, think, options, keep_alive, None, tools)
+        with self.client.stream("POST", self._url("chat", base_url), json=payload,
+                                timeout=self._stream_timeout) as response:
+            self._check(response)
+            yield from self._decode_stream(response.iter_bytes(), stop_event)
+
+    def _decode_stream(self, byte_chunks: Iterable[bytes],
+                       stop_event: Optional[threading.Event]) -> Iterator[StreamEvent]:
+        decoder = NDJSONDecoder()
+        for data in byte_chunks:
+            for chunk in decoder.feed(data):
+                if stop_event is not None and stop_event.is_set():
+                    yield DoneStats(cancelled=True)
+                    return
+                for event in _events(chunk):
+                    yield event
+                    if isinstance(event, DoneStats):
+                        return
+        for chunk in decoder.flush():
+            yield from _events(chunk)
+
+    def chat(self, model: str, messages: List[Dict[str, Any]], think: Optional[bool] = None,
+             options: Optional[Dict[str, Any]] = None, keep_alive: Any = None, format: Any = None,
+             timeout: Optional[float] = None, base_url: Optional[str] = None) -> Dict[str, Any]:
+        """Non-streaming chat completion. Returns Ollama's response object."""
+        payload = self._chat_payload(model, messages, False, think, options, keep_alive, format)
+        response = self.client.post(self._url("chat", base_url), json=payload, timeout=timeout or self._timeout)
+        self._check(response)
+        return response.json()
+
+    def generate(self, model: str, prompt: str = "", options: Optional[Dict[str, Any]] = None,
+                 keep_alive: Any = None, timeout: Optional[float] = None) -> Dict[str, Any]:
+        """Non-streaming /api/generate (also used to load and unload models)."""
+        payload = {"model": model, "prompt": prompt, "stream": False}
+        if options:
+            payload["options"] = options
+        if keep_alive is not None:
+            payload["keep_alive"] = keep_alive
+        response = self.client.post(self._url("generate"), json=payload, timeout=timeout or self._timeout)
+        self._check(response)
+        return response.json()
+
+    def embed(self, model: str, inputs: List[str], keep_alive: Any = None,
+              timeout: Optional[float] = None) -> List[List[float]]:
+        """Embedding vectors for each input (/api/embed)."""
+        payload = {"model": model, "input": inputs}
+        if keep_alive is not None:
+            payload["keep_alive"] = keep_alive
+        response = self.client.post(self._url("embed"), json=payload, timeout=timeout or self._timeout)
+        self._check(response)
+        return response.json().get("embeddings", [])
+
+    def load(self, model: str, keep_alive: Any = None, timeout: float = 120) -> Dict[str, Any]:
+        """Load a model into memory by generating a single token."""
+        return self.generate(model, "hi", options={"num_predict": 1}, keep_alive=keep_alive, timeout=timeout)
+
+    def unload(self, model: str, timeout: float = 5) -> Dict[str, Any]:
+        """Unload a model immediately (keep_alive=0)."""
+        return self.generate(model, keep_alive=0, timeout=timeout)
+
+    def ps(self, timeout: float = 2) -> List[Dict[str, Any]]:
+        """Models currently loaded in Ollama (/api/ps)."""
+        response = self.client.get(self._url("ps"), timeout=timeout)
+        self._check(response)
+        return response.json().get("models", [])
+
+    def tags(self, timeout: float = 5, base_url: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Models available locally (/api/tags), with their size on disk."""
+        response = self.client.get(self._url("tags", base_url), timeout=timeout)
+        self._check(response)
+        return response.json().get("models", [])
+
+    def running_models(self, timeout: float = 2) -> List[str]:
+        """Names of the loaded models; empty if Ollama is unreachable."""
+        try:
+            return [m.get("name", "") for m in self.ps(timeout)]
+        except Exception:
+            return []
+
+    # --- Async face ---
+
+    async def achat_stream(self, model: str, messages: List[Dict[str, Any]], think: Optional[bool] = None,
+                           options: Optional[Dict[str, Any]] = None, keep_alive: Any = None,
+                           stop_event: Optional[threading.Event] = None,
+                           base_url: Optional[str] = None) -> AsyncIterator[StreamEvent]:
+        """Async version of chat_stream. Cancelling the consuming task also closes the stream."""
+        payload = self._chat_payload(model, messages, True, think, options, keep_alive, None)
+        async with self._async_client() as client, client.stream(
+                "POST", self._url("chat", base_url), json=payload, timeout=self._stream_timeout) as response:
+            if response.is_error:
+                await response.aread()
+                self._check(response)
+            decoder = NDJSONDecoder()
+            async for data in response.aiter_bytes():
+                for chunk in decoder.feed(data):
+                    if stop_event is not None and stop_event.is_set():
+                        yield DoneStats(cancelled=True)
+                        return
+                    for event in _events(chunk):
+                        yield event
+                        if isinstance(event, DoneStats):
+                            return
+            for chunk in decoder.flush():
+                for event in _events(chunk):
+                    yield event
+
+    async def achat(self, model: str, messages: List[Dict[str, Any]], think: Optional[bool] = None,
+                    options: Optional[Dict[str, Any]] = None, keep_alive: Any = None, format: Any = None,
+                    timeout: Optional[float] = None, base_url: Optional[str] = None) -> Dict[str, Any]:
+        """Async version of chat."""
+        payload = self._chat_payload(model, messages, False, think, options, keep_alive, format)
+        async with self._async_client() as client:
+            response = await client.post(self._url("chat", base_url), json=payload,
+                                         timeout=timeout or self._timeout)
+        if response.is_error:
+            self._check(response)
+        return response.json()
+
+    def close(self):
+        """Close the sync pool (async clients are closed after each call)."""
+        with self._lock:
+            if self._client is not None:
+                self._client.close()
+                self._client = None
+
+
+# Global client instance
+ollama = OllamaClient()
@@ -0,0 +1,179 @@
+"""
+Ollama Status - One shared, cached view of the models loaded in Ollama (/api/ps).
+
+The residency scheduler, the model manager and the system monitor all read
+loaded models from here instead of calling /api/ps themselves. Reads within
+the TTL are served from the cache, and concurrent readers share one request.
+While anyone is subscribed, a single poller thread refreshes the view and
+notifies subscribers when the set of loaded models changes. It polls quickly
+while a generation is active, slowly while idle, and not at all while paused
+(e.g. the window is hidden).
+"""
+
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Set
+
+from config import (
+    OLLAMA_STATUS_TTL, OLLAMA_STATUS_ACTIVE_INTERVAL, OLLAMA_STATUS_IDLE_INTERVAL, GRAY, RESET
+)
+from core.ollama_client import ollama
+
+# Loaded models as reported by /api/ps, or None while Ollama is unreachable
+Models = Optional[List[Dict[str, Any]]]
+
+
+def _signature(models: Models):
+    """What counts as a change: which models are loaded and how big they are."""
+    if models is None:
+        return None
+    return tuple(sorted((m.get("name", ""), m.get("size", 0), m.get("size_vram", 0)) for m in models))
+
+
+class OllamaStatus:
+    """Cached /api/ps with change notifications and adaptive polling."""
+
+    def __init__(self, client=None, ttl: float = OLLAMA_STATUS_TTL,
+                 active_interval: float = OLLAMA_STATUS_ACTIVE_INTERVAL,
+                 idle_interval: float = OLLAMA_STATUS_IDLE_INTERVAL):
+        self.client = client or ollama
+        self.ttl = ttl
+        self.active_interval = active_interval
+        self.idle_interval = idle_interval
+
+        self._models: Models = None
+        self._fetched_at = 0.0
+        self._fetch_lock = threading.Lock()  # One /api/ps request at a time
+        self._lock = threading.Lock()
+        self._wake = threading.Condition(self._lock)
+        self._subscribers: List[Callable[[Models], None]] = []
+        self._active: Set[str] = set()
+        self._paused = False
+        self._poller: Optional[threading.Thread] = None
+        self.fetches = 0
+
+    # --- Reading ---
+
+    def models(self, max_age: Optional[float] = None) -> Models:
+        """Loaded models, fetched only if the cached view is older than max_age (default: the TTL)."""
+        max_age = self.ttl if max_age is None else max_age
+        with self._lock:
+            if self._fetched_at and time.monotonic() - self._fetched_at <= max_age:
+                return self._models
+        with self._fetch_lock:
+            # Another thread may have fetched while we waited
+            with self._lock:
+                if self._fetched_at and time.monotonic() - self._fetched_at <= max_age:
+                    return self._models
+            return self._fetch()
+
+    def running_models(self, max_age: Optional[float] = None) -> List[str]:
+        """Names of the loaded models; empty if Ollama is unreachable."""
+        return [m.get("name", "") for m in self.models(max_age) or []]
+
+    def refresh(self) -> Models:
+        """Fetch now, ignoring the cache."""
+        return self.models(max_age=0)
+
+    def invalidate(self):
+        """Drop the cached view (e.g. after a load or unload) and wake the poller."""
+        with self._wake:
+            self._fetched_at = 0.0
+            self._wake.notify()
+
+    def _fetch(self) -> Models:
+        try:
+            models = self.client.ps(timeout=2)
+        except Exception:
+            models = None
+        with self._lock:
+            changed = self.fetches == 0 or _signature(models) != _signature(self._models)
+            self._models = models
+            self._fetched_at = time.monotonic()
+            self.fetches += 1
+            subscribers = list(self._subscribers) if changed else []
+        for callback in subscribers:
+            try:
+                callback(models)
+            except Exception as e:
+                print(f"{GRAY}[OllamaStatus] Subscriber error: {e}{RESET}")
+        return models
+
+    # --- Subscriptions and polling ---
+
+    def subscribe(self, callback: Callable[[Models], None]) -> Callable[[], None]:
+        """
+        Call callback(models) whenever the loaded models change (models is None while
+        Ollama is offline). Starts the poller, and replays the cached view if there
+        is one. Returns a function that unsubscribes.
+        """
+        with self._wake:
+            self._subscribers.append(callback)
+            cached = self.fetches > 0
+            models = self._models
+            if self._poller is None or not self._poller.is_alive():
+                self._poller = threading.Thread(target=self._poll_loop, name="OllamaStatus", daemon=True)
+                self._poller.start()
+            self._wake.notify()
+        if cached:
+            callback(models)
+
+        def unsubscribe():
+            with self._lock:
+                if callback in self._subscribers:
+                    self._subscribers.remove(callback)
+        return unsubscribe
+
+    def set_active(self, source: str, active: bool):
+        """Mark a generation as running (fast polling) or finished; source is e.g. "chat"."""
+        with self._wake:
+            if active:
+                self._active.add(source)
+            else:
+                self._active.discard(source)
+            self._wake.notify()
+
+    def is_active(self) -> bool:
+        """Whether a generation is running (background work can wait for it)."""
+        with self._lock:
+            return bool(self._active)
+
+    def set_paused(self, paused: bool):
+        """Stop polling while nothing shows the status (e.g. the window is hidden)."""
+        with self._wake:
+            self._paused = paused
+            self._wake.notify()
+
+    def poll_interval(self) -> Optional[float]:
+        """Seconds until the next poll, or None while paused."""
+        with self._lock:
+            if self._paused:
+                return None
+            return self.active_interval if self._active else self.idle_interval
+
+    def _poll_loop(self):
+        while True:
+            with self._wake:
+                if not self._subscribers:
+                    self._poller = None
+                    return
+                interval = self.active_interval if self._active else self.idle_interval
+                due = self._fetched_at + interval - time.monotonic() if self._fetched_at else 0
+                if self._paused or due > 0:
+                    self._wake.wait(None if self._paused else due)
+                    continue
+            with self._fetch_lock:
+                self._fetch()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "fetches": self.fetches,
+                "subscribers": len(self._subscribers),
+                "active": sorted(self._active),
+                "paused": self._paused,
+            }
+
+
+# Global status instance
+ollama_status = OllamaStatus()
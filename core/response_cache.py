@@ -0,0 +1,173 @@
+"""
+Response Cache - Persistent SQLite cache of nonthinking answers.
+
+Factual one-off prompts ("what's the capital of France") get the same answer
+every time, so the responder's text is stored keyed on the model, the
+normalized prompt and a hash of the system prompt. It is only used when the
+earlier conversation can't change the answer, and the cached text is replayed
+as ContentChunk events so chat and TTS handle it exactly like a live stream.
+Opt-in via settings "general.response_cache".
+"""
+
+import hashlib
+import re
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+from config import RESPONSE_CACHE_PATH, RESPONSE_CACHE_TTL, RESPONSE_CACHE_MAX_ENTRIES, WAKE_WORD
+from core.ollama_client import ContentChunk
+from core.route_cache import is_time_relative, normalize_prompt
+
+# Follow-up wording that makes the answer depend on the earlier conversation
+CONTEXT_REFERENCE_PATTERN = re.compile(
+    r"\b(it|its|that|this|these|those|they|them|their|he|him|his|she|her|"
+    r"again|more|also|else|another|previous|above|earlier|before|last|same|"
+    r"instead|why|continue|elaborate|explain)\b",
+    re.IGNORECASE,
+)
+
+
+def is_cacheable(prompt: str, messages: List[Dict[str, Any]]) -> bool:
+    """
+    True if prompt's answer can come from the cache: it doesn't depend on the time,
+    and either there is no earlier conversation or the prompt doesn't refer to it.
+    messages is the history including the new user turn.
+    """
+    if is_time_relative(prompt):
+        return False
+    earlier_turns = [m for m in messages[:-1] if m.get("role") in ("user", "assistant")]
+    return not earlier_turns or CONTEXT_REFERENCE_PATTERN.search(prompt) is None
+
+
+def replay(text: str) -> Iterator[ContentChunk]:
+    """Cached text as a stream of word-sized ContentChunk events."""
+    for piece in re.findall(r"\s*\S+\s*", text):
+        yield ContentChunk(piece)
+
+
+class ResponseCache:
+    """SQLite-backed response cache with TTL and size (least recently used) eviction."""
+
+    def __init__(self, db_path: str = RESPONSE_CACHE_PATH, ttl_seconds: float = RESPONSE_CACHE_TTL,
+                 max_entries: int = RESPONSE_CACHE_MAX_ENTRIES, wake_word: Optional[str] = WAKE_WORD):
+        self.db_path = db_path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.wake_word = wake_word
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+        self._init_db()
+
+    def _init_db(self):
+        conn = sqlite3.connect(self.db_path)
+        try:
+            conn.execute('''
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                model TEXT,
+                prompt TEXT,
+                response TEXT,
+                created_at REAL,
+                last_used REAL,
+                hits INTEGER DEFAULT 0
+            )
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_responses_last_used ON responses(last_used)')
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _key(self, model: str, prompt: str, system_prompt: str) -> Optional[str]:
+        normalized = normalize_prompt(prompt, self.wake_word)
+        if not normalized:
+            return None
+        system_hash = hashlib.sha256(system_prompt.encode("utf-8")).hexdigest()
+        return hashlib.sha256(f"{model}\0{normalized}\0{system_hash}".encode("utf-8")).hexdigest()
+
+    def get(self, model: str, prompt: str, system_prompt: str) -> Optional[str]:
+        """Return the cached response, or None if missing or expired."""
+        key = self._key(model, prompt, system_prompt)
+        if key is None:
+            return None
+
+        now = time.time()
+        with self._lock:
+            conn = sqlite3.connect(self.db_path)
+            try:
+                row = conn.execute(
+                    'SELECT response, created_at FROM responses WHERE key = ?', (key,)
+                ).fetchone()
+                if row is None or (self.ttl_seconds and now - row[1] > self.ttl_seconds):
+                    if row is not None:
+                        conn.execute('DELETE FROM responses WHERE key = ?', (key,))
+                        conn.commit()
+                    self.misses += 1
+                    return None
+                conn.execute('UPDATE responses SET last_used = ?, hits = hits + 1 WHERE key = ?', (now, key))
+                conn.commit()
+                self.hits += 1
+                return row[0]
+            finally:
+                conn.close()
+
+    def put(self, model: str, prompt: str, system_prompt: str, response: str):
+        """Store a response and evict expired / least recently used entries."""
+        key = self._key(model, prompt, system_prompt)
+        if key is None or not response.strip():
+            return
+
+        now = time.time()
+        with self._lock:
+            conn = sqlite3.connect(self.db_path)
+            try:
+                conn.execute(
+                    'INSERT OR REPLACE INTO responses (key, model, prompt, response, created_at, last_used, hits) '
+                    'VALUES (?, ?, ?, ?, ?, ?, 0)',
+                    (key, model, prompt, response, now, now)
+                )
+                if self.ttl_seconds:
+                    conn.execute('DELETE FROM responses WHERE created_at < ?', (now - self.ttl_seconds,))
+                conn.execute(
+                    'DELETE FROM responses WHERE key NOT IN '
+                    '(SELECT key FROM responses ORDER BY last_used DESC LIMIT ?)',
+                    (self.max_entries,)
+                )
+                conn.commit()
+            finally:
+                conn.close()
+
+    def clear(self):
+        """Drop all cached responses."""
+        with self._lock:
+            conn = sqlite3.connect(self.db_path)
+            try:
+                conn.execute('DELETE FROM responses')
+                conn.commit()
+            finally:
+                conn.close()
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and the number of stored responses."""
+        with self._lock:
+            conn = sqlite3.connect(self.db_path)
+            try:
+                size = conn.execute('SELECT COUNT(*) FROM responses').fetchone()[0]
+            finally:
+                conn.close()
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "size": size,
+                "max_entries": self.max_entries,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+# Global response cache instance
+response_cache = ResponseCache()
@@ -0,0 +1,141 @@
+"""
+Route Result Cache - LRU cache of router decisions keyed on a normalized prompt.
+
+Voice and chat users repeat the same commands all day ("turn off the lights",
+"what's on my calendar"), so identical requests skip router inference entirely.
+"""
+
+import copy
+import re
+import string
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+# Prompts whose arguments depend on when they are asked are never cached
+TIME_RELATIVE_PATTERN = re.compile(
+    r"\b("
+    r"now|today|tonight|tomorrow|yesterday|later|soon|"
+    r"this (morning|afternoon|evening|week|weekend|month|year)|"
+    r"next (week|weekend|month|year|monday|tuesday|wednesday|thursday|friday|saturday|sunday)|"
+    r"monday|tuesday|wednesday|thursday|friday|saturday|sunday|"
+    r"in (an?|\d+) (second|minute|hour|day|week|month)s?|"
+    r"(second|minute|hour|day|week)s? from now"
+    r")\b",
+    re.IGNORECASE,
+)
+
+# Argument keys that carry the raw user text and must reflect the current input
+PROMPT_ARG_KEYS = ("prompt",)
+
+_PUNCT_TABLE = str.maketrans({c: " " for c in string.punctuation})
+
+
+def normalize_prompt(text: str, wake_word: Optional[str] = None) -> str:
+    """Lowercase, strip punctuation, collapse whitespace and drop the wake word."""
+    text = text.lower().translate(_PUNCT_TABLE)
+    words = text.split()
+    if wake_word:
+        wake = wake_word.lower()
+        words = [w for w in words if w != wake]
+    return " ".join(words)
+
+
+def is_time_relative(text: str) -> bool:
+    """Return True if the prompt contains time-relative wording."""
+    return TIME_RELATIVE_PATTERN.search(text) is not None
+
+
+class RouteCache:
+    """
+    Thread-safe LRU cache of (func_name, params) router results with a TTL.
+    Counts hits, misses, evictions and expirations for the system monitor.
+    """
+
+    def __init__(self, max_size: int = 256, ttl_seconds: float = 3600,
+                 wake_word: Optional[str] = None, enabled: bool = True):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.wake_word = wake_word
+        self.enabled = enabled
+        self._entries: "OrderedDict[str, Tuple[float, str, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.bypassed = 0
+
+    def _key(self, user_input: str) -> Optional[str]:
+        """Cache key for a prompt, or None if the prompt must bypass the cache."""
+        if not self.enabled or self.max_size <= 0:
+            return None
+        if is_time_relative(user_input):
+            return None
+        key = normalize_prompt(user_input, self.wake_word)
+        return key or None
+
+    def get(self, user_input: str) -> Optional[Tuple[str, Dict[str, Any]]]:
+        """Return a cached (func_name, params) for the prompt, or None."""
+        key = self._key(user_input)
+        if key is None:
+            if self.enabled:
+                with self._lock:
+                    self.bypassed += 1
+            return None
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            stored_at, func_name, params = entry
+            if self.ttl_seconds and time.monotonic() - stored_at > self.ttl_seconds:
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+
+        params = copy.deepcopy(params)
+        for arg in PROMPT_ARG_KEYS:
+            if arg in params:
+                params[arg] = user_input
+        return func_name, params
+
+    def put(self, user_input: str, func_name: str, params: Dict[str, Any]):
+        """Store a router result for the prompt."""
+        key = self._key(user_input)
+        if key is None:
+            return
+
+        with self._lock:
+            self._entries[key] = (time.monotonic(), func_name, copy.deepcopy(params))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        """Drop all cached routes (e.g. after the router model changes)."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Return cache counters."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "bypassed": self.bypassed,
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
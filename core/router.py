@@ -11,9 +11,15 @@ os.environ["TRANSFORMERS_VERBOSITY"] = "error"
 warnings.filterwarnings("ignore", message=".*generation flags are not valid.*")
 
 import torch
-from transformers import AutoTokenizer, AutoModelForCausalLM, logging as transformers_logging
+from transformers import (
+    AutoTokenizer, DynamicCache,
+    LogitsProcessorList, StoppingCriteriaList, logging as transformers_logging
+)
 from transformers.utils import get_json_schema
-from typing import Literal, Tuple, Dict, Any
+from typing import Literal, Tuple, Dict, Any, List, Optional
+import copy
+import hashlib
+import math
 import time
 import re
 import json
@@ -22,150 +28,77 @@ from huggingface_hub import snapshot_download
 # Suppress transformers logging
 transformers_logging.set_verbosity_error()
 
-from config import LOCAL_ROUTER_PATH, HF_ROUTER_REPO
+from config import (
+    LOCAL_ROUTER_PATH, HF_ROUTER_REPO, ROUTER_PREFIX_CACHE,
+    ROUTER_MODE, ROUTER_SCORE_TEMPERATURE, ROUTER_BATCH_SIZE
+)
+from core.multi_intent import drops_clause, merge_calls, split_compound_prompt
+from core.router_backends import KV_REUSE_BACKENDS, get_router_backend, load_router_model
+from core.router_grammar import (
+    FunctionCallGrammar, FunctionCallLogitsProcessor, FunctionCallStoppingCriteria
+)
+from core.router_tools import TOOL_FUNCTIONS
 
 # Debug flag - set to True to see Gemma's raw response
 DEBUG_ROUTER = False
 
 
-# --- Tool Definitions (all 9 functions) ---
+# Pre-compute tool schemas (the 9 functions are defined in core/router_tools.py)
+TOOLS = [get_json_schema(fn) for fn in TOOL_FUNCTIONS]
 
-def control_light(action: str, device_name: str = None, brightness: int = None, color: str = None) -> str:
-    """
-    Control smart lights - turn on, off, dim, or change color.
-    
-    Args:
-        action: Action to perform: on, off, dim, toggle
-        device_name: Name of the light or room
-        brightness: Brightness level 0-100
-        color: Color name or hex code
-    """
-    return "result"
+SYSTEM_MSG = "You are a model that can do function calling with the following functions"
 
-def set_timer(duration: str, label: str = None) -> str:
-    """
-    Set a countdown timer.
-    
-    Args:
-        duration: Duration like '5 minutes' or '1 hour'
-        label: Optional label for the timer
-    """
-    return "result"
+# Stand-in user turn used to locate where the static prompt prefix ends.
+# A private-use codepoint never appears in real prompts.
+_PROMPT_MARKER = "\ue000"
 
-def set_alarm(time: str, label: str = None) -> str:
-    """
-    Set an alarm for a specific time.
-    
-    Args:
-        time: Time for alarm like '7am' or '14:30'
-        label: Optional label
-    """
-    return "result"
+# All valid function names
+VALID_FUNCTIONS = {
+    "control_light", "set_timer", "set_alarm", "create_calendar_event",
+    "add_task", "web_search", "get_system_info", "thinking", "nonthinking"
+}
 
-def create_calendar_event(title: str, date: str = None, time: str = None, duration: int = None) -> str:
-    """
-    Create a calendar event.
-    
-    Args:
-        title: Event title
-        date: Date like 'tomorrow' or '2024-01-15'
-        time: Time like '3pm'
-        duration: Duration in minutes
-    """
-    return "result"
+# Functions whose generated arguments are never used (see _extract_arguments)
+NO_ARG_FUNCTIONS = {"get_system_info", "thinking", "nonthinking"}
 
-def add_task(text: str, priority: str = None) -> str:
-    """
-    Add a task to the to-do list.
-    
-    Args:
-        text: Task description
-        priority: Priority level
-    """
-    return "result"
+# Fallback if the chat template can't tell us how a call starts
+DEFAULT_CALL_PREFIX = "<start_function_call>call:"
 
-def web_search(query: str) -> str:
-    """
-    Search the web for information using DuckDuckGo.
-    Returns up to 5 search results including titles, snippets, and URLs.
-    
-    Use this when the user asks to:
-    - Search for information online
-    - Look up current events or news
-    - Find facts, definitions, or explanations
-    - Research a topic
-    
-    Args:
-        query: Search query string (e.g., "Python programming best practices")
-    
-    Returns:
-        Search results with titles, body snippets (200 chars), and URLs
-    """
-    return "result"
+# Scoring mode ignores function names below this probability
+MIN_NAME_PROB = 1e-4
 
-def get_system_info() -> str:
-    """
-    Get comprehensive current system state snapshot.
-    
-    Returns information about:
-    - Current time and date
-    - Active countdown timers (label, remaining time)
-    - Upcoming alarms (time, label)
-    - Today's calendar events (title, time)
-    - Pending tasks from to-do list (text, completion status)
-    - Smart home devices (name, on/off status, type)
-    - Current weather (temperature, condition, high/low)
-    - Recent news headlines (title, category, URL)
-    
-    Use this when the user asks:
-    - "What's on my schedule today?"
-    - "What's my current status?"
-    - "What do I have coming up?"
-    - "Give me a summary of everything"
-    - Questions about their timers, tasks, or calendar
-    """
-    return "result"
-
-def thinking(prompt: str) -> str:
-    """
-    Use for complex queries requiring reasoning, math, coding, or multi-step analysis.
+# Prompts used by the console harness and backend checks
+TEST_PROMPTS = [
+    # Action functions
+    ("Turn on the living room lights", "control_light"),
+    ("Set a timer for 10 minutes", "set_timer"),
+    ("Wake me up at 7am", "set_alarm"),
+    ("Schedule meeting tomorrow at 3pm", "create_calendar_event"),
+    ("Add buy groceries to my list", "add_task"),
+    ("Search for Italian recipes", "web_search"),
     
-    Args:
-        prompt: The user's original prompt
-    """
-    return "result"
-
-def nonthinking(prompt: str) -> str:
-    """
-    Use for simple queries, greetings, factual questions not requiring deep reasoning.
+    # New Smart Home Examples
+    ("Dim the kitchen lights to 50%", "control_light"),
+    ("Make the bedroom lights blue", "control_light"),
+    ("Turn off all the lights", "control_light"),
+    ("Toggle the hallway light", "control_light"),
+    ("Set the thermostat to 72 degrees", "control_light"), # Intentionally testing boundary/potential misclassification
+    ("Brightness up in the study", "control_light"),
+    ("Set movie mode lighting", "control_light"),
     
-    Args:
-        prompt: The user's original prompt
-    """
-    return "result"
-
-
-# Pre-compute tool schemas
-TOOLS = [
-    get_json_schema(control_light),
-    get_json_schema(set_timer),
-    get_json_schema(set_alarm),
-    get_json_schema(create_calendar_event),
-    get_json_schema(add_task),
-    get_json_schema(web_search),
-    get_json_schema(get_system_info),
-    get_json_schema(thinking),
-    get_json_schema(nonthinking),
+    # Context function
+    ("How much time is left on my timer?", "get_system_info"),
+    ("What's on my calendar today?", "get_system_info"),
+    ("Are any lights on?", "get_system_info"),
+    ("Is the front door locked?", "get_system_info"),
+    
+    # Passthrough functions
+    ("Explain quantum computing", "thinking"),
+    ("Write a Python function to sort a list", "thinking"),
+    ("Hello there!", "nonthinking"),
+    ("What's the capital of France?", "nonthinking"),
 ]
 
-SYSTEM_MSG = "You are a model that can do function calling with the following functions"
-
-# All valid function names
-VALID_FUNCTIONS = {
-    "control_light", "set_timer", "set_alarm", "create_calendar_event",
-    "add_task", "web_search", "get_system_info", "thinking", "nonthinking"
-}
-
 
 def ensure_model_available(model_path: str = LOCAL_ROUTER_PATH) -> str:
     """
@@ -202,63 +135,370 @@ def ensure_model_available(model_path: str = LOCAL_ROUTER_PATH) -> str:
 class FunctionGemmaRouter:
     """Routes user prompts to appropriate functions using fine-tuned FunctionGemma."""
     
-    def __init__(self, model_path: str = LOCAL_ROUTER_PATH, compile_model: bool = False):
+    def __init__(self, model_path: str = LOCAL_ROUTER_PATH, compile_model: bool = False,
+                 use_prefix_cache: bool = ROUTER_PREFIX_CACHE, mode: str = ROUTER_MODE,
+                 backend: Optional[str] = None):
         # Ensure model is available (download from HF if needed)
         model_path = ensure_model_available(model_path)
         
+        # "torch", "int8" or "onnx" (see core/router_backends.py)
+        backend = backend or get_router_backend()
         device = "cuda" if torch.cuda.is_available() else "cpu"
-        print(f"Loading FunctionGemma Router on {device.upper()}...")
+        print(f"Loading FunctionGemma Router on {device.upper() if backend == 'torch' else 'CPU'} ({backend})...")
         start = time.time()
         
         self.tokenizer = AutoTokenizer.from_pretrained(model_path)
-        
-        # CPU often doesn't support bfloat16 natively
-        dtype = torch.bfloat16 if device == "cuda" else torch.float32
-        
-        self.model = AutoModelForCausalLM.from_pretrained(
-            model_path,
-            torch_dtype=dtype,
-            device_map=device,
-        )
-        self.model.eval()
-
+        self.tokenizer.padding_side = "left"  # Batched generate() needs left padding
+        self.model, self.backend = load_router_model(model_path, backend, device)
         
         # Compile for speed (PyTorch 2.0+)
-        if compile_model:
+        if compile_model and self.backend == "torch":
             try:
                 self.model = torch.compile(self.model, mode="reduce-overhead")
                 print("Model compiled with torch.compile()")
             except Exception as e:
                 print(f"torch.compile() not available: {e}")
         
+        # KV cache reuse needs the transformers model API; ONNX Runtime manages its own cache
+        if self.backend not in KV_REUSE_BACKENDS:
+            use_prefix_cache = False
+            if mode == "score":
+                print(f"Router '{mode}' mode needs KV reuse, using 'constrained' on {self.backend}")
+                mode = "constrained"
+        
+        # Prefix KV cache for the developer message + tool schemas
+        self.use_prefix_cache = use_prefix_cache
+        self._prefix_ids: Optional[torch.Tensor] = None
+        self._prefix_cache: Optional[DynamicCache] = None
+        self._prefix_fingerprint: Optional[str] = None
+        if self.use_prefix_cache:
+            self._build_prefix_cache()
+        
+        # "generate" decodes the whole call, "constrained" decodes it under the call
+        # grammar, "score" ranks names in one pass
+        self.mode = mode
+        self.score_temperature = ROUTER_SCORE_TEMPERATURE
+        self.call_prefix = self._detect_call_prefix()
+        self._call_prefix_ids = self.tokenizer(self.call_prefix, add_special_tokens=False)["input_ids"]
+        self._name_trie = self._build_name_trie()
+        self.grammar = FunctionCallGrammar(TOOLS, self.call_prefix, NO_ARG_FUNCTIONS)
+        
         print(f"Router loaded in {time.time() - start:.2f}s")
-        print(f"Device: {self.model.device}, Dtype: {self.model.dtype}")
+        print(f"Device: {self.model.device}, Dtype: {getattr(self.model, 'dtype', 'n/a')}")
     
-    @torch.inference_mode()
-    def route(self, user_prompt: str) -> Tuple[str, Dict[str, Any]]:
-        """
-        Route a user prompt to the appropriate function.
-        
-        Returns:
-            Tuple of (function_name, arguments_dict)
-        """
-        # Build messages
+    def _render_prompt(self, user_prompt: str) -> str:
+        """Render the chat template for a single user turn."""
         messages = [
             {"role": "developer", "content": SYSTEM_MSG},
             {"role": "user", "content": user_prompt},
         ]
-        
-        # Apply chat template
-        prompt = self.tokenizer.apply_chat_template(
+        return self.tokenizer.apply_chat_template(
             messages,
             tools=TOOLS,
             add_generation_prompt=True,
             tokenize=False
         )
+    
+    @staticmethod
+    def _tools_fingerprint() -> str:
+        """Hash of everything that goes into the static prompt prefix."""
+        payload = json.dumps([SYSTEM_MSG, TOOLS], sort_keys=True)
+        return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+    
+    @torch.inference_mode()
+    def _build_prefix_cache(self):
+        """
+        Prefill the developer message and tool schemas once and keep the KV cache.
+        Every route then only needs to prefill the user-turn suffix.
+        """
+        start = time.time()
+        rendered = self._render_prompt(_PROMPT_MARKER)
+        prefix_text = rendered[:rendered.index(_PROMPT_MARKER)]
+        prefix_ids = self.tokenizer(prefix_text, return_tensors="pt")["input_ids"].to(self.model.device)
+        
+        # Leave the last prefix token out of the cache so a user prompt that merges
+        # with it during tokenization still matches, and generate() always has input.
+        prefix_ids = prefix_ids[:, :-1]
+        
+        cache = DynamicCache()
+        self.model(input_ids=prefix_ids, past_key_values=cache, use_cache=True)
+        
+        self._prefix_ids = prefix_ids[0]
+        self._prefix_cache = cache
+        self._prefix_fingerprint = self._tools_fingerprint()
+        print(f"Router prefix cache: {prefix_ids.shape[1]} tokens in {(time.time() - start)*1000:.0f}ms")
+    
+    def invalidate_prefix_cache(self):
+        """Drop the cached prefix. It is rebuilt on the next route."""
+        self._prefix_ids = None
+        self._prefix_cache = None
+        self._prefix_fingerprint = None
+    
+    def _get_prefix_cache(self, input_ids: torch.Tensor) -> Optional[DynamicCache]:
+        """
+        Return a private copy of the prefix KV cache if it applies to input_ids.
+        Rebuilds the cache when TOOLS or SYSTEM_MSG changed since it was built.
+        """
+        if not self.use_prefix_cache:
+            return None
+        
+        if self._prefix_cache is None or self._prefix_fingerprint != self._tools_fingerprint():
+            self._build_prefix_cache()
+        
+        n = self._prefix_ids.shape[0]
+        if input_ids.shape[0] <= n or not torch.equal(input_ids[:n], self._prefix_ids):
+            return None
+        
+        # generate() extends the cache in place, so each route gets its own copy
+        return copy.deepcopy(self._prefix_cache)
+    
+    def _detect_call_prefix(self) -> str:
+        """Find the text the model emits before a function name, using the chat template."""
+        try:
+            messages = [
+                {"role": "developer", "content": SYSTEM_MSG},
+                {"role": "user", "content": _PROMPT_MARKER},
+            ]
+            gen_prompt = self.tokenizer.apply_chat_template(
+                messages, tools=TOOLS, add_generation_prompt=True, tokenize=False
+            )
+            call = {"type": "function", "function": {"name": _PROMPT_MARKER * 2, "arguments": {}}}
+            rendered = self.tokenizer.apply_chat_template(
+                messages + [{"role": "assistant", "tool_calls": [call]}],
+                tools=TOOLS, tokenize=False
+            )
+            if rendered.startswith(gen_prompt):
+                prefix = rendered[len(gen_prompt):rendered.index(_PROMPT_MARKER * 2)]
+                if prefix.strip():
+                    return prefix
+        except Exception as e:
+            if DEBUG_ROUTER:
+                print(f"[Router DEBUG] Could not detect call prefix: {e}")
+        return DEFAULT_CALL_PREFIX
+    
+    def _build_name_trie(self) -> Dict:
+        """
+        Token trie over all function names as they continue the call prefix.
+        Leaves store the function name under the key None.
+        """
+        trie = {}
+        n = len(self._call_prefix_ids)
+        for name in sorted(VALID_FUNCTIONS):
+            ids = self.tokenizer(self.call_prefix + name, add_special_tokens=False)["input_ids"]
+            if ids[:n] == self._call_prefix_ids:
+                ids = ids[n:]
+            else:
+                ids = self.tokenizer(name, add_special_tokens=False)["input_ids"]
+            node = trie
+            for tok in ids:
+                node = node.setdefault(tok, {})
+            node[None] = name
+        return trie
+    
+    @torch.inference_mode()
+    def _forward(self, input_ids: torch.Tensor, cache: Optional[DynamicCache]):
+        """Run the model over input_ids (1 x n) and return (last-token logits, cache)."""
+        if cache is None:
+            cache = DynamicCache()
+        out = self.model(input_ids=input_ids, past_key_values=cache, use_cache=True)
+        return out.logits[0, -1].float(), out.past_key_values
+    
+    @torch.inference_mode()
+    def _score_functions(self, input_ids: torch.Tensor, temperature: float) -> Tuple[Dict[str, float], Any]:
+        """
+        Probability of each function name as the next constrained continuation of input_ids.
+        
+        One forward pass scores every name whose first token is unique. Names that share
+        a token prefix need one extra step per branching point, but only while the branch
+        is still above MIN_NAME_PROB.
+        
+        Returns:
+            ({function_name: probability}, root_cache) where root_cache covers input_ids
+        """
+        prefix_cache = self._get_prefix_cache(input_ids[0])
+        if prefix_cache is not None:
+            logits, root_cache = self._forward(input_ids[:, self._prefix_ids.shape[0]:], prefix_cache)
+        else:
+            logits, root_cache = self._forward(input_ids, None)
+        
+        probs = {}
+        min_logp = math.log(MIN_NAME_PROB)
+        # (trie node, tokens not yet fed to the model, cache, logits at node, log-prob so far)
+        stack = [(self._name_trie, [], root_cache, logits, 0.0)]
+        while stack:
+            node, pending, cache, node_logits, logp = stack.pop()
+            if None in node:
+                probs[node[None]] = logp
+                continue
+            
+            children = [(tok, child) for tok, child in node.items() if tok is not None]
+            if len(children) == 1:
+                # Only one valid continuation, so its constrained probability is 1
+                tok, child = children[0]
+                stack.append((child, pending + [tok], cache, None, logp))
+                continue
+            
+            if pending:
+                pending_ids = torch.tensor([pending], device=self.model.device)
+                node_logits, cache = self._forward(pending_ids, copy.deepcopy(cache))
+            
+            tokens = [tok for tok, _ in children]
+            child_logp = torch.log_softmax(node_logits[tokens] / temperature, dim=-1).tolist()
+            for (tok, child), lp in zip(children, child_logp):
+                if logp + lp >= min_logp:
+                    stack.append((child, [tok], cache, None, logp + lp))
+        
+        # Renormalize over the names that survived pruning
+        total = sum(math.exp(lp) for lp in probs.values()) or 1.0
+        return {name: math.exp(lp) / total for name, lp in probs.items()}, root_cache
+    
+    @torch.inference_mode()
+    def route_scored(self, user_prompt: str) -> Tuple[str, Dict[str, Any], float]:
+        """
+        Route with a single scoring pass instead of free decoding.
+        
+        The function name is chosen by scoring every name in VALID_FUNCTIONS as a
+        constrained continuation of the call prefix. Decoding only continues for
+        functions that take arguments.
+        
+        Returns:
+            Tuple of (function_name, arguments_dict, confidence)
+        """
+        prompt = self._render_prompt(user_prompt) + self.call_prefix
+        input_ids = self.tokenizer(prompt, return_tensors="pt")["input_ids"].to(self.model.device)
+        
+        probs, root_cache = self._score_functions(input_ids, self.score_temperature)
+        func_name = max(probs, key=probs.get)
+        confidence = probs[func_name]
+        
+        if DEBUG_ROUTER:
+            ranked = sorted(probs.items(), key=lambda kv: -kv[1])
+            print(f"[Router DEBUG] Scores for {user_prompt!r}: {ranked}")
+        
+        if func_name in NO_ARG_FUNCTIONS:
+            return func_name, self._extract_arguments("", func_name, user_prompt), confidence
+        
+        # Continue decoding the arguments after the chosen name, under the call grammar
+        name_ids = self._name_token_ids(func_name)
+        full_ids = torch.cat([input_ids, torch.tensor([name_ids], device=input_ids.device)], dim=1)
+        forced_text = self.call_prefix + func_name
+        outputs = self.model.generate(
+            input_ids=full_ids,
+            attention_mask=torch.ones_like(full_ids),
+            past_key_values=root_cache,
+            max_new_tokens=100,
+            do_sample=False,
+            use_cache=True,
+            pad_token_id=self.tokenizer.pad_token_id,
+            **self._grammar_kwargs(full_ids.shape[1], forced_text),
+        )
+        new_tokens = outputs[0][full_ids.shape[1]:]
+        response = forced_text + self.tokenizer.decode(new_tokens, skip_special_tokens=False)
+        
+        if DEBUG_ROUTER:
+            print(f"[Router DEBUG] Argument decode: {response!r}")
+        
+        return func_name, self._extract_arguments(response, func_name, user_prompt, fallback=False), confidence
+    
+    def _name_token_ids(self, func_name: str) -> list:
+        """Token ids of a function name as stored in the name trie."""
+        def walk(node, path):
+            for tok, child in node.items():
+                if tok is None:
+                    if child == func_name:
+                        return path
+                    continue
+                found = walk(child, path + [tok])
+                if found is not None:
+                    return found
+            return None
+        return walk(self._name_trie, [])
+    
+    def calibrate_temperature(self, labeled_prompts, temperatures=None) -> float:
+        """
+        Fit the scoring temperature on (prompt, expected_function) pairs by minimizing
+        negative log-likelihood, so route_scored confidences match observed accuracy.
+        """
+        temperatures = temperatures or [0.5, 0.75, 1.0, 1.25, 1.5, 2.0, 2.5, 3.0, 4.0]
+        encoded = []
+        for prompt, expected in labeled_prompts:
+            text = self._render_prompt(prompt) + self.call_prefix
+            encoded.append((self.tokenizer(text, return_tensors="pt")["input_ids"].to(self.model.device), expected))
+        
+        best_t, best_nll = self.score_temperature, float("inf")
+        for t in temperatures:
+            nll = 0.0
+            for input_ids, expected in encoded:
+                probs, _ = self._score_functions(input_ids, t)
+                nll -= math.log(max(probs.get(expected, 0.0), MIN_NAME_PROB))
+            if nll < best_nll:
+                best_t, best_nll = t, nll
+        
+        self.score_temperature = best_t
+        return best_t
+    
+    def route(self, user_prompt: str) -> Tuple[str, Dict[str, Any]]:
+        """
+        Route a user prompt to the appropriate function.
+        
+        Returns:
+            Tuple of (function_name, arguments_dict)
+        """
+        if self.mode == "score":
+            func_name, args, _ = self.route_scored(user_prompt)
+            return func_name, args
+        return self._route_generate(user_prompt, constrained=(self.mode == "constrained"))
+    
+    def _grammar_kwargs(self, prompt_length: int, forced_text: str = "") -> Dict[str, Any]:
+        """generate() kwargs that keep decoding on the call grammar and stop at its closing brace."""
+        return {
+            "logits_processor": LogitsProcessorList([
+                FunctionCallLogitsProcessor(self.tokenizer, self.grammar, prompt_length, forced_text)
+            ]),
+            "stopping_criteria": StoppingCriteriaList([
+                FunctionCallStoppingCriteria(self.tokenizer, self.grammar, prompt_length, forced_text)
+            ]),
+        }
+    
+    def route_multi(self, user_prompt: str, split: bool = True) -> List[Tuple[str, Dict[str, Any]]]:
+        """
+        Route a prompt that may hold several commands.
+        Compound prompts are split into clauses and routed as one batch, unless a clause
+        isn't a command (it would be dropped); otherwise every call:... the model emits
+        for the whole prompt is kept (generate mode) instead of only the first.
+        """
+        clauses = split_compound_prompt(user_prompt) if split else [user_prompt]
+        if len(clauses) > 1:
+            calls = self.route_batch(clauses)
+            if not drops_clause(calls):
+                return merge_calls(calls, user_prompt)
+        if self.mode == "generate":
+            calls = self._parse_function_calls(self._generate_response(user_prompt), user_prompt)
+        else:
+            calls = [self.route(user_prompt)]
+        return merge_calls(calls, user_prompt)
+    
+    def _route_generate(self, user_prompt: str, constrained: bool = False) -> Tuple[str, Dict[str, Any]]:
+        """Route by greedily decoding the full function call, optionally under the call grammar."""
+        response = self._generate_response(user_prompt, constrained)
+        return self._parse_function_call(response, user_prompt, fallback=not constrained)
+    
+    @torch.inference_mode()
+    def _generate_response(self, user_prompt: str, constrained: bool = False) -> str:
+        """Greedily decode the router's raw response for one prompt."""
+        prompt = self._render_prompt(user_prompt)
         
         # Tokenize
         inputs = self.tokenizer(prompt, return_tensors="pt").to(self.model.device)
         
+        # Reuse the static prefix so only the user turn is prefilled
+        gen_kwargs = {}
+        prefix_cache = self._get_prefix_cache(inputs["input_ids"][0])
+        if prefix_cache is not None:
+            gen_kwargs["past_key_values"] = prefix_cache
+        if constrained:
+            gen_kwargs.update(self._grammar_kwargs(inputs["input_ids"].shape[1]))
+        
         # Generate with minimal settings for speed
         outputs = self.model.generate(
             **inputs,
@@ -266,6 +506,7 @@ class FunctionGemmaRouter:
             do_sample=False,
             use_cache=True,
             pad_token_id=self.tokenizer.pad_token_id,
+            **gen_kwargs,
         )
         
         # Decode new tokens only
@@ -280,24 +521,33 @@ class FunctionGemmaRouter:
             print(f"  {repr(response)}")
             print(f"{'='*50}")
         
-        # Parse function call
-        return self._parse_function_call(response, user_prompt)
+        return response
+    
+    def _parse_function_call(self, response: str, user_prompt: str, fallback: bool = True) -> Tuple[str, Dict[str, Any]]:
+        """Parse the model's response to extract function name and arguments (first call only)."""
+        return self._parse_function_calls(response, user_prompt, fallback)[0]
     
-    def _parse_function_call(self, response: str, user_prompt: str) -> Tuple[str, Dict[str, Any]]:
-        """Parse the model's response to extract function name and arguments."""
+    def _parse_function_calls(self, response: str, user_prompt: str,
+                              fallback: bool = True) -> List[Tuple[str, Dict[str, Any]]]:
+        """Parse every call:function_name{...} in the response, in order."""
+        matches = [m for m in re.finditer(r"call:(\w+)", response) if m.group(1) in VALID_FUNCTIONS]
         
-        # Try to find function call pattern: call:function_name
-        for func_name in VALID_FUNCTIONS:
-            if f"call:{func_name}" in response:
-                # Try to extract arguments
-                args = self._extract_arguments(response, func_name, user_prompt)
-                return func_name, args
+        calls = []
+        for i, match in enumerate(matches):
+            # Arguments are looked up in this call's own segment of the response
+            end = matches[i + 1].start() if i + 1 < len(matches) else len(response)
+            func_name = match.group(1)
+            calls.append((func_name, self._extract_arguments(response[match.start():end], func_name, user_prompt, fallback)))
         
         # Fallback to nonthinking if no function found
-        return "nonthinking", {"prompt": user_prompt}
+        return calls or [("nonthinking", {"prompt": user_prompt})]
     
-    def _extract_arguments(self, response: str, func_name: str, user_prompt: str) -> Dict[str, Any]:
-        """Extract arguments from the response."""
+    def _extract_arguments(self, response: str, func_name: str, user_prompt: str,
+                           fallback: bool = True) -> Dict[str, Any]:
+        """
+        Extract arguments from the response.
+        With fallback=False, unparseable arguments give {} instead of the raw prompt.
+        """
         
         # Default arguments for passthrough functions
         if func_name in ("thinking", "nonthinking"):
@@ -339,6 +589,10 @@ class FunctionGemmaRouter:
             if args:
                 return args
         
+        # Grammar-constrained output is well-formed, never guess arguments from the prompt
+        if not fallback:
+            return {}
+        
         # Fallback: return user prompt as main argument
         if func_name == "control_light":
             return {"action": "toggle", "device_name": user_prompt}
@@ -355,6 +609,47 @@ class FunctionGemmaRouter:
         
         return {}
     
+    @torch.inference_mode()
+    def route_batch(self, user_prompts: List[str], batch_size: int = ROUTER_BATCH_SIZE) -> List[Tuple[str, Dict[str, Any]]]:
+        """
+        Route several prompts with left-padded, batched generate().
+        Results are in the same order as the prompts. Score mode has no batched
+        form and routes one prompt at a time.
+        """
+        if self.mode == "score":
+            return [self.route(prompt) for prompt in user_prompts]
+        
+        results = []
+        for i in range(0, len(user_prompts), batch_size):
+            chunk = user_prompts[i:i + batch_size]
+            # A single prompt is faster through route(), which can reuse the prefix cache
+            results.extend(self._route_generate_batch(chunk) if len(chunk) > 1 else [self.route(chunk[0])])
+        return results
+    
+    def _route_generate_batch(self, user_prompts: List[str]) -> List[Tuple[str, Dict[str, Any]]]:
+        """Decode one left-padded batch. The prefix cache isn't used: padding shifts the prefix per row."""
+        constrained = self.mode == "constrained"
+        prompts = [self._render_prompt(p) for p in user_prompts]
+        inputs = self.tokenizer(prompts, return_tensors="pt", padding=True).to(self.model.device)
+        prompt_length = inputs["input_ids"].shape[1]
+        
+        gen_kwargs = self._grammar_kwargs(prompt_length) if constrained else {}
+        outputs = self.model.generate(
+            **inputs,
+            max_new_tokens=100,
+            do_sample=False,
+            use_cache=True,
+            pad_token_id=self.tokenizer.pad_token_id,
+            **gen_kwargs,
+        )
+        
+        results = []
+        for user_prompt, row in zip(user_prompts, outputs):
+            response = self.tokenizer.decode(row[prompt_length:], skip_special_tokens=False)
+            response = response.replace(self.tokenizer.pad_token, "")
+            results.append(self._parse_function_call(response, user_prompt, fallback=not constrained))
+        return results
+    
     def route_with_timing(self, user_prompt: str) -> Tuple[Tuple[str, Dict], float]:
         """Route with timing info."""
         start = time.time()
@@ -366,56 +661,33 @@ class FunctionGemmaRouter:
 if __name__ == "__main__":
     router = FunctionGemmaRouter(compile_model=False)
     
-    test_prompts = [
-        # Action functions
-        ("Turn on the living room lights", "control_light"),
-        ("Set a timer for 10 minutes", "set_timer"),
-        ("Wake me up at 7am", "set_alarm"),
-        ("Schedule meeting tomorrow at 3pm", "create_calendar_event"),
-        ("Add buy groceries to my list", "add_task"),
-        ("Search for Italian recipes", "web_search"),
-        
-        # New Smart Home Examples
-        ("Dim the kitchen lights to 50%", "control_light"),
-        ("Make the bedroom lights blue", "control_light"),
-        ("Turn off all the lights", "control_light"),
-        ("Toggle the hallway light", "control_light"),
-        ("Set the thermostat to 72 degrees", "control_light"), # Intentionally testing boundary/potential misclassification
-        ("Brightness up in the study", "control_light"),
-        ("Set movie mode lighting", "control_light"),
-        
-        # Context function
-        ("How much time is left on my timer?", "get_system_info"),
-        ("What's on my calendar today?", "get_system_info"),
-        ("Are any lights on?", "get_system_info"),
-        ("Is the front door locked?", "get_system_info"),
-        
-        # Passthrough functions
-        ("Explain quantum computing", "thinking"),
-        ("Write a Python function to sort a list", "thinking"),
-        ("Hello there!", "nonthinking"),
-        ("What's the capital of France?", "nonthinking"),
-    ]
-    
     print("\n" + "="*70)
     print("FUNCTION CALLING ROUTER TEST")
     print("="*70)
     
-    total_time = 0
-    correct = 0
+    totals = {"generate": 0.0, "score": 0.0}
+    correct = {"generate": 0, "score": 0}
     
-    for prompt, expected in test_prompts:
+    for prompt, expected in TEST_PROMPTS:
         (func_name, args), elapsed = router.route_with_timing(prompt)
-        total_time += elapsed
+        totals["generate"] += elapsed
+        
+        start = time.time()
+        scored_name, scored_args, confidence = router.route_scored(prompt)
+        scored_elapsed = time.time() - start
+        totals["score"] += scored_elapsed
+        
+        correct["generate"] += func_name == expected
+        correct["score"] += scored_name == expected
         match = "✓" if func_name == expected else "✗"
-        if func_name == expected:
-            correct += 1
+        scored_match = "✓" if scored_name == expected else "✗"
         
         print(f"\n[{match}] {prompt}")
-        print(f"    → {func_name}({args}) [{elapsed*1000:.0f}ms]")
+        print(f"    generate → {func_name}({args}) [{elapsed*1000:.0f}ms]")
+        print(f"    [{scored_match}] score → {scored_name}({scored_args}) p={confidence:.2f} [{scored_elapsed*1000:.0f}ms]")
     
-    avg_time = total_time / len(test_prompts)
+    n = len(TEST_PROMPTS)
     print(f"\n{'='*70}")
-    print(f"Accuracy: {correct}/{len(test_prompts)} ({100*correct/len(test_prompts):.0f}%)")
-    print(f"Average routing time: {avg_time*1000:.0f}ms per prompt")
-    print(f"Total time: {total_time:.2f}s for {len(test_prompts)} prompts")
+    for mode in ("generate", "score"):
+        print(f"{mode:>8}: accuracy {correct[mode]}/{n} ({100*correct[mode]/n:.0f}%), "
+              f"avg {totals[mode]/n*1000:.0f}ms per prompt, total {totals[mode]:.2f}s")
@@ -0,0 +1,124 @@
+"""
+Router inference backends.
+
+The FunctionGemma router can run on:
+    torch - Hugging Face model in float32 (CPU) / bfloat16 (CUDA)
+    int8  - torch dynamic int8 quantization of the Linear layers (CPU)
+    onnx  - ONNX Runtime export via optimum (CPU)
+
+Converted artifacts are cached under ROUTER_BACKEND_CACHE_DIR, keyed by a
+fingerprint of the source model files, so conversion only happens once.
+"""
+
+import hashlib
+import os
+import time
+from pathlib import Path
+from typing import Any, Tuple
+
+import torch
+from transformers import AutoModelForCausalLM
+
+from config import ROUTER_BACKEND, ROUTER_BACKEND_CACHE_DIR, GRAY, RESET
+
+ROUTER_BACKENDS = ("torch", "int8", "onnx")
+
+# Backends that expose the full transformers model API (DynamicCache reuse, raw forward)
+KV_REUSE_BACKENDS = {"torch", "int8"}
+
+
+def get_router_backend() -> str:
+    """Backend from the settings store ("router.backend"), falling back to config."""
+    backend = ROUTER_BACKEND
+    try:
+        from core.settings_store import settings
+        backend = settings.get("router.backend", ROUTER_BACKEND)
+    except Exception:
+        pass  # Settings store unavailable (e.g. no Qt in a subprocess)
+    if backend not in ROUTER_BACKENDS:
+        print(f"{GRAY}[Router] Unknown backend '{backend}', using torch{RESET}")
+        backend = "torch"
+    return backend
+
+
+def _model_fingerprint(model_path: str) -> str:
+    """Short hash of the model files' names, sizes and mtimes."""
+    h = hashlib.sha1()
+    for path in sorted(Path(model_path).glob("*")):
+        if path.is_file():
+            stat = path.stat()
+            h.update(f"{path.name}:{stat.st_size}:{int(stat.st_mtime)}".encode("utf-8"))
+    return h.hexdigest()[:12]
+
+
+def _cache_path(model_path: str, backend: str) -> Path:
+    name = Path(model_path).resolve().name
+    return Path(ROUTER_BACKEND_CACHE_DIR) / f"{name}-{backend}-{_model_fingerprint(model_path)}"
+
+
+def _load_torch(model_path: str, device: str) -> Any:
+    # CPU often doesn't support bfloat16 natively
+    dtype = torch.bfloat16 if device == "cuda" else torch.float32
+    model = AutoModelForCausalLM.from_pretrained(
+        model_path,
+        torch_dtype=dtype,
+        device_map=device,
+    )
+    model.eval()
+    return model
+
+
+def _load_int8(model_path: str) -> Any:
+    artifact = _cache_path(model_path, "int8") / "model.pt"
+    if artifact.exists():
+        try:
+            # Pickled module, so weights_only must be off; the file is produced locally below
+            return torch.load(artifact, weights_only=False).eval()
+        except Exception as e:
+            print(f"{GRAY}[Router] Cached int8 model unusable ({e}), rebuilding...{RESET}")
+
+    print(f"{GRAY}[Router] Quantizing router to int8 (one-time)...{RESET}")
+    start = time.time()
+    model = _load_torch(model_path, "cpu")
+    model = torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+    artifact.parent.mkdir(parents=True, exist_ok=True)
+    tmp = artifact.with_suffix(".tmp")
+    torch.save(model, tmp)
+    os.replace(tmp, artifact)
+    print(f"{GRAY}[Router] int8 model cached at {artifact} ({time.time() - start:.1f}s){RESET}")
+    return model
+
+
+def _load_onnx(model_path: str) -> Any:
+    from optimum.onnxruntime import ORTModelForCausalLM
+
+    export_dir = _cache_path(model_path, "onnx")
+    if (export_dir / "model.onnx").exists():
+        return ORTModelForCausalLM.from_pretrained(export_dir, use_cache=True)
+
+    print(f"{GRAY}[Router] Exporting router to ONNX (one-time)...{RESET}")
+    start = time.time()
+    model = ORTModelForCausalLM.from_pretrained(model_path, export=True, use_cache=True)
+    model.save_pretrained(export_dir)
+    print(f"{GRAY}[Router] ONNX model cached at {export_dir} ({time.time() - start:.1f}s){RESET}")
+    return model
+
+
+def load_router_model(model_path: str, backend: str, device: str) -> Tuple[Any, str]:
+    """
+    Load the router model for a backend.
+    Returns (model, backend actually used); int8/onnx fall back to torch on failure.
+    """
+    if backend != "torch" and device != "cpu":
+        print(f"{GRAY}[Router] '{backend}' backend runs on CPU{RESET}")
+
+    try:
+        if backend == "int8":
+            return _load_int8(model_path), backend
+        if backend == "onnx":
+            return _load_onnx(model_path), backend
+    except Exception as e:
+        print(f"{GRAY}[Router] {backend} backend failed ({e}), falling back to torch{RESET}")
+
+    return _load_torch(model_path, device), "torch"
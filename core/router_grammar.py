@@ -0,0 +1,202 @@
+"""
+Grammar-constrained decoding for FunctionGemma function calls.
+
+The router's output format is:
+    <call prefix>NAME{key:<escape>value<escape>,key:value}
+
+FunctionCallGrammar validates a partial call character by character, so it works
+with any tokenization. FunctionCallLogitsProcessor uses it to keep greedy decoding
+on valid function names and schema argument keys, and FunctionCallStoppingCriteria
+ends generation as soon as the closing brace of the call is emitted.
+"""
+
+from typing import Dict, List, Tuple, Iterable
+
+import torch
+from transformers import LogitsProcessor, StoppingCriteria
+
+ESCAPE = "<escape>"
+
+# Candidates checked per step before falling back to a wider scan
+TOP_K_CANDIDATES = 32
+MAX_SCAN_CANDIDATES = 4096
+
+
+class FunctionCallGrammar:
+    """Validates partial function-call text against the tool schemas."""
+
+    def __init__(self, tools: List[Dict], call_prefix: str, no_arg_functions: Iterable[str] = ()):
+        self.call_prefix = call_prefix
+        self.no_arg_functions = set(no_arg_functions)
+        self.keys: Dict[str, set] = {}
+        self.required: Dict[str, set] = {}
+
+        for tool in tools:
+            func = tool["function"]
+            params = func.get("parameters", {})
+            self.keys[func["name"]] = set(params.get("properties", {}).keys())
+            self.required[func["name"]] = set(params.get("required", []))
+
+    def check(self, text: str) -> Tuple[bool, bool]:
+        """
+        Check generated text against the grammar.
+
+        Returns:
+            (is_valid_prefix, is_complete)
+        """
+        prefix = self.call_prefix
+        if len(text) <= len(prefix):
+            return prefix.startswith(text), False
+        if not text.startswith(prefix):
+            return False, False
+
+        rest = text[len(prefix):]
+        brace = rest.find("{")
+        if brace == -1:
+            return any(name.startswith(rest) for name in self.keys), False
+
+        name = rest[:brace]
+        if name not in self.keys:
+            return False, False
+        return self._check_args(name, rest[brace + 1:])
+
+    def _check_args(self, name: str, s: str) -> Tuple[bool, bool]:
+        """Check the text after the opening brace of a call."""
+        if name in self.no_arg_functions:
+            # Arguments of these functions are never used, so skip straight to the end
+            if s == "":
+                return True, False
+            return s == "}", s == "}"
+
+        allowed = self.keys[name]
+        required = self.required[name]
+        seen = set()
+        i = 0
+        n = len(s)
+        if n == 0:
+            return True, False
+
+        # Empty call is only complete when nothing is required
+        if s[0] == "}":
+            return (not required and n == 1), (not required and n == 1)
+
+        while True:
+            # --- key ---
+            colon = s.find(":", i)
+            if colon == -1:
+                partial = s[i:]
+                return any(k.startswith(partial) for k in allowed - seen), False
+            key = s[i:colon]
+            if key not in allowed or key in seen:
+                return False, False
+            seen.add(key)
+            i = colon + 1
+            if i == n:
+                return True, False
+
+            # --- value ---
+            if s.startswith(ESCAPE, i):
+                close = s.find(ESCAPE, i + len(ESCAPE))
+                if close == -1:
+                    return True, False
+                i = close + len(ESCAPE)
+            elif ESCAPE.startswith(s[i:]):
+                # Partial escape token at the end of the text
+                return True, False
+            else:
+                start = i
+                while i < n and s[i] not in ",}<":
+                    i += 1
+                if i == n:
+                    return True, False
+                if i == start or s[i] == "<":
+                    return False, False
+
+            # --- separator ---
+            if i == n:
+                return True, False
+            if s[i] == ",":
+                if not (allowed - seen):
+                    return False, False
+                i += 1
+                if i == n:
+                    return True, False
+                continue
+            if s[i] == "}":
+                complete = required <= seen
+                return complete and i == n - 1, complete and i == n - 1
+            return False, False
+
+
+class _GrammarState:
+    """Shared decoding helpers for the processor and stopping criteria."""
+
+    def __init__(self, tokenizer, grammar: FunctionCallGrammar, prompt_length: int, forced_text: str = ""):
+        self.tokenizer = tokenizer
+        self.grammar = grammar
+        self.prompt_length = prompt_length
+        self.forced_text = forced_text
+        self._skip_ids = {tokenizer.pad_token_id, tokenizer.eos_token_id}
+
+    def generated_ids(self, row: torch.Tensor) -> List[int]:
+        ids = row[self.prompt_length:].tolist()
+        while ids and ids[-1] in self._skip_ids:
+            ids.pop()
+        return ids
+
+    def text(self, ids: List[int]) -> str:
+        return self.forced_text + self.tokenizer.decode(ids, skip_special_tokens=False)
+
+
+class FunctionCallLogitsProcessor(LogitsProcessor):
+    """
+    Restricts greedy decoding to tokens that keep the output a valid function call.
+
+    Candidates are tried in logit order and the first one the grammar accepts is the
+    only token left unmasked, so this is meant for do_sample=False.
+    """
+
+    def __init__(self, tokenizer, grammar: FunctionCallGrammar, prompt_length: int, forced_text: str = ""):
+        self.state = _GrammarState(tokenizer, grammar, prompt_length, forced_text)
+        self.eos_token_id = tokenizer.eos_token_id
+
+    def __call__(self, input_ids: torch.LongTensor, scores: torch.FloatTensor) -> torch.FloatTensor:
+        for row in range(input_ids.shape[0]):
+            ids = self.state.generated_ids(input_ids[row])
+            _, complete = self.state.grammar.check(self.state.text(ids))
+
+            chosen = self.eos_token_id if complete else self._first_valid(ids, scores[row])
+
+            masked = torch.full_like(scores[row], float("-inf"))
+            masked[chosen] = scores[row][chosen]
+            scores[row] = masked
+        return scores
+
+    def _first_valid(self, ids: List[int], row_scores: torch.Tensor) -> int:
+        """Highest-scoring token the grammar accepts, or EOS if none is found."""
+        k = min(TOP_K_CANDIDATES, row_scores.shape[-1])
+        candidates = torch.topk(row_scores, k).indices.tolist()
+        for tok in candidates:
+            if self.state.grammar.check(self.state.text(ids + [tok]))[0]:
+                return tok
+
+        # Rare: the model strongly prefers invalid output, scan further down the ranking
+        limit = min(MAX_SCAN_CANDIDATES, row_scores.shape[-1])
+        for tok in torch.topk(row_scores, limit).indices.tolist()[k:]:
+            if self.state.grammar.check(self.state.text(ids + [tok]))[0]:
+                return tok
+        return self.eos_token_id
+
+
+class FunctionCallStoppingCriteria(StoppingCriteria):
+    """Stops each sequence as soon as its function call is complete."""
+
+    def __init__(self, tokenizer, grammar: FunctionCallGrammar, prompt_length: int, forced_text: str = ""):
+        self.state = _GrammarState(tokenizer, grammar, prompt_length, forced_text)
+
+    def __call__(self, input_ids: torch.LongTensor, scores: torch.FloatTensor, **kwargs) -> torch.BoolTensor:
+        done = [
+            self.state.grammar.check(self.state.text(self.state.generated_ids(row)))[1]
+            for row in input_ids
+        ]
+        return torch.tensor(done, dtype=torch.bool, device=input_ids.device)
@@ -0,0 +1,255 @@
+"""
+Router Server - Runs FunctionGemmaRouter in a worker process.
+
+The GUI process never imports torch/transformers: RouterClient spawns
+`python -m core.router_server`, connects to it over an authenticated localhost
+socket and forwards route / route_batch / route_multi requests. The worker loads the model in
+the background, so it can warm up while the window is already on screen.
+"""
+
+import os
+import subprocess
+import sys
+import threading
+import time
+from multiprocessing.connection import Client, Listener
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+AUTHKEY_ENV = "ROUTER_SERVER_AUTHKEY"
+
+# Worker exits if the parent hasn't connected within this many seconds
+CONNECT_GRACE_SECONDS = 60
+
+
+# --- Worker side ---
+
+def _serve(conn, router):
+    """Answer requests until the parent closes the connection."""
+    handlers = {
+        "route": router.route,
+        "route_batch": router.route_batch,
+        "route_multi": router.route_multi,
+        "ping": lambda: "pong",
+    }
+    while True:
+        try:
+            method, args = conn.recv()
+        except (EOFError, OSError):
+            break
+        try:
+            conn.send(("ok", handlers[method](*args)))
+        except Exception as e:
+            conn.send(("error", f"{type(e).__name__}: {e}"))
+
+
+def main():
+    port = int(sys.argv[1])
+    model_path = sys.argv[2]
+    authkey = bytes.fromhex(os.environ.pop(AUTHKEY_ENV))
+
+    # Don't linger if the parent never shows up
+    watchdog = threading.Timer(CONNECT_GRACE_SECONDS, os._exit, (1,))
+    watchdog.daemon = True
+    watchdog.start()
+    with Listener(("127.0.0.1", port), authkey=authkey) as listener:
+        conn = listener.accept()
+    watchdog.cancel()
+
+    try:
+        from core.router import FunctionGemmaRouter
+        router = FunctionGemmaRouter(model_path=model_path, compile_model=False)
+    except Exception as e:
+        conn.send(("error", f"{type(e).__name__}: {e}"))
+        return
+
+    conn.send(("ready", {"backend": router.backend, "pid": os.getpid()}))
+    _serve(conn, router)
+
+
+# --- Client side ---
+
+def _free_port() -> int:
+    with Listener(("127.0.0.1", 0)) as listener:
+        return listener.address[1]
+
+
+class RouterClient:
+    """
+    Thin client for the router worker with timeouts and auto-restart.
+    A request that times out or hits a dead worker restarts it and raises.
+    """
+
+    def __init__(self, model_path: str, request_timeout: float = 30, start_timeout: float = 300):
+        self.model_path = model_path
+        self.request_timeout = request_timeout
+        self.start_timeout = start_timeout
+        self.restarts = 0
+        self.info: Dict[str, Any] = {}
+
+        self._process: Optional[subprocess.Popen] = None
+        self._conn = None
+        self._ready = threading.Event()
+        self._start_error: Optional[str] = None
+        self._state_lock = threading.RLock()
+        self._request_lock = threading.Lock()  # One request on the connection at a time
+
+    def is_ready(self) -> bool:
+        """True once the worker has loaded the router and is accepting requests."""
+        return self._ready.is_set() and self._conn is not None
+
+    def is_running(self) -> bool:
+        return self._process is not None and self._process.poll() is None
+
+    def start(self):
+        """Spawn the worker if needed. Returns immediately; the model loads in the background."""
+        with self._state_lock:
+            if self.is_running():
+                return
+
+            authkey = os.urandom(16)
+            port = _free_port()
+            env = dict(os.environ, **{AUTHKEY_ENV: authkey.hex()})
+            self._ready.clear()
+            self._start_error = None
+            self._process = subprocess.Popen(
+                [sys.executable, "-m", "core.router_server", str(port), self.model_path],
+                cwd=str(PROJECT_ROOT),
+                env=env,
+            )
+            print(f"[RouterClient] Started router worker (pid {self._process.pid})")
+
+            threading.Thread(
+                target=self._connect, args=(self._process, port, authkey), daemon=True
+            ).start()
+
+    def _connect(self, process: subprocess.Popen, port: int, authkey: bytes):
+        """Connect to a freshly spawned worker and wait for its ready message."""
+        deadline = time.monotonic() + self.start_timeout
+        conn = None
+        try:
+            while conn is None:
+                if process.poll() is not None:
+                    raise RuntimeError(f"worker exited with code {process.returncode}")
+                if time.monotonic() > deadline:
+                    raise TimeoutError("worker did not accept a connection")
+                try:
+                    conn = Client(("127.0.0.1", port), authkey=authkey)
+                except ConnectionRefusedError:
+                    time.sleep(0.1)
+
+            # Model loading happens after the connection is up
+            while not conn.poll(0.5):
+                if process.poll() is not None:
+                    raise RuntimeError(f"worker exited with code {process.returncode}")
+                if time.monotonic() > deadline:
+                    raise TimeoutError("worker did not finish loading the router")
+            status, payload = conn.recv()
+            if status != "ready":
+                raise RuntimeError(payload)
+        except Exception as e:
+            if conn is not None:
+                conn.close()
+            with self._state_lock:
+                if self._process is process:
+                    self._start_error = str(e)
+                    self._kill(process)
+                    self._ready.set()  # Wake waiters so they see the error
+            print(f"[RouterClient] Router worker failed to start: {e}")
+            return
+
+        with self._state_lock:
+            if self._process is not process:
+                conn.close()
+                return
+            self._conn = conn
+            self.info = payload
+            self._ready.set()
+        print(f"[RouterClient] Router worker ready ({payload.get('backend')}, pid {payload.get('pid')})")
+
+    def _wait_ready(self):
+        self.start()
+        if not self._ready.wait(self.start_timeout):
+            raise TimeoutError("Router worker is still loading")
+        if self._start_error:
+            error = self._start_error
+            # Allow the next request to try again
+            with self._state_lock:
+                self._process = None
+                self._ready.clear()
+            raise RuntimeError(f"Router worker failed to start: {error}")
+
+    def _call(self, method: str, *args, timeout: Optional[float] = None):
+        self._wait_ready()
+        timeout = timeout or self.request_timeout
+
+        with self._request_lock:
+            conn = self._conn
+            if conn is None:
+                raise RuntimeError("Router worker is restarting")
+            try:
+                conn.send((method, args))
+                answered = conn.poll(timeout)
+                if answered:
+                    status, payload = conn.recv()
+            except (EOFError, OSError) as e:
+                self.restart(f"connection lost ({e})")
+                raise RuntimeError("Router worker died") from e
+
+            if not answered:
+                self.restart(f"{method} timed out after {timeout}s")
+                raise TimeoutError(f"Router worker timed out on {method}")
+
+        if status == "error":
+            raise RuntimeError(payload)
+        return payload
+
+    def route(self, user_prompt: str) -> Tuple[str, Dict[str, Any]]:
+        func_name, params = self._call("route", user_prompt)
+        return func_name, params
+
+    def route_batch(self, user_prompts: List[str]) -> List[Tuple[str, Dict[str, Any]]]:
+        timeout = self.request_timeout * max(1, len(user_prompts))
+        return [tuple(result) for result in self._call("route_batch", list(user_prompts), timeout=timeout)]
+
+    def route_multi(self, user_prompt: str, split: bool = True) -> List[Tuple[str, Dict[str, Any]]]:
+        return [tuple(result) for result in self._call("route_multi", user_prompt, split)]
+
+    def restart(self, reason: str = ""):
+        """Kill the worker and spawn a new one."""
+        print(f"[RouterClient] Restarting router worker{': ' + reason if reason else ''}")
+        with self._state_lock:
+            self.restarts += 1
+            self._shutdown()
+            self.start()
+
+    def stop(self):
+        """Stop the worker (closing the connection makes it exit)."""
+        with self._state_lock:
+            self._shutdown()
+
+    def _shutdown(self):
+        self._ready.clear()
+        if self._conn is not None:
+            try:
+                self._conn.close()
+            except OSError:
+                pass
+            self._conn = None
+        if self._process is not None:
+            try:
+                self._process.wait(timeout=3)
+            except subprocess.TimeoutExpired:
+                self._kill(self._process)
+            self._process = None
+
+    @staticmethod
+    def _kill(process: subprocess.Popen):
+        if process.poll() is None:
+            process.kill()
+            process.wait()
+
+
+if __name__ == "__main__":
+    main()
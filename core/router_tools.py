@@ -0,0 +1,184 @@
+"""
+Router Tools - The functions the router (and the native tool-calling pipeline) can call.
+
+The stubs only carry signatures and docstrings; the router renders them with
+transformers' get_json_schema. function_schema() builds the same schema without
+importing transformers/torch, for processes that never load the router model.
+"""
+
+import inspect
+import re
+from typing import Any, Callable, Dict, List
+
+
+# --- Tool Definitions (all 9 functions) ---
+
+def control_light(action: str, device_name: str = None, brightness: int = None, color: str = None) -> str:
+    """
+    Control smart lights - turn on, off, dim, or change color.
+    
+    Args:
+        action: Action to perform: on, off, dim, toggle
+        device_name: Name of the light or room
+        brightness: Brightness level 0-100
+        color: Color name or hex code
+    """
+    return "result"
+
+def set_timer(duration: str, label: str = None) -> str:
+    """
+    Set a countdown timer.
+    
+    Args:
+        duration: Duration like '5 minutes' or '1 hour'
+        label: Optional label for the timer
+    """
+    return "result"
+
+def set_alarm(time: str, label: str = None) -> str:
+    """
+    Set an alarm for a specific time.
+    
+    Args:
+        time: Time for alarm like '7am' or '14:30'
+        label: Optional label
+    """
+    return "result"
+
+def create_calendar_event(title: str, date: str = None, time: str = None, duration: int = None) -> str:
+    """
+    Create a calendar event.
+    
+    Args:
+        title: Event title
+        date: Date like 'tomorrow' or '2024-01-15'
+        time: Time like '3pm'
+        duration: Duration in minutes
+    """
+    return "result"
+
+def add_task(text: str, priority: str = None) -> str:
+    """
+    Add a task to the to-do list.
+    
+    Args:
+        text: Task description
+        priority: Priority level
+    """
+    return "result"
+
+def web_search(query: str) -> str:
+    """
+    Search the web for information using DuckDuckGo.
+    Returns up to 5 search results including titles, snippets, and URLs.
+    
+    Use this when the user asks to:
+    - Search for information online
+    - Look up current events or news
+    - Find facts, definitions, or explanations
+    - Research a topic
+    
+    Args:
+        query: Search query string (e.g., "Python programming best practices")
+    
+    Returns:
+        Search results with titles, body snippets (200 chars), and URLs
+    """
+    return "result"
+
+def get_system_info() -> str:
+    """
+    Get comprehensive current system state snapshot.
+    
+    Returns information about:
+    - Current time and date
+    - Active countdown timers (label, remaining time)
+    - Upcoming alarms (time, label)
+    - Today's calendar events (title, time)
+    - Pending tasks from to-do list (text, completion status)
+    - Smart home devices (name, on/off status, type)
+    - Current weather (temperature, condition, high/low)
+    - Recent news headlines (title, category, URL)
+    
+    Use this when the user asks:
+    - "What's on my schedule today?"
+    - "What's my current status?"
+    - "What do I have coming up?"
+    - "Give me a summary of everything"
+    - Questions about their timers, tasks, or calendar
+    """
+    return "result"
+
+def thinking(prompt: str) -> str:
+    """
+    Use for complex queries requiring reasoning, math, coding, or multi-step analysis.
+    
+    Args:
+        prompt: The user's original prompt
+    """
+    return "result"
+
+def nonthinking(prompt: str) -> str:
+    """
+    Use for simple queries, greetings, factual questions not requiring deep reasoning.
+    
+    Args:
+        prompt: The user's original prompt
+    """
+    return "result"
+
+
+TOOL_FUNCTIONS: List[Callable] = [
+    control_light, set_timer, set_alarm, create_calendar_event, add_task,
+    web_search, get_system_info, thinking, nonthinking,
+]
+
+_JSON_TYPES = {str: "string", int: "integer", float: "number", bool: "boolean"}
+_SECTION_PATTERN = re.compile(r"^(Args|Returns):\s*$", re.MULTILINE)
+_ARG_PATTERN = re.compile(r"^(\w+):\s*(.*)$")
+
+
+def _parse_args(block: str) -> Dict[str, str]:
+    """Map each "name: description" line of an Args section (with continuations) to its description."""
+    args: Dict[str, str] = {}
+    name = None
+    for line in block.splitlines():
+        line = line.strip()
+        match = _ARG_PATTERN.match(line)
+        if match:
+            name = match.group(1)
+            args[name] = match.group(2)
+        elif line and name:
+            args[name] += " " + line
+    return args
+
+
+def function_schema(fn: Callable) -> Dict[str, Any]:
+    """JSON schema for a Google-style documented function, matching get_json_schema's output."""
+    doc = inspect.getdoc(fn) or ""
+    parts = _SECTION_PATTERN.split(doc)
+    description = parts[0].strip()
+    sections = {parts[i]: parts[i + 1] for i in range(1, len(parts) - 1, 2)}
+    arg_docs = _parse_args(sections.get("Args", ""))
+
+    properties: Dict[str, Any] = {}
+    required = []
+    for param in inspect.signature(fn).parameters.values():
+        prop = {"type": _JSON_TYPES.get(param.annotation, "string")}
+        if param.name in arg_docs:
+            prop["description"] = arg_docs[param.name]
+        properties[param.name] = prop
+        if param.default is inspect.Parameter.empty:
+            required.append(param.name)
+
+    parameters: Dict[str, Any] = {"type": "object", "properties": properties}
+    if required:
+        parameters["required"] = required
+    returns: Dict[str, Any] = {"type": _JSON_TYPES.get(inspect.signature(fn).return_annotation, "string")}
+    if sections.get("Returns", "").strip():
+        returns["description"] = " ".join(sections["Returns"].split())
+
+    return {
+        "type": "function",
+        "function": {"name": fn.__name__, "description": description, "parameters": parameters, "return": returns},
+    }
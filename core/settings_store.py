@@ -18,6 +18,15 @@ DEFAULT_SETTINGS = {
     "models": {
         "chat": "qwen3:1.7b",
         "web_agent": "qwen3-vl:4b",
+        "tiers": {
+            "fast": "",  # Replies and confirmations; pinned in memory when set (empty = chat model)
+            "deep": ""   # thinking, get_system_info, web_search (empty = chat model)
+        },
+        "memory_budget_gb": 0  # Budget for resident models (0 = share of system RAM)
+    },
+    "router": {},  # "backend": torch, int8, onnx (applies on restart; unset = config.ROUTER_BACKEND)
+    "pipeline": {
+        "mode": "router"  # router (FunctionGemma + responder) or native (responder calls tools)
     },
     "web_agent_params": {
         "temperature": 1.0,
@@ -29,7 +38,8 @@ DEFAULT_SETTINGS = {
     },
     "general": {
         "max_history": 20,
-        "auto_fetch_news": True
+        "auto_fetch_news": True,
+        "response_cache": False  # Reuse answers to repeated standalone questions
     },
     "weather": {
         "latitude": 40.7128,
@@ -0,0 +1,198 @@
+"""
+Speculative Routing - Route the chat input while the user is still typing.
+
+The chat tab submits the (debounced) input box contents; a single background
+thread routes only the newest draft, so stale drafts are dropped before they
+reach the router. At send time take() returns the speculative decision if it
+was made for the same text, waiting for it if it's still in flight. The same
+typing window is used to warm the responder model.
+"""
+
+import copy
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from core.route_cache import PROMPT_ARG_KEYS, normalize_prompt
+
+Call = Tuple[str, Dict[str, Any]]
+
+
+class SpeculativeRouter:
+    """
+    Routes drafts in the background and hands matching results over at send time.
+    Counts how often a speculative result was used and the routing time it saved.
+    """
+
+    def __init__(self, route_fn: Callable[[str], List[Call]], warm_fn: Optional[Callable[[], Any]] = None,
+                 max_age: float = 60, warm_interval: float = 60, wake_word: Optional[str] = None,
+                 max_results: int = 4):
+        self.route_fn = route_fn
+        self.warm_fn = warm_fn
+        self.max_age = max_age
+        self.warm_interval = warm_interval
+        self.wake_word = wake_word
+        self.max_results = max_results
+
+        self._cond = threading.Condition()
+        self._generation = 0
+        self._pending: Optional[Tuple[int, str, str]] = None  # (generation, key, text)
+        self._inflight: Optional[str] = None  # key being routed
+        self._results: "OrderedDict[str, Tuple[float, float, List[Call]]]" = OrderedDict()  # key -> (done_at, route_ms, calls)
+        self._worker: Optional[threading.Thread] = None
+        self._last_warm = 0.0
+
+        self.submitted = 0
+        self.routed = 0
+        self.superseded = 0  # Dropped before routing because a newer draft arrived
+        self.stale = 0  # Routed, but the input had changed by the time it finished
+        self.hits = 0
+        self.waited_hits = 0  # Hits that had to wait for an in-flight route
+        self.misses = 0
+        self.saved_ms = 0.0
+
+    def _key(self, text: str) -> str:
+        return normalize_prompt(text, self.wake_word)
+
+    def submit(self, text: str):
+        """Speculatively route a draft. Replaces any draft that hasn't started routing yet."""
+        key = self._key(text)
+        if not key:
+            return
+
+        with self._cond:
+            self._expire()
+            if key == self._inflight or key in self._results:
+                return
+            self._generation += 1
+            if self._pending is not None:
+                self.superseded += 1
+            self._pending = (self._generation, key, text)
+            self.submitted += 1
+            self._cond.notify_all()
+
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, daemon=True)
+                self._worker.start()
+
+        self._maybe_warm()
+
+    def cancel(self):
+        """Drop the queued draft (e.g. the input box was cleared)."""
+        with self._cond:
+            self._generation += 1
+            if self._pending is not None:
+                self.superseded += 1
+                self._pending = None
+
+    def take(self, text: str, timeout: float = 10) -> Optional[List[Call]]:
+        """
+        Return the speculative route for text, or None if there isn't one.
+        Waits up to timeout seconds if that exact draft is still being routed.
+        """
+        key = self._key(text)
+        start = time.perf_counter()
+        waited = False
+
+        with self._cond:
+            # Nothing else will be typed for this message
+            if self._pending is not None and self._pending[1] != key:
+                self.superseded += 1
+                self._pending = None
+
+            deadline = time.monotonic() + timeout
+            while key not in self._results and (self._inflight == key or
+                                                (self._pending is not None and self._pending[1] == key)):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                waited = True
+                self._cond.wait(remaining)
+
+            entry = self._results.pop(key, None)
+            if entry is None or time.monotonic() - entry[0] > self.max_age:
+                self.misses += 1
+                return None
+
+            _, route_ms, calls = entry
+            self.hits += 1
+            if waited:
+                self.waited_hits += 1
+            self.saved_ms += max(0.0, route_ms - (time.perf_counter() - start) * 1000)
+
+        calls = copy.deepcopy(calls)
+        for _, params in calls:
+            for arg in PROMPT_ARG_KEYS:
+                if arg in params:
+                    params[arg] = text
+        return calls
+
+    def _expire(self):
+        now = time.monotonic()
+        for key in [k for k, (done_at, _, _) in self._results.items() if now - done_at > self.max_age]:
+            del self._results[key]
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._pending is None:
+                    if not self._cond.wait(30):
+                        self._worker = None
+                        return
+                generation, key, text = self._pending
+                self._pending = None
+                self._inflight = key
+
+            start = time.perf_counter()
+            try:
+                calls = self.route_fn(text)
+            except Exception as e:
+                print(f"[Speculative] Routing failed: {e}")
+                calls = None
+            route_ms = (time.perf_counter() - start) * 1000
+
+            with self._cond:
+                self._inflight = None
+                if calls is not None:
+                    self.routed += 1
+                    if generation != self._generation:
+                        self.stale += 1
+                    self._results[key] = (time.monotonic(), route_ms, calls)
+                    while len(self._results) > self.max_results:
+                        self._results.popitem(last=False)
+                self._cond.notify_all()
+
+    def _maybe_warm(self):
+        """Warm the responder at most once per warm_interval, off the caller's thread."""
+        if self.warm_fn is None:
+            return
+        now = time.monotonic()
+        with self._cond:
+            if now - self._last_warm < self.warm_interval:
+                return
+            self._last_warm = now
+        threading.Thread(target=self._warm, daemon=True).start()
+
+    def _warm(self):
+        try:
+            self.warm_fn()
+        except Exception as e:
+            print(f"[Speculative] Responder warm-up failed: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        """Return speculation counters."""
+        with self._cond:
+            sends = self.hits + self.misses
+            return {
+                "submitted": self.submitted,
+                "routed": self.routed,
+                "superseded": self.superseded,
+                "stale": self.stale,
+                "hits": self.hits,
+                "waited_hits": self.waited_hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / sends if sends else 0.0,
+                "saved_ms": round(self.saved_ms, 1),
+                "avg_saved_ms": round(self.saved_ms / self.hits, 1) if self.hits else 0.0,
+            }
@@ -0,0 +1,258 @@
+"""
+Storage - Shared SQLite engine for the app's local databases.
+
+Chat history, tasks/alarms and the calendar used to open a fresh connection
+(and re-read the schema) on every call, in rollback-journal mode, from both
+the Qt main thread and worker threads. A Database keeps one connection per
+thread for the life of that thread, so statement caches stay warm. Every
+connection uses WAL (readers never wait for the writer), synchronous=NORMAL
+and a larger page cache. The schema is brought up to date once at startup by
+numbered migrations recorded in PRAGMA user_version.
+
+WriteBehind moves writes off the caller's thread: statements are queued and a
+writer thread commits them in batches (group commit), so one fsync covers a
+burst of writes. flush() waits for everything queued so far to be committed.
+"""
+
+import atexit
+import sqlite3
+import threading
+import weakref
+from collections import deque
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Deque, Hashable, Iterator, List, Optional, Sequence, Tuple, Union
+
+from config import (
+    STORAGE_CACHE_SIZE_KB, STORAGE_STATEMENT_CACHE, STORAGE_BUSY_TIMEOUT, STORAGE_GROUP_COMMIT_MS, GRAY, RESET
+)
+
+# A migration is a list of SQL statements, or a function that gets the connection
+Migration = Union[Sequence[str], Callable[[sqlite3.Connection], None]]
+
+
+def add_column(table: str, column: str, definition: str) -> Callable[[sqlite3.Connection], None]:
+    """Migration that adds a column unless it already exists (databases from before migrations)."""
+    def migrate(conn: sqlite3.Connection):
+        columns = {row[1] for row in conn.execute(f'PRAGMA table_info({table})')}
+        if column not in columns:
+            conn.execute(f'ALTER TABLE {table} ADD COLUMN {column} {definition}')
+    return migrate
+
+
+class _ThreadConnection:
+    """Holds one thread's connection and closes it when the thread (or the Database) goes away."""
+
+    __slots__ = ("conn", "__weakref__")
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+
+    def close(self):
+        try:
+            self.conn.close()
+        except sqlite3.Error:
+            pass
+
+    def __del__(self):
+        self.close()
+
+
+class Database:
+    """One SQLite file shared across threads: per-thread connections, WAL, versioned migrations."""
+
+    def __init__(self, path: str, migrations: Sequence[Migration] = (), name: str = "Storage",
+                 synchronous: str = "NORMAL"):
+        self.path = path
+        self.name = name
+        self.synchronous = synchronous
+        if path != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+            self._remove_stale_wal()
+        self._local = threading.local()
+        self._handles: "weakref.WeakSet[_ThreadConnection]" = weakref.WeakSet()
+        self._lock = threading.Lock()
+        self.migrate(migrations)
+
+    def _remove_stale_wal(self):
+        """A -wal/-shm left behind by a deleted database must not be replayed into a new one."""
+        if Path(self.path).exists():
+            return
+        for suffix in ("-wal", "-shm"):
+            Path(self.path + suffix).unlink(missing_ok=True)
+
+    # --- Connections ---
+
+    def connection(self) -> sqlite3.Connection:
+        """This thread's connection (opened on first use)."""
+        handle = getattr(self._local, "handle", None)
+        if handle is None:
+            handle = _ThreadConnection(self._connect())
+            self._local.handle = handle
+            with self._lock:
+                self._handles.add(handle)
+        return handle.conn
+
+    def _connect(self) -> sqlite3.Connection:
+        # Autocommit: single statements commit on their own, transaction() groups them.
+        # check_same_thread is off only so close() can run from any thread; each
+        # thread still uses just its own connection.
+        conn = sqlite3.connect(self.path, timeout=STORAGE_BUSY_TIMEOUT, isolation_level=None,
+                               check_same_thread=False, cached_statements=STORAGE_STATEMENT_CACHE)
+        conn.row_factory = sqlite3.Row
+        conn.execute('PRAGMA journal_mode=WAL')
+        # NORMAL is safe with WAL (no corruption) and only fsyncs at checkpoints; FULL fsyncs every commit
+        conn.execute(f'PRAGMA synchronous={self.synchronous}')
+        conn.execute(f'PRAGMA cache_size=-{STORAGE_CACHE_SIZE_KB}')
+        conn.execute('PRAGMA temp_store=MEMORY')
+        return conn
+
+    def close(self):
+        """Close every thread's connection (e.g. at shutdown or before deleting the file)."""
+        with self._lock:
+            handles = list(self._handles)
+            self._handles.clear()
+        for handle in handles:
+            handle.close()
+        self._local = threading.local()
+
+    # --- Queries ---
+
+    def execute(self, sql: str, params: Sequence[Any] = ()) -> sqlite3.Cursor:
+        return self.connection().execute(sql, params)
+
+    def executemany(self, sql: str, rows) -> sqlite3.Cursor:
+        return self.connection().executemany(sql, rows)
+
+    def query(self, sql: str, params: Sequence[Any] = ()) -> List[sqlite3.Row]:
+        return self.connection().execute(sql, params).fetchall()
+
+    def query_one(self, sql: str, params: Sequence[Any] = ()) -> Optional[sqlite3.Row]:
+        return self.connection().execute(sql, params).fetchone()
+
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Connection]:
+        """Run the enclosed statements atomically (nested use joins the outer transaction)."""
+        conn = self.connection()
+        if conn.in_transaction:
+            yield conn
+            return
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            yield conn
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        conn.execute('COMMIT')
+
+    # --- Schema ---
+
+    def version(self) -> int:
+        return self.query_one('PRAGMA user_version')[0]
+
+    def migrate(self, migrations: Sequence[Migration]):
+        """Apply migrations newer than the stored user_version, each in its own transaction."""
+        current = self.version()
+        for version, migration in enumerate(migrations[current:], start=current + 1):
+            with self.transaction() as conn:
+                if callable(migration):
+                    migration(conn)
+                else:
+                    for statement in migration:
+                        conn.execute(statement)
+                conn.execute(f'PRAGMA user_version = {version}')
+            print(f"{GRAY}[{self.name}] Migrated {self.path} to schema version {version}.{RESET}")
+
+
+class WriteBehind:
+    """
+    Queue of writes for one Database, committed by a background thread in batches.
+
+    A batch is everything queued while the previous commit ran, plus whatever
+    arrives within group_commit_ms of the first write. Writes with the same
+    coalesce key in one batch collapse into the last one (e.g. repeated
+    "session updated at" stamps). Call flush() before reading data that may
+    still be queued: it cuts the group-commit wait short, so a flush costs one
+    commit rather than group_commit_ms. Pending writes are also flushed at
+    interpreter exit.
+    """
+
+    def __init__(self, db: Database, group_commit_ms: float = STORAGE_GROUP_COMMIT_MS):
+        self.db = db
+        self.group_commit = group_commit_ms / 1000
+        self._queue: Deque[Tuple[str, Sequence[Any], Optional[Hashable]]] = deque()
+        self._cond = threading.Condition()
+        self._submitted = 0
+        self._committed = 0
+        self._flushing = 0  # Threads waiting in flush()
+        self._closed = False
+        self.batches = 0
+        self._thread = threading.Thread(target=self._run, name=f"{db.name}Writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def submit(self, sql: str, params: Sequence[Any] = (), coalesce: Optional[Hashable] = None):
+        """Queue a write; returns immediately (after close(), writes synchronously)."""
+        with self._cond:
+            if not self._closed:
+                self._queue.append((sql, params, coalesce))
+                self._submitted += 1
+                self._cond.notify_all()
+                return
+        # Late writes (e.g. a reply that finished during shutdown) still get saved
+        self.db.execute(sql, params)
+
+    def pending(self) -> int:
+        with self._cond:
+            return self._submitted - self._committed
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait until everything submitted so far is committed. Returns False on timeout."""
+        with self._cond:
+            target = self._submitted
+            if self._committed >= target:
+                return True
+            self._flushing += 1
+            self._cond.notify_all()  # Wake the writer if it is waiting for a batch to fill
+            try:
+                return self._cond.wait_for(lambda: self._committed >= target, timeout)
+            finally:
+                self._flushing -= 1
+
+    def close(self):
+        """Commit what is queued and stop the writer thread."""
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join()
+        atexit.unregister(self.close)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._queue or self._closed)
+                if not self._queue:
+                    return  # Closed and drained
+                # Group commit: give closely following writes a moment to join this
+                # batch, unless a flush() is already waiting for them
+                if self.group_commit:
+                    self._cond.wait_for(lambda: self._flushing or self._closed, self.group_commit)
+                batch = list(self._queue)
+                self._queue.clear()
+            self._commit(batch)
+            with self._cond:
+                self._committed += len(batch)
+                self.batches += 1
+                self._cond.notify_all()
+
+    def _commit(self, batch: List[Tuple[str, Sequence[Any], Optional[Hashable]]]):
+        last = {key: i for i, (_, _, key) in enumerate(batch) if key is not None}
+        try:
+            with self.db.transaction() as conn:
+                for i, (sql, params, key) in enumerate(batch):
+                    if key is None or last[key] == i:
+                        conn.execute(sql, params)
+        except Exception as e:
+            print(f"{GRAY}[{self.db.name}] Failed to commit {len(batch)} queued writes: {e}{RESET}")
@@ -0,0 +1,67 @@
+"""
+Stage Timing - Per-request wall-clock breakdown of pipeline stages.
+
+Stages are recorded as offsets from the start of the request, so stages that
+run concurrently (e.g. responder warm-up next to routing) show up as
+overlapping intervals in the summary.
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Tuple
+
+
+class StageTimer:
+    """Collects (stage, start, end) intervals and point-in-time marks for one request."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.t0 = time.perf_counter()
+        self._stages: List[Tuple[str, float, float]] = []
+        self._marks: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def _now(self) -> float:
+        return (time.perf_counter() - self.t0) * 1000
+
+    @contextmanager
+    def stage(self, name: str):
+        """Time the enclosed block as a stage."""
+        start = self._now()
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._stages.append((name, start, self._now()))
+
+    def wrap(self, name: str, fn: Callable[..., Any]) -> Callable[..., Any]:
+        """Return fn timed as a stage (for work handed to another thread)."""
+        def timed(*args, **kwargs):
+            with self.stage(name):
+                return fn(*args, **kwargs)
+        return timed
+
+    def mark(self, name: str):
+        """Record a point in time (only the first mark of a name counts)."""
+        with self._lock:
+            self._marks.setdefault(name, self._now())
+
+    def stages(self) -> Dict[str, Any]:
+        """Stages as {name: {"start_ms", "end_ms", "ms"}} plus marks and the total so far."""
+        with self._lock:
+            result = {
+                name: {"start_ms": round(start, 1), "end_ms": round(end, 1), "ms": round(end - start, 1)}
+                for name, start, end in self._stages
+            }
+            result.update({name: {"at_ms": round(at, 1)} for name, at in self._marks.items()})
+        result["total"] = {"ms": round(self._now(), 1)}
+        return result
+
+    def summary(self) -> str:
+        """One-line breakdown, e.g. "route 0-95ms | warmup 0-640ms | first_token @910ms | total 2310ms"."""
+        with self._lock:
+            parts = [(start, f"{name} {start:.0f}-{end:.0f}ms") for name, start, end in self._stages]
+            parts += [(at, f"{name} @{at:.0f}ms") for name, at in self._marks.items()]
+        parts.sort(key=lambda part: part[0])
+        return " | ".join([text for _, text in parts] + [f"total {self._now():.0f}ms"])
@@ -4,19 +4,27 @@ Manages: STT → Function Gemma → Qwen → TTS pipeline.
 """
 
 import threading
-import json
-import requests
 from typing import Optional
 from PySide6.QtCore import QObject, Signal
 
 from config import (
-    RESPONDER_MODEL, OLLAMA_URL, MAX_HISTORY, GRAY, RESET, CYAN, GREEN, WAKE_WORD
+    MAX_HISTORY, PIPELINE_MODE, NATIVE_TOOLS_TIER, GRAY, RESET, CYAN, GREEN, WAKE_WORD
 )
 from core.stt import STTListener
-from core.llm import route_query, should_bypass_router, http_session
-from core.model_persistence import ensure_qwen_loaded, mark_qwen_used, unload_qwen
+from core.llm import route_query_multi, should_bypass_router, start_responder_warmup, warm_responder
+from core.ollama_client import ollama, ContentChunk, DoneStats
+from core.ollama_status import ollama_status
+from core.context_window import ContextWindow, summarize_with_model
+from core.context_builder import build_context_message
+from core.response_cache import response_cache, is_cacheable, replay
+from core.settings_store import settings
+from core.model_tiers import FAST, model_for_tier, select_responder, keep_alive_for, mark_model_used
+from core.native_tools import run_native
 from core.tts import tts, SentenceBuffer
 from core.function_executor import executor as function_executor
+from core.timing import StageTimer
+from core.metrics import llm_metrics
+from core.memory_index import memory_index
 
 # Functions that are actions (not passthrough)
 ACTION_FUNCTIONS = {
@@ -50,7 +58,14 @@ class VoiceAssistant(QObject):
                 'content': 'You are a helpful assistant. Respond in short, complete sentences. Never use emojis or special characters. Keep responses concise and conversational.'
             }
         ]
+        self.context = ContextWindow(summarizer=summarize_with_model, name="VoiceAssistant")
         self.current_session_id = None
+        self.timer = None
+        self.model = None
+        self.function = None  # Routed function(s), for the metrics
+        self.user_text = ""
+        self._responder_ready = None
+        self._memory = None  # Future of the memory lookup, started with routing
         
     def initialize(self) -> bool:
         """Initialize voice assistant components."""
@@ -139,40 +154,67 @@ class VoiceAssistant(QObject):
     
     def _process_query(self, user_text: str):
         """Process user query through the pipeline."""
+        self.timer = StageTimer("Voice")
+        native = settings.get("pipeline.mode", PIPELINE_MODE) == "native"
+        # Load the responder while routing and tools run; waited on before the first token
+        tier = NATIVE_TOOLS_TIER if native else FAST
+        self.model = model_for_tier(tier)
+        self.function = None
+        self.user_text = user_text
+        self._memory = None
+        self._start_warmup(tier)
+        ollama_status.set_active("voice", True)
         try:
+            if native:
+                self._process_native(user_text)
+                return
+            # Earlier chats, tasks and events about the question, embedded while routing runs
+            self._memory = memory_index.lookup(user_text, [m['content'] for m in self.messages] + [user_text])
+            
             # Step 1: Route through Function Gemma
-            if should_bypass_router(user_text):
-                func_name = "nonthinking"
-                params = {"prompt": user_text}
-            else:
-                func_name, params = route_query(user_text)
+            with self.timer.stage("route"):
+                if should_bypass_router(user_text):
+                    calls = [("nonthinking", {"prompt": user_text})]
+                else:
+                    calls = route_query_multi(user_text)
+            func_name, params = calls[0]
+            self.function = ",".join(name for name, _ in calls)
+            
+            tier, model = select_responder(calls)
+            if model != self.model:
+                self.model = model
+                self._start_warmup(tier)
             
-            print(f"{GRAY}[VoiceAssistant] Routed to: {func_name}{RESET}")
+            print(f"{GRAY}[VoiceAssistant] Routed to: {', '.join(name for name, _ in calls)} "
+                  f"({tier} tier: {self.model}){RESET}")
             
             # Step 2: Handle based on function type
-            if func_name in ACTION_FUNCTIONS:
-                # Execute action function
-                result = function_executor.execute(func_name, params)
-                response_text = result.get("message", "Done.")
+            if len(calls) > 1:
+                # Compound command: run the calls together, answer once
+                with self.timer.stage("execute"):
+                    results = function_executor.execute_many(calls)
+                for (name, _), result in zip(calls, results):
+                    self._emit_action_signals(name, result)
                 
-                # Emit GUI update signals for specific actions
-                if func_name == "set_timer" and result.get("success"):
-                    seconds = result.get("data", {}).get("seconds", 0)
-                    label = result.get("data", {}).get("label", "Timer")
-                    self.timer_set.emit(seconds, label)
-                elif func_name == "set_alarm" and result.get("success"):
-                    self.alarm_added.emit()
-                elif func_name == "create_calendar_event" and result.get("success"):
-                    self.calendar_updated.emit()
-                elif func_name == "add_task" and result.get("success"):
-                    self.task_added.emit()
+                context_msg = "\n".join(
+                    self._build_context_message(name, result) for (name, _), result in zip(calls, results)
+                )
+                enable_thinking = any(name in ("web_search", "get_system_info") for name, _ in calls)
+                self._respond_with_context(context_msg, user_text, enable_thinking)
+            
+            elif func_name in ACTION_FUNCTIONS:
+                # Execute action function
+                with self.timer.stage("execute"):
+                    result = function_executor.execute(func_name, params)
+                self._emit_action_signals(func_name, result)
                 
                 # Generate Qwen response with context
                 self._generate_response_with_context(func_name, result, user_text)
                 
             elif func_name == "get_system_info":
                 # Get system info
-                result = function_executor.execute(func_name, params)
+                with self.timer.stage("execute"):
+                    result = function_executor.execute(func_name, params)
                 self._generate_response_with_context(func_name, result, user_text, enable_thinking=True)
                 
             elif func_name in ("thinking", "nonthinking"):
@@ -189,101 +231,101 @@ class VoiceAssistant(QObject):
             print(f"{GRAY}[VoiceAssistant] {error_msg}{RESET}")
             self.error_occurred.emit(error_msg)
             self.processing_finished.emit()
+        
+        finally:
+            ollama_status.set_active("voice", False)
+            print(f"{GRAY}[Timing] {self.timer.summary()}{RESET}")
     
-    def _generate_response_with_context(self, func_name: str, result: dict, user_text: str, enable_thinking: bool = False):
-        """Generate Qwen response with function execution context."""
+    def _start_warmup(self, tier: str):
+        """Start loading self.model in the background."""
+        model = self.model
+        self._responder_ready = start_responder_warmup(
+            self.timer.wrap(f"warmup_{tier}", lambda: warm_responder(model))
+        )
+    
+    def _wait_for_responder(self) -> bool:
+        """Block until the latest warm-up has finished. Returns False if the model failed to load."""
+        with self.timer.stage("wait_responder"):
+            try:
+                return bool(self._responder_ready.result())
+            except Exception as e:
+                print(f"{GRAY}[VoiceAssistant] Responder warm-up failed: {e}{RESET}")
+                return False
+    
+    def _process_native(self, user_text: str):
+        """Single-hop pipeline: the responder calls the tools itself (settings "pipeline.mode")."""
         try:
-            # Ensure Qwen is loaded
-            if not ensure_qwen_loaded():
-                print(f"{GRAY}[VoiceAssistant] Failed to load Qwen model.{RESET}")
+            if not self._wait_for_responder():
+                print(f"{GRAY}[VoiceAssistant] Failed to load {self.model}.{RESET}")
                 self.processing_finished.emit()
                 return
             
-            mark_qwen_used()
+            self.messages.append({'role': 'user', 'content': user_text})
+            self.context.fit(self.messages, MAX_HISTORY, model=self.model)
+            
+            events = run_native(self.model, self.messages, self._execute_native_calls,
+                                keep_alive=keep_alive_for(self.model))
+            self._stream_chat(False, events=events)
+            mark_model_used(self.model)
             
-            # Build context message
-            success = result.get("success", False)
-            message = result.get("message", "")
+            print(f"{GREEN}[VoiceAssistant] Response generated.{RESET}")
+            self.processing_finished.emit()
             
-            # Enhanced context for get_system_info
-            if func_name == "get_system_info" and success:
-                data = result.get("data", {})
-                context_parts = []
-                if data.get("timers"):
-                    context_parts.append(f"Active timers: {data['timers']}")
-                if data.get("alarms"):
-                    context_parts.append(f"Alarms: {data['alarms']}")
-                if data.get("calendar_today"):
-                    context_parts.append(f"Today's events: {data['calendar_today']}")
-                if data.get("tasks"):
-                    pending = [t for t in data['tasks'] if not t.get('completed')]
-                    context_parts.append(f"Pending tasks: {len(pending)} items")
-                if data.get("smart_devices"):
-                    on_devices = [d['name'] for d in data['smart_devices'] if d.get('is_on')]
-                    context_parts.append(f"Devices on: {on_devices if on_devices else 'none'}")
-                if data.get("weather"):
-                    w = data['weather']
-                    context_parts.append(f"Weather: {w.get('temp')}°F, {w.get('condition')}")
-                if data.get("news"):
-                    news_items = data['news']
-                    if news_items:
-                        news_titles = [item.get('title', '')[:50] for item in news_items[:3]]
-                        context_parts.append(f"Top news: {', '.join(news_titles)}")
-                context_msg = "SYSTEM CONTEXT:\n" + "\n".join(context_parts) if context_parts else "No system information available."
-            else:
-                context_msg = f"Function {func_name} executed. Success: {success}. Result: {message}"
+        except Exception as e:
+            print(f"{GRAY}[VoiceAssistant] Error in native tool pipeline: {e}{RESET}")
+            self.processing_finished.emit()
+    
+    def _execute_native_calls(self, calls: list) -> list:
+        """Run the tool calls the responder asked for and describe each result for it."""
+        print(f"{GRAY}[VoiceAssistant] Tool calls: {', '.join(name for name, _ in calls)}{RESET}")
+        with self.timer.stage("execute"):
+            results = function_executor.execute_many(calls)
+        for (name, _), result in zip(calls, results):
+            self._emit_action_signals(name, result)
+        return [self._build_context_message(name, result) for (name, _), result in zip(calls, results)]
+    
+    def _emit_action_signals(self, func_name: str, result: dict):
+        """Emit GUI update signals for specific actions."""
+        if not result.get("success"):
+            return
+        if func_name == "set_timer":
+            seconds = result.get("data", {}).get("seconds", 0)
+            label = result.get("data", {}).get("label", "Timer")
+            self.timer_set.emit(seconds, label)
+        elif func_name == "set_alarm":
+            self.alarm_added.emit()
+        elif func_name == "create_calendar_event":
+            self.calendar_updated.emit()
+        elif func_name == "add_task":
+            self.task_added.emit()
+    
+    def _build_context_message(self, func_name: str, result: dict) -> str:
+        """Describe a function result for the responder (token-budgeted, ranked by the question)."""
+        return build_context_message(func_name, result, self.user_text, spoken=True)
+    
+    def _generate_response_with_context(self, func_name: str, result: dict, user_text: str, enable_thinking: bool = False):
+        """Generate Qwen response with function execution context."""
+        self._respond_with_context(self._build_context_message(func_name, result), user_text, enable_thinking)
+    
+    def _respond_with_context(self, context_msg: str, user_text: str, enable_thinking: bool = False):
+        """Stream a Qwen response to user_text with the given context."""
+        try:
+            # Ensure Qwen is loaded (started in the background by _process_query)
+            if not self._wait_for_responder():
+                print(f"{GRAY}[VoiceAssistant] Failed to load {self.model}.{RESET}")
+                self.processing_finished.emit()
+                return
             
-            # Manage context window
-            max_hist = MAX_HISTORY
-            if len(self.messages) > max_hist:
-                self.messages = [self.messages[0]] + self.messages[-(max_hist-1):]
+            mark_model_used(self.model)
             
             # Add context as user message
             context_prompt = f"{context_msg}\n\nUser asked: {user_text}\n\nRespond naturally and concisely."
             self.messages.append({'role': 'user', 'content': context_prompt})
+            self.context.fit(self.messages, MAX_HISTORY, model=self.model)
             
-            # Prepare payload
-            payload = {
-                "model": RESPONDER_MODEL,
-                "messages": self.messages,
-                "stream": True,
-                "think": enable_thinking,
-                "keep_alive": "5m"
-            }
-            
-            sentence_buffer = SentenceBuffer()
-            full_response = ""
-            
-            # Stream response
-            with http_session.post(f"{OLLAMA_URL}/chat", json=payload, stream=True) as r:
-                r.raise_for_status()
-                
-                for line in r.iter_lines():
-                    if line:
-                        try:
-                            chunk = json.loads(line.decode('utf-8'))
-                            msg = chunk.get('message', {})
-                            
-                            if 'content' in msg and msg['content']:
-                                content = msg['content']
-                                full_response += content
-                                
-                                # Queue for TTS
-                                sentences = sentence_buffer.add(content)
-                                for s in sentences:
-                                    tts.queue_sentence(s)
-                        except:
-                            continue
-            
-            # Flush remaining
-            rem = sentence_buffer.flush()
-            if rem:
-                tts.queue_sentence(rem)
-            
-            # Update messages
-            self.messages.append({'role': 'assistant', 'content': full_response})
+            self._stream_chat(enable_thinking)
             
-            mark_qwen_used()  # Update usage time
+            mark_model_used(self.model)  # Update usage time
             
             print(f"{GREEN}[VoiceAssistant] Response generated.{RESET}")
             self.processing_finished.emit()
@@ -295,63 +337,34 @@ class VoiceAssistant(QObject):
     def _stream_qwen_response(self, user_text: str, enable_thinking: bool):
         """Stream direct Qwen response."""
         try:
-            # Ensure Qwen is loaded
-            if not ensure_qwen_loaded():
-                print(f"{GRAY}[VoiceAssistant] Failed to load Qwen model.{RESET}")
-                self.processing_finished.emit()
-                return
-            
-            mark_qwen_used()
-            
-            # Manage context window
-            max_hist = MAX_HISTORY
-            if len(self.messages) > max_hist:
-                self.messages = [self.messages[0]] + self.messages[-(max_hist-1):]
+            # Started with routing; usually ready by now. Checked before the cache: an answer
+            # cached before these memories existed would ignore them
+            with self.timer.stage("memory"):
+                memory = self._memory.result() if self._memory else ""
             
-            self.messages.append({'role': 'user', 'content': user_text})
+            if not enable_thinking and not memory and self._answer_from_cache(user_text):
+                return
             
-            # Prepare payload
-            payload = {
-                "model": RESPONDER_MODEL,
-                "messages": self.messages,
-                "stream": True,
-                "think": enable_thinking,
-                "keep_alive": "5m"
-            }
+            # Ensure Qwen is loaded (started in the background by _process_query)
+            if not self._wait_for_responder():
+                print(f"{GRAY}[VoiceAssistant] Failed to load {self.model}.{RESET}")
+                self.processing_finished.emit()
+                return
             
-            sentence_buffer = SentenceBuffer()
-            full_response = ""
+            mark_model_used(self.model)
             
-            # Stream response
-            with http_session.post(f"{OLLAMA_URL}/chat", json=payload, stream=True) as r:
-                r.raise_for_status()
-                
-                for line in r.iter_lines():
-                    if line:
-                        try:
-                            chunk = json.loads(line.decode('utf-8'))
-                            msg = chunk.get('message', {})
-                            
-                            if 'content' in msg and msg['content']:
-                                content = msg['content']
-                                full_response += content
-                                
-                                # Queue for TTS
-                                sentences = sentence_buffer.add(content)
-                                for s in sentences:
-                                    tts.queue_sentence(s)
-                        except:
-                            continue
+            content = f"{memory}\n\nUser asked: {user_text}" if memory else user_text
+            self.messages.append({'role': 'user', 'content': content})
+            self.context.fit(self.messages, MAX_HISTORY, model=self.model)
             
-            # Flush remaining
-            rem = sentence_buffer.flush()
-            if rem:
-                tts.queue_sentence(rem)
+            self._stream_chat(enable_thinking)
             
-            # Update messages
-            self.messages.append({'role': 'assistant', 'content': full_response})
+            if (not enable_thinking and not memory and self._cache_enabled()
+                    and is_cacheable(user_text, self.messages[:-1])):
+                response_cache.put(self.model, user_text, self.messages[0]['content'],
+                                   self.messages[-1]['content'])
             
-            mark_qwen_used()  # Update usage time
+            mark_model_used(self.model)  # Update usage time
             
             print(f"{GREEN}[VoiceAssistant] Response generated.{RESET}")
             self.processing_finished.emit()
@@ -359,6 +372,64 @@ class VoiceAssistant(QObject):
         except Exception as e:
             print(f"{GRAY}[VoiceAssistant] Error streaming response: {e}{RESET}")
             self.processing_finished.emit()
+    
+    @staticmethod
+    def _cache_enabled() -> bool:
+        return settings.get("general.response_cache", False)
+    
+    def _answer_from_cache(self, user_text: str) -> bool:
+        """Speak a cached answer without loading Qwen. Returns False on a cache miss."""
+        if not self._cache_enabled():
+            return False
+        history = self.messages + [{'role': 'user', 'content': user_text}]
+        if not is_cacheable(user_text, history):
+            return False
+        cached = response_cache.get(self.model, user_text, self.messages[0]['content'])
+        if cached is None:
+            return False
+        
+        self.messages.append({'role': 'user', 'content': user_text})
+        self.context.fit(self.messages, MAX_HISTORY, model=self.model)
+        self._stream_chat(False, events=replay(cached))
+        print(f"{GREEN}[VoiceAssistant] Response served from cache.{RESET}")
+        self.processing_finished.emit()
+        return True
+    
+    def _stream_chat(self, enable_thinking: bool, events=None):
+        """
+        Stream the reply to self.messages into TTS and append it to the history.
+        events replaces the Ollama stream (e.g. a cached response being replayed).
+        """
+        sentence_buffer = SentenceBuffer()
+        full_response = ""
+        
+        if events is None:
+            events = ollama.chat_stream(self.model, self.messages, think=enable_thinking,
+                                        keep_alive=keep_alive_for(self.model))
+        recorder = llm_metrics.stream("voice", self.model, self.function)
+        for event in events:
+            recorder.observe(event)
+            if self.timer and isinstance(event, ContentChunk):
+                self.timer.mark("first_token")
+            if isinstance(event, DoneStats):
+                self.context.record(self.messages, event)
+            elif isinstance(event, ContentChunk):
+                full_response += event.text
+                
+                # Queue for TTS
+                for s in sentence_buffer.add(event.text):
+                    tts.queue_sentence(s)
+        
+        first_token = self.timer.stages().get("first_token", {}).get("at_ms") if self.timer else None
+        recorder.finish(first_token)
+        
+        # Flush remaining
+        rem = sentence_buffer.flush()
+        if rem:
+            tts.queue_sentence(rem)
+        
+        self.messages.append({'role': 'assistant', 'content': full_response})
+        memory_index.schedule_sync()  # Pick up any task or event this turn created
 
 
 # Global voice assistant instance
@@ -0,0 +1,144 @@
+"""
+Offline evaluation of FunctionGemmaRouter over training_dataset_functions.jsonl.
+
+Streams the dataset (or its held-out 20% split) through route_batch at each batch
+size and reports function accuracy, argument exact-match, a confusion matrix and
+p50/p95/p99 latency per prompt and per batch. Results are written as JSON so runs
+can be compared.
+
+Usage:
+    python eval_router.py [--split heldout] [--batch-sizes 1 4 8] [--mode constrained]
+                          [--backend int8] [--limit 200] [--output router_eval.json]
+"""
+
+import argparse
+import json
+import time
+from collections import defaultdict
+from datetime import datetime
+from itertools import islice
+
+import numpy as np
+
+from config import LOCAL_ROUTER_PATH, ROUTER_MODE, ROUTER_TRAINING_DATA
+from core.intent_classifier import is_held_out, iter_dataset
+
+
+def stream_examples(path, split, limit):
+    examples = (e for e in iter_dataset(path) if split == "all" or is_held_out(e[0]))
+    return islice(examples, limit) if limit else examples
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def percentiles(values):
+    arr = np.array(values) if values else np.zeros(1)
+    return {
+        "mean": round(float(arr.mean()), 2),
+        "p50": round(float(np.percentile(arr, 50)), 2),
+        "p95": round(float(np.percentile(arr, 95)), 2),
+        "p99": round(float(np.percentile(arr, 99)), 2),
+    }
+
+
+def evaluate(router, args, batch_size):
+    """Run one pass over the split. Returns (metrics, confusion, errors)."""
+    total = func_correct = args_correct = 0
+    per_prompt_ms, per_batch_ms = [], []
+    confusion = defaultdict(lambda: defaultdict(int))
+    errors = []
+
+    for batch in batched(stream_examples(args.data, args.split, args.limit), batch_size):
+        prompts = [prompt for prompt, _, _ in batch]
+        start = time.perf_counter()
+        results = router.route_batch(prompts, batch_size=batch_size)
+        elapsed = (time.perf_counter() - start) * 1000
+        per_batch_ms.append(elapsed)
+        per_prompt_ms.extend([elapsed / len(batch)] * len(batch))
+
+        for (prompt, expected_func, expected_args), (func, params) in zip(batch, results):
+            total += 1
+            confusion[expected_func][func] += 1
+            if func == expected_func:
+                func_correct += 1
+                if params == expected_args:
+                    args_correct += 1
+            if func != expected_func or params != expected_args:
+                errors.append({"prompt": prompt, "expected": [expected_func, expected_args], "got": [func, params]})
+
+    metrics = {
+        "batch_size": batch_size,
+        "examples": total,
+        "accuracy": round(func_correct / total, 4) if total else 0.0,
+        "args_exact_match": round(args_correct / total, 4) if total else 0.0,
+        "latency_per_prompt_ms": percentiles(per_prompt_ms),
+        "latency_per_batch_ms": percentiles(per_batch_ms),
+        "prompts_per_second": round(total / (sum(per_batch_ms) / 1000), 2) if per_batch_ms else 0.0,
+    }
+    return metrics, {k: dict(v) for k, v in confusion.items()}, errors
+
+
+def print_confusion(confusion):
+    labels = sorted(set(confusion) | {p for row in confusion.values() for p in row})
+    short = [label[:8] for label in labels]
+    print("\n" + "expected / got".ljust(22) + "".join(f"{s:>9}" for s in short))
+    for expected in labels:
+        row = confusion.get(expected, {})
+        print(f"{expected:<22}" + "".join(f"{row.get(got, 0):>9}" for got in labels))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--data", default=ROUTER_TRAINING_DATA)
+    parser.add_argument("--split", choices=["all", "heldout"], default="heldout")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--mode", choices=["generate", "constrained", "score"], default=ROUTER_MODE)
+    parser.add_argument("--backend", choices=["torch", "int8", "onnx"], default=None)
+    parser.add_argument("--model", default=LOCAL_ROUTER_PATH)
+    parser.add_argument("--limit", type=int, default=None, help="Evaluate at most N examples")
+    parser.add_argument("--output", default="router_eval.json")
+    args = parser.parse_args()
+
+    from core.router import FunctionGemmaRouter
+    router = FunctionGemmaRouter(model_path=args.model, compile_model=False, mode=args.mode, backend=args.backend)
+    router.route("warm up")
+
+    runs, confusion, errors = [], None, None
+    for batch_size in args.batch_sizes:
+        metrics, run_confusion, run_errors = evaluate(router, args, batch_size)
+        runs.append(metrics)
+        if confusion is None:
+            confusion, errors = run_confusion, run_errors
+
+        lat = metrics["latency_per_prompt_ms"]
+        print(f"batch {batch_size:>3}: acc {metrics['accuracy']:.1%}  args {metrics['args_exact_match']:.1%}  "
+              f"per-prompt p50 {lat['p50']:.1f}ms p95 {lat['p95']:.1f}ms p99 {lat['p99']:.1f}ms  "
+              f"{metrics['prompts_per_second']:.1f} prompts/s")
+
+    print_confusion(confusion)
+
+    report = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "model": args.model,
+        "mode": router.mode,
+        "backend": router.backend,
+        "data": args.data,
+        "split": args.split,
+        "runs": runs,
+        "confusion_matrix": confusion,
+        "errors": errors,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nWrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Accuracy and latency parity of the router backends against PyTorch.
+
+Runs TEST_PROMPTS from core/router.py through each backend and reports accuracy,
+agreement with the torch backend's (function, arguments) output, and latency.
+
+Usage:
+    python eval_router_backends.py [--backends int8 onnx] [--runs 3]
+"""
+
+import argparse
+import gc
+import time
+
+import numpy as np
+
+from config import LOCAL_ROUTER_PATH
+from core.router import FunctionGemmaRouter, TEST_PROMPTS
+from core.router_backends import ROUTER_BACKENDS
+
+
+def run_backend(backend, runs):
+    """Return (outputs, latencies_ms, load_s) for one backend."""
+    start = time.time()
+    router = FunctionGemmaRouter(model_path=LOCAL_ROUTER_PATH, compile_model=False, backend=backend)
+    load_s = time.time() - start
+    if router.backend != backend:
+        print(f"  {backend} unavailable, skipped")
+        return None, None, None
+
+    router.route("warm up")
+    outputs, latencies = [], []
+    for prompt, _ in TEST_PROMPTS:
+        for _ in range(runs):
+            start = time.perf_counter()
+            result = router.route(prompt)
+            latencies.append((time.perf_counter() - start) * 1000)
+        outputs.append(result)
+
+    del router
+    gc.collect()
+    return outputs, latencies, load_s
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", nargs="+", default=[b for b in ROUTER_BACKENDS if b != "torch"],
+                        choices=ROUTER_BACKENDS)
+    parser.add_argument("--runs", type=int, default=3, help="Timed runs per prompt")
+    args = parser.parse_args()
+
+    results = {}
+    for backend in ["torch"] + [b for b in args.backends if b != "torch"]:
+        print(f"\n[{backend}]")
+        outputs, latencies, load_s = run_backend(backend, args.runs)
+        if outputs is not None:
+            results[backend] = (outputs, latencies, load_s)
+
+    reference = results["torch"][0]
+    print(f"\n{'Backend':<8} {'Load':>7} {'Accuracy':>9} {'Parity':>8} {'Mean':>9} {'p50':>9} {'p95':>9}")
+    print("-" * 64)
+    for backend, (outputs, latencies, load_s) in results.items():
+        accuracy = sum(out[0] == expected for out, (_, expected) in zip(outputs, TEST_PROMPTS)) / len(TEST_PROMPTS)
+        parity = sum(out == ref for out, ref in zip(outputs, reference)) / len(reference)
+        ms = np.array(latencies)
+        print(f"{backend:<8} {load_s:>6.1f}s {accuracy:>9.1%} {parity:>8.1%} "
+              f"{ms.mean():>7.1f}ms {np.percentile(ms, 50):>7.1f}ms {np.percentile(ms, 95):>7.1f}ms")
+
+    mismatches = [
+        (backend, prompt, out, ref)
+        for backend, (outputs, _, _) in results.items() if backend != "torch"
+        for (prompt, _), out, ref in zip(TEST_PROMPTS, outputs, reference) if out != ref
+    ]
+    if mismatches:
+        print("\nMismatches vs torch:")
+        for backend, prompt, out, ref in mismatches:
+            print(f"  [{backend}] {prompt!r}: {out} != {ref}")
+
+
+if __name__ == "__main__":
+    main()
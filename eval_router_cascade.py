@@ -0,0 +1,83 @@
+"""
+Compare the classifier -> router cascade against the full FunctionGemma router.
+
+A deterministic 20% of training_dataset_functions.jsonl is held out, the classifier
+is trained on the rest, and both pipelines are run on the held-out prompts.
+
+Usage:
+    python eval_router_cascade.py [--threshold 0.9] [--no-router]
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from config import INTENT_CLASSIFIER_THRESHOLD, LOCAL_ROUTER_PATH, ROUTER_TRAINING_DATA
+from core.intent_classifier import IntentClassifier, IntentFastPath, is_held_out, load_dataset
+
+
+def summarize(name, results):
+    """Print accuracy and latency for a list of (ok_func, ok_args, ms) tuples."""
+    if not results:
+        print(f"{name:<16} no results")
+        return
+    func_acc = sum(r[0] for r in results) / len(results)
+    args_acc = sum(r[1] for r in results) / len(results)
+    ms = np.array([r[2] for r in results])
+    print(f"{name:<16} func {func_acc:6.1%}  args {args_acc:6.1%}  "
+          f"mean {ms.mean():8.2f}ms  p50 {np.percentile(ms, 50):8.2f}ms  p95 {np.percentile(ms, 95):8.2f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--threshold", type=float, default=INTENT_CLASSIFIER_THRESHOLD)
+    parser.add_argument("--no-router", action="store_true", help="Only evaluate the classifier fast path")
+    args = parser.parse_args()
+
+    examples = load_dataset(ROUTER_TRAINING_DATA)
+    train = [e for e in examples if not is_held_out(e[0])]
+    test = [e for e in examples if is_held_out(e[0])]
+    print(f"Train: {len(train)}  Held out: {len(test)}")
+
+    classifier = IntentClassifier.train([e[0] for e in train], [e[1] for e in train])
+    fast_path = IntentFastPath(classifier, args.threshold)
+
+    router = None
+    if not args.no_router:
+        from core.router import FunctionGemmaRouter
+        router = FunctionGemmaRouter(model_path=LOCAL_ROUTER_PATH, compile_model=False)
+        router.route("warm up")
+
+    fast_results, cascade_results, router_results = [], [], []
+    for prompt, func, expected_args in test:
+        start = time.perf_counter()
+        result = fast_path.route(prompt)
+        fast_ms = (time.perf_counter() - start) * 1000
+
+        if result is not None:
+            ok = (result[0] == func, result == (func, expected_args), fast_ms)
+            fast_results.append(ok)
+            cascade_results.append(ok)
+
+        if router is None:
+            continue
+
+        start = time.perf_counter()
+        routed = router.route(prompt)
+        router_ms = (time.perf_counter() - start) * 1000
+        router_results.append((routed[0] == func, routed == (func, expected_args), router_ms))
+
+        if result is None:
+            cascade_results.append((routed[0] == func, routed == (func, expected_args), fast_ms + router_ms))
+
+    print(f"\nThreshold {args.threshold}: fast path handled {len(fast_results)}/{len(test)} "
+          f"({len(fast_results) / len(test):.1%}) of held-out prompts\n")
+    summarize("Fast path only", fast_results)
+    if router is not None:
+        summarize("Cascade", cascade_results)
+        summarize("Router", router_results)
+
+
+if __name__ == "__main__":
+    main()
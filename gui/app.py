@@ -5,7 +5,7 @@ Main PySide6 application setup and layout using Fluent Widgets.
 import threading
 import sys
 from PySide6.QtWidgets import QApplication, QWidget, QVBoxLayout
-from PySide6.QtCore import Qt, QSize, QThread
+from PySide6.QtCore import Qt, QSize, QThread, QEvent
 from PySide6.QtGui import QIcon
 
 from qfluentwidgets import (
@@ -15,6 +15,8 @@ from qfluentwidgets import (
 
 from gui.handlers import ChatHandlers
 from core.model_manager import unload_all_models
+from core.history import history_manager
+from core.memory_index import memory_index
 from core.voice_assistant import voice_assistant
 from core.tts import tts
 from config import VOICE_ASSISTANT_ENABLED, GREEN, RESET
@@ -239,6 +241,7 @@ class MainWindow(FluentWindow):
         self._chat_signals_connected = True
         self.chat_tab.new_chat_requested.connect(self.handlers.clear_chat)
         self.chat_tab.send_message_requested.connect(self._on_send)
+        self.chat_tab.draft_changed.connect(self.handlers.speculate)
         self.chat_tab.stop_generation_requested.connect(self.handlers.stop_generation)
         self.chat_tab.tts_toggled.connect(self.handlers.toggle_tts)
         self.chat_tab.session_selected.connect(self._on_session_clicked)
@@ -246,6 +249,7 @@ class MainWindow(FluentWindow):
         self.chat_tab.session_pin_requested.connect(self.handlers.pin_session)
         self.chat_tab.session_rename_requested.connect(self.handlers.rename_session)
         self.chat_tab.session_delete_requested.connect(self.handlers.delete_session)
+        self.chat_tab.older_messages_requested.connect(self.handlers.load_older_messages)
         
         # Initial sidebar refresh
         self.chat_tab.refresh_sidebar()
@@ -261,6 +265,8 @@ class MainWindow(FluentWindow):
     def _init_background(self):
         """Initialize app status."""
         self.set_status("Ready")
+        # Embed history, tasks and events added since the last run
+        memory_index.schedule_sync()
     
     def _init_system_monitor(self):
         """Add system monitor widget to the title bar, centered with controls on the right."""
@@ -329,6 +335,9 @@ class MainWindow(FluentWindow):
     def add_streaming_widgets(self, thinking_ui, search_indicator, response_bubble):
         if self.chat_tab: self.chat_tab.add_streaming_widgets(thinking_ui, search_indicator, response_bubble)
     
+    def prepend_message_bubbles(self, messages: list):
+        if self.chat_tab: self.chat_tab.prepend_message_bubbles(messages)
+    
     def clear_chat_display(self):
         if self.chat_tab: self.chat_tab.clear_chat_display()
     
@@ -338,6 +347,22 @@ class MainWindow(FluentWindow):
     def scroll_to_bottom(self):
         if self.chat_tab: self.chat_tab.scroll_to_bottom()
 
+    def showEvent(self, event):
+        """Resume status polling when the window is shown again."""
+        super().showEvent(event)
+        self.system_monitor.set_paused(False)
+
+    def hideEvent(self, event):
+        """Nothing shows the status while hidden, so stop polling."""
+        super().hideEvent(event)
+        self.system_monitor.set_paused(True)
+
+    def changeEvent(self, event):
+        """Pause status polling while minimized."""
+        super().changeEvent(event)
+        if event.type() == QEvent.Type.WindowStateChange:
+            self.system_monitor.set_paused(self.isMinimized())
+
     def closeEvent(self, event):
         """Handle application close event."""
         print("[App] Closing application, unloading models...")
@@ -348,6 +373,10 @@ class MainWindow(FluentWindow):
             voice_assistant.stop()
         
         unload_all_models(sync=True)
+        
+        memory_index.close()
+        # Commit chat messages still queued by the history writer
+        history_manager.close()
         event.accept()
 
 
@@ -3,13 +3,13 @@ System Monitor Component - Displays CPU, RAM, GPU usage and running Ollama model
 """
 
 import psutil
-import requests
 from PySide6.QtWidgets import QWidget, QHBoxLayout, QLabel, QFrame
 from PySide6.QtCore import QTimer, Qt, QObject, Signal, QThread
 from PySide6.QtGui import QFont
 
-from config import OLLAMA_URL
-from core.llm import is_router_loaded
+from core.ollama_status import ollama_status
+from core.metrics import llm_metrics
+from core.llm import is_router_loaded, get_route_cache_stats, get_speculation_stats
 
 # Try to import pynvml for GPU monitoring
 try:
@@ -61,24 +61,15 @@ class MonitorWorker(QObject):
             else:
                 stats['gpu'] = None
 
-            # Ollama Models
-            try:
-                response = requests.get(f"{OLLAMA_URL}/ps", timeout=2)
-                if response.status_code == 200:
-                    data = response.json()
-                    models = data.get("models", [])
-                    if models:
-                        model_names = [m.get("name", "?").split(":")[0] for m in models]
-                        stats['models'] = model_names
-                    else:
-                        stats['models'] = []
-                else:
-                    stats['models'] = "Offline"
-            except Exception:
-                stats['models'] = "Offline"
-            
             # Local Router Model (Gemma)
             stats['router_loaded'] = is_router_loaded()
+            
+            # Route cache counters
+            stats['route_cache'] = get_route_cache_stats()
+            stats['speculation'] = get_speculation_stats()
+            
+            # Responder throughput / latency over the last hour
+            stats['llm'] = llm_metrics.summary()
 
             self.stats_updated.emit(stats)
         except Exception as e:
@@ -88,15 +79,22 @@ class MonitorWorker(QObject):
 class SystemMonitor(QFrame):
     """
     A status bar showing system resource usage and running models.
-    Updates every 3 seconds via background thread.
+    Resource stats update every 3 seconds via background thread; running models
+    update when the shared Ollama status service reports a change.
     """
+    models_changed = Signal(object)
     
     def __init__(self, parent=None):
         super().__init__(parent)
         self.setObjectName("systemMonitor")
+        self._models = []
+        self._router_loaded = False
         self._setup_ui()
         self._init_worker()
         self._init_voice_indicator()
+        self.models_changed.connect(self._on_models_changed)
+        # Called from the status poller thread; the signal hops to the GUI thread
+        self._unsubscribe_models = ollama_status.subscribe(self.models_changed.emit)
     
     def _setup_ui(self):
         """Build the monitor UI."""
@@ -199,6 +197,19 @@ class SystemMonitor(QFrame):
         models_container.addWidget(self.models_value)
         layout.addLayout(models_container)
         
+        # Route cache
+        cache_container = QHBoxLayout()
+        cache_container.setSpacing(4)
+        cache_icon = QLabel("⚡")
+        cache_icon.setFixedWidth(20)
+        cache_container.addWidget(cache_icon)
+        cache_label = QLabel("Route cache:")
+        cache_container.addWidget(cache_label)
+        self.cache_value = QLabel("0%")
+        self.cache_value.setObjectName("valueLabel")
+        cache_container.addWidget(self.cache_value)
+        layout.addLayout(cache_container)
+        
         # Voice listening indicator (simple glowing bar)
         self.voice_indicator = QFrame()
         self.voice_indicator.setFixedSize(4, 20)
@@ -272,6 +283,20 @@ class SystemMonitor(QFrame):
         # Initial call
         QTimer.singleShot(100, self.worker.collect)
 
+    def set_paused(self, paused: bool):
+        """Stop all polling while the window is hidden or minimized."""
+        if paused:
+            self.timer.stop()
+        elif not self.timer.isActive():
+            self.timer.start(3000)
+            QTimer.singleShot(0, self.worker.collect)
+        ollama_status.set_paused(paused)
+
+    def _on_models_changed(self, models):
+        """Running Ollama models changed (None while Ollama is offline)."""
+        self._models = None if models is None else [m.get("name", "?").split(":")[0] for m in models]
+        self._render_models()
+
     def _on_stats_updated(self, stats):
         """Update UI with new stats from worker."""
         # CPU
@@ -303,23 +328,38 @@ class SystemMonitor(QFrame):
              self.vram_value.setText("Error")
              
         # Models
-        models = stats.get('models', [])
-        router_loaded = stats.get('router_loaded', False)
+        self._router_loaded = stats.get('router_loaded', False)
+        self._render_models()
+        self.models_value.setToolTip(self._llm_tooltip(stats.get('llm')))
         
+        # Route cache
+        cache = stats.get('route_cache')
+        if cache:
+            self.cache_value.setText(f"{cache['hit_rate'] * 100:.0f}% ({cache['hits']}/{cache['hits'] + cache['misses']})")
+            self.cache_value.setToolTip(
+                f"Hits: {cache['hits']}  Misses: {cache['misses']}\n"
+                f"Evictions: {cache['evictions']}  Expired: {cache['expirations']}\n"
+                f"Bypassed (time-relative): {cache['bypassed']}\n"
+                f"Size: {cache['size']}/{cache['max_size']}"
+                + self._speculation_tooltip(stats.get('speculation'))
+            )
+
+    def _render_models(self):
+        """Show the running Ollama models plus the local router."""
+        models = self._models
         display_parts = []
         
         # Add Ollama models
-        if isinstance(models, list):
-            if models:
-                if len(models) <= 2:
-                    display_parts.extend(models)
-                else:
-                    display_parts.append(f"{models[0]} +{len(models)-1}")
-        elif models == "Offline":
+        if models is None:
             display_parts.append("Ollama Offline")
+        elif models:
+            if len(models) <= 2:
+                display_parts.extend(models)
+            else:
+                display_parts.append(f"{models[0]} +{len(models)-1}")
         
         # Add local router
-        if router_loaded:
+        if self._router_loaded:
             display_parts.append("gemma")
         
         if display_parts:
@@ -327,6 +367,32 @@ class SystemMonitor(QFrame):
         else:
             self.models_value.setText("None")
 
+    @staticmethod
+    def _llm_tooltip(llm) -> str:
+        """Tooltip with the responder's rolling speed and latency."""
+        if not llm or not llm['requests']:
+            return "No responses in the last hour"
+        ms = lambda v: f"{v:.0f}ms" if v is not None else "-"
+        return (
+            f"Last hour: {llm['requests']} responses\n"
+            f"Generation: {llm['tokens_per_second']:.1f} tok/s  "
+            f"Prefill: {llm['prefill_tokens_per_second']:.0f} tok/s\n"
+            f"TTFT p50/p95: {ms(llm['ttft_ms_p50'])} / {ms(llm['ttft_ms_p95'])}\n"
+            f"Request to first token p50/p95: {ms(llm['first_token_ms_p50'])} / {ms(llm['first_token_ms_p95'])}"
+        )
+
+    @staticmethod
+    def _speculation_tooltip(spec) -> str:
+        """Tooltip lines for speculative routing in the chat tab."""
+        if not spec:
+            return ""
+        sends = spec['hits'] + spec['misses']
+        return (
+            f"\n\nSpeculative routes used: {spec['hits']}/{sends} sends ({spec['hit_rate'] * 100:.0f}%)\n"
+            f"Saved: {spec['saved_ms'] / 1000:.1f}s total, {spec['avg_saved_ms']:.0f}ms per hit\n"
+            f"Drafts routed: {spec['routed']}  Superseded: {spec['superseded']}  Stale: {spec['stale']}"
+        )
+
     def _color_by_usage(self, label: QLabel, percent: float):
         """Color the label based on usage percentage."""
         if percent >= 90:
@@ -341,6 +407,8 @@ class SystemMonitor(QFrame):
 
     def __del__(self):
         """Cleanup thread."""
+        if hasattr(self, '_unsubscribe_models'):
+            self._unsubscribe_models()
         if hasattr(self, 'monitor_thread'):
             self.monitor_thread.quit()
             self.monitor_thread.wait()
@@ -1,15 +1,25 @@
 from PySide6.QtCore import QObject, Signal, QThread, QTimer
-import json
 import re
+import threading
 
-from config import RESPONDER_MODEL, OLLAMA_URL, MAX_HISTORY
-from core.llm import route_query, should_bypass_router, http_session
+from config import MAX_HISTORY, HISTORY_PAGE_SIZE, PIPELINE_MODE, NATIVE_TOOLS_TIER, GRAY, RESET
+from core.llm import (
+    route_query_multi, should_bypass_router, speculative_router, start_responder_warmup, warm_responder
+)
+from core.ollama_client import ollama, ThinkingChunk, ContentChunk, DoneStats
+from core.ollama_status import ollama_status
+from core.context_window import ContextWindow, summarize_with_model
+from core.context_builder import build_context_message
+from core.response_cache import response_cache, is_cacheable, replay
 from core.tts import tts, SentenceBuffer
 from core.history import history_manager
-from core.model_manager import ensure_exclusive_qwen
-from core.model_persistence import ensure_qwen_loaded, mark_qwen_used
+from core.model_tiers import FAST, model_for_tier, select_responder, keep_alive_for, mark_model_used
+from core.native_tools import run_native
 from core.settings_store import settings as app_settings
 from core.function_executor import executor as function_executor
+from core.timing import StageTimer
+from core.metrics import llm_metrics
+from core.memory_index import memory_index
 
 # Functions that are actions (not passthrough)
 ACTION_FUNCTIONS = {"control_light", "set_timer", "set_alarm", "create_calendar_event", "add_task", "web_search"}
@@ -18,6 +28,17 @@ ACTION_FUNCTIONS = {"control_light", "set_timer", "set_alarm", "create_calendar_
 # DEBUG: Set to True to test streaming without TTS blocking
 DEBUG_SKIP_TTS = False
 
+# Keeps chat history under the token budget without shifting the prompt prefix every turn
+chat_context = ContextWindow(summarizer=summarize_with_model, name="Chat")
+
+
+def _overlap(older: list, newer: list) -> int:
+    """Length of the longest tail of older that newer starts with."""
+    for k in range(min(len(older), len(newer)), 0, -1):
+        if older[-k:] == newer[:k]:
+            return k
+    return 0
+
 
 class ChatWorker(QObject):
     """Background worker for LLM processing with Qt signals."""
@@ -48,19 +69,51 @@ class ChatWorker(QObject):
         self.current_session_id = current_session_id
         self.stop_event = stop_event
         self.full_response = ""
+        self.timer = None
+        self.model = None
+        self.function = None  # Routed function(s), for the metrics
+        self._responder_ready = None
+        self._memory = None  # Future of the memory lookup, started with routing
         
     def process(self):
         """Background processing method."""
+        self.timer = StageTimer("Chat")
+        native = app_settings.get("pipeline.mode", PIPELINE_MODE) == "native"
+        # Ready the responder while routing and tools run; waited on before the first token
+        tier = NATIVE_TOOLS_TIER if native else FAST
+        self.model = model_for_tier(tier)
+        self._start_warmup(tier)
         try:
-            if should_bypass_router(self.user_text):
-                func_name = "nonthinking"
-                params = {"prompt": self.user_text}
-            else:
-                self.status.emit("Routing...")
-                func_name, params = route_query(self.user_text)
+            if native:
+                self._process_native()
+                return
+            # Earlier chats, tasks and events about the question, embedded while routing runs
+            self._memory = memory_index.lookup(self.user_text, [m['content'] for m in self.messages] + [self.user_text])
+            
+            with self.timer.stage("route"):
+                if should_bypass_router(self.user_text):
+                    calls = [("nonthinking", {"prompt": self.user_text})]
+                else:
+                    self.status.emit("Routing...")
+                    # Usually already routed while the message was being typed
+                    calls = speculative_router.take(self.user_text) if speculative_router else None
+                    if calls is None:
+                        calls = route_query_multi(self.user_text)
+            func_name, params = calls[0]
+            self.function = ",".join(name for name, _ in calls)
+            
+            # The routed functions decide the responder tier
+            tier, model = select_responder(calls)
+            if model != self.model:
+                self.model = model
+                self._start_warmup(tier)
+            
+            # Compound command: run the calls together, answer once
+            if len(calls) > 1:
+                self._execute_multiple(calls)
             
             # Handle action functions
-            if func_name in ACTION_FUNCTIONS:
+            elif func_name in ACTION_FUNCTIONS:
                 self.status.emit(f"Executing {func_name}...")
                 
                 # Emit search start for web_search
@@ -68,24 +121,14 @@ class ChatWorker(QObject):
                     query = params.get("query", "")
                     self.search_start.emit(query)
                 
-                result = function_executor.execute(func_name, params)
+                with self.timer.stage("execute"):
+                    result = function_executor.execute(func_name, params)
                 
                 # Emit search end for web_search
                 if func_name == "web_search":
                     self.search_end.emit()
                 
-                # Emit toast notification
-                self.toast.emit(result["message"], result["success"])
-                
-                # Emit GUI update signals for specific actions
-                if func_name == "set_timer" and result["success"]:
-                    seconds = result.get("data", {}).get("seconds", 0)
-                    label = result.get("data", {}).get("label", "Timer")
-                    self.set_timer_signal.emit(seconds, label)
-                elif func_name == "set_alarm" and result["success"]:
-                    self.reload_alarms.emit()
-                elif func_name == "create_calendar_event" and result["success"]:
-                    self.reload_calendar.emit()
+                self._emit_action_signals(func_name, result)
                 
                 # Enable thinking for web_search
                 enable_thinking = (func_name == "web_search")
@@ -96,7 +139,8 @@ class ChatWorker(QObject):
             # Handle get_system_info (context query)
             elif func_name == "get_system_info":
                 self.status.emit("Gathering system info...")
-                result = function_executor.execute(func_name, params)
+                with self.timer.stage("execute"):
+                    result = function_executor.execute(func_name, params)
                 
                 # Generate Qwen response with full system context
                 self._generate_response_with_context(func_name, result, enable_thinking=True)
@@ -114,192 +158,184 @@ class ChatWorker(QObject):
             self.error.emit(str(e))
         
         finally:
+            print(f"{GRAY}[Timing] {self.timer.summary()}{RESET}")
             self.done.emit()
     
-    def _generate_response_with_context(self, func_name: str, result: dict, enable_thinking: bool = False):
-        """Generate a Qwen response with function result as context."""
-        # Build system message with context
-        if func_name == "get_system_info" and result.get("success"):
-            data = result.get("data", {})
-            context_parts = []
-            
-            if data.get("timers"):
-                context_parts.append(f"Active timers: {data['timers']}")
-            if data.get("alarms"):
-                context_parts.append(f"Alarms: {data['alarms']}")
-            if data.get("calendar_today"):
-                context_parts.append(f"Today's events: {data['calendar_today']}")
-            if data.get("tasks"):
-                pending = [t for t in data['tasks'] if not t.get('completed')]
-                context_parts.append(f"Pending tasks: {len(pending)} items")
-            if data.get("smart_devices"):
-                on_devices = [d['name'] for d in data['smart_devices'] if d.get('is_on')]
-                context_parts.append(f"Devices on: {on_devices if on_devices else 'none'}")
-            if data.get("weather"):
-                w = data['weather']
-                context_parts.append(f"Weather: {w.get('temp')}°F, {w.get('condition')}")
-            if data.get("news"):
-                news_items = data['news']
-                if news_items:
-                    news_titles = [item.get('title', '')[:50] for item in news_items[:3]]
-                    context_parts.append(f"Top news: {', '.join(news_titles)}")
-            
-            context_msg = "SYSTEM CONTEXT:\n" + "\n".join(context_parts) if context_parts else ""
-        else:
-            # Action function result
-            status = "succeeded" if result.get("success") else "failed"
-            
-            # Special handling for web_search to include full results
-            if func_name == "web_search" and result.get("success") and result.get("data"):
-                search_data = result.get("data", {})
-                query = search_data.get("query", "")
-                results = search_data.get("results", [])
-                
-                if results:
-                    context_msg = f"SEARCH RESULTS for '{query}':\n\n"
-                    for i, r in enumerate(results, 1):
-                        title = r.get("title", "")
-                        body = r.get("body", "")
-                        url = r.get("url", "")
-                        context_msg += f"{i}. {title}\n"
-                        context_msg += f"   {body}\n"
-                        context_msg += f"   URL: {url}\n\n"
-                    context_msg += "Use the above search results to answer the user's question. Include relevant URLs in your response using markdown link format [text](url)."
-                else:
-                    context_msg = f"ACTION RESULT: {func_name} {status}. {result.get('message', '')}"
-            else:
-                context_msg = f"ACTION RESULT: {func_name} {status}. {result.get('message', '')}"
-        
-        # Prepare messages with context
-        max_hist = app_settings.get("general.max_history", MAX_HISTORY)
-        if len(self.messages) > max_hist:
-            self.messages = [self.messages[0]] + self.messages[-(max_hist-1):]
-        
-        # Add context as system message and user's original question
-        context_prompt = f"{context_msg}\n\nUser asked: {self.user_text}\n\nRespond naturally and concisely."
-        self.messages.append({'role': 'user', 'content': context_prompt})
+    def _start_warmup(self, tier: str):
+        """Start loading self.model in the background."""
+        model = self.model
+        warm = self.timer.wrap(f"warmup_{tier}", lambda: warm_responder(model))
+        self._responder_ready = start_responder_warmup(warm)
+    
+    def _wait_for_responder(self):
+        """Block until the latest background warm-up has finished."""
+        with self.timer.stage("wait_responder"):
+            try:
+                self._responder_ready.result()
+            except Exception as e:
+                # Streaming will surface a real failure; a failed warm-up only costs latency
+                print(f"{GRAY}[ChatWorker] Responder warm-up failed: {e}{RESET}")
+        mark_model_used(self.model)
+    
+    def _first_token_ms(self):
+        """Time from the user's send to the first streamed token, if there was one."""
+        return self.timer.stages().get("first_token", {}).get("at_ms") if self.timer else None
+    
+    def _emit_action_signals(self, func_name: str, result: dict):
+        """Toast the result of an action and notify the GUI pages it affects."""
+        self.toast.emit(result["message"], result["success"])
+        
+        if func_name == "set_timer" and result["success"]:
+            seconds = result.get("data", {}).get("seconds", 0)
+            label = result.get("data", {}).get("label", "Timer")
+            self.set_timer_signal.emit(seconds, label)
+        elif func_name == "set_alarm" and result["success"]:
+            self.reload_alarms.emit()
+        elif func_name == "create_calendar_event" and result["success"]:
+            self.reload_calendar.emit()
+    
+    def _process_native(self):
+        """Single-hop pipeline: the responder calls the tools itself (settings "pipeline.mode")."""
+        self.messages.append({'role': 'user', 'content': self.user_text})
+        chat_context.fit(self.messages, app_settings.get("general.max_history", MAX_HISTORY), model=self.model)
         
         self.ui_update.emit()
+        self.status.emit("Generating...")
+        self._wait_for_responder()
+        
+        events = run_native(self.model, self.messages, self._execute_native_calls,
+                            keep_alive=keep_alive_for(self.model), stop_event=self.stop_event)
+        self._stream_chat(self.model, False, events=events)
+    
+    def _execute_native_calls(self, calls: list) -> list:
+        """Run the tool calls the responder asked for and describe each result for it."""
+        results = self._run_calls(calls)
         self.status.emit("Generating response...")
+        return [self._build_context_message(name, result) for (name, _), result in zip(calls, results)]
+    
+    def _run_calls(self, calls: list) -> list:
+        """Execute calls concurrently, with search and action signals for the UI."""
+        self.status.emit(f"Executing {', '.join(name for name, _ in calls)}...")
         
-        model = app_settings.get("models.chat", RESPONDER_MODEL)
-        ensure_qwen_loaded()  # Use persistence manager
-        mark_qwen_used()
-        ensure_exclusive_qwen(model)
-        ollama_url = app_settings.get("ollama_url", OLLAMA_URL)
-        
-        payload = {
-            "model": model,
-            "messages": self.messages,
-            "stream": True,
-            "think": enable_thinking,  # Enable thinking for web_search
-            "keep_alive": "5m"  # Longer keep-alive for voice assistant
-        }
+        searches = [params.get("query", "") for name, params in calls if name == "web_search"]
+        if searches:
+            self.search_start.emit(", ".join(searches))
         
-        sentence_buffer = SentenceBuffer()
-        self.full_response = ""
-        self.think_start.emit(enable_thinking)
+        with self.timer.stage("execute"):
+            results = function_executor.execute_many(calls)
         
-        with http_session.post(f"{ollama_url}/api/chat", json=payload, stream=True) as r:
-            r.raise_for_status()
-            
-            for line in r.iter_lines():
-                if self.stop_event.is_set():
-                    break
-                    
-                if line:
-                    try:
-                        chunk = json.loads(line.decode('utf-8'))
-                        msg = chunk.get('message', {})
-                        
-                        # Handle thinking chunks (for web_search)
-                        if 'thinking' in msg and msg['thinking']:
-                            thought = msg['thinking']
-                            self.thought_chunk.emit(thought)
-                        
-                        if 'content' in msg and msg['content']:
-                            content = msg['content']
-                            self.full_response += content
-                            self.response_chunk.emit(content)
-                            
-                            if self.is_tts_enabled and not DEBUG_SKIP_TTS:
-                                sentences = sentence_buffer.add(content)
-                                for s in sentences:
-                                    tts.queue_sentence(s)
-                    except:
-                        continue
+        if searches:
+            self.search_end.emit()
         
-        self.think_end.emit()
+        for (func_name, _), result in zip(calls, results):
+            if func_name in ACTION_FUNCTIONS:
+                self._emit_action_signals(func_name, result)
+        return results
+    
+    def _execute_multiple(self, calls: list):
+        """Execute several routed calls concurrently and generate one combined response."""
+        results = self._run_calls(calls)
         
-        if self.is_tts_enabled and not DEBUG_SKIP_TTS and not self.stop_event.is_set():
-            rem = sentence_buffer.flush()
-            if rem:
-                tts.queue_sentence(rem)
+        context_msg = "\n\n".join(
+            self._build_context_message(func_name, result)
+            for (func_name, _), result in zip(calls, results)
+        )
+        enable_thinking = any(name in ("web_search", "get_system_info") for name, _ in calls)
+        self._respond_with_context(context_msg, enable_thinking)
+    
+    def _generate_response_with_context(self, func_name: str, result: dict, enable_thinking: bool = False):
+        """Generate a Qwen response with function result as context."""
+        self._respond_with_context(self._build_context_message(func_name, result), enable_thinking)
+    
+    def _build_context_message(self, func_name: str, result: dict) -> str:
+        """Describe a function result for the responder (token-budgeted, ranked by the question)."""
+        return build_context_message(func_name, result, self.user_text)
+    
+    def _respond_with_context(self, context_msg: str, enable_thinking: bool = False):
+        """Stream a Qwen response to the user's question with the given context."""
+        # Add context as system message and user's original question
+        context_prompt = f"{context_msg}\n\nUser asked: {self.user_text}\n\nRespond naturally and concisely."
+        self.messages.append({'role': 'user', 'content': context_prompt})
+        chat_context.fit(self.messages, app_settings.get("general.max_history", MAX_HISTORY), model=self.model)
         
-        self.messages.append({'role': 'assistant', 'content': self.full_response})
+        self.ui_update.emit()
+        self.status.emit("Generating response...")
         
-        if self.current_session_id:
-            history_manager.add_message(self.current_session_id, "assistant", self.full_response)
+        model = self.model
+        self._wait_for_responder()
+        
+        self._stream_chat(model, enable_thinking)
     
     def _stream_qwen_response(self, enable_thinking: bool):
         """Stream a direct Qwen response (for thinking/nonthinking)."""
-        max_hist = app_settings.get("general.max_history", MAX_HISTORY)
-        if len(self.messages) > max_hist:
-            self.messages = [self.messages[0]] + self.messages[-(max_hist-1):]
-        
         self.messages.append({'role': 'user', 'content': self.user_text})
+        chat_context.fit(self.messages, app_settings.get("general.max_history", MAX_HISTORY), model=self.model)
         
         self.ui_update.emit()
+        
+        model = self.model
+        system_prompt = self.messages[0]['content']
+        
+        # Started with routing; usually ready by now. Checked before the cache: an answer
+        # cached before these memories existed would ignore them
+        with self.timer.stage("memory"):
+            memory = self._memory.result() if self._memory else ""
+        
+        use_cache = (not enable_thinking and not memory and app_settings.get("general.response_cache", False)
+                     and is_cacheable(self.user_text, self.messages))
+        if use_cache:
+            cached = response_cache.get(model, self.user_text, system_prompt)
+            if cached is not None:
+                self.status.emit("Answering from cache...")
+                self._stream_chat(model, False, events=replay(cached))
+                return
+        
+        if memory:
+            self.messages[-1] = {'role': 'user', 'content': f"{memory}\n\nUser asked: {self.user_text}"}
+            chat_context.fit(self.messages, app_settings.get("general.max_history", MAX_HISTORY), model=self.model)
+        
         self.status.emit("Generating...")
+        self._wait_for_responder()
         
-        model = app_settings.get("models.chat", RESPONDER_MODEL)
-        ensure_qwen_loaded()  # Use persistence manager
-        mark_qwen_used()
-        ensure_exclusive_qwen(model)
-        ollama_url = app_settings.get("ollama_url", OLLAMA_URL)
-        
-        payload = {
-            "model": model,
-            "messages": self.messages,
-            "stream": True,
-            "think": enable_thinking,
-            "keep_alive": "5m"  # Longer keep-alive for voice assistant
-        }
+        self._stream_chat(model, enable_thinking)
         
+        if use_cache and not self.stop_event.is_set():
+            response_cache.put(model, self.user_text, system_prompt, self.full_response)
+    
+    def _stream_chat(self, model: str, enable_thinking: bool, events=None):
+        """
+        Stream the reply to self.messages into the UI (and TTS), then save it.
+        events replaces the Ollama stream (e.g. a cached response being replayed).
+        """
         sentence_buffer = SentenceBuffer()
         self.full_response = ""
         self.think_start.emit(enable_thinking)
-
-        with http_session.post(f"{ollama_url}/api/chat", json=payload, stream=True) as r:
-            r.raise_for_status()
-            
-            for line in r.iter_lines():
-                if self.stop_event.is_set():
-                    break
-                    
-                if line:
-                    try:
-                        chunk = json.loads(line.decode('utf-8'))
-                        msg = chunk.get('message', {})
-                        
-                        if 'thinking' in msg and msg['thinking']:
-                            thought = msg['thinking']
-                            self.thought_chunk.emit(thought)
-                            
-                        if 'content' in msg and msg['content']:
-                            content = msg['content']
-                            self.full_response += content
-                            self.response_chunk.emit(content)
-                            
-                            if self.is_tts_enabled and not DEBUG_SKIP_TTS:
-                                sentences = sentence_buffer.add(content)
-                                for s in sentences:
-                                    tts.queue_sentence(s)
-                                    
-                    except:
-                        continue
+        
+        live = events is None
+        if live:
+            events = ollama.chat_stream(model, self.messages, think=enable_thinking,
+                                        keep_alive=keep_alive_for(model), stop_event=self.stop_event)
+        recorder = llm_metrics.stream("chat", model, self.function)
+        for event in events:
+            recorder.observe(event)  # Before the stop check, so a cancelled DoneStats is seen
+            if self.stop_event.is_set():
+                break
+            if self.timer and isinstance(event, (ThinkingChunk, ContentChunk)):
+                self.timer.mark("first_token")
+            if isinstance(event, DoneStats):
+                chat_context.record(self.messages, event)
+            elif isinstance(event, ThinkingChunk):
+                self.thought_chunk.emit(event.text)
+            elif isinstance(event, ContentChunk):
+                self.full_response += event.text
+                self.response_chunk.emit(event.text)
+                
+                if self.is_tts_enabled and not DEBUG_SKIP_TTS:
+                    for s in sentence_buffer.add(event.text):
+                        tts.queue_sentence(s)
         
         self.think_end.emit()
+        recorder.finish(self._first_token_ms(), cancelled=live and self.stop_event.is_set())
         
         if self.is_tts_enabled and not DEBUG_SKIP_TTS and not self.stop_event.is_set():
             rem = sentence_buffer.flush()
@@ -310,10 +346,14 @@ class ChatWorker(QObject):
         
         if self.current_session_id:
             history_manager.add_message(self.current_session_id, "assistant", self.full_response)
+        memory_index.schedule_sync()  # Index this turn (and any task or event it created)
 
 
 class ChatHandlers(QObject):
     """Encapsulates all chat-related event handlers and state."""
+
+    # A page of messages read off the GUI thread: session id, before id, messages
+    _messages_loaded = Signal(str, object, object)
     
     def __init__(self, main_window):
         super().__init__(main_window)
@@ -329,6 +369,12 @@ class ChatHandlers(QObject):
         self._worker = None
         self._thread = None
         
+        # Paging of the loaded session (older messages load when scrolled to the top)
+        self._oldest_loaded_id = None
+        self._more_messages = False
+        self._messages_request = None  # (session id, before id) of the page being read
+        self._messages_loaded.connect(self._on_messages_loaded)
+        
         self.streaming_state = {
             'response_bubble': None,
             'thinking_ui': None,
@@ -356,14 +402,16 @@ class ChatHandlers(QObject):
         # If deleting the current session, clear the chat
         if session_id == self.current_session_id:
             self.current_session_id = None
+            self._more_messages = False
+            self._messages_request = None
             self.messages = [self.messages[0]]  # Keep system prompt
             self.main_window.clear_chat_display()
         
         self.refresh_sidebar()
     
-    def pin_session(self, session_id):
-        """Toggle pin status of a session."""
-        is_pinned = history_manager.toggle_pin(session_id)
+    def pin_session(self, session_id, is_pinned: bool):
+        """Pin or unpin a session."""
+        history_manager.set_pinned(session_id, is_pinned)
         status = "Chat pinned" if is_pinned else "Chat unpinned"
         self.main_window.set_status(status)
         self.refresh_sidebar()
@@ -374,30 +422,62 @@ class ChatHandlers(QObject):
         self.refresh_sidebar()
 
     def load_session(self, session_id):
-        """Load a specific chat session."""
+        """Load a specific chat session (its newest page; older pages load on scroll)."""
         self.current_session_id = session_id
-        db_messages = history_manager.get_messages(session_id)
+        self._oldest_loaded_id = None
+        self._more_messages = False
         
         # Reset message context (keep system prompt)
         self.messages = [self.messages[0]]
         self.main_window.clear_chat_display()
-        
-        for msg in db_messages:
-            role = msg['role']
-            content = msg['content']
-            
-            # Reconstruct LLM context
-            self.messages.append({'role': role, 'content': content})
-            
-            # Reconstruct UI bubbles
-            self.main_window.add_message_bubble(role, content)
+        self._read_messages(session_id)
         
         self.refresh_sidebar()  # Update highlight
 
+    def load_older_messages(self):
+        """Show the next older page of the current session above the loaded messages."""
+        if not (self.current_session_id and self._more_messages) or self._messages_request:
+            return
+        self._read_messages(self.current_session_id, self._oldest_loaded_id)
+
+    def _read_messages(self, session_id, before_id=None):
+        """Read a page of messages on a worker thread (reads wait for queued writes to commit)."""
+        self._messages_request = (session_id, before_id)
+
+        def run():
+            try:
+                page = history_manager.get_messages(session_id, before_id=before_id, limit=HISTORY_PAGE_SIZE)
+            except Exception as e:
+                print(f"{GRAY}[Chat] Failed to load messages: {e}{RESET}")
+                page = []
+            self._messages_loaded.emit(session_id, before_id, page)
+
+        threading.Thread(target=run, name="HistoryRead", daemon=True).start()
+
+    def _on_messages_loaded(self, session_id, before_id, page):
+        if (session_id, before_id) != self._messages_request or session_id != self.current_session_id:
+            return  # Superseded by another session or a new chat
+        self._messages_request = None
+        self._more_messages = len(page) == HISTORY_PAGE_SIZE
+        if not page:
+            return
+        self._oldest_loaded_id = page[0]['id']
+        if before_id is None:
+            # Newest page: the LLM context. It goes in front of turns sent while it was
+            # loading (in place, a running worker appends its reply to this list), minus
+            # those the read already saw. Older pages are display only, since the model's
+            # context is the newest page, trimmed by ContextWindow anyway
+            sent = [(m['role'], m['content']) for m in self.messages[1:]]
+            loaded = [(m['role'], m['content']) for m in page]
+            page = page[:len(page) - _overlap(loaded, sent)]
+            self.messages[1:1] = [{'role': m['role'], 'content': m['content']} for m in page]
+        self.main_window.prepend_message_bubbles(page)
+
     def init_new_session(self, first_message):
         """Create a new session in DB."""
         title = first_message[:30] + "..." if len(first_message) > 30 else first_message
         self.current_session_id = history_manager.create_session(title=title)
+        self._more_messages = False
         return self.current_session_id
     
     def _on_think_start(self, thinking_enabled: bool):
@@ -510,11 +590,13 @@ class ChatHandlers(QObject):
         """Switch UI to generating mode."""
         self.streaming_state['is_generating'] = True
         self.main_window.set_generating_state(True)
+        ollama_status.set_active("chat", True)
 
     def _end_generation_state(self):
         """Switch UI back to idle mode."""
         self.streaming_state['is_generating'] = False
         self.main_window.set_generating_state(False)
+        ollama_status.set_active("chat", False)
 
     def stop_generation(self):
         """Stop current generation."""
@@ -524,6 +606,15 @@ class ChatHandlers(QObject):
             self.main_window.set_status("Stopping...")
             self.ui_throttle_timer.stop()
 
+    def speculate(self, text: str):
+        """Route the chat draft in the background so the decision is ready at send time."""
+        if speculative_router is None or self.streaming_state['is_generating']:
+            return
+        if len(text.strip()) < 3 or should_bypass_router(text):
+            speculative_router.cancel()
+            return
+        speculative_router.submit(text)
+
     def send_message(self, text: str):
         """Handle sending a new message."""
         tts.stop()  # Interrupt previous speech
@@ -547,7 +638,6 @@ class ChatHandlers(QObject):
         self._start_generation_state()
         
         # Create stop event
-        import threading
         self._stop_event = threading.Event()
         
         # Create streaming UI containers
@@ -607,6 +697,8 @@ class ChatHandlers(QObject):
     def clear_chat(self):
         """Start a fresh chat (reset session)."""
         self.current_session_id = None
+        self._more_messages = False
+        self._messages_request = None
         self.messages = [self.messages[0]]
         self.main_window.clear_chat_display()
         self.refresh_sidebar()
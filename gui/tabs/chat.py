@@ -1,3 +1,6 @@
+import html
+import threading
+
 from PySide6.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QFrame, QLabel, 
     QListWidgetItem, QSizePolicy, QMenu
@@ -7,7 +10,7 @@ from PySide6.QtGui import QFont, QIcon, QColor
 
 from qfluentwidgets import (
     PrimaryPushButton, PushButton, TransparentToolButton,
-    LineEdit, SwitchButton, ListWidget, ScrollArea,
+    LineEdit, SearchLineEdit, SwitchButton, ListWidget, ScrollArea,
     FluentIcon as FIF, Action, RoundMenu
 )
 
@@ -15,6 +18,13 @@ from gui.components.message_bubble import MessageBubble
 from gui.components import ThinkingExpander
 # We will replace local ToggleSwitch with qfluentwidgets.SwitchButton
 from core.history import history_manager
+from config import (
+    SPECULATIVE_ROUTING_ENABLED, SPECULATIVE_ROUTING_DEBOUNCE_MS, HISTORY_SESSION_PAGE_SIZE,
+    HISTORY_SEARCH_DEBOUNCE_MS, GRAY, RESET
+)
+
+# Snippet highlight markers (control characters, so they survive html.escape and can't clash with chat text)
+HIGHLIGHT_START, HIGHLIGHT_END = "\x02", "\x03"
 
 
 class ChatTab(QWidget):
@@ -25,19 +35,33 @@ class ChatTab(QWidget):
     
     # Signals to communicate with MainWindow/Handlers
     send_message_requested = Signal(str)
+    draft_changed = Signal(str)  # Input text after a typing pause (speculative routing)
     stop_generation_requested = Signal()
     tts_toggled = Signal(bool)
     new_chat_requested = Signal()
     session_selected = Signal(str)
+    older_messages_requested = Signal()  # Chat scrolled to the top
     
     # Session handling signals
-    session_pin_requested = Signal(str)
+    session_pin_requested = Signal(str, bool)  # session id, pin
     session_rename_requested = Signal(str, str)
     session_delete_requested = Signal(str)
 
+    # History reads wait for queued writes to commit, so they run off the GUI thread
+    _sessions_loaded = Signal(int, object)  # sidebar generation, page of sessions
+    _search_finished = Signal(int, object)  # search generation, results
+
     def __init__(self):
         super().__init__()
         self.setObjectName("ChatTab")
+        # Sidebar paging (keyset cursor of the last loaded session)
+        self._current_session_id = None
+        self._session_cursor = None
+        self._sessions_exhausted = True
+        self._loading_sessions = False
+        # Bumped per refresh/search so results of superseded reads are dropped
+        self._sidebar_generation = 0
+        self._search_generation = 0
         self._setup_ui()
         self._connect_internal_signals()
 
@@ -60,6 +84,23 @@ class ChatTab(QWidget):
         self.new_chat_btn = PushButton(FIF.ADD, "New Chat")
         sidebar_layout.addWidget(self.new_chat_btn)
 
+        # Search past conversations (replaces the session list while there is a query)
+        self.search_input = SearchLineEdit()
+        self.search_input.setPlaceholderText("Search chats")
+        self.search_input.setClearButtonEnabled(True)
+        sidebar_layout.addWidget(self.search_input)
+
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(HISTORY_SEARCH_DEBOUNCE_MS)
+        self.search_timer.timeout.connect(self._run_search)
+
+        self.search_results = ListWidget()
+        self.search_results.setStyleSheet("background: transparent; border: none;")
+        self.search_results.setWordWrap(True)
+        self.search_results.hide()
+        sidebar_layout.addWidget(self.search_results)
+
         # Session List
         self.session_list = ListWidget()
         self.session_list.setContextMenuPolicy(Qt.CustomContextMenu)
@@ -141,6 +182,12 @@ class ChatTab(QWidget):
 
         chat_layout.addWidget(input_bar)
 
+        # Debounce typing so only paused drafts are routed speculatively
+        self.draft_timer = QTimer(self)
+        self.draft_timer.setSingleShot(True)
+        self.draft_timer.setInterval(SPECULATIVE_ROUTING_DEBOUNCE_MS)
+        self.draft_timer.timeout.connect(lambda: self.draft_changed.emit(self.user_input.text()))
+
         layout.addWidget(self.chat_content)
 
     def _connect_internal_signals(self):
@@ -148,13 +195,23 @@ class ChatTab(QWidget):
         self.new_chat_btn.clicked.connect(self.new_chat_requested.emit)
         self.send_btn.clicked.connect(self._on_send_clicked)
         self.user_input.returnPressed.connect(self._on_send_clicked)
+        if SPECULATIVE_ROUTING_ENABLED:
+            self.user_input.textChanged.connect(self.draft_timer.start)
         self.stop_btn.clicked.connect(self.stop_generation_requested.emit)
         self.tts_toggle.checkedChanged.connect(self.tts_toggled.emit)
         self.session_list.itemClicked.connect(self._on_session_clicked)
+        self.search_input.textChanged.connect(self._on_search_changed)
+        self.search_input.searchSignal.connect(lambda _: self._run_search())
+        self.search_results.itemClicked.connect(self._on_session_clicked)
+        self.session_list.verticalScrollBar().valueChanged.connect(self._on_sidebar_scrolled)
+        self.chat_scroll.verticalScrollBar().valueChanged.connect(self._on_chat_scrolled)
+        self._sessions_loaded.connect(self._on_sessions_loaded)
+        self._search_finished.connect(self._on_search_finished)
 
     def _on_send_clicked(self):
         text = self.user_input.text()
         if text.strip():
+            self.draft_timer.stop()
             self.send_message_requested.emit(text)
 
     def _on_session_clicked(self, item: QListWidgetItem):
@@ -162,6 +219,72 @@ class ChatTab(QWidget):
         if session_id:
             self.session_selected.emit(session_id)
 
+    def _on_search_changed(self, text: str):
+        if text.strip():
+            self.search_timer.start()
+            return
+        self.search_timer.stop()
+        self._search_generation += 1  # Drop a search still in flight
+        self.search_results.clear()
+        self.search_results.hide()
+        self.session_list.show()
+
+    def _run_search(self):
+        """Show the best matching messages for the current query."""
+        text = self.search_input.text()
+        if not text.strip():
+            return
+        self._search_generation += 1
+        self._read_history(
+            lambda: history_manager.search(text, highlight=(HIGHLIGHT_START, HIGHLIGHT_END)),
+            self._search_finished, self._search_generation
+        )
+
+    def _on_search_finished(self, generation: int, results: list):
+        if generation != self._search_generation:
+            return
+        self.search_results.clear()
+        for result in results:
+            snippet = html.escape(result['snippet'].replace("\n", " "))
+            snippet = snippet.replace(HIGHLIGHT_START, "<b>").replace(HIGHLIGHT_END, "</b>")
+            label = QLabel(f"<span style='color: gray;'>{html.escape(result['title'] or 'Chat')}</span><br>{snippet}")
+            label.setWordWrap(True)
+            label.setTextFormat(Qt.RichText)
+            label.setStyleSheet("background: transparent; padding: 4px;")
+            label.setAttribute(Qt.WA_TransparentForMouseEvents)
+            
+            item = QListWidgetItem()
+            item.setData(Qt.UserRole, result['session_id'])
+            item.setSizeHint(QSize(0, label.heightForWidth(self.search_results.viewport().width()) + 8))
+            self.search_results.addItem(item)
+            self.search_results.setItemWidget(item, label)
+        if not results:
+            self.search_results.addItem(QListWidgetItem("No matching messages"))
+        
+        self.session_list.hide()
+        self.search_results.show()
+
+    def _read_history(self, read, signal, generation: int):
+        """Run a history read on a worker thread; signal(generation, result) brings it back."""
+        def run():
+            try:
+                result = read()
+            except Exception as e:
+                print(f"{GRAY}[Chat] History read failed: {e}{RESET}")
+                result = []
+            signal.emit(generation, result)
+        threading.Thread(target=run, name="HistoryRead", daemon=True).start()
+
+    def _on_chat_scrolled(self, value: int):
+        scrollbar = self.chat_scroll.verticalScrollBar()
+        if value == scrollbar.minimum() and scrollbar.maximum() > 0:
+            self.older_messages_requested.emit()
+
+    def _on_sidebar_scrolled(self, value: int):
+        scrollbar = self.session_list.verticalScrollBar()
+        if not self._sessions_exhausted and value >= scrollbar.maximum() - scrollbar.pageStep() // 2:
+            self._load_more_sessions()
+
     # --- Public API for Controller/MainWindow ---
 
     def set_status(self, text: str):
@@ -179,8 +302,8 @@ class ChatTab(QWidget):
          if not is_generating:
              self.user_input.setFocus()
 
-    def add_message_bubble(self, role: str, text: str, is_thinking: bool = False):
-        """Add a bubble."""
+    def _bubble_row(self, role: str, text: str, is_thinking: bool = False) -> QWidget:
+        """A bubble aligned to its side of the chat."""
         # Note: MessageBubble might need updates to look good on transparent background
         bubble = MessageBubble(role, text, is_thinking)
         
@@ -195,6 +318,11 @@ class ChatTab(QWidget):
         else:
             wrapper_layout.addWidget(bubble)
             wrapper_layout.addStretch()
+        return wrapper
+
+    def add_message_bubble(self, role: str, text: str, is_thinking: bool = False):
+        """Add a bubble."""
+        wrapper = self._bubble_row(role, text, is_thinking)
         
         # Insert before stretch (last item)
         count = self.chat_container_layout.count()
@@ -202,6 +330,15 @@ class ChatTab(QWidget):
         
         QTimer.singleShot(50, self.scroll_to_bottom)
 
+    def prepend_message_bubbles(self, messages: list):
+        """Insert older messages above the current ones, keeping the view where it was."""
+        scrollbar = self.chat_scroll.verticalScrollBar()
+        from_bottom = scrollbar.maximum() - scrollbar.value()
+        for index, msg in enumerate(messages):
+            self.chat_container_layout.insertWidget(index, self._bubble_row(msg['role'], msg['content']))
+        
+        QTimer.singleShot(50, lambda: scrollbar.setValue(scrollbar.maximum() - from_bottom))
+
     def add_streaming_widgets(self, thinking_ui, search_indicator, response_bubble):
         """Add streaming widgets."""
         wrapper = QWidget()
@@ -239,21 +376,50 @@ class ChatTab(QWidget):
         scrollbar.setValue(scrollbar.maximum())
 
     def refresh_sidebar(self, current_session_id: str = None):
-        """Refresh sidebar list."""
-        self.session_list.clear()
-        sessions = history_manager.get_sessions()
+        """Refresh sidebar list (first page; more load when scrolled to the end)."""
+        self._current_session_id = current_session_id
+        self._sidebar_generation += 1
+        self._session_cursor = None
+        self._sessions_exhausted = False
+        self._loading_sessions = False
+        self._load_more_sessions()
+        if not self.search_results.isHidden():
+            self._run_search()  # Sessions may have been renamed or deleted
+
+    def _load_more_sessions(self):
+        """Request the next page of sessions for the sidebar."""
+        if self._loading_sessions:
+            return
+        self._loading_sessions = True
+        cursor = self._session_cursor
+        self._read_history(
+            lambda: history_manager.get_sessions(limit=HISTORY_SESSION_PAGE_SIZE, cursor=cursor),
+            self._sessions_loaded, self._sidebar_generation
+        )
+
+    def _on_sessions_loaded(self, generation: int, sessions: list):
+        """Append a page of sessions (the first page replaces the list)."""
+        if generation != self._sidebar_generation:
+            return
+        self._loading_sessions = False
+        if self._session_cursor is None:
+            self.session_list.clear()
+        self._sessions_exhausted = len(sessions) < HISTORY_SESSION_PAGE_SIZE
+        if sessions:
+            self._session_cursor = sessions[-1]['cursor']
         
         for sess in sessions:
             title = sess['title']
             sid = sess['id']
             is_pinned = sess.get('pinned', False)
-            is_current = sid == current_session_id
+            is_current = sid == self._current_session_id
             
             # Use standard QListWidgetItem but maybe with custom text/icon
             # Fluent ListWidget generally handles text well
             
             item = QListWidgetItem(title)
             item.setData(Qt.UserRole, sid)
+            item.setData(Qt.UserRole + 1, is_pinned)
             
             if is_pinned:
                 item.setIcon(FIF.PIN.icon())
@@ -272,7 +438,9 @@ class ChatTab(QWidget):
 
         menu = RoundMenu(parent=self)
         
-        menu.addAction(Action(FIF.PIN, "Pin/Unpin", triggered=lambda: self.session_pin_requested.emit(session_id)))
+        is_pinned = bool(item.data(Qt.UserRole + 1))
+        menu.addAction(Action(FIF.PIN, "Unpin" if is_pinned else "Pin",
+                              triggered=lambda: self.session_pin_requested.emit(session_id, not is_pinned)))
         menu.addAction(Action(FIF.EDIT, "Rename", triggered=lambda: self._prompt_rename(session_id)))
         menu.addSeparator()
         menu.addAction(Action(FIF.DELETE, "Delete", triggered=lambda: self.session_delete_requested.emit(session_id)))
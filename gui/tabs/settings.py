@@ -2,9 +2,9 @@
 Comprehensive Settings Tab with model selection, connection settings, and preferences.
 """
 
-from config import LOCAL_ROUTER_PATH, RESPONDER_MODEL
+from config import LOCAL_ROUTER_PATH, RESPONDER_MODEL, ROUTER_BACKEND
 
-import requests
+import httpx
 from PySide6.QtWidgets import (
     QWidget, QVBoxLayout, QLabel, QHBoxLayout
 )
@@ -18,6 +18,7 @@ from qfluentwidgets import (
 )
 
 from core.settings_store import settings
+from core.ollama_client import ollama, OllamaError
 
 
 class ModelFetcher(QThread):
@@ -31,14 +32,11 @@ class ModelFetcher(QThread):
     
     def run(self):
         try:
-            response = requests.get(f"{self.ollama_url}/api/tags", timeout=10)
-            if response.status_code == 200:
-                data = response.json()
-                models = [m['name'] for m in data.get('models', [])]
-                self.models_fetched.emit(models)
-            else:
-                self.error_occurred.emit(f"HTTP {response.status_code}")
-        except requests.exceptions.ConnectionError:
+            models = [m['name'] for m in ollama.tags(timeout=10, base_url=self.ollama_url)]
+            self.models_fetched.emit(models)
+        except OllamaError as e:
+            self.error_occurred.emit(str(e))
+        except httpx.ConnectError:
             self.error_occurred.emit("Cannot connect to Ollama")
         except Exception as e:
             self.error_occurred.emit(str(e))
@@ -55,12 +53,11 @@ class ConnectionTester(QThread):
     
     def run(self):
         try:
-            response = requests.get(f"{self.url}/api/tags", timeout=5)
-            if response.status_code == 200:
-                self.success.emit()
-            else:
-                self.failed.emit(f"HTTP {response.status_code}")
-        except requests.exceptions.ConnectionError:
+            ollama.tags(timeout=5, base_url=self.url)
+            self.success.emit()
+        except OllamaError as e:
+            self.failed.emit(str(e))
+        except httpx.ConnectError:
             self.failed.emit("Connection refused")
         except Exception as e:
             self.failed.emit(str(e))
@@ -71,7 +68,7 @@ class ComboBoxCard(SettingCard):
     
     value_changed = Signal(str)
     
-    def __init__(self, icon, title, description, options: list, key_path: str, parent=None):
+    def __init__(self, icon, title, description, options: list, key_path: str, parent=None, default: str = None):
         super().__init__(icon, title, description, parent)
         self.key_path = key_path
         
@@ -80,7 +77,9 @@ class ComboBoxCard(SettingCard):
         self.combo.addItems(options)
         
         # Set current value from settings
-        current = settings.get(key_path, options[0] if options else "")
+        if default is None:
+            default = options[0] if options else ""
+        current = settings.get(key_path, default)
         if current in options:
             self.combo.setCurrentText(current)
         
@@ -98,16 +97,17 @@ class ModelSelectCard(SettingCard):
     
     model_changed = Signal(str)
     
-    def __init__(self, icon, title, description, key_path: str, parent=None):
+    def __init__(self, icon, title, description, key_path: str, parent=None, default_label: str = None):
         super().__init__(icon, title, description, parent)
         self.key_path = key_path
+        self.default_label = default_label  # Optional entry that stores "" (use the fallback model)
         
         self.combo = ComboBox(self)
         self.combo.setMinimumWidth(180)
         self.combo.setPlaceholderText("Select model...")
         
         # Load current value
-        current = settings.get(key_path, "")
+        current = settings.get(key_path, "") or default_label
         if current:
             self.combo.addItem(current)
             self.combo.setCurrentText(current)
@@ -118,12 +118,15 @@ class ModelSelectCard(SettingCard):
     
     def _on_changed(self, text: str):
         if text:
-            settings.set(self.key_path, text)
-            self.model_changed.emit(text)
+            value = "" if text == self.default_label else text
+            settings.set(self.key_path, value)
+            self.model_changed.emit(value)
     
     def update_models(self, models: list):
         """Update the dropdown with available models."""
         current = self.combo.currentText()
+        if self.default_label:
+            models = [self.default_label] + models
         self.combo.clear()
         self.combo.addItems(models)
         if current in models:
@@ -346,6 +349,26 @@ class SettingsTab(ScrollArea):
         )
         self.ai_group.addSettingCard(self.chat_model_card)
         
+        self.fast_tier_card = ModelSelectCard(
+            FIF.SEND,
+            "Fast Response Model",
+            "Small model for quick replies and action confirmations, kept loaded",
+            "models.tiers.fast",
+            self.ai_group,
+            default_label="Same as chat model"
+        )
+        self.ai_group.addSettingCard(self.fast_tier_card)
+        
+        self.deep_tier_card = ModelSelectCard(
+            FIF.EDUCATION,
+            "Reasoning Model",
+            "Larger model for thinking, system summaries and web search answers",
+            "models.tiers.deep",
+            self.ai_group,
+            default_label="Same as chat model"
+        )
+        self.ai_group.addSettingCard(self.deep_tier_card)
+        
         self.web_agent_model_card = ModelSelectCard(
             FIF.GLOBE,
             "Web Agent Model",
@@ -364,6 +387,38 @@ class SettingsTab(ScrollArea):
         )
         self.ai_group.addSettingCard(self.router_model_card)
         
+        self.router_backend_card = ComboBoxCard(
+            FIF.SPEED_HIGH,
+            "Router Backend",
+            "CPU inference backend for the router: torch, int8 quantized or ONNX Runtime (applies on restart)",
+            ["torch", "int8", "onnx"],
+            "router.backend",
+            self.ai_group,
+            default=ROUTER_BACKEND
+        )
+        self.ai_group.addSettingCard(self.router_backend_card)
+        
+        self.pipeline_mode_card = ComboBoxCard(
+            FIF.DEVELOPER_TOOLS,
+            "Pipeline Mode",
+            "router: the function router picks a tool, then the chat model answers. "
+            "native: the chat model calls the tools itself, so no router model is needed",
+            ["router", "native"],
+            "pipeline.mode",
+            self.ai_group
+        )
+        self.ai_group.addSettingCard(self.pipeline_mode_card)
+        
+        self.memory_budget_card = SliderCard(
+            FIF.SPEED_MEDIUM,
+            "Model Memory Budget (GB)",
+            "Memory for loaded Ollama models; least recently used models are unloaded to stay under it (0 = auto)",
+            "models.memory_budget_gb",
+            0, 64,
+            self.ai_group
+        )
+        self.ai_group.addSettingCard(self.memory_budget_card)
+        
         self.refresh_models_card = PushSettingCard(
             "Refresh",
             FIF.SYNC,
@@ -476,6 +531,15 @@ class SettingsTab(ScrollArea):
         )
         self.general_group.addSettingCard(self.auto_news_card)
         
+        self.response_cache_card = SwitchCard(
+            FIF.SAVE,
+            "Response Cache",
+            "Answer repeated standalone questions instantly from a local cache",
+            "general.response_cache",
+            self.general_group
+        )
+        self.general_group.addSettingCard(self.response_cache_card)
+        
         self.expandLayout.addWidget(self.general_group)
 
         # ─────────────────────────────────────────────────────────────
@@ -533,6 +597,8 @@ class SettingsTab(ScrollArea):
     def _on_models_fetched(self, models: list):
         self._available_models = models
         self.chat_model_card.update_models(models)
+        self.fast_tier_card.update_models(models)
+        self.deep_tier_card.update_models(models)
         self.web_agent_model_card.update_models(models)
         
         InfoBar.success(
@@ -3,12 +3,16 @@ Pocket AI - Main Entry Point
 """
 
 import os
+from config import ROUTER_OUT_OF_PROCESS, VOICE_ASSISTANT_ENABLED
+
 # Workaround for torch/PySide6 DLL conflict (WinError 1114)
 # Importing torch before PySide6 often resolves startup crashes on Windows.
-try:
-    import torch
-except ImportError:
-    pass
+# Only needed when torch ends up in this process: the in-process router or RealTimeSTT.
+if not ROUTER_OUT_OF_PROCESS or VOICE_ASSISTANT_ENABLED:
+    try:
+        import torch
+    except ImportError:
+        pass
 
 import warnings
 import sys
@@ -0,0 +1,75 @@
+import sys
+import os
+import unittest
+
+# Add core directory to path to bypass package init (avoids loading tts/sounddevice)
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../core')))
+
+from context_builder import build_system_context, build_context_message, estimate_tokens
+
+def system_info(tasks=3, news=5):
+    return {
+        "current_time": "2026-10-17 09:30:00",
+        "timers": [{"label": "pasta", "remaining": "4:32"}],
+        "alarms": [{"time": "07:00", "label": "Wake up"}],
+        "calendar_today": [{"title": "Dentist", "time": "14:00"}],
+        "tasks": [{"text": f"task number {i}", "completed": False} for i in range(tasks)]
+                 + [{"text": "already done", "completed": True}],
+        "smart_devices": [{"name": "Kitchen Light", "is_on": True}, {"name": "Desk Lamp", "is_on": False}],
+        "weather": {"temp": 61, "condition": "Rain", "high": 64, "low": 50},
+        "news": [{"title": f"Headline {i}"} for i in range(news)],
+    }
+
+class TestContextBuilder(unittest.TestCase):
+    def test_compact_lines(self):
+        text = build_system_context(system_info(), "what's going on", max_tokens=1000)
+        self.assertTrue(text.startswith("SYSTEM CONTEXT:\n"))
+        self.assertIn("Active timers: pasta (4:32 left)", text)
+        self.assertIn("Devices on: Kitchen Light", text)
+        self.assertIn("Weather: 61°F, Rain (high 64, low 50)", text)
+        self.assertIn("Pending tasks: task number 0; task number 1; task number 2", text)
+        self.assertNotIn("already done", text)
+        self.assertNotIn("{", text)  # No Python reprs
+
+    def test_fits_budget(self):
+        data = system_info(tasks=200, news=50)
+        for budget in (40, 80, 150):
+            text = build_system_context(data, "what's up", max_tokens=budget)
+            self.assertLessEqual(estimate_tokens(text), budget)
+        self.assertIn("more)", build_system_context(data, "what's up", max_tokens=150))
+
+    def test_query_relevance(self):
+        data = system_info(tasks=60, news=40)
+        text = build_system_context(data, "do I need an umbrella, what's the weather", max_tokens=40)
+        self.assertIn("Weather:", text)
+        text = build_system_context(data, "what's on my todo list", max_tokens=60)
+        self.assertIn("Pending tasks: task number 0", text)
+        text = build_system_context(data, "any news about Headline 37", max_tokens=40)
+        self.assertIn("Headline 37", text)
+
+    def test_no_devices_on(self):
+        data = system_info()
+        data["smart_devices"] = [{"name": "Desk Lamp", "is_on": False}]
+        self.assertIn("Devices on: none", build_system_context(data))
+
+    def test_context_messages(self):
+        self.assertEqual(
+            build_context_message("set_timer", {"success": True, "message": "Timer set for 5 minutes"}),
+            "ACTION RESULT: set_timer succeeded. Timer set for 5 minutes",
+        )
+        self.assertEqual(build_context_message("get_system_info", {"success": True, "data": {}}),
+                         "No system information available.")
+        search = {"success": True, "data": {"query": "q", "results": [{"title": "T", "body": "B", "url": "U"}]}}
+        self.assertIn("SEARCH RESULTS for 'q'", build_context_message("web_search", search))
+
+    def test_spoken_search_results_have_no_urls(self):
+        search = {"success": True, "data": {"query": "q", "results": [
+            {"title": "Opening hours", "body": "Open until 10pm", "url": "https://example.com/hours"}]}}
+        spoken = build_context_message("web_search", search, spoken=True)
+        self.assertIn("Open until 10pm", spoken)
+        self.assertNotIn("http", spoken)
+        self.assertNotIn("[text](url)", spoken)
+        self.assertIn("https://example.com/hours", build_context_message("web_search", search))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,101 @@
+import sys
+import os
+import threading
+import time
+import unittest
+from unittest import mock
+
+# Add core directory to path to bypass package init (avoids loading tts/sounddevice)
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../core')))
+
+import context_window
+from context_window import ContextWindow, SUMMARY_PREFIX, is_summary
+
+def turn(i):
+    return [{"role": "user", "content": f"question {i} " + "x" * 200},
+            {"role": "assistant", "content": f"answer {i} " + "y" * 200}]
+
+class TestContextWindow(unittest.TestCase):
+    def setUp(self):
+        self.summaries = []
+
+        def summarizer(previous, evicted, model):
+            self.summaries.append((len(evicted), model))
+            return (previous + " " if previous else "") + f"{len(evicted)} msgs"
+
+        self.window = ContextWindow(max_tokens=1000, trim_ratio=0.5, summarizer=summarizer)
+        self.messages = [{"role": "system", "content": "You are helpful."}]
+
+    def converse(self, turns):
+        for i in range(turns):
+            self.messages.extend(turn(i)[:1])
+            self.window.fit(self.messages, model="qwen3:4b")
+            self.messages.extend(turn(i)[1:])
+        self.window.wait_for_summary(5)
+
+    def test_prefix_stable_between_trims(self):
+        prefixes = []
+        with mock.patch.object(context_window, "print"):
+            for i in range(30):
+                self.messages.append(turn(i)[0])
+                trimmed = self.window.fit(self.messages)
+                if not trimmed and prefixes:
+                    # Everything sent last turn is still the start of this prompt
+                    self.assertEqual(self.messages[:len(prefixes[-1])], prefixes[-1])
+                prefixes.append([dict(m) for m in self.messages])
+                self.messages.append(turn(i)[1])
+        # Trims are rare and in blocks, not every turn
+        self.assertLess(self.window.trims, 10)
+        self.assertGreater(self.window.trims, 1)
+
+    def test_trim_keeps_new_turn_and_adds_summary(self):
+        with mock.patch.object(context_window, "print"):
+            self.converse(12)
+        self.assertEqual(self.messages[0]["content"], "You are helpful.")
+        self.assertTrue(is_summary(self.messages[1]))
+        self.assertEqual(self.messages[2]["role"], "user")
+        self.assertTrue(self.messages[1]["content"].startswith(SUMMARY_PREFIX))
+        self.assertLessEqual(context_window.estimate_tokens(self.messages), 1000)
+        self.assertEqual(self.messages[-1]["content"], turn(11)[1]["content"])
+        # Summarized with this turn's responder, not a default model
+        self.assertTrue(self.summaries)
+        self.assertTrue(all(model == "qwen3:4b" for _, model in self.summaries))
+
+    def test_trim_does_not_wait_for_summarizer(self):
+        release = threading.Event()
+
+        def slow_summarizer(previous, evicted, model):
+            release.wait(5)
+            return "model summary"
+
+        window = ContextWindow(max_tokens=1000, trim_ratio=0.5, summarizer=slow_summarizer)
+        messages = [{"role": "system", "content": "sys"}]
+        trims = 0
+        with mock.patch.object(context_window, "print"):
+            for i in range(20):
+                messages.extend(turn(i)[:1])
+                start = time.monotonic()
+                if window.fit(messages):
+                    trims += 1
+                    self.assertLess(time.monotonic() - start, 1)
+                    if trims == 1:
+                        # Extractive summary in the prompt; the model's one is used from the next trim
+                        self.assertIn("User asked: question", messages[1]["content"])
+                        release.set()
+                        window.wait_for_summary(5)
+                messages.extend(turn(i)[1:])
+        self.assertGreaterEqual(trims, 2)
+        self.assertTrue(messages[1]["content"].startswith(SUMMARY_PREFIX + "model summary"))
+
+    def test_message_cap(self):
+        window = ContextWindow(max_tokens=100000, trim_ratio=0.5, summarizer=lambda p, e, m: "s")
+        messages = [{"role": "system", "content": "sys"}]
+        with mock.patch.object(context_window, "print"):
+            for i in range(11):
+                messages.extend(turn(i))
+            messages.append(turn(11)[0])
+            self.assertTrue(window.fit(messages, max_messages=20))
+        self.assertLessEqual(len(messages) - 2, 10)
+
+if __name__ == '__main__':
+    unittest.main()
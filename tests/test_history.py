@@ -6,7 +6,8 @@ import shutil
 # Add core directory to path to bypass package init (avoids loading tts/sounddevice)
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../core')))
 
-from history import ChatHistoryManager
+from history import ChatHistoryManager, MIGRATIONS, backfill_search_index, search_query
+from storage import Database
 
 TEST_DB = "test_history.db"
 
@@ -17,8 +18,10 @@ class TestChatHistory(unittest.TestCase):
         
     def tearDown(self):
         # Cleanup
-        if os.path.exists(TEST_DB):
-            os.remove(TEST_DB)
+        self.mgr.close()
+        for path in (TEST_DB, TEST_DB + "-wal", TEST_DB + "-shm"):
+            if os.path.exists(path):
+                os.remove(path)
 
     def test_create_session(self):
         sid = self.mgr.create_session("Test Session")
@@ -50,5 +53,113 @@ class TestChatHistory(unittest.TestCase):
         sessions = self.mgr.get_sessions()
         self.assertEqual(sessions[0]['title'], "Old")
 
+    def test_session_pages(self):
+        for i in range(7):
+            self.mgr.create_session(f"Chat {i}")
+        pinned = self.mgr.create_session("Pinned")
+        self.mgr.toggle_pin(pinned)
+        
+        titles, cursor = [], None
+        while True:
+            page = self.mgr.get_sessions(limit=3, cursor=cursor)
+            titles.extend(s['title'] for s in page)
+            if len(page) < 3:
+                break
+            cursor = page[-1]['cursor']
+        self.assertEqual(titles, [s['title'] for s in self.mgr.get_sessions()])
+        self.assertEqual(titles[0], "Pinned")
+        self.mgr.set_pinned(pinned, False)
+        self.assertFalse(any(s['pinned'] for s in self.mgr.get_sessions()))
+        self.assertEqual(len(titles), 8)
+
+    def test_message_pages(self):
+        sid = self.mgr.create_session("Long")
+        for i in range(10):
+            self.mgr.add_message(sid, "user", f"msg {i}")
+        
+        newest = self.mgr.get_messages(sid, limit=4)
+        self.assertEqual([m['content'] for m in newest], ["msg 6", "msg 7", "msg 8", "msg 9"])
+        older = self.mgr.get_messages(sid, before_id=newest[0]['id'], limit=4)
+        self.assertEqual([m['content'] for m in older], ["msg 2", "msg 3", "msg 4", "msg 5"])
+        oldest = self.mgr.get_messages(sid, before_id=older[0]['id'], limit=4)
+        self.assertEqual([m['content'] for m in oldest], ["msg 0", "msg 1"])
+
+    def test_existing_message_ids_reads_committed_rows(self):
+        sid = self.mgr.create_session("Chat")
+        self.mgr.add_message(sid, "user", "hello")
+        ids = [m['id'] for m in self.mgr.get_messages(sid)]
+        self.mgr.delete_session(sid)
+        self.mgr.flush()
+        self.assertEqual(self.mgr.existing_message_ids(ids + [999]), set())
+        other = self.mgr.create_session("Other")
+        self.mgr.add_message(other, "user", "hi")
+        ids = [m['id'] for m in self.mgr.get_messages(other)]
+        self.assertEqual(self.mgr.existing_message_ids(ids), set(ids))
+
+class TestChatSearch(unittest.TestCase):
+    def setUp(self):
+        self.mgr = ChatHistoryManager(db_path=TEST_DB)
+        
+    def tearDown(self):
+        self.mgr.close()
+        for path in (TEST_DB, TEST_DB + "-wal", TEST_DB + "-shm"):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def test_search_query(self):
+        self.assertEqual(search_query("pasta timer"), '"pasta" "timer"*')
+        self.assertEqual(search_query('"NEAR( OR'), '"NEAR" "OR"*')
+        self.assertEqual(search_query("  ?! "), "")
+
+    def test_ranked_snippets(self):
+        cooking = self.mgr.create_session("Cooking")
+        garden = self.mgr.create_session("Garden")
+        self.mgr.add_message(cooking, "user", "How long should I boil pasta for a pasta salad?")
+        self.mgr.add_message(garden, "user", "Water the tomatoes, then make pasta")
+        self.mgr.add_message(garden, "assistant", "The tomatoes need water every morning.")
+        
+        results = self.mgr.search("pasta")
+        self.assertEqual([r['session_id'] for r in results], [cooking, garden])
+        self.assertEqual(results[0]['title'], "Cooking")
+        self.assertIn("[pasta]", results[0]['snippet'])
+        # Prefix match on the word being typed
+        self.assertEqual(len(self.mgr.search("tomat")), 2)
+        self.assertEqual(self.mgr.search("water tomatoes morn")[0]['role'], "assistant")
+        self.assertEqual(self.mgr.search(""), [])
+
+    def test_deleted_sessions_leave_index(self):
+        sid = self.mgr.create_session("Temp")
+        self.mgr.add_message(sid, "user", "remember the umbrella")
+        self.assertEqual(len(self.mgr.search("umbrella")), 1)
+        self.mgr.delete_session(sid)
+        self.assertEqual(self.mgr.search("umbrella"), [])
+
+    def test_backfill_existing_messages(self):
+        self.mgr.close()
+        os.remove(TEST_DB)
+        # A database from before search: schema version 3 with messages already in it
+        db = Database(TEST_DB, MIGRATIONS[:3])
+        db.execute("INSERT INTO sessions (id, title, created_at, updated_at) VALUES ('old', 'Old chat', '', '')")
+        db.executemany("INSERT INTO messages (session_id, role, content) VALUES ('old', 'user', ?)",
+                       [(f"note number {i} about kites",) for i in range(25)])
+        db.migrate(MIGRATIONS)
+        self.assertEqual(tuple(db.query_one("SELECT last_id, end_id FROM fts_backfill")), (0, 25))
+        
+        # Interrupted after one batch: progress is kept
+        self.assertTrue(backfill_search_index(db, batch=10))
+        self.assertEqual(db.query_one("SELECT last_id FROM fts_backfill")[0], 10)
+        db.execute("DELETE FROM messages WHERE id IN (5, 20)")  # Indexed and not yet indexed
+        db.close()
+        
+        # Resumes in the background on the next start
+        self.mgr = ChatHistoryManager(db_path=TEST_DB)
+        self.mgr.add_message("old", "user", "one more kite")
+        self.mgr.wait_for_index(timeout=10)
+        self.assertIsNone(self.mgr.db.query_one("SELECT 1 FROM fts_backfill"))
+        self.assertEqual(len(self.mgr.search("kite", limit=100)), 24)
+        self.assertEqual(self.mgr.search("number 4 about"), [])  # id 5
+        self.assertEqual(self.mgr.search("number 19 about"), [])  # id 20
+        self.mgr.db.execute("INSERT INTO messages_fts(messages_fts) VALUES ('integrity-check')")
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,62 @@
+import sys
+import os
+import unittest
+
+# Add core directory to path to bypass package init (avoids loading tts/sounddevice)
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../core')))
+
+from intent_classifier import IntentClassifier, IntentFastPath, extract_arguments
+
+TEST_MODEL = "test_intent_classifier.npz"
+
+TRAIN = [
+    ("Set a timer for 10 minutes", "set_timer"),
+    ("Timer for 5 minutes", "set_timer"),
+    ("Start a 30 minute timer", "set_timer"),
+    ("Turn off the kitchen lights", "control_light"),
+    ("Turn on the bedroom lights", "control_light"),
+    ("Switch off the lamp", "control_light"),
+    ("Hello", "nonthinking"),
+    ("Good morning", "nonthinking"),
+    ("Thank you", "nonthinking"),
+]
+
+class TestIntentClassifier(unittest.TestCase):
+    def tearDown(self):
+        if os.path.exists(TEST_MODEL):
+            os.remove(TEST_MODEL)
+
+    def test_extract_arguments(self):
+        self.assertEqual(extract_arguments("set_timer", "Set a timer for 10 minutes"), {"duration": "10 minutes"})
+        self.assertEqual(extract_arguments("set_timer", "Start 30 minute timer"), {"duration": "30 minutes"})
+        self.assertEqual(extract_arguments("set_alarm", "Wake me up at 7am"), {"time": "7am"})
+        self.assertEqual(extract_arguments("control_light", "Turn off the kitchen lights"),
+                         {"action": "off", "device_name": "kitchen"})
+        self.assertEqual(extract_arguments("control_light", "Lights on in the living room"),
+                         {"action": "on", "device_name": "living room"})
+        self.assertIsNone(extract_arguments("control_light", "turn off the kitchen lights in 10 minutes"))
+        self.assertIsNone(extract_arguments("control_light", "turn on the porch light at 8pm"))
+        self.assertIsNone(extract_arguments("control_light", "turn off the lamp and then the fan"))
+        self.assertEqual(extract_arguments("add_task", "Add buy milk to my list"), {"text": "buy milk"})
+        self.assertIsNone(extract_arguments("set_timer", "Set a timer"))
+        self.assertIsNone(extract_arguments("create_calendar_event", "Schedule lunch Friday"))
+
+    def test_train_save_load(self):
+        clf = IntentClassifier.train([t for t, _ in TRAIN], [label for _, label in TRAIN], epochs=100)
+        clf.save(TEST_MODEL)
+        loaded = IntentClassifier.load(TEST_MODEL)
+
+        self.assertEqual(loaded.labels, clf.labels)
+        self.assertEqual(loaded.predict("Set a timer for 20 minutes")[0], "set_timer")
+        self.assertEqual(loaded.predict("Turn off the office lights")[0], "control_light")
+
+    def test_fast_path_defers_when_unsure(self):
+        clf = IntentClassifier.train([t for t, _ in TRAIN], [label for _, label in TRAIN], epochs=100)
+        self.assertIsNone(IntentFastPath(clf, threshold=1.01).route("Set a timer for 10 minutes"))
+        self.assertEqual(IntentFastPath(clf, threshold=0.0).route("Set a timer for 10 minutes"),
+                         ("set_timer", {"duration": "10 minutes"}))
+        # Confident about the intent, but the arguments need the router
+        self.assertIsNone(IntentFastPath(clf, threshold=0.0).route("Turn off the kitchen lights in 10 minutes"))
+
+if __name__ == '__main__':
+    unittest.main()
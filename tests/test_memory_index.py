@@ -0,0 +1,187 @@
+import sys
+import os
+import re
+import tempfile
+import threading
+import unittest
+from unittest import mock
+import zlib
+
+import numpy as np
+
+# Add core directory to path to bypass package init (avoids loading tts/sounddevice)
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../core')))
+
+import memory_index
+from memory_index import MemoryIndex, Source, cosine_scores, top_k, MEMORY_HEADER
+
+DIM = 64
+
+
+def embed(texts):
+    """Bag of words hashed into DIM buckets: texts sharing words are similar."""
+    vectors = np.zeros((len(texts), DIM), dtype=np.float32)
+    for i, text in enumerate(texts):
+        for word in re.findall(r"[a-z]+", text.lower()):
+            vectors[i, zlib.crc32(word.encode()) % DIM] += 1.0
+    return vectors
+
+
+class FakeSources:
+    def __init__(self):
+        self.messages = []  # (id, role, text)
+        self.tasks = {}  # id -> text
+
+    def add_message(self, text, role="user"):
+        self.messages.append((len(self.messages) + 1, role, text))
+
+    def sources(self):
+        def messages(after_id):
+            return [(mid, f"{role} message", text, "2026-03-02T18:04:00")
+                    for mid, role, text in self.messages if mid > (after_id or 0)][:3]
+
+        def exists(ids):
+            return {mid for mid, _, _ in self.messages} & set(ids)
+
+        def tasks(_):
+            return [(tid, "task", text, "") for tid, text in self.tasks.items()]
+
+        return [Source("messages", messages, append_only=True, exists=exists), Source("tasks", tasks)]
+
+
+class TestMemoryIndex(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = tmp.name
+        self.data = FakeSources()
+        self.calls = []
+
+    def open(self, model="fake-embed"):
+        def counting_embed(texts):
+            self.calls.append(list(texts))
+            return embed(texts)
+
+        index = MemoryIndex(self.dir, embed=counting_embed, sources=self.data.sources(), model=model)
+        self.addCleanup(index.close)
+        return index
+
+    def test_incremental_sync(self):
+        for text in ["my sister lives in Lisbon", "ok", "the car needs new tyres", "book a dentist appointment"]:
+            self.data.add_message(text)
+        index = self.open()
+        self.assertEqual(index.sync(), 3)  # "ok" is too short to index
+        self.assertEqual(index.sync(), 0)
+        self.data.add_message("remember the wifi password is on the fridge")
+        self.calls.clear()
+        self.assertEqual(index.sync(), 1)
+        self.assertEqual(self.calls, [["remember the wifi password is on the fridge"]])
+
+        # The cursor and vectors survive a restart
+        index.close()
+        index = self.open()
+        self.assertEqual(index.sync(), 0)
+        self.assertEqual(index.search("does my sister live in Lisbon")[0]['text'], "my sister lives in Lisbon")
+
+    def test_tables_are_reconciled(self):
+        self.data.tasks = {"a": "buy milk and eggs", "b": "call the plumber about the leak"}
+        index = self.open()
+        index.sync()
+        self.data.tasks = {"a": "buy oat milk and eggs"}
+        self.assertEqual(index.sync(), 1)
+        self.assertEqual(index.stats()["live"], 1)
+        hits = index.search("plumber leak", min_score=0.0)
+        self.assertEqual([h['text'] for h in hits], ["buy oat milk and eggs"])
+
+    def test_deleted_messages_are_dropped(self):
+        self.data.add_message("the spare key is under the blue flowerpot")
+        index = self.open()
+        index.sync()
+        self.assertEqual(len(index.search("spare key flowerpot")), 1)
+        self.data.messages.clear()
+        self.assertEqual(index.search("spare key flowerpot"), [])
+        self.assertEqual(index.stats()["live"], 0)
+
+    def test_growth_and_top_k(self):
+        index = self.open()
+        for i in range(1500):
+            self.data.add_message(f"note number {i} about topic{i % 7}")
+        self.data.add_message("quarterly taxes are due in april")
+        while index.sync():
+            pass
+        self.assertEqual(index.count, 1501)
+        self.assertGreaterEqual(os.path.getsize(index.vectors_path), 1501 * DIM * 2)
+        hits = index.search("when are the taxes due", k=3, min_score=0.0)
+        self.assertEqual(hits[0]['text'], "quarterly taxes are due in april")
+        self.assertEqual(len(hits), 3)
+        self.assertEqual(sorted((h['score'] for h in hits), reverse=True), [h['score'] for h in hits])
+
+    def test_appends_do_not_wait_for_scoring(self):
+        self.data.add_message("the recycling goes out on tuesdays")
+        index = self.open()
+        index.sync()
+        score = memory_index.cosine_scores
+
+        def scoring_while_appending(matrix, query):
+            self.data.add_message("the compost goes out on thursdays")
+            writer = threading.Thread(target=index.sync)
+            writer.start()
+            writer.join(timeout=5)
+            self.assertFalse(writer.is_alive())
+            return score(matrix, query)
+
+        with mock.patch.object(memory_index, "cosine_scores", scoring_while_appending):
+            hits = index.search_vector(index.embed(["recycling tuesdays"])[0], k=5)
+        self.assertEqual([row for row, _ in hits], [0])  # Scored the rows present when it started
+        self.assertEqual(index.count, 2)
+
+    def test_context_budget_and_exclusions(self):
+        self.data.add_message("my flight to Oslo leaves at 7am on Friday")
+        self.data.add_message("the Oslo hotel is near the central station", role="assistant")
+        index = self.open()
+        index.sync()
+        context = index.context_for("when my flight to Oslo leaves", max_tokens=1000)
+        self.assertTrue(context.startswith(MEMORY_HEADER))
+        self.assertIn("[user message 2026-03-02 18:04] my flight to Oslo leaves at 7am on Friday", context)
+
+        # Already in the conversation
+        context = index.context_for("when my flight to Oslo leaves",
+                                    exclude=["my flight to Oslo leaves at 7am on Friday"], max_tokens=1000)
+        self.assertNotIn("7am", context)
+        self.assertEqual(index.context_for("when my flight to Oslo leaves", max_tokens=10), "")
+        self.assertEqual(index.lookup("when my flight to Oslo leaves").result(timeout=5),
+                         index.context_for("when my flight to Oslo leaves"))
+
+    def test_slow_query_skips_one_turn_errors_back_off(self):
+        self.data.add_message("the boiler service is booked for March")
+        index = self.open()
+        index.sync()
+        failure = TimeoutError("timed out")
+
+        def failing_embed(texts):
+            raise failure
+        index._embed_fn = failing_embed
+        with mock.patch("builtins.print"):
+            self.assertEqual(index.context_for("when is the boiler service"), "")
+            self.assertEqual(index._retry_at, 0.0)
+            failure = ValueError("model not found")
+            self.assertEqual(index.context_for("when is the boiler service"), "")
+        self.assertGreater(index._retry_at, 0.0)
+
+    def test_model_change_rebuilds(self):
+        self.data.add_message("the garage door code is 4321")
+        index = self.open()
+        index.sync()
+        index.close()
+        index = self.open(model="other-embed")
+        self.assertEqual(index.sync(), 1)
+        self.assertEqual(index.count, 1)
+
+    def test_scoring_helpers(self):
+        matrix = np.eye(4, dtype=np.float16)[[2, 0, 3, 1]]
+        scores = cosine_scores(matrix, np.array([0.1, 0.9, 0.3, 0.0], dtype=np.float32), block=3)
+        self.assertEqual(list(top_k(scores, 2)), [3, 0])
+        self.assertEqual(len(top_k(scores, 10)), 4)
+
+if __name__ == '__main__':
+    unittest.main()
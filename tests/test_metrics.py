@@ -0,0 +1,92 @@
+import sys
+import os
+import tempfile
+import time
+import unittest
+
+# Add core directory to path to bypass package init (avoids loading tts/sounddevice)
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../core')))
+
+from metrics import LLMMetrics, _percentile
+from core.ollama_client import ContentChunk, DoneStats, ToolCallChunk
+
+def done(eval_count=100, eval_ms=1000, prompt_count=50, prompt_ms=100, load_ms=0, cancelled=False):
+    return DoneStats(
+        model="qwen3:1.7b", eval_count=eval_count, eval_duration=int(eval_ms * 1e6),
+        prompt_eval_count=prompt_count, prompt_eval_duration=int(prompt_ms * 1e6),
+        load_duration=int(load_ms * 1e6), total_duration=int((eval_ms + prompt_ms + load_ms) * 1e6),
+        cancelled=cancelled,
+    )
+
+class TestLLMMetrics(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.metrics = LLMMetrics(db_path=os.path.join(self.tmp.name, "metrics.db"))
+
+    def test_recorder_stores_one_row_per_reply(self):
+        recorder = self.metrics.stream("chat", "qwen3:1.7b", "set_timer")
+        for event in [ContentChunk("Timer"), ContentChunk(" set."), done()]:
+            recorder.observe(event)
+        recorder.finish(first_token_ms=420.0)
+
+        summary = self.metrics.summary()
+        self.assertEqual(summary["requests"], 1)
+        self.assertAlmostEqual(summary["tokens_per_second"], 100.0)
+        self.assertAlmostEqual(summary["prefill_tokens_per_second"], 500.0)
+        self.assertIsNotNone(summary["ttft_ms_p50"])
+        self.assertEqual(summary["first_token_ms_p50"], 420.0)
+
+    def test_native_rounds_are_summed(self):
+        recorder = self.metrics.stream("voice", "qwen3:4b")
+        for event in [ToolCallChunk([("set_timer", {})]), done(eval_count=10, eval_ms=100),
+                      ContentChunk("Done."), done(eval_count=30, eval_ms=300)]:
+            recorder.observe(event)
+        recorder.finish()
+
+        by_function = self.metrics.breakdown("function")
+        self.assertEqual(list(by_function), ["set_timer"])
+        self.assertEqual(by_function["set_timer"]["requests"], 1)
+        self.assertAlmostEqual(by_function["set_timer"]["tokens_per_second"], 100.0)
+
+    def test_replay_without_done_stats_is_not_recorded(self):
+        recorder = self.metrics.stream("chat", "qwen3:1.7b", "nonthinking")
+        recorder.observe(ContentChunk("cached"))
+        recorder.finish()
+        self.assertEqual(self.metrics.summary()["requests"], 0)
+
+    def test_cancelled_reply_is_recorded(self):
+        recorder = self.metrics.stream("chat", "qwen3:1.7b", "nonthinking")
+        recorder.observe(ContentChunk("Once upon"))
+        recorder.finish(cancelled=True)  # Stopped before Ollama's DoneStats arrived
+        summary = self.metrics.summary()
+        self.assertEqual(summary["requests"], 1)
+        self.assertEqual(summary["cancelled"], 1)
+
+    def test_filters_and_breakdown(self):
+        self.metrics.record("chat", "qwen3:1.7b", "nonthinking", [done(eval_ms=1000)], ttft_ms=100)
+        self.metrics.record("voice", "qwen3:4b", "thinking", [done(eval_ms=4000)], ttft_ms=300)
+        self.metrics.record("chat", "qwen3:4b", "web_search", [done(eval_ms=2000)], ttft_ms=200)
+
+        self.assertEqual(self.metrics.summary(entry="chat")["requests"], 2)
+        self.assertEqual(self.metrics.summary(model="qwen3:4b", entry="chat")["requests"], 1)
+        by_model = self.metrics.breakdown("model")
+        self.assertAlmostEqual(by_model["qwen3:1.7b"]["tokens_per_second"], 100.0)
+        self.assertAlmostEqual(by_model["qwen3:4b"]["tokens_per_second"], 200 / 6)
+        self.assertEqual(self.metrics.summary()["ttft_ms_p95"], 300)
+        with self.assertRaises(ValueError):
+            self.metrics.breakdown("prompt")
+
+    def test_window(self):
+        self.metrics.record("chat", "qwen3:1.7b", "nonthinking", [done()])
+        time.sleep(0.05)
+        self.assertEqual(self.metrics.summary(window_seconds=0.01)["requests"], 0)
+        self.assertEqual(self.metrics.summary(window_seconds=None)["requests"], 1)
+
+    def test_percentile(self):
+        self.assertIsNone(_percentile([], 50))
+        self.assertEqual(_percentile([3, 1, 2], 50), 2)
+        self.assertEqual(_percentile(list(range(1, 101)), 95), 95)
+
+if __name__ == '__main__':
+    unittest.main()
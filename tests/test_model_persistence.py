@@ -0,0 +1,123 @@
+import sys
+import os
+import unittest
+
+# Add core directory to path to bypass package init (avoids loading tts/sounddevice)
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../core')))
+
+from ollama_status import OllamaStatus
+from model_persistence import (
+    ResidencyScheduler, PRIORITY_AGENT, PRIORITY_EMBED, PRIORITY_RESPONDER, GB, canonical_name
+)
+
+SIZES = {"qwen3:0.6b": 1 * GB, "qwen3:1.7b": 2 * GB, "qwen3:4b": 4 * GB, "qwen3-vl:4b": 5 * GB,
+         "nomic-embed-text:latest": 1 * GB}
+
+class FakeOllama:
+    """Minimal stand-in for OllamaClient's ps/tags/load/unload."""
+    def __init__(self, running=()):
+        self.running = list(running)
+        self.loads = []
+        self.unloads = []
+
+    def ps(self, timeout=None):
+        return [{"name": name, "size": SIZES[name]} for name in self.running]
+
+    def tags(self):
+        return [{"name": name, "size": size} for name, size in SIZES.items()]
+
+    def load(self, model, keep_alive=None, timeout=None):
+        self.loads.append((model, keep_alive))
+        self.running.append(model)
+
+    def unload(self, model):
+        self.unloads.append(model)
+        self.running.remove(model)
+
+    def embed(self, model, inputs, keep_alive=None, timeout=None):
+        if keep_alive == 0:
+            self.unload(model)
+        else:
+            self.load(model, keep_alive)
+        return []
+
+class TestResidencyScheduler(unittest.TestCase):
+    def make(self, budget_gb, running=()):
+        self.client = FakeOllama(running)
+        scheduler = ResidencyScheduler(budget_bytes=budget_gb * GB, idle_timeout=60, tick=3600, client=self.client,
+                                       status=OllamaStatus(client=self.client, ttl=0))
+        return scheduler
+
+    def test_loads_within_budget_without_eviction(self):
+        scheduler = self.make(8)
+        self.assertTrue(scheduler.ensure_loaded("qwen3:0.6b"))
+        self.assertTrue(scheduler.ensure_loaded("qwen3:1.7b"))
+        self.assertEqual(self.client.unloads, [])
+        self.assertEqual(scheduler.used_bytes(), 3 * GB)
+
+    def test_already_loaded_is_not_reloaded(self):
+        scheduler = self.make(8, running=["qwen3:1.7b"])
+        self.assertTrue(scheduler.ensure_loaded("qwen3:1.7b"))
+        self.assertEqual(self.client.loads, [])
+
+    def test_evicts_least_recently_used_first(self):
+        scheduler = self.make(6)
+        scheduler.ensure_loaded("qwen3:1.7b")
+        scheduler.ensure_loaded("qwen3:4b")
+        scheduler.touch("qwen3:1.7b")  # 4b is now the least recently used
+        scheduler.ensure_loaded("qwen3:0.6b")
+        self.assertEqual(self.client.unloads, ["qwen3:4b"])
+
+    def test_lower_priority_evicted_before_recency(self):
+        scheduler = self.make(8)
+        scheduler.ensure_loaded("qwen3:1.7b", PRIORITY_RESPONDER)
+        scheduler.ensure_loaded("qwen3-vl:4b", PRIORITY_AGENT)
+        scheduler.ensure_loaded("qwen3:4b", PRIORITY_RESPONDER)
+        self.assertEqual(self.client.unloads, ["qwen3-vl:4b"])
+
+    def test_pinned_model_never_evicted(self):
+        scheduler = self.make(6)
+        scheduler.set_pinned(["qwen3:0.6b"])
+        scheduler.ensure_loaded("qwen3:0.6b")
+        self.assertEqual(self.client.loads[0], ("qwen3:0.6b", -1))
+        scheduler.ensure_loaded("qwen3:1.7b")
+        scheduler.ensure_loaded("qwen3:4b")
+        self.assertEqual(self.client.unloads, ["qwen3:1.7b"])
+        self.assertIn("qwen3:0.6b", self.client.running)
+
+    def test_external_models_evicted_first_but_not_idle_unloaded(self):
+        scheduler = self.make(6, running=["qwen3-vl:4b"])
+        scheduler.ensure_loaded("qwen3:1.7b")
+        self.assertEqual(self.client.unloads, ["qwen3-vl:4b"])
+
+        scheduler = self.make(16, running=["qwen3-vl:4b"])
+        scheduler.ensure_loaded("qwen3:1.7b")
+        for state in scheduler._models.values():
+            state.last_used -= 120
+        scheduler._evict_idle()
+        self.assertEqual(self.client.unloads, ["qwen3:1.7b"])
+
+    def test_preload_hint_only_when_it_fits(self):
+        scheduler = self.make(5)
+        scheduler.ensure_loaded("qwen3:1.7b")
+        scheduler._preload("qwen3:4b")
+        self.assertNotIn("qwen3:4b", self.client.running)
+        scheduler._preload("qwen3:0.6b")
+        self.assertIn("qwen3:0.6b", self.client.running)
+        self.assertEqual(self.client.unloads, [])
+
+    def test_embedding_model_uses_embed_and_is_evicted_before_responders(self):
+        scheduler = self.make(3)
+        scheduler.ensure_loaded("nomic-embed-text", PRIORITY_EMBED, embedding=True)
+        self.assertTrue(scheduler.is_loaded("nomic-embed-text"))
+        scheduler.ensure_loaded("qwen3:1.7b", PRIORITY_RESPONDER)
+        scheduler.ensure_loaded("qwen3:0.6b", PRIORITY_RESPONDER)
+        self.assertEqual(self.client.unloads, ["nomic-embed-text:latest"])
+        self.assertFalse(scheduler.is_loaded("nomic-embed-text"))
+
+    def test_canonical_name(self):
+        self.assertEqual(canonical_name("llama3"), "llama3:latest")
+        self.assertEqual(canonical_name("qwen3:1.7b"), "qwen3:1.7b")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,47 @@
+import sys
+import os
+import unittest
+from unittest import mock
+
+# Add core directory to path to bypass package init (avoids loading tts/sounddevice)
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../core')))
+
+import model_tiers
+from model_tiers import FAST, DEEP, tier_for, select_responder, keep_alive_for
+
+def settings_with(values):
+    return lambda key, default: values.get(key, default)
+
+class TestModelTiers(unittest.TestCase):
+    def patch_settings(self, values):
+        patcher = mock.patch.object(model_tiers, "_setting", side_effect=settings_with(values))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_tier_for_functions(self):
+        self.assertEqual(tier_for(["nonthinking"]), FAST)
+        self.assertEqual(tier_for(["set_timer"]), FAST)
+        self.assertEqual(tier_for(["thinking"]), DEEP)
+        self.assertEqual(tier_for(["get_system_info"]), DEEP)
+        # Compound commands use the deepest tier any call needs
+        self.assertEqual(tier_for(["set_timer", "web_search"]), DEEP)
+
+    def test_unset_tiers_use_chat_model(self):
+        self.patch_settings({"models.chat": "qwen3:1.7b"})
+        self.assertEqual(select_responder([("nonthinking", {})]), (FAST, "qwen3:1.7b"))
+        self.assertEqual(select_responder([("thinking", {})]), (DEEP, "qwen3:1.7b"))
+        self.assertIsNone(model_tiers.pinned_model())
+
+    def test_configured_tiers(self):
+        self.patch_settings({
+            "models.chat": "qwen3:1.7b",
+            "models.tiers.fast": "qwen3:0.6b",
+            "models.tiers.deep": "qwen3:4b",
+        })
+        self.assertEqual(select_responder([("control_light", {})]), (FAST, "qwen3:0.6b"))
+        self.assertEqual(select_responder([("thinking", {})]), (DEEP, "qwen3:4b"))
+        self.assertEqual(keep_alive_for("qwen3:0.6b"), -1)
+        self.assertEqual(keep_alive_for("qwen3:4b"), "5m")
+
+if __name__ == '__main__':
+    unittest.main()
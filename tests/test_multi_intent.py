@@ -0,0 +1,53 @@
+import sys
+import os
+import unittest
+
+# Add core directory to path to bypass package init (avoids loading tts/sounddevice)
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../core')))
+
+from multi_intent import drops_clause, merge_calls, split_compound_prompt
+
+class TestMultiIntent(unittest.TestCase):
+    def test_split_compound_command(self):
+        self.assertEqual(
+            split_compound_prompt("Turn off the kitchen lights and set a timer for 20 minutes"),
+            ["Turn off the kitchen lights", "set a timer for 20 minutes"],
+        )
+        self.assertEqual(
+            split_compound_prompt("dim the lights, add milk to my list, then search for pasta recipes"),
+            ["dim the lights", "add milk to my list", "search for pasta recipes"],
+        )
+
+    def test_no_split_inside_arguments(self):
+        for text in ("search for salt and pepper shakers",
+                     "explain the difference between cats and dogs",
+                     "remind me to call mom and dad",
+                     "search for restaurants and what time they close",
+                     "add task buy milk and set up the printer"):
+            self.assertEqual(split_compound_prompt(text), [text])
+
+    def test_merge_drops_passthrough_and_duplicates(self):
+        calls = [
+            ("control_light", {"action": "off"}),
+            ("nonthinking", {"prompt": "thanks"}),
+            ("control_light", {"action": "off"}),
+            ("set_timer", {"duration": "20 minutes"}),
+        ]
+        self.assertEqual(merge_calls(calls, "full prompt"), [
+            ("control_light", {"action": "off"}),
+            ("set_timer", {"duration": "20 minutes"}),
+        ])
+
+    def test_passthrough_clause_is_not_dropped(self):
+        # "check the garage and turn off the lights": the first clause isn't a command
+        calls = [("nonthinking", {"prompt": "check the garage"}), ("control_light", {"action": "off"})]
+        self.assertTrue(drops_clause(calls))
+        self.assertFalse(drops_clause([("control_light", {"action": "off"}), ("set_timer", {"duration": "5m"})]))
+        self.assertFalse(drops_clause([("nonthinking", {"prompt": "a"}), ("thinking", {"prompt": "b"})]))
+
+    def test_merge_only_passthrough(self):
+        calls = [("nonthinking", {"prompt": "a"}), ("thinking", {"prompt": "b"})]
+        self.assertEqual(merge_calls(calls, "a and b"), [("thinking", {"prompt": "a and b"})])
+
+if __name__ == '__main__':
+    unittest.main()
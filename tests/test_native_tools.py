@@ -0,0 +1,96 @@
+import sys
+import os
+import json
+import unittest
+from unittest import mock
+
+import httpx
+
+# Add core directory to path to bypass package init (avoids loading tts/sounddevice)
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../core')))
+
+import native_tools
+from native_tools import NATIVE_TOOLS, run_native
+from router_tools import TOOL_FUNCTIONS, function_schema
+from core.ollama_client import OllamaClient, ContentChunk, DoneStats, ToolCallChunk
+
+def ndjson(*chunks):
+    return b"".join(json.dumps(c).encode() + b"\n" for c in chunks)
+
+TOOL_ROUND = ndjson(
+    {"message": {"role": "assistant", "content": "", "tool_calls": [
+        {"function": {"name": "set_timer", "arguments": {"duration": "5 minutes"}}}
+    ]}, "done": False},
+    {"message": {"role": "assistant", "content": ""}, "done": True, "prompt_eval_count": 300},
+)
+ANSWER_ROUND = ndjson(
+    {"message": {"role": "assistant", "content": "Timer set."}, "done": False},
+    {"message": {"role": "assistant", "content": ""}, "done": True, "prompt_eval_count": 20},
+)
+
+class TestNativeTools(unittest.TestCase):
+    def setUp(self):
+        self.requests = []
+        self.bodies = [TOOL_ROUND, ANSWER_ROUND]
+
+        def handler(request):
+            self.requests.append(json.loads(request.content))
+            return httpx.Response(200, content=self.bodies.pop(0))
+
+        client = OllamaClient("http://ollama.test", transport=httpx.MockTransport(handler))
+        patcher = mock.patch.object(native_tools, "ollama", client)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_tools_exclude_passthrough(self):
+        names = [tool["function"]["name"] for tool in NATIVE_TOOLS]
+        self.assertIn("set_timer", names)
+        self.assertIn("get_system_info", names)
+        self.assertNotIn("thinking", names)
+        self.assertNotIn("nonthinking", names)
+        self.assertTrue(all("return" not in tool["function"] for tool in NATIVE_TOOLS))
+
+    def test_tool_round_then_answer(self):
+        executed = []
+
+        def execute(calls):
+            executed.extend(calls)
+            return ["ACTION RESULT: set_timer succeeded."]
+
+        messages = [{"role": "system", "content": "sys"}, {"role": "user", "content": "timer 5 minutes"}]
+        events = list(run_native("qwen3:1.7b", messages, execute))
+
+        self.assertEqual(executed, [("set_timer", {"duration": "5 minutes"})])
+        self.assertEqual(events[0], ToolCallChunk([("set_timer", {"duration": "5 minutes"})]))
+        self.assertIn(ContentChunk("Timer set."), events)
+        self.assertEqual(sum(isinstance(e, DoneStats) for e in events), 2)
+
+        # The tool turn and its result are fed back in the same conversation
+        self.assertEqual([m["role"] for m in messages], ["system", "user", "assistant", "tool"])
+        self.assertEqual(messages[3]["tool_name"], "set_timer")
+        self.assertEqual(len(self.requests), 2)
+        self.assertEqual(self.requests[1]["messages"][-1]["content"], "ACTION RESULT: set_timer succeeded.")
+
+    def test_last_round_has_no_tools(self):
+        list(run_native("qwen3:1.7b", [{"role": "user", "content": "hi"}], lambda calls: ["ok"], max_rounds=1))
+        self.assertIn("tools", self.requests[0])
+        self.assertNotIn("tools", self.requests[1])
+
+    def test_no_tool_call_single_round(self):
+        self.bodies = [ANSWER_ROUND]
+        messages = [{"role": "user", "content": "hello"}]
+        events = list(run_native("qwen3:1.7b", messages, lambda calls: self.fail("no tools expected")))
+        self.assertEqual(events[0], ContentChunk("Timer set."))
+        self.assertEqual(len(messages), 1)
+
+class TestFunctionSchema(unittest.TestCase):
+    def test_matches_transformers(self):
+        try:
+            from transformers.utils import get_json_schema
+        except ImportError:
+            self.skipTest("transformers not installed")
+        for fn in TOOL_FUNCTIONS:
+            self.assertEqual(function_schema(fn), get_json_schema(fn), fn.__name__)
+
+if __name__ == '__main__':
+    unittest.main()
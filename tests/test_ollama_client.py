@@ -0,0 +1,107 @@
+import sys
+import os
+import asyncio
+import json
+import threading
+import unittest
+
+import httpx
+
+# Add core directory to path to bypass package init (avoids loading tts/sounddevice)
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../core')))
+
+from ollama_client import (
+    OllamaClient, OllamaError, NDJSONDecoder, ThinkingChunk, ContentChunk, DoneStats
+)
+
+CHUNKS = [
+    {"message": {"role": "assistant", "content": "", "thinking": "Hmm"}, "done": False},
+    {"message": {"role": "assistant", "content": "Hello"}, "done": False},
+    {"message": {"role": "assistant", "content": " there"}, "done": False},
+    {"message": {"role": "assistant", "content": ""}, "done": True, "done_reason": "stop",
+     "eval_count": 10, "eval_duration": 500_000_000},
+]
+BODY = b"".join(json.dumps(c).encode() + b"\n" for c in CHUNKS)
+
+
+def split_body(size=7):
+    """The body in awkward pieces, so JSON lines straddle network reads."""
+    return [BODY[i:i + size] for i in range(0, len(BODY), size)]
+
+
+class AsyncBody(httpx.AsyncByteStream):
+    async def __aiter__(self):
+        for part in split_body():
+            yield part
+
+
+class TestOllamaClient(unittest.TestCase):
+    def setUp(self):
+        self.requests = []
+
+        def handler(request):
+            self.requests.append(json.loads(request.content))
+            return httpx.Response(200, content=iter(split_body()))
+
+        self.client = OllamaClient("http://ollama.test", transport=httpx.MockTransport(handler))
+
+    def test_decoder_handles_partial_and_malformed_lines(self):
+        decoder = NDJSONDecoder()
+        self.assertEqual(decoder.feed(b'{"a": 1}\n{"b"'), [{"a": 1}])
+        self.assertEqual(decoder.feed(b': 2}\nnot json\n'), [{"b": 2}])
+        self.assertEqual(decoder.feed(b'{"c": 3}'), [])
+        self.assertEqual(decoder.flush(), [{"c": 3}])
+
+    def test_chat_stream_typed_events(self):
+        events = list(self.client.chat_stream("qwen3:1.7b", [{"role": "user", "content": "hi"}], think=True))
+        self.assertEqual(events[:3], [ThinkingChunk("Hmm"), ContentChunk("Hello"), ContentChunk(" there")])
+        self.assertIsInstance(events[3], DoneStats)
+        self.assertEqual(events[3].tokens_per_second, 20.0)
+        self.assertEqual(self.requests[0]["think"], True)
+        self.assertTrue(self.requests[0]["stream"])
+
+    def test_stop_event_cancels(self):
+        stop = threading.Event()
+        events = []
+        for event in self.client.chat_stream("qwen3:1.7b", [], stop_event=stop):
+            events.append(event)
+            stop.set()
+        self.assertEqual(events, [ThinkingChunk("Hmm"), DoneStats(cancelled=True)])
+
+    def test_error_status_raises(self):
+        client = OllamaClient("http://ollama.test", transport=httpx.MockTransport(
+            lambda request: httpx.Response(404, json={"error": "model not found"})))
+        with self.assertRaises(OllamaError):
+            list(client.chat_stream("missing", []))
+
+    def test_embed(self):
+        requests = []
+
+        def handler(request):
+            requests.append((request.url.path, json.loads(request.content)))
+            return httpx.Response(200, json={"embeddings": [[0.1, 0.2], [0.3, 0.4]]})
+
+        client = OllamaClient("http://ollama.test", transport=httpx.MockTransport(handler))
+        self.assertEqual(client.embed("nomic-embed-text", ["a", "b"], keep_alive="10m"), [[0.1, 0.2], [0.3, 0.4]])
+        self.assertEqual(requests[0], ("/api/embed", {"model": "nomic-embed-text", "input": ["a", "b"],
+                                                      "keep_alive": "10m"}))
+
+    def test_async_chat_stream(self):
+        client = OllamaClient("http://ollama.test", async_transport=httpx.MockTransport(
+            lambda request: httpx.Response(200, stream=AsyncBody())))
+
+        async def collect():
+            return [event async for event in client.achat_stream("qwen3:1.7b", [])]
+
+        events = asyncio.run(collect())
+        self.assertEqual([e.text for e in events if isinstance(e, ContentChunk)], ["Hello", " there"])
+        self.assertIsInstance(events[-1], DoneStats)
+
+    def test_async_chat_across_event_loops(self):
+        client = OllamaClient("http://ollama.test", async_transport=httpx.MockTransport(
+            lambda request: httpx.Response(200, json={"message": {"role": "assistant", "content": "hi"}})))
+        for _ in range(2):  # Each asyncio.run() is a new loop; no client may outlive its loop
+            self.assertEqual(asyncio.run(client.achat("qwen3:1.7b", []))["message"]["content"], "hi")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,115 @@
+import sys
+import os
+import threading
+import time
+import unittest
+
+# Add core directory to path to bypass package init (avoids loading tts/sounddevice)
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../core')))
+
+from ollama_status import OllamaStatus
+
+class FakeOllama:
+    """Counts /api/ps calls; set running to None to simulate Ollama being offline."""
+    def __init__(self, running=()):
+        self.running = None if running is None else list(running)
+        self.calls = 0
+        self.delay = 0
+
+    def ps(self, timeout=None):
+        self.calls += 1
+        time.sleep(self.delay)
+        if self.running is None:
+            raise ConnectionError("offline")
+        return [{"name": name, "size": 1} for name in self.running]
+
+class TestOllamaStatus(unittest.TestCase):
+    def test_ttl_cache(self):
+        client = FakeOllama(["qwen3:1.7b"])
+        status = OllamaStatus(client=client, ttl=60)
+        self.assertEqual(status.running_models(), ["qwen3:1.7b"])
+        self.assertEqual(status.running_models(), ["qwen3:1.7b"])
+        self.assertEqual(client.calls, 1)
+
+        status.invalidate()
+        status.running_models()
+        self.assertEqual(client.calls, 2)
+
+    def test_concurrent_readers_share_one_request(self):
+        client = FakeOllama(["qwen3:1.7b"])
+        client.delay = 0.1
+        status = OllamaStatus(client=client, ttl=60)
+        threads = [threading.Thread(target=status.models) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(client.calls, 1)
+
+    def test_offline(self):
+        status = OllamaStatus(client=FakeOllama(None), ttl=0)
+        self.assertIsNone(status.models())
+        self.assertEqual(status.running_models(), [])
+
+    def test_notifies_only_on_change(self):
+        client = FakeOllama(["qwen3:1.7b"])
+        status = OllamaStatus(client=client, ttl=0, idle_interval=3600)
+        events = []
+        status.set_paused(True)  # Drive fetches by hand
+        status.subscribe(events.append)
+
+        status.refresh()
+        status.refresh()
+        self.assertEqual(len(events), 1)
+
+        client.running.append("qwen3:4b")
+        status.refresh()
+        self.assertEqual([m["name"] for m in events[-1]], ["qwen3:1.7b", "qwen3:4b"])
+
+        client.running = None
+        status.refresh()
+        self.assertIsNone(events[-1])
+        self.assertEqual(len(events), 3)
+
+    def test_new_subscriber_gets_cached_view(self):
+        status = OllamaStatus(client=FakeOllama(["qwen3:1.7b"]), ttl=60)
+        status.set_paused(True)
+        status.models()
+        events = []
+        status.subscribe(events.append)
+        self.assertEqual(len(events), 1)
+
+    def test_poll_interval(self):
+        status = OllamaStatus(client=FakeOllama(), active_interval=1, idle_interval=10)
+        self.assertEqual(status.poll_interval(), 10)
+        status.set_active("chat", True)
+        status.set_active("voice", True)
+        status.set_active("chat", False)
+        self.assertEqual(status.poll_interval(), 1)
+        status.set_active("voice", False)
+        status.set_active("voice", False)
+        self.assertEqual(status.poll_interval(), 10)
+        status.set_paused(True)
+        self.assertIsNone(status.poll_interval())
+
+    def test_poller_pushes_changes(self):
+        client = FakeOllama(["qwen3:1.7b"])
+        status = OllamaStatus(client=client, ttl=0, active_interval=0.02, idle_interval=3600)
+        status.set_active("chat", True)
+        first, changed = threading.Event(), threading.Event()
+        events = []
+
+        def on_change(models):
+            events.append(models)
+            (first if len(events) == 1 else changed).set()
+
+        unsubscribe = status.subscribe(on_change)
+        self.assertTrue(first.wait(2))
+        client.running.append("qwen3:4b")
+        self.assertTrue(changed.wait(2))
+        self.assertEqual(len(events[-1]), 2)
+        unsubscribe()
+        self.assertEqual(status.stats()["subscribers"], 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,60 @@
+import sys
+import os
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+# Add core directory to path to bypass package init (avoids loading tts/sounddevice)
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../core')))
+
+from response_cache import ResponseCache, is_cacheable, replay
+
+SYSTEM = "You are a helpful assistant."
+
+class TestResponseCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache = ResponseCache(db_path=os.path.join(self.tmp.name, "cache.db"),
+                                   ttl_seconds=60, max_entries=2, wake_word="jarvis")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_hit_on_normalized_prompt(self):
+        self.cache.put("qwen3:1.7b", "What's the capital of France?", SYSTEM, "Paris.")
+        self.assertEqual(self.cache.get("qwen3:1.7b", "jarvis what's the capital of france", SYSTEM), "Paris.")
+        # Model and system prompt are part of the key
+        self.assertIsNone(self.cache.get("qwen3:4b", "What's the capital of France?", SYSTEM))
+        self.assertIsNone(self.cache.get("qwen3:1.7b", "What's the capital of France?", "Be terse."))
+
+    def test_ttl_expiry(self):
+        self.cache.put("m", "capital of france", SYSTEM, "Paris.")
+        with mock.patch("response_cache.time.time", return_value=time.time() + 120):
+            self.assertIsNone(self.cache.get("m", "capital of france", SYSTEM))
+        self.assertEqual(self.cache.stats()["size"], 0)
+
+    def test_size_eviction_is_lru(self):
+        self.cache.put("m", "one", SYSTEM, "1")
+        self.cache.put("m", "two", SYSTEM, "2")
+        time.sleep(0.01)
+        self.assertEqual(self.cache.get("m", "one", SYSTEM), "1")
+        self.cache.put("m", "three", SYSTEM, "3")
+        self.assertEqual(self.cache.get("m", "one", SYSTEM), "1")
+        self.assertIsNone(self.cache.get("m", "two", SYSTEM))
+
+    def test_is_cacheable(self):
+        fresh = [{"role": "system", "content": SYSTEM}, {"role": "user", "content": "q"}]
+        ongoing = [{"role": "system", "content": SYSTEM}, {"role": "user", "content": "a"},
+                   {"role": "assistant", "content": "b"}, {"role": "user", "content": "q"}]
+        self.assertTrue(is_cacheable("tell me more about it", fresh))
+        self.assertFalse(is_cacheable("tell me more about it", ongoing))
+        self.assertTrue(is_cacheable("what's the capital of france", ongoing))
+        self.assertFalse(is_cacheable("what's the weather today", fresh))
+
+    def test_replay_reassembles_text(self):
+        text = "Paris is the capital.\n\nIt is in France."
+        self.assertEqual("".join(chunk.text for chunk in replay(text)), text)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,57 @@
+import sys
+import os
+import unittest
+from unittest import mock
+
+# Add core directory to path to bypass package init (avoids loading tts/sounddevice)
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../core')))
+
+import route_cache
+from route_cache import RouteCache, normalize_prompt
+
+class TestRouteCache(unittest.TestCase):
+    def setUp(self):
+        self.cache = RouteCache(max_size=2, ttl_seconds=60, wake_word="jarvis")
+
+    def test_normalize_prompt(self):
+        self.assertEqual(normalize_prompt("Jarvis, turn OFF the lights!", "jarvis"), "turn off the lights")
+        self.assertEqual(normalize_prompt("  turn off   the lights ", "jarvis"), "turn off the lights")
+
+    def test_hit_on_normalized_prompt(self):
+        self.cache.put("Turn off the lights", "control_light", {"action": "off"})
+        self.assertEqual(self.cache.get("jarvis turn off the lights."), ("control_light", {"action": "off"}))
+        stats = self.cache.stats()
+        self.assertEqual(stats["hits"], 1)
+        self.assertEqual(stats["misses"], 0)
+
+    def test_prompt_argument_uses_current_input(self):
+        self.cache.put("What is a black hole?", "nonthinking", {"prompt": "What is a black hole?"})
+        func, params = self.cache.get("what is a black hole")
+        self.assertEqual(func, "nonthinking")
+        self.assertEqual(params["prompt"], "what is a black hole")
+
+    def test_lru_eviction(self):
+        self.cache.put("a", "web_search", {"query": "a"})
+        self.cache.put("b", "web_search", {"query": "b"})
+        self.cache.get("a")
+        self.cache.put("c", "web_search", {"query": "c"})
+
+        self.assertIsNone(self.cache.get("b"))
+        self.assertIsNotNone(self.cache.get("a"))
+        self.assertEqual(self.cache.stats()["evictions"], 1)
+
+    def test_ttl_expiry(self):
+        with mock.patch.object(route_cache.time, "monotonic", return_value=100.0):
+            self.cache.put("turn on the lights", "control_light", {"action": "on"})
+        with mock.patch.object(route_cache.time, "monotonic", return_value=200.0):
+            self.assertIsNone(self.cache.get("turn on the lights"))
+        self.assertEqual(self.cache.stats()["expirations"], 1)
+
+    def test_time_relative_bypass(self):
+        self.cache.put("Remind me tomorrow at 9", "create_calendar_event", {"title": "Reminder", "date": "tomorrow"})
+        self.assertIsNone(self.cache.get("Remind me tomorrow at 9"))
+        self.assertEqual(self.cache.stats()["size"], 0)
+        self.assertEqual(self.cache.stats()["bypassed"], 1)
+
+if __name__ == '__main__':
+    unittest.main()
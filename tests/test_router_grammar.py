@@ -0,0 +1,116 @@
+import sys
+import os
+import unittest
+
+# Add core directory to path to bypass package init (avoids loading tts/sounddevice)
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../core')))
+
+from router_grammar import ESCAPE, FunctionCallGrammar
+
+PREFIX = "<start_function_call>call:"
+
+def tool(name, properties, required=()):
+    return {"type": "function", "function": {
+        "name": name,
+        "parameters": {
+            "type": "object",
+            "properties": {p: {"type": "string"} for p in properties},
+            "required": list(required),
+        },
+    }}
+
+TOOLS = [
+    tool("control_light", ["action", "room"], required=["action"]),
+    tool("set_timer", ["duration", "label"], required=["duration"]),
+    tool("web_search", ["query"], required=["query"]),
+    tool("nonthinking", ["prompt"], required=["prompt"]),
+]
+
+def esc(value):
+    return f"{ESCAPE}{value}{ESCAPE}"
+
+class TestFunctionCallGrammar(unittest.TestCase):
+    def setUp(self):
+        self.grammar = FunctionCallGrammar(TOOLS, PREFIX, no_arg_functions=["nonthinking"])
+
+    def assertPrefix(self, text):
+        self.assertEqual(self.grammar.check(text), (True, False), text)
+
+    def assertComplete(self, text):
+        self.assertEqual(self.grammar.check(text), (True, True), text)
+
+    def assertInvalid(self, text):
+        self.assertEqual(self.grammar.check(text), (False, False), text)
+
+    def test_valid_prefixes(self):
+        for text in [
+            "",
+            "<start_fun",
+            PREFIX,
+            PREFIX + "control",
+            PREFIX + "control_light",
+            PREFIX + "control_light{",
+            PREFIX + "control_light{act",
+            PREFIX + "control_light{action:",
+            PREFIX + "control_light{action:<esc",
+            PREFIX + "control_light{action:" + ESCAPE + "tu",
+            PREFIX + "control_light{action:" + esc("on"),
+            PREFIX + "control_light{action:" + esc("on") + ",",
+            PREFIX + "control_light{action:" + esc("on") + ",ro",
+            PREFIX + "set_timer{duration:10",
+            PREFIX + "nonthinking{",
+        ]:
+            self.assertPrefix(text)
+
+    def test_complete_calls(self):
+        self.assertComplete(PREFIX + "control_light{action:" + esc("off") + "}")
+        self.assertComplete(PREFIX + "control_light{action:" + esc("on") + ",room:" + esc("kitchen") + "}")
+        self.assertComplete(PREFIX + "control_light{room:" + esc("kitchen") + ",action:" + esc("on") + "}")
+        self.assertComplete(PREFIX + "set_timer{duration:600}")
+        self.assertComplete(PREFIX + "web_search{query:" + esc("weather, today {tomorrow}") + "}")
+        # Arguments of no-arg functions are skipped
+        self.assertComplete(PREFIX + "nonthinking{}")
+
+    def test_missing_required_argument_is_not_complete(self):
+        self.assertInvalid(PREFIX + "control_light{room:" + esc("kitchen") + "}")
+        self.assertInvalid(PREFIX + "set_timer{}")
+
+    def test_bad_function_names(self):
+        self.assertInvalid("call:control_light{")
+        self.assertInvalid(PREFIX + "x")
+        self.assertInvalid(PREFIX + "control_lights")
+        self.assertInvalid(PREFIX + "control_lights{")
+        self.assertInvalid(PREFIX + "{action:" + esc("on") + "}")
+
+    def test_bad_argument_names(self):
+        self.assertInvalid(PREFIX + "control_light{colour:")
+        self.assertInvalid(PREFIX + "control_light{x")
+        self.assertInvalid(PREFIX + "set_timer{action:" + esc("on") + "}")
+        # Each key at most once
+        self.assertInvalid(PREFIX + "control_light{action:" + esc("on") + ",action:")
+        self.assertInvalid(PREFIX + "nonthinking{prompt:")
+
+    def test_unbalanced_quotes_and_braces(self):
+        # An unclosed escape is still a prefix, never a complete call
+        self.assertPrefix(PREFIX + "web_search{query:" + ESCAPE + "weather}")
+        self.assertPrefix(PREFIX + "web_search{query:" + esc("weather"))
+        self.assertInvalid(PREFIX + "web_search{query:" + esc("weather") + "x")
+        self.assertInvalid(PREFIX + "set_timer{duration:}")
+        self.assertInvalid(PREFIX + "set_timer{duration:10<")
+        self.assertInvalid(PREFIX + "set_timer{duration:10}}")
+        self.assertInvalid(PREFIX + "control_light{action:" + esc("on") + "}}")
+        self.assertInvalid(PREFIX + "nonthinking{}}")
+
+    def test_multiple_calls(self):
+        first = PREFIX + "control_light{action:" + esc("off") + "}"
+        second = PREFIX + "set_timer{duration:600}"
+        self.assertComplete(first)
+        self.assertComplete(second)
+        # One call per generation: anything after the closing brace is rejected
+        self.assertInvalid(first + second)
+        self.assertInvalid(first + "<")
+        # Separator after the last remaining key
+        self.assertInvalid(PREFIX + "control_light{action:" + esc("on") + ",room:" + esc("hall") + ",")
+
+if __name__ == '__main__':
+    unittest.main()
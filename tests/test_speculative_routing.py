@@ -0,0 +1,49 @@
+import sys
+import os
+import threading
+import time
+import unittest
+
+# Add core directory to path to bypass package init (avoids loading tts/sounddevice)
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../core')))
+
+from speculative_routing import SpeculativeRouter
+
+class TestSpeculativeRouter(unittest.TestCase):
+    def setUp(self):
+        self.routed = []
+        self.release = threading.Event()
+        self.release.set()
+
+        def route(text):
+            self.release.wait(5)
+            self.routed.append(text)
+            return [("nonthinking", {"prompt": text})]
+
+        self.router = SpeculativeRouter(route, wake_word="jarvis")
+
+    def test_hit_uses_current_text(self):
+        self.router.submit("tell me a joke")
+        self.assertEqual(self.router.take("Tell me a joke!"), [("nonthinking", {"prompt": "Tell me a joke!"})])
+        stats = self.router.stats()
+        self.assertEqual(stats["hits"], 1)
+        self.assertEqual(stats["misses"], 0)
+
+    def test_miss_when_text_changed(self):
+        self.router.submit("tell me a joke")
+        self.assertIsNone(self.router.take("tell me a story"))
+        self.assertEqual(self.router.stats()["misses"], 1)
+
+    def test_stale_drafts_are_dropped(self):
+        self.release.clear()
+        self.router.submit("turn")
+        time.sleep(0.05)  # "turn" is now in flight
+        self.router.submit("turn off")
+        self.router.submit("turn off the lights")
+        self.release.set()
+        self.assertIsNotNone(self.router.take("turn off the lights"))
+        self.assertEqual(self.routed, ["turn", "turn off the lights"])
+        self.assertEqual(self.router.stats()["superseded"], 1)
+
+if __name__ == '__main__':
+    unittest.main()
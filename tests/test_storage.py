@@ -0,0 +1,154 @@
+import sys
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import unittest
+
+# Add core directory to path to bypass package init (avoids loading tts/sounddevice)
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../core')))
+
+from storage import Database, WriteBehind, add_column
+from history import ChatHistoryManager
+from tasks import TaskManager
+
+class TestDatabase(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.path = os.path.join(self.tmp.name, "test.db")
+
+    def open(self, migrations):
+        db = Database(self.path, migrations)
+        self.addCleanup(db.close)
+        return db
+
+    def test_migrations_run_once(self):
+        calls = []
+        migrations = [
+            ["CREATE TABLE notes (id INTEGER PRIMARY KEY, text TEXT)"],
+            lambda conn: calls.append("v2"),
+        ]
+        db = self.open(migrations)
+        self.assertEqual(db.version(), 2)
+        self.open(migrations)
+        self.assertEqual(calls, ["v2"])
+
+        # A new migration is applied on the next start
+        db = self.open(migrations + [add_column("notes", "pinned", "INTEGER DEFAULT 0")])
+        self.assertEqual(db.version(), 3)
+        db.execute("INSERT INTO notes (text) VALUES ('a')")
+        self.assertEqual(db.query_one("SELECT pinned FROM notes")[0], 0)
+
+    def test_failed_migration_rolls_back(self):
+        def broken(conn):
+            conn.execute("CREATE TABLE half (id INTEGER)")
+            raise RuntimeError("boom")
+
+        with self.assertRaises(RuntimeError):
+            self.open([["CREATE TABLE notes (id INTEGER)"], broken])
+        db = self.open([["CREATE TABLE notes (id INTEGER)"]])
+        self.assertEqual(db.version(), 1)
+        self.assertIsNone(db.query_one("SELECT name FROM sqlite_master WHERE name = 'half'"))
+
+    def test_wal_and_per_thread_connections(self):
+        db = self.open([["CREATE TABLE notes (id INTEGER)"]])
+        self.assertEqual(db.query_one("PRAGMA journal_mode")[0], "wal")
+        self.assertIs(db.connection(), db.connection())
+
+        other = []
+        thread = threading.Thread(target=lambda: other.append(db.connection()))
+        thread.start()
+        thread.join()
+        self.assertIsNot(other[0], db.connection())
+
+    def test_transaction(self):
+        db = self.open([["CREATE TABLE notes (id INTEGER)"]])
+        with self.assertRaises(ValueError):
+            with db.transaction() as conn:
+                conn.execute("INSERT INTO notes VALUES (1)")
+                raise ValueError
+        with db.transaction() as conn:
+            conn.execute("INSERT INTO notes VALUES (2)")
+            with db.transaction():
+                conn.execute("INSERT INTO notes VALUES (3)")
+        self.assertEqual([r[0] for r in db.query("SELECT id FROM notes ORDER BY id")], [2, 3])
+
+    def test_legacy_databases(self):
+        # Created by the old code: sessions without the pinned column, tasks without alarms
+        history_path = os.path.join(self.tmp.name, "history.db")
+        conn = sqlite3.connect(history_path)
+        conn.execute("CREATE TABLE sessions (id TEXT PRIMARY KEY, title TEXT, created_at TEXT, updated_at TEXT)")
+        conn.execute("INSERT INTO sessions VALUES ('s1', 'Old chat', '2024-01-01', '2024-01-01')")
+        conn.commit()
+        conn.close()
+        conn = sqlite3.connect(self.path)
+        conn.execute("CREATE TABLE tasks (id TEXT PRIMARY KEY, text TEXT NOT NULL, completed BOOLEAN DEFAULT 0, "
+                     "created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)")
+        conn.commit()
+        conn.close()
+
+        history = ChatHistoryManager(history_path)
+        self.addCleanup(history.close)
+        self.assertEqual(history.get_sessions()[0]["pinned"], False)
+        self.assertTrue(history.toggle_pin("s1"))
+
+        tasks = TaskManager(self.path)
+        self.addCleanup(tasks.close)
+        self.assertEqual(tasks.get_alarms(), [])
+        self.assertIsNotNone(tasks.add_alarm("07:00", "Wake up"))
+        self.assertEqual(tasks.get_alarms()[0]["label"], "Wake up")
+
+class TestWriteBehind(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.db = Database(os.path.join(tmp.name, "test.db"), [
+            ["CREATE TABLE notes (id INTEGER PRIMARY KEY, text TEXT)",
+             "CREATE TABLE stamps (key TEXT PRIMARY KEY, value INTEGER)",
+             "INSERT INTO stamps VALUES ('s', 0)",
+             "CREATE TABLE updates (n INTEGER)",
+             "INSERT INTO updates VALUES (0)",
+             "CREATE TRIGGER count_updates AFTER UPDATE ON stamps BEGIN UPDATE updates SET n = n + 1; END"],
+        ])
+        self.addCleanup(self.db.close)
+
+    def test_group_commit(self):
+        writer = WriteBehind(self.db, group_commit_ms=50)
+        self.addCleanup(writer.close)
+        for i in range(100):
+            writer.submit("INSERT INTO notes (text) VALUES (?)", (f"note {i}",))
+        self.assertTrue(writer.flush(timeout=5))
+        self.assertEqual(writer.pending(), 0)
+        self.assertEqual(self.db.query_one("SELECT COUNT(*) FROM notes")[0], 100)
+        self.assertLessEqual(writer.batches, 2)
+
+    def test_flush_skips_group_commit_wait(self):
+        writer = WriteBehind(self.db, group_commit_ms=10_000)
+        self.addCleanup(writer.close)
+        writer.submit("INSERT INTO notes (text) VALUES ('now')")
+        start = time.monotonic()
+        self.assertTrue(writer.flush(timeout=5))
+        self.assertLess(time.monotonic() - start, 2)
+        self.assertEqual(self.db.query_one("SELECT COUNT(*) FROM notes")[0], 1)
+
+    def test_coalesce_keeps_last(self):
+        writer = WriteBehind(self.db, group_commit_ms=50)
+        self.addCleanup(writer.close)
+        for value in range(1, 6):
+            writer.submit("UPDATE stamps SET value = ? WHERE key = 's'", (value,), coalesce="s")
+        writer.flush()
+        self.assertEqual(self.db.query_one("SELECT value FROM stamps")[0], 5)
+        self.assertLess(self.db.query_one("SELECT n FROM updates")[0], 5)
+
+    def test_close_drains_and_late_writes_are_kept(self):
+        writer = WriteBehind(self.db, group_commit_ms=200)
+        writer.submit("INSERT INTO notes (text) VALUES ('queued')")
+        writer.close()
+        writer.submit("INSERT INTO notes (text) VALUES ('late')")
+        texts = [r[0] for r in self.db.query("SELECT text FROM notes ORDER BY id")]
+        self.assertEqual(texts, ["queued", "late"])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,59 @@
+import sys
+import os
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+# Add core directory to path to bypass package init (avoids loading tts/sounddevice)
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../core')))
+
+from timing import StageTimer
+
+class TestStageTimer(unittest.TestCase):
+    def test_stage_records_interval(self):
+        timer = StageTimer("Test")
+        with timer.stage("route"):
+            time.sleep(0.02)
+        route = timer.stages()["route"]
+        self.assertGreaterEqual(route["ms"], 15)
+        self.assertAlmostEqual(route["end_ms"] - route["start_ms"], route["ms"], delta=0.2)
+
+    def test_stage_recorded_on_exception(self):
+        timer = StageTimer("Test")
+        with self.assertRaises(ValueError):
+            with timer.stage("execute"):
+                raise ValueError("boom")
+        self.assertIn("execute", timer.stages())
+
+    def test_wrapped_background_stage_overlaps(self):
+        timer = StageTimer("Test")
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            future = pool.submit(timer.wrap("warmup", lambda: time.sleep(0.05) or "ready"))
+            with timer.stage("route"):
+                time.sleep(0.02)
+            self.assertEqual(future.result(), "ready")
+
+        stages = timer.stages()
+        # Warm-up started alongside routing and outlived it
+        self.assertLess(stages["warmup"]["start_ms"], stages["route"]["end_ms"])
+        self.assertGreater(stages["warmup"]["end_ms"], stages["route"]["end_ms"])
+
+    def test_mark_keeps_first(self):
+        timer = StageTimer("Test")
+        timer.mark("first_token")
+        first = timer.stages()["first_token"]["at_ms"]
+        time.sleep(0.01)
+        timer.mark("first_token")
+        self.assertEqual(timer.stages()["first_token"]["at_ms"], first)
+
+    def test_summary_in_start_order(self):
+        timer = StageTimer("Test")
+        with timer.stage("route"):
+            pass
+        timer.mark("first_token")
+        summary = timer.summary()
+        self.assertLess(summary.index("route"), summary.index("first_token @"))
+        self.assertTrue(summary.split(" | ")[-1].startswith("total "))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,28 @@
+"""
+Train the lexical intent classifier used as the router's fast path.
+Writes a float16 .npz artifact to INTENT_CLASSIFIER_PATH.
+"""
+
+import time
+
+from config import INTENT_CLASSIFIER_PATH, ROUTER_TRAINING_DATA
+from core.intent_classifier import IntentClassifier, load_dataset
+
+
+def main():
+    examples = load_dataset(ROUTER_TRAINING_DATA)
+    print(f"Training on {len(examples)} examples from {ROUTER_TRAINING_DATA}...")
+
+    start = time.perf_counter()
+    classifier = IntentClassifier.train([e[0] for e in examples], [e[1] for e in examples])
+    print(f"Trained in {time.perf_counter() - start:.1f}s")
+
+    train_acc = sum(classifier.predict(p)[0] == f for p, f, _ in examples) / len(examples)
+    print(f"Training accuracy: {train_acc:.1%}")
+
+    classifier.save(INTENT_CLASSIFIER_PATH)
+    print(f"Saved to {INTENT_CLASSIFIER_PATH}")
+
+
+if __name__ == "__main__":
+    main()